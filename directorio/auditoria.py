@@ -0,0 +1,394 @@
+# -*- coding: utf-8 -*-
+"""
+Módulo de Auditoría de Préstamos y Stock.
+
+Registra un evento por cada préstamo, devolución, cambio de estado, baja de
+préstamo y cambio de stock, con la fecha y hora, quién lo hizo (el actor) y el
+valor anterior. Con estos eventos se puede reconstruir el stock y los préstamos
+tal como estaban en cualquier momento.
+
+Los eventos se guardan en una carpeta 'auditoria' junto a los archivos de datos:
+
+- `actual.jsonl`: el segmento abierto, una línea JSON por evento (solo anexado).
+- `segmento_NNNNNN.jsonl.gz`: segmentos cerrados y comprimidos, que no cambian.
+- `punto_NNNNNN.json.gz`: el estado completo al cerrar cada segmento.
+- `indice.json`: rango de fechas y número del último evento de cada segmento.
+
+Cuando el segmento abierto supera `TAMANO_SEGMENTO` bytes se cierra: se
+comprime y se guarda su punto de control. Una consulta "a una fecha" parte del
+último punto anterior a esa fecha y solo aplica los eventos posteriores, en
+lugar de repasar la historia desde el principio.
+"""
+
+import getpass
+import gzip
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import cerrojo
+import codec_json
+
+NOMBRE_CARPETA = 'auditoria'
+NOMBRE_ACTUAL = 'actual.jsonl'
+NOMBRE_INDICE = 'indice.json'
+
+# Tamaño (bytes) a partir del cual se cierra el segmento abierto.
+TAMANO_SEGMENTO = 256 * 1024
+
+PRESTAMO = 'prestamo'
+DEVOLUCION = 'devolucion'
+ESTADO = 'estado'
+BAJA = 'baja'
+STOCK = 'stock'
+
+_CERROJO = threading.Lock()
+# Siguiente número de evento por carpeta y el tamaño del segmento abierto al calcularlo
+_SIGUIENTE: Dict[str, Tuple[int, int]] = {}
+_ACTOR: Optional[str] = None
+
+
+def configurar(actor: Optional[str] = None) -> None:
+    """
+    Indica el actor que se anota en los eventos (por defecto, el usuario del sistema).
+
+    Args:
+        actor (Optional[str]): Nombre de quien opera el programa.
+    """
+    global _ACTOR
+    _ACTOR = actor
+
+
+def _actor() -> str:
+    if _ACTOR:
+        return _ACTOR
+    try:
+        return getpass.getuser()
+    except (KeyError, OSError):
+        return 'sistema'
+
+
+def carpeta_auditoria(archivo: str) -> str:
+    """
+    Retorna la carpeta de auditoría de un archivo de datos (la misma para libros y préstamos).
+
+    Args:
+        archivo (str): Ruta a un archivo de datos (e.g. 'data/prestamo.json').
+
+    Returns:
+        str: Ruta de la carpeta (e.g. 'data/auditoria').
+    """
+    return os.path.join(os.path.dirname(os.path.abspath(archivo)), NOMBRE_CARPETA)
+
+
+def _momento(momento: str) -> str:
+    """Normaliza un momento de consulta: una fecha sola ('AAAA-MM-DD') incluye todo ese día."""
+    return momento + 'T23:59:59.999999' if len(momento) == 10 else momento
+
+
+# --- Índice, segmentos y puntos de control ---
+
+def _leer_indice(carpeta: str) -> Dict[str, Any]:
+    ruta = os.path.join(carpeta, NOMBRE_INDICE)
+    if not os.path.exists(ruta):
+        return {'ultimo_n': 0, 'segmentos': []}
+    with open(ruta, mode='r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _guardar_indice(carpeta: str, indice: Dict[str, Any]) -> None:
+    codec_json.escribir_atomico(os.path.join(carpeta, NOMBRE_INDICE), indice)
+
+
+def _ruta_segmento(carpeta: str, numero: int) -> str:
+    return os.path.join(carpeta, f"segmento_{numero:06d}.jsonl.gz")
+
+
+def _ruta_punto(carpeta: str, numero: int) -> str:
+    return os.path.join(carpeta, f"punto_{numero:06d}.json.gz")
+
+
+def _escribir_gzip(ruta: str, texto: str) -> None:
+    temporal = ruta + '.tmp'
+    with gzip.open(temporal, mode='wt', encoding='utf-8') as f:
+        f.write(texto)
+    os.replace(temporal, ruta)
+
+
+def _leer_punto(carpeta: str, numero: int) -> Dict[str, Any]:
+    with gzip.open(_ruta_punto(carpeta, numero), mode='rt', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _estado_vacio() -> Dict[str, Any]:
+    return {'stock': {}, 'prestamos': {}, 'iniciales': {}}
+
+
+def _eventos_segmento(carpeta: str, numero: int) -> Iterator[Dict[str, Any]]:
+    with gzip.open(_ruta_segmento(carpeta, numero), mode='rt', encoding='utf-8') as f:
+        for linea in f:
+            if linea.strip():
+                yield json.loads(linea)
+
+
+def _eventos_actuales(carpeta: str, desde_n: int) -> Iterator[Dict[str, Any]]:
+    """Eventos del segmento abierto posteriores a `desde_n` (los anteriores ya se cerraron)."""
+    ruta = os.path.join(carpeta, NOMBRE_ACTUAL)
+    if not os.path.exists(ruta):
+        return
+    with open(ruta, mode='r', encoding='utf-8') as f:
+        for linea in f:
+            try:
+                evento = json.loads(linea)
+            except json.JSONDecodeError:
+                continue  # línea cortada por un cierre inesperado
+            if evento.get('n', 0) > desde_n:
+                yield evento
+
+
+def _aplicar(estado: Dict[str, Any], evento: Dict[str, Any]) -> None:
+    tipo, clave = evento['tipo'], str(evento['clave'])
+    if tipo == STOCK:
+        # El primer valor anterior conocido es el stock que tenía antes de auditarse
+        estado['iniciales'].setdefault(clave, evento['anterior'])
+        estado['stock'][clave] = evento['nuevo']
+    elif tipo == PRESTAMO:
+        estado['prestamos'][clave] = dict(evento['nuevo'])
+    elif tipo in (DEVOLUCION, ESTADO):
+        if clave in estado['prestamos']:
+            estado['prestamos'][clave] = dict(estado['prestamos'][clave], estado=evento['nuevo'])
+    elif tipo == BAJA:
+        estado['prestamos'].pop(clave, None)
+
+
+def _cerrar_segmento(carpeta: str) -> None:
+    """Comprime el segmento abierto y guarda el estado al final de él como punto de control."""
+    indice = _leer_indice(carpeta)
+    eventos = list(_eventos_actuales(carpeta, indice['ultimo_n']))
+    if not eventos:
+        return
+
+    segmentos = indice['segmentos']
+    estado = _leer_punto(carpeta, segmentos[-1]['numero']) if segmentos else _estado_vacio()
+    for evento in eventos:
+        _aplicar(estado, evento)
+
+    numero = segmentos[-1]['numero'] + 1 if segmentos else 1
+    _escribir_gzip(_ruta_segmento(carpeta, numero),
+                   ''.join(json.dumps(e, ensure_ascii=False) + '\n' for e in eventos))
+    _escribir_gzip(_ruta_punto(carpeta, numero), json.dumps(estado, ensure_ascii=False))
+    segmentos.append({
+        'numero': numero,
+        'desde': eventos[0]['ts'],
+        'hasta': eventos[-1]['ts'],
+        'ultimo_n': eventos[-1]['n'],
+    })
+    indice['ultimo_n'] = eventos[-1]['n']
+    # Si el programa se cierra aquí, los eventos ya cerrados se ignoran por su número
+    _guardar_indice(carpeta, indice)
+    os.remove(os.path.join(carpeta, NOMBRE_ACTUAL))
+
+
+def _tamano_actual(carpeta: str) -> int:
+    try:
+        return os.path.getsize(os.path.join(carpeta, NOMBRE_ACTUAL))
+    except OSError:
+        return 0
+
+
+def _siguiente_numero(carpeta: str) -> int:
+    # Si el segmento abierto cambió de tamaño, otro proceso anotó eventos: se relee
+    siguiente = _SIGUIENTE.get(carpeta)
+    if siguiente is None or siguiente[1] != _tamano_actual(carpeta):
+        ultimo = _leer_indice(carpeta)['ultimo_n']
+        for evento in _eventos_actuales(carpeta, ultimo):
+            ultimo = max(ultimo, evento['n'])
+        siguiente = (ultimo + 1, _tamano_actual(carpeta))
+    return siguiente[0]
+
+
+# --- Registro de eventos ---
+
+@cerrojo.exclusivo
+def registrar(archivo: str, tipo: str, clave: Any, anterior: Any, nuevo: Any, **extra: Any) -> Dict[str, Any]:
+    """
+    Anexa un evento a la auditoría.
+
+    Args:
+        archivo (str): Un archivo de datos (define la carpeta de auditoría).
+        tipo (str): PRESTAMO, DEVOLUCION, ESTADO, BAJA o STOCK.
+        clave (Any): ID del préstamo o ISBN del libro.
+        anterior (Any): El valor antes del cambio (None si no existía).
+        nuevo (Any): El valor después del cambio (None si dejó de existir).
+        **extra (Any): Datos adicionales del evento (e.g. la fecha de devolución).
+
+    Returns:
+        Dict[str, Any]: El evento registrado.
+    """
+    carpeta = carpeta_auditoria(archivo)
+    with _CERROJO:
+        os.makedirs(carpeta, exist_ok=True)
+        evento = {
+            'n': _siguiente_numero(carpeta),
+            'ts': datetime.now().isoformat(timespec='microseconds'),
+            'actor': _actor(),
+            'tipo': tipo,
+            'clave': str(clave),
+            'anterior': anterior,
+            'nuevo': nuevo,
+            **extra,
+        }
+        ruta = os.path.join(carpeta, NOMBRE_ACTUAL)
+        with open(ruta, mode='a', encoding='utf-8') as f:
+            f.write(json.dumps(evento, ensure_ascii=False) + '\n')
+        if os.path.getsize(ruta) >= TAMANO_SEGMENTO:
+            _cerrar_segmento(carpeta)
+        _SIGUIENTE[carpeta] = (evento['n'] + 1, _tamano_actual(carpeta))
+    return evento
+
+
+def registrar_stock(archivo: str, isbn: Any, anterior: Any, nuevo: Any) -> None:
+    """Registra un cambio de stock de un libro, si de verdad cambió."""
+    anterior = None if anterior in (None, '') else int(anterior)
+    nuevo = None if nuevo in (None, '') else int(nuevo)
+    if anterior != nuevo:
+        registrar(archivo, STOCK, isbn, anterior, nuevo)
+
+
+# --- Consultas ---
+
+def eventos(
+        archivo: str,
+        clave: Optional[str] = None,
+        desde: Optional[str] = None,
+        hasta: Optional[str] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Recorre los eventos en orden, abriendo solo los segmentos del rango pedido.
+
+    Args:
+        archivo (str): Un archivo de datos (define la carpeta de auditoría).
+        clave (Optional[str]): Solo los eventos de este préstamo o ISBN.
+        desde (Optional[str]): Primer momento ISO incluido.
+        hasta (Optional[str]): Último momento ISO incluido (una fecha sola incluye todo el día).
+
+    Yields:
+        Dict[str, Any]: Cada evento.
+    """
+    carpeta = carpeta_auditoria(archivo)
+    hasta = _momento(hasta) if hasta else None
+    indice = _leer_indice(carpeta)
+    fuentes = [
+        _eventos_segmento(carpeta, s['numero']) for s in indice['segmentos']
+        if not ((desde and s['hasta'] < desde) or (hasta and s['desde'] > hasta))
+    ]
+    fuentes.append(_eventos_actuales(carpeta, indice['ultimo_n']))
+    for fuente in fuentes:
+        for evento in fuente:
+            if (desde and evento['ts'] < desde) or (clave is not None and evento['clave'] != str(clave)):
+                continue
+            if hasta and evento['ts'] > hasta:
+                return
+            yield evento
+
+
+def posicion_final(archivo: str) -> Dict[str, Any]:
+    """
+    Retorna el número y el momento del último evento registrado, sin recorrer los segmentos cerrados.
+
+    Args:
+        archivo (str): Un archivo de datos (define la carpeta de auditoría).
+
+    Returns:
+        Dict[str, Any]: {'n': ..., 'ts': ...}; {'n': 0, 'ts': ''} si no hay eventos.
+    """
+    carpeta = carpeta_auditoria(archivo)
+    indice = _leer_indice(carpeta)
+    posicion = {'n': indice['ultimo_n'], 'ts': indice['segmentos'][-1]['hasta'] if indice['segmentos'] else ''}
+    for evento in _eventos_actuales(carpeta, indice['ultimo_n']):
+        if evento['n'] > posicion['n']:
+            posicion = {'n': evento['n'], 'ts': evento['ts']}
+    return posicion
+
+
+def estado_en(archivo: str, momento: str) -> Dict[str, Any]:
+    """
+    Reconstruye el stock y los préstamos tal como estaban en un momento.
+
+    Parte del último punto de control anterior al momento y aplica solo los
+    eventos que siguen. Los libros cuyo stock cambió por primera vez después
+    del momento toman el valor que tenían antes de ese primer cambio.
+
+    Args:
+        archivo (str): Un archivo de datos (define la carpeta de auditoría).
+        momento (str): Momento ISO ('AAAA-MM-DD' incluye todo el día).
+
+    Returns:
+        Dict[str, Any]: {'stock': {ISBN: stock}, 'prestamos': {ID: préstamo}} en ese momento,
+            solo con los libros y préstamos que aparecen en la auditoría.
+    """
+    carpeta = carpeta_auditoria(archivo)
+    momento = _momento(momento)
+    indice = _leer_indice(carpeta)
+    segmentos = indice['segmentos']
+
+    previos = [s for s in segmentos if s['hasta'] <= momento]
+    estado = _leer_punto(carpeta, previos[-1]['numero']) if previos else _estado_vacio()
+    restantes = segmentos[len(previos):]
+
+    # Stock previo a la auditoría de cada libro: el del último punto más los del segmento abierto
+    iniciales = dict(_leer_punto(carpeta, segmentos[-1]['numero'])['iniciales']) if segmentos else {}
+
+    def aplicar_hasta_el_momento(fuente: Iterator[Dict[str, Any]]) -> bool:
+        for evento in fuente:
+            if evento['ts'] > momento:
+                return False
+            _aplicar(estado, evento)
+        return True
+
+    seguir = True
+    for segmento in restantes:
+        seguir = aplicar_hasta_el_momento(_eventos_segmento(carpeta, segmento['numero']))
+        if not seguir:
+            break
+    for evento in _eventos_actuales(carpeta, indice['ultimo_n']):
+        if seguir and evento['ts'] <= momento:
+            _aplicar(estado, evento)
+        elif evento['tipo'] == STOCK:
+            iniciales.setdefault(str(evento['clave']), evento['anterior'])
+
+    stock = {isbn: valor for isbn, valor in iniciales.items() if valor is not None}
+    stock.update(estado['stock'])
+    return {'stock': stock, 'prestamos': estado['prestamos']}
+
+
+def stock_en(archivo: str, isbn: str, momento: str) -> Optional[int]:
+    """
+    Retorna el stock que tenía un libro en un momento.
+
+    Args:
+        archivo (str): Un archivo de datos (define la carpeta de auditoría).
+        isbn (str): El ISBN del libro.
+        momento (str): Momento ISO ('AAAA-MM-DD' incluye todo el día).
+
+    Returns:
+        Optional[int]: El stock, o None si el libro nunca cambió de stock (su stock actual es el de entonces).
+    """
+    return estado_en(archivo, momento)['stock'].get(str(isbn))
+
+
+def prestamos_en(archivo: str, momento: str) -> List[Dict[str, Any]]:
+    """
+    Lista los préstamos sin devolver que había en un momento.
+
+    Args:
+        archivo (str): Un archivo de datos (define la carpeta de auditoría).
+        momento (str): Momento ISO ('AAAA-MM-DD' incluye todo el día).
+
+    Returns:
+        List[Dict[str, Any]]: Los préstamos activos en ese momento.
+    """
+    prestamos = estado_en(archivo, momento)['prestamos'].values()
+    return [p for p in prestamos if p.get('estado') != 'devuelto']
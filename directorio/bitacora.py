@@ -0,0 +1,318 @@
+# -*- coding: utf-8 -*-
+"""
+Módulo de Bitácora de Cambios (formato '.log').
+
+Guarda los datos de una entidad como una instantánea completa más una bitácora
+de operaciones que solo crece:
+
+- `<base>.log`: una operación JSON por línea ('guardar' un registro nuevo o
+  modificado, 'borrar' una clave o 'sumar' una cantidad a un campo, como el
+  stock), cada una con un número de secuencia 'n'.
+- `<base>_instantanea.json`: todos los registros hasta la operación 'hasta'.
+
+Un cambio cuesta una línea anexada, sin importar el tamaño del archivo. Al
+cargar se lee la instantánea y se le aplican las operaciones posteriores a
+'hasta'. Cuando la bitácora supera `UMBRAL_COMPACTACION` bytes, un hilo en
+segundo plano la pliega en una instantánea nueva, así que el tiempo de carga
+queda acotado.
+
+Para compactar sin detener las escrituras, la bitácora se renombra a
+`<base>.log.compactando` y las operaciones nuevas van a una bitácora vacía.
+Como cada operación tiene su número, volver a aplicar una bitácora ya plegada
+(por ejemplo, si el programa se cerró a mitad de una compactación) no repite
+ningún cambio. El renombrado y la instantánea nueva se hacen con el cerrojo de
+la carpeta tomado (ver `cerrojo`), como las demás escrituras.
+"""
+
+import json
+import os
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+import cerrojo
+import codec_json
+
+EXTENSION = '.log'
+
+# Tamaño de la bitácora (bytes) a partir del cual se compacta en segundo plano.
+UMBRAL_COMPACTACION = 1024 * 1024
+
+_CERROJO = threading.Lock()
+_COMPACTADORES: Dict[str, threading.Thread] = {}
+
+
+def es_bitacora(filepath: str) -> bool:
+    """Indica si la ruta corresponde al formato de bitácora."""
+    return filepath.endswith(EXTENSION)
+
+
+def ruta_instantanea(filepath: str) -> str:
+    """Retorna la ruta de la instantánea de una bitácora ('libros.log' → 'libros_instantanea.json')."""
+    base, _ = os.path.splitext(filepath)
+    return f"{base}_instantanea.json"
+
+
+def _ruta_compactando(filepath: str) -> str:
+    return filepath + '.compactando'
+
+
+def _leer_instantanea(filepath: str) -> Dict[str, Any]:
+    try:
+        instantanea = codec_json.leer(ruta_instantanea(filepath))
+    except (FileNotFoundError, json.JSONDecodeError):
+        instantanea = None
+    if not isinstance(instantanea, dict):
+        return {'version': 0, 'hasta': 0, 'registros': []}
+    return instantanea
+
+
+def _escribir_instantanea(filepath: str, registros: List[Dict[str, Any]], hasta: int, version: int) -> None:
+    """Escribe la instantánea en un temporal y la reemplaza de una sola vez."""
+    ruta = ruta_instantanea(filepath)
+    temporal = ruta + '.tmp'
+    codec_json.escribir(temporal, {'version': version, 'hasta': hasta, 'registros': registros})
+    os.replace(temporal, ruta)
+
+
+def _operaciones(ruta: str) -> Iterator[Dict[str, Any]]:
+    """Recorre las operaciones de una bitácora, saltando líneas incompletas."""
+    try:
+        with open(ruta, mode='r', encoding='utf-8') as archivo:
+            for linea in archivo:
+                try:
+                    yield json.loads(linea)
+                except json.JSONDecodeError:
+                    continue  # línea cortada por un cierre inesperado
+    except FileNotFoundError:
+        return
+
+
+def _ultima_operacion(ruta: str) -> Optional[int]:
+    """Retorna el número de la última operación completa de una bitácora, leyendo solo su final."""
+    try:
+        with open(ruta, mode='rb') as archivo:
+            archivo.seek(0, os.SEEK_END)
+            tamano = archivo.tell()
+            bloque = 4096
+            while True:
+                inicio = max(0, tamano - bloque)
+                archivo.seek(inicio)
+                lineas = archivo.read(tamano - inicio).splitlines()
+                # La primera línea puede estar cortada si no se leyó desde el inicio
+                for linea in reversed(lineas if inicio == 0 else lineas[1:]):
+                    try:
+                        return int(json.loads(linea)['n'])
+                    except (ValueError, KeyError, TypeError):
+                        continue
+                if inicio == 0:
+                    return None
+                bloque *= 2
+    except FileNotFoundError:
+        return None
+
+
+def _ultimo_numero(filepath: str) -> int:
+    """Número de la última operación registrada (en la bitácora, la que se compacta o la instantánea)."""
+    for ruta in (filepath, _ruta_compactando(filepath)):
+        numero = _ultima_operacion(ruta)
+        if numero is not None:
+            return numero
+    return int(_leer_instantanea(filepath).get('hasta', 0))
+
+
+def _aplicar(registros: Dict[str, Dict[str, Any]], operacion: Dict[str, Any]) -> None:
+    tipo = operacion.get('op')
+    if tipo == 'guardar':
+        registros[str(operacion['clave'])] = operacion['registro']
+    elif tipo == 'borrar':
+        registros.pop(str(operacion['clave']), None)
+    elif tipo == 'sumar':
+        registro = registros.get(str(operacion['clave']))
+        if registro is not None:
+            valor = registro.get(operacion['campo'])
+            total = int(valor or 0) + int(operacion['delta'])
+            # Se conserva el tipo con que venía el campo (texto en CSV, número en JSON)
+            registro[operacion['campo']] = total if isinstance(valor, int) else str(total)
+
+
+def _reconstruir(filepath: str, clave: str, incluir_bitacora: bool = True) -> Tuple[List[Dict[str, Any]], int, int]:
+    """Aplica sobre la instantánea las operaciones posteriores. Retorna (registros, hasta, versión)."""
+    instantanea = _leer_instantanea(filepath)
+    hasta = int(instantanea.get('hasta', 0))
+    registros = {str(r.get(clave)): r for r in instantanea.get('registros', [])}
+    rutas = [_ruta_compactando(filepath)] + ([filepath] if incluir_bitacora else [])
+    for ruta in rutas:
+        for operacion in _operaciones(ruta):
+            if operacion.get('n', 0) > hasta:
+                _aplicar(registros, operacion)
+                hasta = operacion['n']
+    return list(registros.values()), hasta, int(instantanea.get('version', 0))
+
+
+# --- Interfaz para los gestores ---
+
+def inicializar(filepath: str) -> None:
+    """Crea una bitácora vacía (la instantánea se crea al primer guardado completo o compactación)."""
+    if not os.path.exists(filepath):
+        open(filepath, mode='a', encoding='utf-8').close()
+
+
+def leer(filepath: str, clave: str) -> List[Dict[str, Any]]:
+    """
+    Lee los registros: la instantánea más las operaciones que vinieron después.
+
+    Args:
+        filepath (str): Ruta de la bitácora ('.log').
+        clave (str): Campo que identifica a cada registro.
+
+    Returns:
+        List[Dict[str, Any]]: Los registros, en orden de creación.
+    """
+    with _CERROJO:
+        return _reconstruir(filepath, clave)[0]
+
+
+def aplicar_lineas(registros: Iterable[Mapping[str, Any]], clave: str, lineas: Iterable[str]) -> List[Mapping[str, Any]]:
+    """
+    Aplica a registros ya leídos las operaciones de líneas anexadas a la bitácora.
+
+    Los registros que no cambian se conservan tal cual (no se copian).
+
+    Args:
+        registros (Iterable[Mapping[str, Any]]): Los registros leídos antes de las líneas.
+        clave (str): Campo que identifica a cada registro.
+        lineas (Iterable[str]): Las líneas anexadas, una operación JSON cada una.
+
+    Returns:
+        List[Mapping[str, Any]]: Los registros con las operaciones aplicadas.
+
+    Raises:
+        ValueError: Si una línea no es una operación válida.
+    """
+    por_clave: Dict[str, Any] = {str(r.get(clave)): r for r in registros}
+    for linea in lineas:
+        operacion = json.loads(linea)
+        valor = str(operacion['clave'])
+        if operacion.get('op') == 'sumar' and valor in por_clave:
+            por_clave[valor] = dict(por_clave[valor])
+        _aplicar(por_clave, operacion)
+    return list(por_clave.values())
+
+
+def escribir(filepath: str, datos: List[Dict[str, Any]]) -> None:
+    """
+    Guarda el contenido completo como instantánea nueva y vacía la bitácora.
+
+    Args:
+        filepath (str): Ruta de la bitácora ('.log').
+        datos (List[Dict[str, Any]]): El contenido completo.
+    """
+    with _CERROJO:
+        version = int(_leer_instantanea(filepath).get('version', 0)) + 1
+        _escribir_instantanea(filepath, list(datos), _ultimo_numero(filepath), version)
+        open(filepath, mode='w', encoding='utf-8').close()
+        if os.path.exists(_ruta_compactando(filepath)):
+            os.remove(_ruta_compactando(filepath))
+
+
+def anotar(
+        filepath: str,
+        clave: str,
+        cambiados: Iterable[Dict[str, Any]] = (),
+        eliminados: Iterable[str] = (),
+        sumas: Iterable[Tuple[str, str, int]] = (),
+) -> None:
+    """
+    Anexa a la bitácora las operaciones de un cambio.
+
+    Si la bitácora pasa del umbral, se compacta en segundo plano.
+
+    Args:
+        filepath (str): Ruta de la bitácora ('.log').
+        clave (str): Campo que identifica a cada registro.
+        cambiados (Iterable[Dict[str, Any]]): Registros nuevos o modificados.
+        eliminados (Iterable[str]): Claves de los registros eliminados.
+        sumas (Iterable[Tuple[str, str, int]]): Tríos (clave, campo, cantidad) a sumar.
+    """
+    operaciones: List[Dict[str, Any]] = [{'op': 'borrar', 'clave': str(valor)} for valor in eliminados]
+    operaciones += [{'op': 'guardar', 'clave': str(r.get(clave)), 'registro': r} for r in cambiados]
+    operaciones += [{'op': 'sumar', 'clave': str(valor), 'campo': campo, 'delta': int(delta)}
+                    for valor, campo, delta in sumas]
+    if not operaciones:
+        return
+
+    with _CERROJO:
+        numero = _ultimo_numero(filepath)
+        lineas = []
+        for operacion in operaciones:
+            numero += 1
+            lineas.append(json.dumps({'n': numero, **operacion}, ensure_ascii=False))
+        with open(filepath, mode='ab+') as archivo:
+            # Si un cierre inesperado dejó una línea cortada, se empieza en una línea nueva
+            if archivo.tell() > 0:
+                archivo.seek(-1, os.SEEK_END)
+                if archivo.read(1) != b'\n':
+                    lineas.insert(0, '')
+            archivo.write(('\n'.join(lineas) + '\n').encode('utf-8'))
+        tamano = os.path.getsize(filepath)
+
+    if tamano >= UMBRAL_COMPACTACION:
+        compactar_en_segundo_plano(filepath, clave)
+
+
+# --- Compactación ---
+
+def compactar(filepath: str, clave: str) -> bool:
+    """
+    Pliega la bitácora en una instantánea nueva.
+
+    Las operaciones que se anexen mientras tanto van a una bitácora nueva y no se pierden.
+
+    Args:
+        filepath (str): Ruta de la bitácora ('.log').
+        clave (str): Campo que identifica a cada registro.
+
+    Returns:
+        bool: True si se escribió una instantánea nueva.
+    """
+    with cerrojo.bloquear(filepath), _CERROJO:
+        compactando = _ruta_compactando(filepath)
+        # Si quedó una compactación a medias, se termina esa antes de tomar la bitácora actual
+        if not os.path.exists(compactando):
+            if not os.path.exists(filepath) or os.path.getsize(filepath) == 0:
+                return False
+            os.replace(filepath, compactando)
+            open(filepath, mode='a', encoding='utf-8').close()
+
+    # El plegado, que es lo costoso, se hace sin bloquear a quienes anotan cambios
+    registros, hasta, version = _reconstruir(filepath, clave, incluir_bitacora=False)
+
+    with cerrojo.bloquear(filepath), _CERROJO:
+        # Si entretanto se guardó el contenido completo, este plegado ya no sirve
+        if int(_leer_instantanea(filepath).get('version', 0)) != version:
+            return False
+        _escribir_instantanea(filepath, registros, hasta, version + 1)
+        if os.path.exists(compactando):
+            os.remove(compactando)
+    return True
+
+
+def compactar_en_segundo_plano(filepath: str, clave: str) -> None:
+    """Lanza la compactación en un hilo, salvo que ya haya una en curso para el archivo."""
+    ruta = os.path.abspath(filepath)
+    with _CERROJO:
+        hilo = _COMPACTADORES.get(ruta)
+        if hilo is not None and hilo.is_alive():
+            return
+        hilo = threading.Thread(target=compactar, args=(filepath, clave), name='compactar-bitacora', daemon=True)
+        _COMPACTADORES[ruta] = hilo
+        hilo.start()
+
+
+def esperar_compactaciones() -> None:
+    """Espera a que terminen las compactaciones en curso (por ejemplo, antes de salir)."""
+    with _CERROJO:
+        hilos = list(_COMPACTADORES.values())
+        _COMPACTADORES.clear()
+    for hilo in hilos:
+        hilo.join()
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+Módulo de Búsqueda Aproximada de Usuarios.
+
+Permite encontrar usuarios por nombre, apellido o correo sin conocer su
+documento, tolerando errores de escritura. Los textos se normalizan (sin
+tildes, sin mayúsculas) y se dividen en trigramas (grupos de tres letras);
+un índice invertido guarda, por trigrama, los documentos que lo contienen.
+
+Una búsqueda solo visita las listas de los trigramas de la consulta y ordena
+a los candidatos por la proporción de trigramas de la consulta que contienen
+(a igual proporción, primero el usuario con menos texto, que es más específico),
+así que su costo depende de la consulta y no del total de usuarios.
+
+Como los índices por fecha de los préstamos, el índice de cada archivo vive en
+memoria mientras el archivo no cambie por otro camino, y se actualiza con los
+cambios que guardan `crear_usuario`, `actualizar_usuario` y `eliminar_usuario`.
+"""
+
+import heapq
+import os
+import unicodedata
+from collections import Counter
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+import vigilante
+
+CAMPOS = ('nombres', 'apellidos', 'email')
+
+_INDICES: Dict[str, "IndiceTrigramas"] = {}
+
+
+def normalizar(texto: Any) -> str:
+    """Quita tildes y diacríticos y pasa a minúsculas ('Núñez' → 'nunez')."""
+    descompuesto = unicodedata.normalize('NFKD', str(texto or ''))
+    return ''.join(c for c in descompuesto if not unicodedata.combining(c)).casefold()
+
+
+def trigramas(texto: Any) -> FrozenSet[str]:
+    """
+    Retorna los trigramas de un texto normalizado, palabra por palabra.
+
+    Cada palabra se rellena con espacios ('  ana ') para que sus primeras y
+    últimas letras también formen trigramas.
+
+    Args:
+        texto (Any): El texto.
+
+    Returns:
+        FrozenSet[str]: Los trigramas.
+    """
+    resultado = set()
+    for palabra in normalizar(texto).replace('@', ' ').replace('.', ' ').split():
+        relleno = f"  {palabra} "
+        resultado.update(relleno[i:i + 3] for i in range(len(relleno) - 2))
+    return frozenset(resultado)
+
+
+class IndiceTrigramas:
+    """Índice invertido trigrama → documentos, con los trigramas de cada usuario."""
+
+    def __init__(self, usuarios: Iterable[Dict[str, Any]] = ()) -> None:
+        self.listas: Dict[str, Set[str]] = {}
+        self.por_usuario: Dict[str, FrozenSet[str]] = {}
+        self.usuarios: Dict[str, Dict[str, Any]] = {}
+        self.firma: Tuple[int, int] = (-1, -1)
+        for usuario in usuarios:
+            self.guardar(usuario)
+
+    def guardar(self, usuario: Dict[str, Any]) -> None:
+        """Agrega un usuario o reemplaza al que tenga el mismo documento."""
+        documento = str(usuario.get('documento'))
+        self.borrar(documento)
+        propios = trigramas(' '.join(str(usuario.get(campo) or '') for campo in CAMPOS))
+        self.por_usuario[documento] = propios
+        self.usuarios[documento] = usuario
+        for trigrama in propios:
+            self.listas.setdefault(trigrama, set()).add(documento)
+
+    def borrar(self, documento: str) -> None:
+        propios = self.por_usuario.pop(str(documento), None)
+        if propios is None:
+            return
+        self.usuarios.pop(str(documento), None)
+        for trigrama in propios:
+            lista = self.listas.get(trigrama)
+            if lista is not None:
+                lista.discard(str(documento))
+                if not lista:
+                    del self.listas[trigrama]
+
+    def aplicar(self, cambiados: Iterable[Dict[str, Any]], eliminados: Iterable[str]) -> None:
+        """Aplica usuarios nuevos o modificados y documentos eliminados."""
+        for documento in eliminados:
+            self.borrar(documento)
+        for usuario in cambiados:
+            self.guardar(dict(usuario))
+
+    def buscar(self, consulta: str, k: int = 10, similitud_minima: float = 0.2) -> List[Tuple[float, Dict[str, Any]]]:
+        """
+        Retorna los k usuarios más parecidos a la consulta.
+
+        Args:
+            consulta (str): Nombre, apellido o correo (completo o parcial, con o sin tildes).
+            k (int): Cantidad máxima de resultados.
+            similitud_minima (float): Similitud mínima (0 a 1) para incluir un resultado.
+
+        Returns:
+            List[Tuple[float, Dict[str, Any]]]: Pares (similitud, usuario), de mayor a menor similitud.
+        """
+        buscados = trigramas(consulta)
+        if not buscados:
+            return []
+        coincidencias: Counter = Counter()
+        for trigrama in buscados:
+            coincidencias.update(self.listas.get(trigrama, ()))
+
+        # Proporción de los trigramas de la consulta que aparecen en cada usuario
+        total = len(buscados)
+        puntajes = (
+            (comunes / total, documento) for documento, comunes in coincidencias.items()
+            if comunes / total >= similitud_minima
+        )
+        mejores = heapq.nlargest(k, puntajes, key=lambda par: (par[0], -len(self.por_usuario[par[1]])))
+        return [(round(puntaje, 3), dict(self.usuarios[documento])) for puntaje, documento in mejores]
+
+
+# --- Índices por archivo ---
+
+def vigente(filepath: str) -> Optional[IndiceTrigramas]:
+    """Retorna el índice de un archivo si sigue al día con él, o None."""
+    indice = _INDICES.get(os.path.abspath(filepath))
+    if indice is not None and indice.firma == vigilante.firma(filepath):
+        return indice
+    return None
+
+
+def confirmar(filepath: str, indice: IndiceTrigramas) -> None:
+    """Registra que el índice corresponde al contenido actual del archivo."""
+    indice.firma = vigilante.firma(filepath)
+    _INDICES[os.path.abspath(filepath)] = indice
+
+
+def de_archivo(filepath: str) -> IndiceTrigramas:
+    """
+    Retorna el índice de trigramas de un archivo de usuarios, construyéndolo si hace falta.
+
+    Args:
+        filepath (str): Ruta al archivo de usuarios.
+
+    Returns:
+        IndiceTrigramas: El índice al día con el archivo.
+    """
+    indice = vigente(filepath)
+    if indice is None:
+        import gestor_datos  # importación diferida: gestor_datos usa este módulo
+        indice = IndiceTrigramas(gestor_datos.cargar_datos(filepath))
+        confirmar(filepath, indice)
+    return indice
+
+
+def buscar(filepath: str, consulta: str, k: int = 10) -> List[Tuple[float, Dict[str, Any]]]:
+    """
+    Busca usuarios por nombre, apellido o correo, tolerando errores de escritura.
+
+    Args:
+        filepath (str): Ruta al archivo de usuarios.
+        consulta (str): El texto buscado.
+        k (int): Cantidad máxima de resultados.
+
+    Returns:
+        List[Tuple[float, Dict[str, Any]]]: Pares (similitud, usuario), de mayor a menor similitud.
+    """
+    return de_archivo(filepath).buscar(consulta, k)
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+Módulo de Carga Paralela.
+
+Carga los archivos de usuarios, libros y préstamos al mismo tiempo en lugar de
+uno tras otro:
+
+- Archivos pequeños: un hilo por archivo (la carga está dominada por el I/O).
+- Archivos JSON grandes: un proceso aparte, para decodificar en otro núcleo.
+- Archivos CSV muy grandes: se dividen en trozos por saltos de línea y cada
+  trozo se interpreta en un proceso distinto (si están comprimidos, se cargan
+  enteros en un proceso, como los JSON).
+
+Cada archivo se carga con el mismo gestor de datos que usa el resto del sistema.
+Un archivo con escrituras diferidas pendientes se carga siempre en un hilo: su
+contenido al día está en la memoria de este proceso, no en el disco.
+
+Lo que se carga en otro proceso también queda en la caché de lectura de este
+(ver `vigilante`), como lo cargado en un hilo con el gestor: al arrancar,
+`precargar` lee todo a la vez y las lecturas siguientes no vuelven al disco.
+"""
+
+import csv
+import importlib
+import io
+import os
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import codificacion
+import compresion
+import escritura_diferida
+import vigilante
+
+# Gestor de datos de cada entidad.
+GESTORES = {
+    'usuarios': 'gestor_datos',
+    'libros': 'gestor_datos2',
+    'prestamos': 'gestor_datos3',
+}
+
+# A partir de este tamaño (bytes) un JSON se decodifica en otro proceso.
+UMBRAL_PROCESO = 8 * 1024 * 1024
+
+# A partir de este tamaño (bytes) un CSV se interpreta en trozos paralelos.
+UMBRAL_CSV_TROZOS = 32 * 1024 * 1024
+
+
+def _cargar_con_gestor(nombre_gestor: str, filepath: str) -> List[Dict[str, Any]]:
+    """Carga un archivo con el gestor indicado (función de nivel de módulo para poder usarla en procesos)."""
+    gestor = importlib.import_module(nombre_gestor)
+    return gestor.cargar_datos(filepath)
+
+
+def _tamano(filepath: str) -> int:
+    try:
+        return os.path.getsize(filepath)
+    except OSError:
+        return 0
+
+
+def cargar_en_paralelo(archivos: Dict[str, str], max_procesos: Optional[int] = None) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Carga varias entidades a la vez.
+
+    Args:
+        archivos (Dict[str, str]): Ruta de cada entidad ('usuarios', 'libros', 'prestamos').
+        max_procesos (Optional[int]): Límite de procesos para los archivos grandes.
+
+    Returns:
+        Dict[str, List[Dict[str, Any]]]: Los registros cargados de cada entidad.
+    """
+    grandes = {
+        entidad: ruta for entidad, ruta in archivos.items()
+        if _tamano(ruta) >= (UMBRAL_CSV_TROZOS if ruta.endswith('.csv') else UMBRAL_PROCESO)
+        and escritura_diferida.leer_pendiente(ruta) is None
+    }
+    pequenos = {entidad: ruta for entidad, ruta in archivos.items() if entidad not in grandes}
+
+    # La firma se toma antes de leer, como en los gestores
+    firmas = {entidad: vigilante.firma(ruta) for entidad, ruta in grandes.items()}
+    resultados: Dict[str, List[Dict[str, Any]]] = {}
+    futuros: Dict[str, Future] = {}
+    procesos = ProcessPoolExecutor(max_workers=max_procesos) if grandes else None
+    try:
+        with ThreadPoolExecutor(max_workers=max(len(pequenos), 1)) as hilos:
+            for entidad, ruta in pequenos.items():
+                futuros[entidad] = hilos.submit(_cargar_con_gestor, GESTORES[entidad], ruta)
+            for entidad, ruta in grandes.items():
+                if ruta.endswith('.csv') and not compresion.comprimido(ruta):
+                    # Los trozos se reparten en el grupo de procesos desde un hilo
+                    futuros[entidad] = hilos.submit(_cargar_csv_grande, GESTORES[entidad], ruta, procesos)
+                else:
+                    futuros[entidad] = procesos.submit(_cargar_con_gestor, GESTORES[entidad], ruta)
+            for entidad, futuro in futuros.items():
+                resultados[entidad] = futuro.result()
+    finally:
+        if procesos is not None:
+            procesos.shutdown()
+
+    # Lo leído fuera del gestor de este proceso queda en su caché y como base del diario
+    for entidad, ruta in grandes.items():
+        escritura_diferida.recordar(ruta, resultados[entidad])
+        vigilante.guardar_cache(ruta, resultados[entidad], firmas[entidad],
+                                importlib.import_module(GESTORES[entidad]).CLAVE)
+    return resultados
+
+
+def precargar(archivos: Dict[str, str]) -> None:
+    """
+    Carga en paralelo los archivos que existan para dejarlos en la caché de lectura.
+
+    Sirve al arrancar el programa, con el vigilante ya activo.
+
+    Args:
+        archivos (Dict[str, str]): Ruta de cada entidad ('usuarios', 'libros', 'prestamos').
+    """
+    existentes = {entidad: ruta for entidad, ruta in archivos.items() if os.path.exists(ruta)}
+    if existentes:
+        cargar_en_paralelo(existentes)
+
+
+def _cargar_csv_grande(nombre_gestor: str, filepath: str, procesos: ProcessPoolExecutor) -> List[Dict[str, Any]]:
+    """Carga un CSV grande por trozos y comparte sus valores repetidos como lo haría el gestor."""
+    filas = cargar_csv_paralelo(filepath, None, procesos)
+    gestor = importlib.import_module(nombre_gestor)
+    return codificacion.compartir_valores(filas, getattr(gestor, 'COLUMNAS_DICCIONARIO', []))
+
+
+def dividir_en_trozos(filepath: str, partes: int) -> Tuple[bytes, List[Tuple[int, int]]]:
+    """
+    Divide un CSV en rangos de bytes que empiezan y terminan en un salto de línea.
+
+    Asume, como los archivos que escribe el sistema, que ningún campo contiene
+    saltos de línea.
+
+    Args:
+        filepath (str): Ruta al archivo CSV.
+        partes (int): Cantidad de trozos deseada.
+
+    Returns:
+        Tuple[bytes, List[Tuple[int, int]]]: La línea de cabecera y los rangos (inicio, fin).
+    """
+    tamano = _tamano(filepath)
+    with open(filepath, mode='rb') as f:
+        cabecera = f.readline()
+        inicio = f.tell()
+        rangos = []
+        paso = max((tamano - inicio) // max(partes, 1), 1)
+        while inicio < tamano:
+            f.seek(min(inicio + paso, tamano))
+            if f.tell() < tamano:
+                f.readline()  # avanzar hasta el final de la línea actual
+            fin = f.tell()
+            rangos.append((inicio, fin))
+            inicio = fin
+    return cabecera, rangos
+
+
+def _interpretar_trozo(filepath: str, cabecera: bytes, inicio: int, fin: int) -> List[Dict[str, Any]]:
+    """Interpreta las filas CSV contenidas entre dos posiciones del archivo."""
+    with open(filepath, mode='rb') as f:
+        f.seek(inicio)
+        contenido = f.read(fin - inicio)
+    texto = (cabecera + contenido).decode('utf-8-sig')
+    return list(csv.DictReader(io.StringIO(texto, newline='')))
+
+
+def cargar_csv_paralelo(
+        filepath: str,
+        partes: Optional[int] = None,
+        procesos: Optional[ProcessPoolExecutor] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Carga un CSV grande interpretando sus trozos en paralelo, conservando el orden.
+
+    Args:
+        filepath (str): Ruta al archivo CSV.
+        partes (Optional[int]): Cantidad de trozos (por defecto, un trozo por núcleo).
+        procesos (Optional[ProcessPoolExecutor]): Grupo de procesos a reutilizar.
+
+    Returns:
+        List[Dict[str, Any]]: Las filas del archivo.
+    """
+    cabecera, rangos = dividir_en_trozos(filepath, partes or os.cpu_count() or 1)
+    propio = procesos is None
+    grupo = ProcessPoolExecutor() if propio else procesos
+    try:
+        futuros = [grupo.submit(_interpretar_trozo, filepath, cabecera, inicio, fin) for inicio, fin in rangos]
+        filas: List[Dict[str, Any]] = []
+        for futuro in futuros:
+            filas.extend(futuro.result())
+        return filas
+    finally:
+        if propio:
+            grupo.shutdown()
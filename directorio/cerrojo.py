@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+Módulo de Cerrojo de la Carpeta de Datos.
+
+Las operaciones que leen, modifican y vuelven a guardar varios archivos (un
+préstamo toca libros, ejemplares, préstamos y auditoría) no deben intercalarse
+cuando varios procesos trabajan sobre la misma carpeta de datos. Este módulo
+da un cerrojo exclusivo por carpeta, entre procesos y entre hilos, sobre el
+archivo '.cerrojo' de la carpeta.
+
+Usa `fcntl.flock` (POSIX) o `msvcrt.locking` (Windows); si ninguno está
+disponible, el cerrojo solo protege entre hilos del mismo proceso. Es
+reentrante: una operación protegida puede llamar a otra de la misma carpeta.
+
+Lo toma todo lo que escribe en la carpeta: las escrituras de los gestores de
+datos, las operaciones de usuarios, libros y préstamos, y los módulos que
+guardan archivos junto al de préstamos (ejemplares, reservas, multas,
+política, histórico, auditoría, sucursales).
+
+El archivo '.cerrojo' guarda además quién lo tuvo por última vez. Un proceso
+que toma el cerrojo después de otro aplica antes el diario de la escritura
+diferida de la carpeta (ver `escritura_diferida`): así lo pendiente del otro
+proceso solo se escribe cuando alguien más necesita la carpeta, y no cada vez
+que se suelta el cerrojo.
+"""
+
+import functools
+import inspect
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator
+
+import escritura_diferida
+import vigilante
+
+try:
+    import fcntl
+except ImportError:  # fcntl solo existe en POSIX
+    fcntl = None
+
+try:
+    import msvcrt
+except ImportError:  # msvcrt solo existe en Windows
+    msvcrt = None
+
+NOMBRE_ARCHIVO = '.cerrojo'
+
+_HILOS: Dict[str, threading.RLock] = {}
+_CREANDO = threading.Lock()
+_TENIDOS = threading.local()
+_RELEVOS: Dict[str, int] = {}
+
+# Identifica a esta ejecución del programa (junto con el pid, que cambia en los procesos hijos)
+_SESION = uuid.uuid4().hex
+
+
+def _cerrojo_hilos(carpeta: str) -> threading.RLock:
+    with _CREANDO:
+        return _HILOS.setdefault(carpeta, threading.RLock())
+
+
+def _dueno() -> bytes:
+    """Retorna la marca que este proceso deja en el archivo '.cerrojo'."""
+    return f'{os.getpid()}:{_SESION}'.encode()
+
+
+def es_dueno(carpeta: str) -> bool:
+    """
+    Indica si este proceso fue el último en tomar el cerrojo de una carpeta.
+
+    Args:
+        carpeta (str): La carpeta de datos (ruta absoluta).
+
+    Returns:
+        bool: True si ningún otro proceso tomó el cerrojo desde la última vez que lo tomó este.
+    """
+    if getattr(_TENIDOS, 'carpetas', {}).get(carpeta):
+        return True
+    try:
+        with open(os.path.join(carpeta, NOMBRE_ARCHIVO), mode='rb') as f:
+            return f.read() == _dueno()
+    except FileNotFoundError:
+        return False
+
+
+def relevos(carpeta: str) -> int:
+    """
+    Retorna cuántas veces tomó este proceso el cerrojo de una carpeta después de otro.
+
+    Lo que se guardó en memoria de un archivo de la carpeta sigue al día mientras
+    este número no cambie y el cerrojo esté tomado.
+
+    Args:
+        carpeta (str): La carpeta de datos (ruta absoluta).
+
+    Returns:
+        int: La cantidad de relevos.
+    """
+    return _RELEVOS.get(carpeta, 0)
+
+
+def _tomar(carpeta: str, archivo) -> None:
+    """Con el cerrojo ya tomado, pone al día la carpeta si otro proceso lo tuvo y deja la marca propia."""
+    archivo.seek(0)
+    if archivo.read() == _dueno():
+        return
+    # Lo que otro proceso escribió puede conservar fecha y tamaño: la caché de lectura no sirve
+    _RELEVOS[carpeta] = _RELEVOS.get(carpeta, 0) + 1
+    vigilante.invalidar_carpeta(carpeta)
+    escritura_diferida.al_tomar_carpeta(carpeta)
+    archivo.seek(0)
+    archivo.truncate()
+    archivo.write(_dueno())
+    archivo.flush()
+
+
+@contextmanager
+def bloquear(archivo: str) -> Iterator[None]:
+    """
+    Toma el cerrojo exclusivo de la carpeta de un archivo de datos.
+
+    Args:
+        archivo (str): Un archivo de la carpeta a bloquear.
+
+    Yields:
+        None: Mientras dura el bloque, ningún otro proceso ni hilo tiene el cerrojo.
+    """
+    carpeta = os.path.dirname(os.path.abspath(archivo))
+    tenidos = getattr(_TENIDOS, 'carpetas', None)
+    if tenidos is None:
+        tenidos = _TENIDOS.carpetas = {}
+
+    with _cerrojo_hilos(carpeta):
+        if tenidos.get(carpeta):
+            # Ya lo tiene este hilo: solo se cuenta el nuevo nivel
+            tenidos[carpeta] += 1
+            try:
+                yield
+            finally:
+                tenidos[carpeta] -= 1
+            return
+
+        os.makedirs(carpeta, exist_ok=True)
+        with open(os.path.join(carpeta, NOMBRE_ARCHIVO), mode='a+b') as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            elif msvcrt is not None:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            tenidos[carpeta] = 1
+            try:
+                _tomar(carpeta, f)
+                yield
+            finally:
+                tenidos[carpeta] = 0
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                elif msvcrt is not None:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def exclusivo(funcion: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Decorador: ejecuta la función con el cerrojo de la carpeta de su primer argumento.
+
+    Args:
+        funcion (Callable[..., Any]): Función cuyo primer argumento es un archivo de datos.
+
+    Returns:
+        Callable[..., Any]: La función protegida.
+    """
+    parametro = next(iter(inspect.signature(funcion).parameters))
+
+    @functools.wraps(funcion)
+    def protegida(*args: Any, **kwargs: Any) -> Any:
+        archivo = args[0] if args else kwargs[parametro]
+        with bloquear(archivo):
+            return funcion(*args, **kwargs)
+    return protegida
@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""
+Módulo de Códec JSON.
+
+Lectura y escritura de los archivos JSON de los gestores de datos:
+
+- Por defecto se escribe JSON compacto (sin sangría ni espacios); la salida con
+  sangría queda disponible con `configurar(bonito=True)` o por llamada.
+- Si `orjson` está instalado se usa para codificar y decodificar; si no, se usa
+  el módulo `json` de la biblioteca estándar. Ambos leen lo que escribe el otro.
+- Las listas grandes se escriben por trozos de registros, sin armar en memoria
+  una sola cadena con todo el archivo.
+- Los archivos comprimidos (ver `compresion`) se descomprimen por flujo y el
+  texto pasa a un lector incremental que decodifica registro por registro a
+  medida que llega (`iterar`), sin esperar a tener el archivo entero. Los
+  archivos codificados por diccionario (ver `codificacion`) se decodifican
+  enteros y luego se recorren sus registros.
+"""
+
+import codecs
+import json
+import os
+import re
+from typing import IO, Any, Callable, Iterator, List, Optional
+
+import codificacion
+import compresion
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional
+    orjson = None
+
+# Registros que se codifican juntos en cada escritura al archivo.
+TAMANO_TROZO = 1000
+
+# Bytes (ya descomprimidos) que se leen de una vez en la lectura incremental.
+TAMANO_LECTURA = 1 << 16
+
+_BONITO = False
+_ACELERADO = orjson is not None
+
+_CODIFICADOR = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+_DECODIFICADOR = json.JSONDecoder()
+_ESPACIOS = re.compile(r'[ \t\n\r]*')
+
+
+def configurar(bonito: Optional[bool] = None, acelerado: Optional[bool] = None) -> None:
+    """
+    Cambia el formato por defecto y el motor de codificación.
+
+    Args:
+        bonito (Optional[bool]): True para escribir con sangría de 4 espacios.
+        acelerado (Optional[bool]): False para usar siempre la biblioteca estándar.
+    """
+    global _BONITO, _ACELERADO
+    if bonito is not None:
+        _BONITO = bonito
+    if acelerado is not None:
+        _ACELERADO = acelerado and orjson is not None
+
+
+def _codificador() -> Callable[[Any], bytes]:
+    if _ACELERADO:
+        return orjson.dumps
+    return lambda valor: _CODIFICADOR.encode(valor).encode('utf-8')
+
+
+def _textos(flujo: IO[bytes]) -> Iterator[str]:
+    """Lee un flujo binario por bloques y lo entrega como texto UTF-8."""
+    decodificador = codecs.getincrementaldecoder('utf-8')()
+    while True:
+        bloque = flujo.read(TAMANO_LECTURA)
+        texto = decodificador.decode(bloque, final=not bloque)
+        if texto:
+            yield texto
+        if not bloque:
+            return
+
+
+def _elementos(texto: str, textos: Iterator[str]) -> Iterator[Any]:
+    """
+    Decodifica uno a uno los elementos de una lista JSON que llega por trozos.
+
+    `texto` empieza con el '[' de la lista; cuando un elemento queda cortado al
+    final del búfer se agrega el siguiente trozo y se vuelve a intentar.
+    """
+    posicion = 1
+    agotado = False
+    espera_valor = True  # justo después de '[' o de ','
+    admite_cierre = True  # justo después de '[' o de un valor
+    while True:
+        posicion = _ESPACIOS.match(texto, posicion).end()
+        if posicion < len(texto):
+            caracter = texto[posicion]
+            if caracter == ']' and admite_cierre:
+                return
+            if not espera_valor:
+                if caracter != ',':
+                    raise json.JSONDecodeError("Se esperaba ',' o ']'", texto, posicion)
+                posicion += 1
+                espera_valor, admite_cierre = True, False
+                continue
+            try:
+                valor, fin = _DECODIFICADOR.raw_decode(texto, posicion)
+                # Un valor que llega al final del búfer (p. ej. un número) podría seguir en el próximo trozo
+                if fin < len(texto) or agotado:
+                    yield valor
+                    posicion = fin
+                    espera_valor, admite_cierre = False, True
+                    continue
+            except json.JSONDecodeError:
+                if agotado:
+                    raise
+        elif agotado:
+            raise json.JSONDecodeError("La lista no está cerrada", texto, posicion)
+
+        siguiente = next(textos, None)
+        if siguiente is None:
+            agotado = True
+        else:
+            texto = texto[posicion:] + siguiente
+            posicion = 0
+
+
+def _inicio(textos: Iterator[str]) -> str:
+    """Retorna el primer trozo con contenido, sin los espacios iniciales."""
+    for texto in textos:
+        if texto.strip():
+            return texto.lstrip()
+    return ''
+
+
+def iterar(filepath: str) -> Iterator[Any]:
+    """
+    Recorre los registros de un archivo JSON con una lista, sin cargarlo entero.
+
+    Un archivo codificado por diccionario sí se carga entero para decodificarlo.
+
+    Args:
+        filepath (str): Ruta al archivo (comprimido o no).
+
+    Yields:
+        Any: Cada elemento de la lista (o registro decodificado), en orden.
+
+    Raises:
+        ValueError: Si el archivo no contiene una lista ni un documento codificado.
+        json.JSONDecodeError: Si el archivo no es JSON válido.
+    """
+    with compresion.abrir(filepath, 'rb') as json_file:
+        textos = _textos(json_file)
+        texto = _inicio(textos)
+        if texto.startswith('['):
+            yield from _elementos(texto, textos)
+            return
+        documento = json.loads(texto + ''.join(textos)) if texto.startswith('{') else None
+    if not codificacion.es_codificado(documento):
+        raise ValueError(f"El archivo JSON no contiene una lista: {filepath}")
+    yield from codificacion.decodificar(documento)
+
+
+def leer(filepath: str) -> Any:
+    """
+    Lee y decodifica un archivo JSON.
+
+    Si el archivo está comprimido, se descomprime por flujo: con orjson (que
+    necesita el documento entero) se decodifica al terminar de descomprimir; con
+    la biblioteca estándar, cada registro se decodifica en cuanto llega.
+
+    Args:
+        filepath (str): Ruta al archivo.
+
+    Returns:
+        Any: El contenido decodificado.
+
+    Raises:
+        json.JSONDecodeError: Si el archivo no es JSON válido (también con orjson).
+    """
+    if compresion.comprimido(filepath):
+        with compresion.abrir(filepath, 'rb') as json_file:
+            if _ACELERADO:
+                return orjson.loads(json_file.read())
+            textos = _textos(json_file)
+            texto = _inicio(textos)
+            if texto.startswith('['):
+                return list(_elementos(texto, textos))
+            return json.loads(texto + ''.join(textos))
+    if _ACELERADO:
+        with open(filepath, mode='rb') as json_file:
+            return orjson.loads(json_file.read())
+    with open(filepath, mode='r', encoding='utf-8') as json_file:
+        return json.load(json_file)
+
+
+def escribir_atomico(filepath: str, datos: Any, indent: Optional[int] = None) -> None:
+    """
+    Escribe un valor como JSON plano en un temporal y lo pone en lugar del archivo de una sola vez.
+
+    Quien lea el archivo ve el contenido anterior o el nuevo entero, nunca uno a
+    medio escribir. Es para los archivos auxiliares (índices, marcas, colas),
+    que no pasan por la compresión ni la codificación de los gestores.
+
+    Args:
+        filepath (str): Ruta al archivo (se crea su carpeta si hace falta).
+        datos (Any): El valor a guardar.
+        indent (Optional[int]): Sangría del JSON; compacto por defecto.
+    """
+    directorio = os.path.dirname(filepath)
+    if directorio:
+        os.makedirs(directorio, exist_ok=True)
+    temporal = filepath + '.tmp'
+    with open(temporal, mode='w', encoding='utf-8') as f:
+        json.dump(datos, f, ensure_ascii=False, indent=indent)
+    os.replace(temporal, filepath)
+
+
+def escribir(filepath: str, datos: Any, bonito: Optional[bool] = None) -> None:
+    """
+    Codifica y escribe un valor en un archivo JSON, sobrescribiendo el contenido.
+
+    Args:
+        filepath (str): Ruta al archivo.
+        datos (Any): El valor a guardar (normalmente una lista de registros).
+        bonito (Optional[bool]): Sangría de 4 espacios; por defecto, la configurada.
+    """
+    if _BONITO if bonito is None else bonito:
+        with compresion.abrir(filepath, 'w', encoding='utf-8') as json_file:
+            json.dump(datos, json_file, indent=4, ensure_ascii=False)
+        return
+
+    codificar = _codificador()
+    with compresion.abrir(filepath, 'wb') as json_file:
+        if not isinstance(datos, list):
+            json_file.write(codificar(datos))
+            return
+        json_file.write(b'[')
+        for inicio in range(0, len(datos), TAMANO_TROZO):
+            trozo: List[bytes] = [codificar(registro) for registro in datos[inicio:inicio + TAMANO_TROZO]]
+            if inicio:
+                json_file.write(b',')
+            json_file.write(b','.join(trozo))
+        json_file.write(b']')
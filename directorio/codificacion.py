@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+Módulo de Codificación por Diccionario.
+
+Las columnas de baja cardinalidad (estado, fechas, claves de usuario y libro,
+autor) repiten los mismos valores en miles de registros. Este módulo permite:
+
+- Compartir una sola instancia de cada valor repetido en memoria.
+- Guardar esas columnas en disco como códigos enteros pequeños más una tabla
+  de valores por columna.
+
+No contiene lógica de negocio, solo transformaciones de datos.
+"""
+
+from typing import Any, Dict, Iterable, List
+
+# Identificador del formato codificado dentro del archivo JSON.
+FORMATO = 'diccionario'
+
+
+class Diccionario:
+    """Tabla de valores distintos de una columna, con su código entero."""
+
+    __slots__ = ('valores', '_codigos')
+
+    def __init__(self, valores: Iterable[Any] = ()) -> None:
+        self.valores: List[Any] = []
+        self._codigos: Dict[Any, int] = {}
+        for valor in valores:
+            self.codigo(valor)
+
+    def codigo(self, valor: Any) -> int:
+        """Retorna el código del valor, agregándolo a la tabla si es nuevo."""
+        codigo = self._codigos.get(valor)
+        if codigo is None:
+            codigo = len(self.valores)
+            self._codigos[valor] = codigo
+            self.valores.append(valor)
+        return codigo
+
+    def valor(self, codigo: int) -> Any:
+        """Retorna el valor correspondiente a un código."""
+        return self.valores[codigo]
+
+    def __len__(self) -> int:
+        return len(self.valores)
+
+
+def compartir_valores(datos: List[Dict[str, Any]], columnas: Iterable[str]) -> List[Dict[str, Any]]:
+    """
+    Reemplaza, en el lugar, los valores repetidos de las columnas indicadas por
+    una única instancia compartida.
+
+    Args:
+        datos (List[Dict[str, Any]]): Los registros cargados.
+        columnas (Iterable[str]): Las columnas de baja cardinalidad.
+
+    Returns:
+        List[Dict[str, Any]]: La misma lista recibida.
+    """
+    for columna in columnas:
+        compartidos: Dict[Any, Any] = {}
+        for registro in datos:
+            if columna in registro:
+                valor = registro[columna]
+                registro[columna] = compartidos.setdefault(valor, valor)
+    return datos
+
+
+def codificar(datos: List[Dict[str, Any]], columnas: Iterable[str]) -> Dict[str, Any]:
+    """
+    Convierte una lista de registros al formato codificado por diccionario.
+
+    Los registros conservan sus claves; las columnas indicadas guardan el código
+    entero del valor en lugar del valor.
+
+    Args:
+        datos (List[Dict[str, Any]]): Los registros a codificar.
+        columnas (Iterable[str]): Las columnas a codificar.
+
+    Returns:
+        Dict[str, Any]: El documento con 'formato', 'diccionarios' y 'registros'.
+    """
+    diccionarios = {columna: Diccionario() for columna in columnas}
+    registros = []
+    for registro in datos:
+        fila = dict(registro)
+        for columna, dic in diccionarios.items():
+            if columna in fila:
+                fila[columna] = dic.codigo(fila[columna])
+        registros.append(fila)
+
+    return {
+        'formato': FORMATO,
+        'diccionarios': {columna: dic.valores for columna, dic in diccionarios.items()},
+        'registros': registros,
+    }
+
+
+def es_codificado(documento: Any) -> bool:
+    """Indica si un documento JSON cargado está en el formato codificado."""
+    return isinstance(documento, dict) and documento.get('formato') == FORMATO
+
+
+def decodificar(documento: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Reconstruye la lista de registros a partir del formato codificado.
+
+    Cada valor repetido se restaura como la misma instancia de la tabla de
+    valores, por lo que no se crean copias por registro.
+
+    Args:
+        documento (Dict[str, Any]): El documento cargado del archivo.
+
+    Returns:
+        List[Dict[str, Any]]: Los registros decodificados.
+    """
+    diccionarios = documento.get('diccionarios', {})
+    registros = documento.get('registros', [])
+    for registro in registros:
+        for columna, valores in diccionarios.items():
+            codigo = registro.get(columna)
+            if isinstance(codigo, int):
+                registro[columna] = valores[codigo]
+    return registros
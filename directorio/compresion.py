@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+"""
+Módulo de Compresión de Archivos de Datos.
+
+Los archivos JSON y CSV de los gestores pueden guardarse comprimidos con los
+códecs de la biblioteca estándar: 'gzip', 'bz2' o 'lzma'. El códec de cada
+archivo se elige así:
+
+1. Por extensión: 'prestamo.json.gz', 'libro.csv.bz2', 'usuario.json.xz'.
+2. Por configuración: `configurar(codec='gzip')` para todos los archivos, o
+   `configurar(por_entidad={'prestamo': 'lzma'})` para uno (la entidad es el
+   nombre del archivo sin extensiones). Así el archivo conserva su nombre.
+
+Al leer no hace falta saber cómo se escribió: el códec se reconoce por los
+primeros bytes del archivo y el contenido se descomprime a medida que se lee.
+
+Los formatos que se modifican en su lugar (ancho fijo '.dat' y bitácora '.log')
+no se comprimen.
+
+`medir` (y este módulo como programa) compara, para cada códec, los bytes en
+disco y los tiempos de guardado y de carga de un archivo de datos, para elegir
+el códec de cada entidad.
+
+Uso:
+    python compresion.py data/libro.json data/prestamo.json --repeticiones 5
+"""
+
+import argparse
+import bz2
+import csv
+import gzip
+import lzma
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import IO, Any, Dict, List, Optional, Sequence
+
+NINGUNO = 'ninguno'
+
+# Módulo, extensión y firma (primeros bytes) de cada códec.
+CODECS = {
+    'gzip': (gzip, '.gz', b'\x1f\x8b'),
+    'bz2': (bz2, '.bz2', b'BZh'),
+    'lzma': (lzma, '.xz', b'\xfd7zXZ\x00'),
+}
+
+_POR_EXTENSION = {extension: nombre for nombre, (_, extension, _) in CODECS.items()}
+_LARGO_FIRMA = max(len(firma) for _, _, firma in CODECS.values())
+
+_CODEC: Optional[str] = None
+_POR_ENTIDAD: Dict[str, Optional[str]] = {}
+
+
+def _validar(codec: Optional[str]) -> Optional[str]:
+    if codec in (None, NINGUNO):
+        return None
+    if codec not in CODECS:
+        raise ValueError(f"Códec de compresión no válido: {codec!r}")
+    return codec
+
+
+def configurar(codec: Optional[str] = None, por_entidad: Optional[Dict[str, str]] = None) -> None:
+    """
+    Elige el códec con que se escriben los archivos cuyo nombre no lo indica.
+
+    Args:
+        codec (Optional[str]): Códec para todos los archivos ('gzip', 'bz2',
+            'lzma' o 'ninguno'); None lo deja como está.
+        por_entidad (Optional[Dict[str, str]]): Códec de entidades concretas
+            (p. ej. {'prestamo': 'lzma', 'usuario': 'ninguno'}); tiene prioridad.
+
+    Raises:
+        ValueError: Si algún códec no existe.
+    """
+    global _CODEC
+    if codec is not None:
+        _CODEC = _validar(codec)
+    for entidad, codec_entidad in (por_entidad or {}).items():
+        _POR_ENTIDAD[entidad] = _validar(codec_entidad)
+
+
+def _extension_codec(filepath: str) -> str:
+    extension = os.path.splitext(filepath)[1]
+    return extension if extension in _POR_EXTENSION else ''
+
+
+def formato(filepath: str) -> str:
+    """
+    Retorna la extensión del formato de datos, sin la de compresión.
+
+    Args:
+        filepath (str): Ruta al archivo ('prestamo.json.gz').
+
+    Returns:
+        str: La extensión del formato ('.json').
+    """
+    return os.path.splitext(filepath[:len(filepath) - len(_extension_codec(filepath))])[1]
+
+
+def elegir(filepath: str) -> Optional[str]:
+    """
+    Retorna el códec con que se escribe un archivo (por extensión o configuración).
+
+    Args:
+        filepath (str): Ruta al archivo.
+
+    Returns:
+        Optional[str]: El nombre del códec, o None para escribirlo sin comprimir.
+    """
+    extension = _extension_codec(filepath)
+    if extension:
+        return _POR_EXTENSION[extension]
+    entidad = os.path.basename(filepath).split('.')[0]
+    return _POR_ENTIDAD[entidad] if entidad in _POR_ENTIDAD else _CODEC
+
+
+def detectar(filepath: str) -> Optional[str]:
+    """
+    Reconoce el códec de un archivo existente por sus primeros bytes.
+
+    Args:
+        filepath (str): Ruta al archivo.
+
+    Returns:
+        Optional[str]: El nombre del códec, o None si no está comprimido (o no existe).
+    """
+    try:
+        with open(filepath, mode='rb') as f:
+            inicio = f.read(_LARGO_FIRMA)
+    except OSError:
+        return None
+    return next((nombre for nombre, (_, _, firma) in CODECS.items() if inicio.startswith(firma)), None)
+
+
+def comprimido(filepath: str) -> bool:
+    """Indica si un archivo existente está comprimido."""
+    return detectar(filepath) is not None
+
+
+def abrir(filepath: str, modo: str = 'rb', **kwargs: Any) -> IO:
+    """
+    Abre un archivo de datos, comprimido o no, como lo haría `open`.
+
+    Al leer se descomprime según el contenido; al escribir se comprime con el
+    códec que indique `elegir`. La descompresión es por flujo: solo se tiene en
+    memoria lo que se va leyendo.
+
+    Args:
+        filepath (str): Ruta al archivo.
+        modo (str): 'r', 'rb', 'w' o 'wb'.
+        **kwargs (Any): Argumentos de texto de `open` ('encoding', 'newline').
+
+    Returns:
+        IO: El archivo abierto.
+    """
+    codec = detectar(filepath) if modo.startswith('r') else elegir(filepath)
+    if codec is None:
+        return open(filepath, mode=modo, **kwargs)
+    modulo = CODECS[codec][0]
+    return modulo.open(filepath, mode=modo if 'b' in modo else modo + 't', **kwargs)
+
+
+def _leer_csv(filepath: str) -> List[Dict[str, Any]]:
+    with abrir(filepath, 'r', newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+def _escribir_csv(filepath: str, datos: List[Dict[str, Any]]) -> None:
+    with abrir(filepath, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=list(datos[0]) if datos else [])
+        writer.writeheader()
+        writer.writerows(datos)
+
+
+def medir(filepath: str, codecs: Optional[Sequence[str]] = None, repeticiones: int = 3) -> List[Dict[str, Any]]:
+    """
+    Compara los códecs con el contenido de un archivo de datos JSON o CSV.
+
+    Cada códec escribe y vuelve a leer una copia del contenido en una carpeta
+    temporal; de cada tiempo se toma el mejor de las repeticiones.
+
+    Args:
+        filepath (str): Archivo de datos de referencia.
+        codecs (Optional[Sequence[str]]): Códecs a medir (todos y 'ninguno' por defecto).
+        repeticiones (int): Veces que se mide cada operación.
+
+    Returns:
+        List[Dict[str, Any]]: Por códec: 'codec', 'bytes', 'proporcion' (frente a
+            sin comprimir, si se midió), 'guardar_ms' y 'cargar_ms'.
+    """
+    import codec_json  # importación diferida: codec_json usa este módulo
+
+    es_csv = formato(filepath) == '.csv'
+    datos = _leer_csv(filepath) if es_csv else codec_json.leer(filepath)
+    leer = _leer_csv if es_csv else codec_json.leer
+    escribir = _escribir_csv if es_csv else codec_json.escribir
+
+    resultados = []
+    carpeta = tempfile.mkdtemp(prefix='compresion_')
+    try:
+        for codec in codecs or [NINGUNO, *CODECS]:
+            extension = CODECS[codec][1] if _validar(codec) else ''
+            ruta = os.path.join(carpeta, 'medicion' + ('.csv' if es_csv else '.json') + extension)
+            tiempos_guardar, tiempos_cargar = [], []
+            for _ in range(max(repeticiones, 1)):
+                inicio = time.perf_counter()
+                escribir(ruta, datos)
+                tiempos_guardar.append(time.perf_counter() - inicio)
+                inicio = time.perf_counter()
+                leer(ruta)
+                tiempos_cargar.append(time.perf_counter() - inicio)
+            resultados.append({
+                'codec': codec,
+                'bytes': os.path.getsize(ruta),
+                'guardar_ms': round(min(tiempos_guardar) * 1000, 3),
+                'cargar_ms': round(min(tiempos_cargar) * 1000, 3),
+            })
+    finally:
+        shutil.rmtree(carpeta, ignore_errors=True)
+
+    sin_comprimir = next((r['bytes'] for r in resultados if r['codec'] == NINGUNO), None)
+    for resultado in resultados:
+        resultado['proporcion'] = round(resultado['bytes'] / sin_comprimir, 3) if sin_comprimir else None
+    return resultados
+
+
+def main(argumentos: Optional[Sequence[str]] = None) -> int:
+    """Punto de entrada de la línea de comandos: muestra la comparación de cada archivo."""
+    from rich.console import Console
+    from rich.table import Table
+
+    parser = argparse.ArgumentParser(description="Compara los códecs de compresión con archivos de datos.")
+    parser.add_argument('archivos', nargs='+', help="Archivos de datos JSON o CSV (comprimidos o no).")
+    parser.add_argument('--codecs', nargs='+', choices=[NINGUNO, *CODECS])
+    parser.add_argument('--repeticiones', type=int, default=3)
+    opciones = parser.parse_args(argumentos)
+
+    console = Console()
+    for archivo in opciones.archivos:
+        tabla = Table(title=f"🗜️ {archivo}")
+        tabla.add_column("Códec", style="cyan")
+        tabla.add_column("Bytes", justify="right")
+        tabla.add_column("Proporción", justify="right")
+        tabla.add_column("Guardar (ms)", justify="right", style="magenta")
+        tabla.add_column("Cargar (ms)", justify="right", style="magenta")
+        for r in medir(archivo, opciones.codecs, opciones.repeticiones):
+            tabla.add_row(r['codec'], str(r['bytes']), str(r['proporcion'] if r['proporcion'] is not None else '-'),
+                          str(r['guardar_ms']), str(r['cargar_ms']))
+        console.print(tabla)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
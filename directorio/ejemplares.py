@@ -0,0 +1,353 @@
+# -*- coding: utf-8 -*-
+"""
+Módulo de Ejemplares.
+
+Cada libro tiene ejemplares físicos identificados como '<ISBN>#<n>'. El estado
+de los ejemplares de un ISBN se guarda como una cadena compacta de un carácter
+por ejemplar ('D' disponible, 'P' prestado, 'B' dado de baja), en un archivo
+junto al de libros (e.g. 'data/libro_ejemplares.json').
+
+En memoria, cada ISBN mantiene además una pila con las posiciones libres, por
+lo que tomar o liberar un ejemplar cuesta O(1). Lo leído queda en memoria
+mientras el archivo conserve su firma (fecha y tamaño) y ningún otro proceso
+haya tomado el cerrojo de la carpeta: prestar o devolver no vuelve a leer el
+archivo.
+
+El archivo guarda un ISBN por línea (sigue siendo JSON). Prestar o devolver solo
+cambia un carácter del ISBN afectado, así que se sobrescribe en su lugar solo
+ese byte; el archivo completo solo se reescribe cuando cambia la cantidad de
+ejemplares de algún ISBN.
+
+Los ejemplares mandan sobre el stock: los de un ISBN se crean la primera vez
+que se presta, a partir del stock que tenga el libro en ese momento, y desde
+entonces el stock del libro es la cantidad de ejemplares disponibles
+(`stock`). El campo 'stock' del libro solo refleja ese valor.
+"""
+
+import json
+import os
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import cerrojo
+import vigilante
+
+DISPONIBLE = ord('D')
+PRESTADO = ord('P')
+BAJA = ord('B')
+
+NOMBRES_ESTADO = {DISPONIBLE: 'disponible', PRESTADO: 'prestado', BAJA: 'baja'}
+
+# Ejemplares leídos por archivo, con la firma del archivo y los relevos del cerrojo al leerlo
+_LEIDOS: Dict[str, Tuple[Tuple[int, int], int, Dict[str, 'Ejemplares']]] = {}
+
+
+class Ejemplares:
+    """
+    Estado de los ejemplares de un ISBN, con la pila de posiciones libres.
+
+    'posicion' y 'largo' indican dónde están sus estados en el archivo y
+    cuántos eran al leerlo (None si no se leyeron del archivo); 'cambiados'
+    guarda las posiciones modificadas desde la última vez que se guardó.
+    """
+
+    __slots__ = ('isbn', 'estados', 'libres', 'posicion', 'largo', 'cambiados')
+
+    def __init__(self, isbn: str, estados: bytearray, posicion: Optional[int] = None) -> None:
+        self.isbn = isbn
+        self.estados = estados
+        self.libres = [i for i, estado in enumerate(estados) if estado == DISPONIBLE]
+        self.posicion = posicion
+        self.largo = len(estados) if posicion is not None else None
+        self.cambiados = set()
+
+    def id_ejemplar(self, indice: int) -> str:
+        return f"{self.isbn}#{indice + 1}"
+
+    def tomar(self) -> Optional[int]:
+        """Marca como prestado un ejemplar libre y retorna su posición."""
+        if not self.libres:
+            return None
+        indice = self.libres.pop()
+        self.estados[indice] = PRESTADO
+        self.cambiados.add(indice)
+        return indice
+
+    def liberar(self, indice: int) -> None:
+        """Marca como disponible un ejemplar prestado."""
+        if self.estados[indice] == PRESTADO:
+            self.estados[indice] = DISPONIBLE
+            self.libres.append(indice)
+            self.cambiados.add(indice)
+
+    def agregar(self, cantidad: int) -> None:
+        """Agrega ejemplares nuevos disponibles."""
+        inicio = len(self.estados)
+        self.estados.extend(bytes([DISPONIBLE]) * cantidad)
+        self.libres.extend(range(inicio, inicio + cantidad))
+
+    def retirar(self, cantidad: int) -> None:
+        """Da de baja ejemplares disponibles."""
+        for _ in range(min(cantidad, len(self.libres))):
+            indice = self.libres.pop()
+            self.estados[indice] = BAJA
+            self.cambiados.add(indice)
+
+    def disponibles(self) -> int:
+        return len(self.libres)
+
+
+def ruta_ejemplares(archivo_libro: str) -> str:
+    """
+    Retorna la ruta del archivo de ejemplares asociado a un archivo de libros.
+
+    Args:
+        archivo_libro (str): Ruta al archivo de libros (e.g. 'data/libro.json').
+
+    Returns:
+        str: Ruta del archivo de ejemplares (e.g. 'data/libro_ejemplares.json').
+    """
+    base, _ = os.path.splitext(archivo_libro)
+    return f"{base}_ejemplares.json"
+
+
+def _linea(isbn: str, estados: bytes) -> bytes:
+    return json.dumps(isbn).encode('utf-8') + b': "' + bytes(estados) + b'"'
+
+
+def _leer_lineas(contenido: bytes) -> Optional[Dict[str, Ejemplares]]:
+    """Lee el formato de un ISBN por línea, con la posición de cada uno; None si no lo es."""
+    if not contenido.startswith(b'{\n'):
+        return None
+    copias = {}
+    inicio = 2
+    for linea in contenido[2:].splitlines(keepends=True):
+        texto = linea.rstrip(b'\n').rstrip(b',')
+        if texto != b'}':
+            clave, separador, valor = texto.rpartition(b': "')
+            if not separador or not valor.endswith(b'"'):
+                return None
+            isbn = json.loads(clave)
+            copias[isbn] = Ejemplares(isbn, bytearray(valor[:-1]), inicio + len(clave) + len(separador))
+        inicio += len(linea)
+    return copias
+
+
+def cargar(filepath: str) -> Dict[str, Ejemplares]:
+    """
+    Carga los ejemplares de todos los ISBN.
+
+    Si el archivo no cambió desde la última lectura, retorna lo que ya está en
+    memoria: quien modifique los ejemplares debe tener el cerrojo de la carpeta
+    y guardarlos con `guardar`.
+
+    Args:
+        filepath (str): Ruta al archivo de ejemplares.
+
+    Returns:
+        Dict[str, Ejemplares]: Los ejemplares por ISBN.
+    """
+    ruta = os.path.abspath(filepath)
+    firma = vigilante.firma(ruta)
+    relevos = cerrojo.relevos(os.path.dirname(ruta))
+    leido = _LEIDOS.get(ruta)
+    if leido is not None and leido[:2] == (firma, relevos):
+        return leido[2]
+    if firma == (-1, -1):
+        _LEIDOS.pop(ruta, None)
+        return {}
+
+    with open(ruta, mode='rb') as f:
+        contenido = f.read()
+    copias = _leer_lineas(contenido)
+    if copias is None:
+        # Archivos escritos en una sola línea: se leen como JSON y se reescriben completos
+        try:
+            datos = json.loads(contenido)
+        except json.JSONDecodeError:
+            return {}
+        copias = {isbn: Ejemplares(isbn, bytearray(estados, 'ascii')) for isbn, estados in datos.items()}
+    _LEIDOS[ruta] = (firma, relevos, copias)
+    return copias
+
+
+def _sobrescribir(f, posicion: int, datos: bytes) -> None:
+    if hasattr(os, 'pwrite'):
+        os.pwrite(f.fileno(), datos, posicion)
+    else:  # os.pwrite solo existe en POSIX
+        f.seek(posicion)
+        f.write(datos)
+
+
+@cerrojo.exclusivo
+def guardar(filepath: str, copias: Dict[str, Ejemplares], isbns: Optional[Iterable[str]] = None) -> None:
+    """
+    Guarda el estado de los ejemplares.
+
+    Si se indican los ISBN modificados y ninguno cambió su cantidad de
+    ejemplares, solo se sobrescriben en el archivo los estados que cambiaron;
+    si no, se reescribe el archivo completo.
+
+    Args:
+        filepath (str): Ruta al archivo de ejemplares.
+        copias (Dict[str, Ejemplares]): Los ejemplares por ISBN, leídos con `cargar`.
+        isbns (Optional[Iterable[str]]): Los ISBN modificados (todos por defecto).
+    """
+    ruta = os.path.abspath(filepath)
+    try:
+        _guardar(ruta, copias, isbns)
+    except Exception:
+        # Lo que quedó en memoria ya no coincide con el archivo
+        _LEIDOS.pop(ruta, None)
+        raise
+    _LEIDOS[ruta] = (vigilante.firma(ruta), cerrojo.relevos(os.path.dirname(ruta)), copias)
+
+
+def _guardar(filepath: str, copias: Dict[str, Ejemplares], isbns: Optional[Iterable[str]]) -> None:
+    cambiados = [copias[isbn] for isbn in isbns] if isbns is not None else None
+    if cambiados is not None and all(e.posicion is not None and e.largo == len(e.estados) for e in cambiados):
+        with open(filepath, mode='r+b') as f:
+            for e in cambiados:
+                for indice in sorted(e.cambiados):
+                    _sobrescribir(f, e.posicion + indice, e.estados[indice:indice + 1])
+                e.cambiados.clear()
+        return
+
+    lineas = [_linea(isbn, e.estados) for isbn, e in copias.items()]
+    temporal = filepath + '.tmp'
+    with open(temporal, mode='wb') as f:
+        f.write(b'{\n' + b',\n'.join(lineas) + (b'\n' if lineas else b'') + b'}\n')
+    os.replace(temporal, filepath)
+
+    posicion = 2
+    for linea, e in zip(lineas, copias.values()):
+        e.posicion, e.largo = posicion + len(linea) - len(e.estados) - 1, len(e.estados)
+        e.cambiados.clear()
+        posicion += len(linea) + 2
+
+
+def _indice(id_ejemplar: str) -> Optional[int]:
+    _, _, numero = str(id_ejemplar).rpartition('#')
+    try:
+        return int(numero) - 1
+    except ValueError:
+        return None
+
+
+def stock(filepath: str, isbn: str, stock_libro: int) -> int:
+    """
+    Retorna el stock disponible de un libro: sus ejemplares disponibles.
+
+    Args:
+        filepath (str): Ruta al archivo de ejemplares.
+        isbn (str): ISBN del libro.
+        stock_libro (int): Stock del libro, que vale mientras el ISBN no tenga
+            ejemplares registrados.
+
+    Returns:
+        int: La cantidad de ejemplares disponibles.
+    """
+    ejemplares = cargar(filepath).get(str(isbn))
+    return ejemplares.disponibles() if ejemplares is not None else stock_libro
+
+
+@cerrojo.exclusivo
+def prestar(filepath: str, isbn: str, stock_libro: int) -> Optional[str]:
+    """
+    Toma un ejemplar libre del libro y lo marca como prestado.
+
+    Si el ISBN aún no tiene ejemplares registrados, se crean tantos como stock
+    tenga el libro.
+
+    Args:
+        filepath (str): Ruta al archivo de ejemplares.
+        isbn (str): ISBN del libro.
+        stock_libro (int): Stock del libro, para crear sus ejemplares.
+
+    Returns:
+        Optional[str]: El ID del ejemplar prestado, o None si no queda ninguno libre.
+    """
+    copias = cargar(filepath)
+    isbn = str(isbn)
+    ejemplares = copias.get(isbn)
+    if ejemplares is None:
+        ejemplares = Ejemplares(isbn, bytearray())
+        ejemplares.agregar(max(stock_libro, 0))
+
+    indice = ejemplares.tomar()
+    if indice is None:
+        return None
+    copias[isbn] = ejemplares
+    guardar(filepath, copias, [isbn])
+    return ejemplares.id_ejemplar(indice)
+
+
+@cerrojo.exclusivo
+def devolver(filepath: str, isbn: str, id_ejemplar: str = '') -> None:
+    """
+    Marca como disponible el ejemplar devuelto.
+
+    Los préstamos anteriores al registro de ejemplares no tienen 'id_ejemplar':
+    en ese caso el ejemplar devuelto se registra como uno nuevo.
+
+    Args:
+        filepath (str): Ruta al archivo de ejemplares.
+        isbn (str): ISBN del libro.
+        id_ejemplar (str): ID del ejemplar prestado, si se conoce.
+    """
+    copias = cargar(filepath)
+    ejemplares = copias.get(str(isbn))
+    if ejemplares is None:
+        return
+
+    indice = _indice(id_ejemplar) if id_ejemplar else None
+    if indice is not None and 0 <= indice < len(ejemplares.estados):
+        ejemplares.liberar(indice)
+    else:
+        ejemplares.agregar(1)
+    guardar(filepath, copias, [str(isbn)])
+
+
+@cerrojo.exclusivo
+def sincronizar_stock(filepath: str, isbn: str, stock: int) -> None:
+    """
+    Ajusta los ejemplares disponibles de un ISBN al stock indicado, agregando
+    ejemplares nuevos o dando de baja ejemplares disponibles.
+
+    No hace nada si el ISBN todavía no tiene ejemplares registrados.
+
+    Args:
+        filepath (str): Ruta al archivo de ejemplares.
+        isbn (str): ISBN del libro.
+        stock (int): El nuevo stock disponible.
+    """
+    copias = cargar(filepath)
+    ejemplares = copias.get(str(isbn))
+    if ejemplares is None:
+        return
+
+    diferencia = stock - ejemplares.disponibles()
+    if diferencia > 0:
+        ejemplares.agregar(diferencia)
+    elif diferencia < 0:
+        ejemplares.retirar(-diferencia)
+    guardar(filepath, copias, [str(isbn)])
+
+
+def listar(filepath: str, isbn: str) -> List[Dict[str, Any]]:
+    """
+    Lista los ejemplares de un libro con su estado.
+
+    Args:
+        filepath (str): Ruta al archivo de ejemplares.
+        isbn (str): ISBN del libro.
+
+    Returns:
+        List[Dict[str, Any]]: Filas con 'id_ejemplar' y 'estado'.
+    """
+    ejemplares = cargar(filepath).get(str(isbn))
+    if ejemplares is None:
+        return []
+    return [
+        {'id_ejemplar': ejemplares.id_ejemplar(i), 'estado': NOMBRES_ESTADO.get(estado, 'desconocido')}
+        for i, estado in enumerate(ejemplares.estados)
+    ]
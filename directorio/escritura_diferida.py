@@ -0,0 +1,393 @@
+# -*- coding: utf-8 -*-
+"""
+Módulo de Escritura Diferida.
+
+Cuando está activo, `guardar_datos` de los gestores no escribe el archivo al
+momento: el nuevo contenido queda en memoria (y es lo que retorna
+`cargar_datos`), se anota en un diario y un hilo en segundo plano escribe los
+archivos en grupo cada cierto tiempo o cada cierta cantidad de operaciones.
+Varias operaciones sobre el mismo archivo se resuelven en una sola escritura.
+
+El diario es uno por carpeta de datos ('.diferido.jsonl') y solo se anota con
+el cerrojo de la carpeta tomado (ver `cerrojo`). Guarda solo los registros que
+cambiaron (por su clave), así que su costo no depende del tamaño del archivo, y
+cada anotación se fuerza a disco (`fsync`).
+
+Lo pendiente sobrevive a soltar el cerrojo: mientras ningún otro proceso tome
+el cerrojo de la carpeta, las operaciones siguientes se siguen acumulando en
+memoria. El siguiente proceso que lo toma (o que lee una carpeta con el diario
+sin aplicar) aplica el diario sobre los archivos antes de usarlos, y el proceso
+que lo anotó descarta lo suyo al recuperar el cerrojo. Si el programa se cierra
+sin vaciar el buffer, el diario lo aplica el siguiente que tome el cerrojo.
+
+Cada gestor expone `_leer(filepath)` y `_escribir(filepath, datos)` (la
+lectura y la escritura reales) y una constante `CLAVE` con el campo que
+identifica a sus registros. Las rutas se normalizan a absolutas, así que una
+ruta relativa y una absoluta al mismo archivo comparten lo pendiente.
+"""
+
+import importlib
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+NOMBRE_DIARIO = '.diferido.jsonl'
+
+_ESCRITOR: Optional["EscritorDiferido"] = None
+
+_LOG = logging.getLogger(__name__)
+
+
+def _escritor_de(gestor: str):
+    """Retorna la función de escritura real del gestor indicado por nombre de módulo."""
+    return importlib.import_module(gestor)._escribir
+
+
+def ruta_diario(carpeta: str) -> str:
+    """Retorna la ruta del diario de escrituras pendientes de una carpeta de datos."""
+    return os.path.join(carpeta, NOMBRE_DIARIO)
+
+
+def _cerrojo_de(carpeta: str):
+    """Retorna el cerrojo de una carpeta (como contexto)."""
+    import cerrojo  # importación diferida: cerrojo usa este módulo
+    return cerrojo.bloquear(os.path.join(carpeta, cerrojo.NOMBRE_ARCHIVO))
+
+
+def _copiar(datos: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Copia los registros (son planos) para que quien los reciba pueda modificarlos."""
+    return [dict(registro) for registro in datos]
+
+
+def diferencias(
+        anteriores: List[Dict[str, Any]],
+        nuevos: List[Dict[str, Any]],
+        clave: str,
+) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    Calcula los registros agregados o modificados y las claves eliminadas.
+
+    Args:
+        anteriores (List[Dict[str, Any]]): El contenido anterior.
+        nuevos (List[Dict[str, Any]]): El contenido nuevo.
+        clave (str): El campo que identifica a cada registro.
+
+    Returns:
+        Tuple[List[Dict[str, Any]], List[str]]: (registros cambiados, claves eliminadas).
+    """
+    previos = {str(r.get(clave)): r for r in anteriores}
+    cambiados = []
+    vistos = set()
+    for registro in nuevos:
+        id_registro = str(registro.get(clave))
+        vistos.add(id_registro)
+        if previos.get(id_registro) != registro:
+            cambiados.append(registro)
+    eliminados = [id_registro for id_registro in previos if id_registro not in vistos]
+    return cambiados, eliminados
+
+
+def aplicar_diferencias(
+        datos: List[Dict[str, Any]],
+        cambiados: List[Dict[str, Any]],
+        eliminados: List[str],
+        clave: str,
+) -> List[Dict[str, Any]]:
+    """
+    Aplica registros cambiados y claves eliminadas sobre un contenido.
+
+    Args:
+        datos (List[Dict[str, Any]]): El contenido actual.
+        cambiados (List[Dict[str, Any]]): Registros nuevos o modificados.
+        eliminados (List[str]): Claves de los registros eliminados.
+        clave (str): El campo que identifica a cada registro.
+
+    Returns:
+        List[Dict[str, Any]]: El contenido resultante.
+    """
+    borrar = set(eliminados)
+    por_clave = {str(r.get(clave)): r for r in cambiados}
+    resultado = []
+    for registro in datos:
+        id_registro = str(registro.get(clave))
+        if id_registro in borrar:
+            continue
+        resultado.append(por_clave.pop(id_registro, registro))
+    resultado.extend(por_clave.values())
+    return resultado
+
+
+class EscritorDiferido:
+    """Buffer de escrituras con hilo de vaciado en grupo y diario de operaciones por carpeta."""
+
+    def __init__(self, intervalo_ms: int = 200, max_operaciones: int = 50) -> None:
+        self.intervalo = intervalo_ms / 1000
+        self.max_operaciones = max_operaciones
+        self._condicion = threading.Condition()
+        self._pendientes: Dict[str, Tuple[str, List[Dict[str, Any]]]] = {}
+        self._base: Dict[str, List[Dict[str, Any]]] = {}
+        self._operaciones = 0
+        self._activo = True
+        self._hilo = threading.Thread(target=self._bucle, name='escritura-diferida', daemon=True)
+        self._hilo.start()
+
+    # --- Operaciones llamadas por los gestores ---
+
+    def leer(self, filepath: str) -> Optional[List[Dict[str, Any]]]:
+        """Retorna una copia del contenido aún no escrito de un archivo, o None."""
+        with self._condicion:
+            if filepath in self._pendientes:
+                return _copiar(self._pendientes[filepath][1])
+        return None
+
+    def recordar(self, filepath: str, datos: List[Dict[str, Any]]) -> None:
+        """Guarda el contenido recién leído de disco como base para calcular diferencias."""
+        with self._condicion:
+            if filepath not in self._base:
+                self._base[filepath] = _copiar(datos)
+
+    def olvidar(self, filepath: str) -> None:
+        """Descarta la base de un archivo (por ejemplo, si otro proceso lo modificó)."""
+        with self._condicion:
+            self._base.pop(filepath, None)
+
+    def encolar(self, filepath: str, datos: List[Dict[str, Any]], gestor: str, clave: str) -> None:
+        """Deja el nuevo contenido de un archivo en memoria y anota el cambio en el diario de su carpeta."""
+        datos = _copiar(datos)
+        carpeta = os.path.dirname(filepath)
+        # Con el cerrojo tomado, lo propio sigue vigente y nadie más anota en el diario
+        with _cerrojo_de(carpeta), self._condicion:
+            anterior = self._pendientes.get(filepath, (None, self._base.get(filepath)))[1]
+            entrada: Dict[str, Any] = {'archivo': os.path.basename(filepath), 'gestor': gestor, 'clave': clave}
+            if anterior is None:
+                entrada['completo'] = datos
+            else:
+                entrada['cambiados'], entrada['eliminados'] = diferencias(anterior, datos, clave)
+            with open(ruta_diario(carpeta), mode='a', encoding='utf-8') as diario:
+                diario.write(json.dumps(entrada, ensure_ascii=False) + '\n')
+                diario.flush()
+                os.fsync(diario.fileno())
+
+            self._pendientes[filepath] = (gestor, datos)
+            self._operaciones += 1
+            if self._operaciones >= self.max_operaciones:
+                self._condicion.notify()
+
+    def descartar(self, carpeta: str) -> None:
+        """
+        Olvida lo pendiente y las bases de una carpeta que otro proceso tomó.
+
+        Lo pendiente ya está en el diario de la carpeta, que aplica quien tomó el cerrojo.
+        """
+        with self._condicion:
+            for rutas in (self._pendientes, self._base):
+                for ruta in [ruta for ruta in rutas if os.path.dirname(ruta) == carpeta]:
+                    del rutas[ruta]
+
+    # --- Vaciado ---
+
+    def carpetas_pendientes(self) -> List[str]:
+        """Retorna las carpetas con escrituras pendientes."""
+        with self._condicion:
+            return sorted({os.path.dirname(ruta) for ruta in self._pendientes})
+
+    def vaciar(self, carpeta: Optional[str] = None) -> None:
+        """
+        Escribe en disco lo pendiente (de una carpeta o de todas), cada carpeta con su cerrojo tomado.
+
+        Si una escritura falla, lo no escrito sigue pendiente, el diario se
+        conserva y el error se propaga.
+        """
+        for pendiente in self.carpetas_pendientes():
+            if carpeta is None or pendiente == carpeta:
+                with _cerrojo_de(pendiente):
+                    self._vaciar(pendiente)
+
+    def _vaciar(self, carpeta: str) -> None:
+        with self._condicion:
+            lote = {ruta: pendiente for ruta, pendiente in self._pendientes.items()
+                    if os.path.dirname(ruta) == carpeta}
+            self._operaciones = 0
+
+        # Con el cerrojo tomado, nadie agrega pendientes de esta carpeta mientras se escriben
+        for ruta, (gestor, datos) in lote.items():
+            _escritor_de(gestor)(ruta, datos)
+            with self._condicion:
+                del self._pendientes[ruta]
+                self._base[ruta] = datos
+        if os.path.exists(ruta_diario(carpeta)):
+            os.remove(ruta_diario(carpeta))
+
+    def _vaciar_con_cerrojo(self) -> None:
+        """Vacía carpeta por carpeta; un error se registra y no detiene a las demás."""
+        for carpeta in self.carpetas_pendientes():
+            try:
+                self.vaciar(carpeta)
+            except Exception:  # el hilo debe seguir vivo para las escrituras siguientes
+                _LOG.exception("No se pudieron escribir los cambios pendientes de %s", carpeta)
+
+    def _bucle(self) -> None:
+        while True:
+            with self._condicion:
+                if not self._activo:
+                    return
+                self._condicion.wait(self.intervalo)
+            self._vaciar_con_cerrojo()
+
+    def detener(self) -> None:
+        """Vacía lo pendiente y detiene el hilo."""
+        with self._condicion:
+            self._activo = False
+            self._condicion.notify()
+        self._hilo.join()
+        self._vaciar_con_cerrojo()
+        self.vaciar()
+
+
+def aplicar_diario(carpeta: str) -> int:
+    """
+    Aplica sobre los archivos de una carpeta las operaciones de su diario y lo borra.
+
+    Se llama con el cerrojo de la carpeta tomado.
+
+    Args:
+        carpeta (str): La carpeta de datos.
+
+    Returns:
+        int: La cantidad de operaciones aplicadas.
+    """
+    ruta = ruta_diario(carpeta)
+    if not os.path.exists(ruta):
+        return 0
+    aplicadas = 0
+    contenido: Dict[str, Tuple[str, List[Dict[str, Any]]]] = {}
+    with open(ruta, mode='r', encoding='utf-8') as diario:
+        for linea in diario:
+            try:
+                entrada = json.loads(linea)
+            except json.JSONDecodeError:
+                break  # última línea incompleta: se descarta
+            archivo, gestor = os.path.join(carpeta, entrada['archivo']), entrada['gestor']
+            if 'completo' in entrada:
+                datos = entrada['completo']
+            else:
+                actual = contenido[archivo][1] if archivo in contenido else \
+                    importlib.import_module(gestor)._leer(archivo)
+                datos = aplicar_diferencias(actual, entrada['cambiados'], entrada['eliminados'], entrada['clave'])
+            contenido[archivo] = (gestor, datos)
+            aplicadas += 1
+    for archivo, (gestor, datos) in contenido.items():
+        _escritor_de(gestor)(archivo, datos)
+    os.remove(ruta)
+    return aplicadas
+
+
+def al_tomar_carpeta(carpeta: str) -> None:
+    """
+    Pone al día una carpeta cuyo cerrojo tuvo otro proceso desde la última vez.
+
+    Lo llama `cerrojo` con el cerrojo ya tomado: lo pendiente propio de la
+    carpeta quedó en el diario (y lo aplicó quien tomó el cerrojo después, o se
+    aplica ahora), así que se descarta, y se aplica lo que otro dejó anotado.
+
+    Args:
+        carpeta (str): La carpeta de datos (ruta absoluta).
+    """
+    if _ESCRITOR is not None:
+        _ESCRITOR.descartar(carpeta)
+    aplicar_diario(carpeta)
+
+
+def _sincronizar(carpeta: str) -> None:
+    """Toma el cerrojo (y con él aplica el diario) si lo que hay en disco o en memoria puede estar atrasado."""
+    import cerrojo  # importación diferida: cerrojo usa este módulo
+    if cerrojo.es_dueno(carpeta):
+        return
+    propio = _ESCRITOR is not None and carpeta in _ESCRITOR.carpetas_pendientes()
+    if propio or os.path.exists(ruta_diario(carpeta)):
+        with _cerrojo_de(carpeta):
+            pass
+
+
+# --- Interfaz del módulo ---
+
+def activar(intervalo_ms: int = 200, max_operaciones: int = 50) -> EscritorDiferido:
+    """
+    Activa la escritura diferida para todos los gestores de datos.
+
+    Args:
+        intervalo_ms (int): Cada cuánto se vacía el buffer.
+        max_operaciones (int): Cantidad de operaciones que fuerza un vaciado anticipado.
+
+    Returns:
+        EscritorDiferido: El escritor activo.
+    """
+    global _ESCRITOR
+    if _ESCRITOR is None:
+        _ESCRITOR = EscritorDiferido(intervalo_ms, max_operaciones)
+    return _ESCRITOR
+
+
+def desactivar() -> None:
+    """Vacía lo pendiente y vuelve a la escritura inmediata."""
+    global _ESCRITOR
+    if _ESCRITOR is not None:
+        # Sigue registrado mientras vacía: si otro proceso tomó una carpeta, lo suyo se descarta
+        _ESCRITOR.detener()
+        _ESCRITOR = None
+
+
+def vaciar(carpeta: Optional[str] = None) -> None:
+    """
+    Escribe de inmediato lo pendiente, si la escritura diferida está activa.
+
+    Args:
+        carpeta (Optional[str]): Solo los archivos de esta carpeta (todos por defecto).
+    """
+    if _ESCRITOR is not None:
+        _ESCRITOR.vaciar(os.path.abspath(carpeta) if carpeta is not None else None)
+
+
+def leer_pendiente(filepath: str) -> Optional[List[Dict[str, Any]]]:
+    """
+    Retorna el contenido aún no escrito de un archivo, o None si no hay nada pendiente.
+
+    Antes pone al día la carpeta si otro proceso tomó su cerrojo o dejó un
+    diario sin aplicar: con None, lo que hay en disco está al día.
+    """
+    filepath = os.path.abspath(filepath)
+    _sincronizar(os.path.dirname(filepath))
+    return _ESCRITOR.leer(filepath) if _ESCRITOR is not None else None
+
+
+def recordar(filepath: str, datos: List[Dict[str, Any]]) -> None:
+    """Registra lo leído de disco como base de diferencias, si la escritura diferida está activa."""
+    if _ESCRITOR is not None:
+        _ESCRITOR.recordar(os.path.abspath(filepath), datos)
+
+
+def olvidar(filepath: str) -> None:
+    """Descarta la base de diferencias de un archivo, si la escritura diferida está activa."""
+    if _ESCRITOR is not None:
+        _ESCRITOR.olvidar(os.path.abspath(filepath))
+
+
+def encolar(filepath: str, datos: List[Dict[str, Any]], gestor: str, clave: str) -> bool:
+    """
+    Deja una escritura en el buffer si la escritura diferida está activa.
+
+    Args:
+        filepath (str): Ruta del archivo.
+        datos (List[Dict[str, Any]]): El nuevo contenido completo.
+        gestor (str): Nombre del módulo gestor que sabe leer y escribir el archivo.
+        clave (str): Campo que identifica a cada registro.
+
+    Returns:
+        bool: True si la escritura quedó diferida, False si el gestor debe escribir ya.
+    """
+    if _ESCRITOR is None:
+        return False
+    _ESCRITOR.encolar(os.path.abspath(filepath), datos, gestor, clave)
+    return True
@@ -0,0 +1,299 @@
+# -*- coding: utf-8 -*-
+"""
+Módulo de Esquemas.
+
+Esquemas declarativos de usuario, libro y préstamo. Cada esquema se compila una
+sola vez en una lista de funciones (una por campo) que validan y convierten el
+valor al formato de almacenamiento, así que validar un registro cuesta un paso
+constante por campo.
+
+La validación no se detiene en el primer registro con errores: recorre el lote
+completo y retorna los registros válidos (ya convertidos) junto con la lista de
+errores encontrados. Se usa al cargar datos para mostrarlos y en la importación
+masiva, que guarda como las altas y cambios normales: solo los registros
+importados (con los índices al día), con su auditoría y, en los libros, con sus
+ejemplares ajustados al stock.
+"""
+
+import re
+from datetime import date
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import auditoria
+import cerrojo
+import ejemplares
+import gestor_datos
+import gestor_datos2
+import gestor_datos3
+
+ESTADOS_PRESTAMO = ('prestado', 'atrasado', 'devuelto')
+
+_EMAIL = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+_FECHA = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+# Dígitos, separados o no por guiones, con una X final opcional (dígito de control del ISBN-10)
+_ISBN = re.compile(r'^\d+(-\d+)*(-?[Xx])?$')
+
+
+class Campo:
+    """Declaración de un campo: tipo, si es obligatorio y sus restricciones."""
+
+    __slots__ = ('nombre', 'tipo', 'requerido', 'minimo', 'opciones', 'como_texto')
+
+    def __init__(
+            self,
+            nombre: str,
+            tipo: str = 'texto',
+            requerido: bool = False,
+            minimo: Optional[int] = None,
+            opciones: Sequence[str] = (),
+            como_texto: bool = True,
+    ) -> None:
+        self.nombre = nombre
+        self.tipo = tipo
+        self.requerido = requerido
+        self.minimo = minimo
+        self.opciones = tuple(opciones)
+        self.como_texto = como_texto
+
+
+ESQUEMAS: Dict[str, Tuple[Campo, ...]] = {
+    'usuario': (
+        Campo('id', 'entero', minimo=0),
+        Campo('documento', 'digitos', requerido=True),
+        Campo('nombres'),
+        Campo('apellidos'),
+        Campo('email', 'email'),
+    ),
+    'libro': (
+        Campo('id', 'entero', minimo=0),
+        Campo('ISBN', 'isbn', requerido=True),
+        Campo('nombre'),
+        Campo('autor'),
+        Campo('stock', 'entero', minimo=0),
+    ),
+    'prestamo': (
+        Campo('id_prestamo', 'entero', requerido=True, minimo=1, como_texto=False),
+        Campo('id_usuario'),
+        Campo('id_libro'),
+        Campo('fecha_prestamo', 'fecha'),
+        Campo('fecha_devolucion_esperada', 'fecha'),
+        Campo('estado', 'opcion', opciones=ESTADOS_PRESTAMO),
+        Campo('id_ejemplar'),
+    ),
+}
+
+# Gestor de datos de cada entidad.
+GESTORES = {
+    'usuario': gestor_datos,
+    'libro': gestor_datos2,
+    'prestamo': gestor_datos3,
+}
+
+
+class ErrorCampo(Exception):
+    """Valor inválido para un campo (uso interno: se convierte en una fila de errores)."""
+
+
+class Resultado:
+    """Registros válidos (ya convertidos) y errores de un lote."""
+
+    __slots__ = ('validos', 'errores')
+
+    def __init__(self) -> None:
+        self.validos: List[Dict[str, Any]] = []
+        self.errores: List[Dict[str, Any]] = []
+
+
+# --- Compilación ---
+
+def _convertidor(campo: Campo) -> Callable[[Any], Any]:
+    """Arma la función que valida y convierte el valor de un campo."""
+    if campo.tipo == 'entero':
+        minimo, como_texto = campo.minimo, campo.como_texto
+
+        def convertir(valor: Any) -> Any:
+            try:
+                numero = int(valor)
+            except (TypeError, ValueError):
+                raise ErrorCampo("debe ser un número entero") from None
+            if minimo is not None and numero < minimo:
+                raise ErrorCampo(f"debe ser mayor o igual a {minimo}")
+            return str(numero) if como_texto else numero
+    elif campo.tipo == 'digitos':
+        def convertir(valor: Any) -> Any:
+            texto = str(valor).strip()
+            if not texto.isdigit():
+                raise ErrorCampo("solo puede contener dígitos")
+            return texto
+    elif campo.tipo == 'isbn':
+        def convertir(valor: Any) -> Any:
+            texto = str(valor).strip()
+            if not _ISBN.match(texto):
+                raise ErrorCampo("solo puede contener dígitos, guiones y una X final")
+            return texto.replace('-', '').upper()
+    elif campo.tipo == 'email':
+        def convertir(valor: Any) -> Any:
+            texto = str(valor).strip()
+            if not _EMAIL.match(texto):
+                raise ErrorCampo("no es un correo válido")
+            return texto
+    elif campo.tipo == 'fecha':
+        def convertir(valor: Any) -> Any:
+            texto = str(valor).strip()
+            if not _FECHA.match(texto):
+                raise ErrorCampo("debe tener el formato AAAA-MM-DD")
+            try:
+                date.fromisoformat(texto)
+            except ValueError:
+                raise ErrorCampo("no es una fecha válida") from None
+            return texto
+    elif campo.tipo == 'opcion':
+        opciones = frozenset(campo.opciones)
+
+        def convertir(valor: Any) -> Any:
+            texto = str(valor).strip()
+            if texto not in opciones:
+                raise ErrorCampo(f"debe ser uno de: {', '.join(campo.opciones)}")
+            return texto
+    else:
+        def convertir(valor: Any) -> Any:
+            return str(valor).strip()
+    return convertir
+
+
+@lru_cache(maxsize=None)
+def compilar(entidad: str) -> Tuple[Tuple[str, bool, Callable[[Any], Any]], ...]:
+    """
+    Compila el esquema de una entidad (una sola vez por entidad).
+
+    Args:
+        entidad (str): 'usuario', 'libro' o 'prestamo'.
+
+    Returns:
+        Tuple[Tuple[str, bool, Callable[[Any], Any]], ...]: Por campo, (nombre, requerido, convertidor).
+    """
+    if entidad not in ESQUEMAS:
+        raise ValueError(f"Entidad desconocida: {entidad}")
+    return tuple((campo.nombre, campo.requerido, _convertidor(campo)) for campo in ESQUEMAS[entidad])
+
+
+# --- Validación ---
+
+def validar(entidad: str, registros: Sequence[Dict[str, Any]], clave: Optional[str] = None) -> Resultado:
+    """
+    Valida y convierte un lote de registros, recolectando todos los errores.
+
+    Los campos opcionales vacíos se guardan como texto vacío. Los registros con
+    algún error no se incluyen en los válidos.
+
+    Args:
+        entidad (str): 'usuario', 'libro' o 'prestamo'.
+        registros (Sequence[Dict[str, Any]]): Los registros a validar.
+        clave (Optional[str]): Si se indica, también se rechazan los registros
+            cuya clave ya apareció antes en el lote.
+
+    Returns:
+        Resultado: Los registros válidos y los errores, cada uno con 'fila'
+            (desde 1), 'campo', 'valor' y 'mensaje'.
+    """
+    campos = compilar(entidad)
+    resultado = Resultado()
+    vistos = set()
+    for fila, registro in enumerate(registros, start=1):
+        convertido = {}
+        valido = True
+        for nombre, requerido, convertir in campos:
+            valor = registro.get(nombre)
+            if valor is None or valor == '':
+                if requerido:
+                    resultado.errores.append({'fila': fila, 'campo': nombre, 'valor': valor, 'mensaje': "es obligatorio"})
+                    valido = False
+                else:
+                    convertido[nombre] = ''
+                continue
+            try:
+                convertido[nombre] = convertir(valor)
+            except ErrorCampo as error:
+                resultado.errores.append({'fila': fila, 'campo': nombre, 'valor': valor, 'mensaje': str(error)})
+                valido = False
+        if valido and clave is not None:
+            if convertido[clave] in vistos:
+                resultado.errores.append({'fila': fila, 'campo': clave, 'valor': convertido[clave],
+                                          'mensaje': "clave repetida en el lote"})
+                valido = False
+            vistos.add(convertido[clave])
+        if valido:
+            resultado.validos.append(convertido)
+    return resultado
+
+
+def cargar(entidad: str, filepath: str) -> Resultado:
+    """
+    Carga un archivo de datos y valida sus registros.
+
+    Args:
+        entidad (str): 'usuario', 'libro' o 'prestamo'.
+        filepath (str): Ruta al archivo de datos.
+
+    Returns:
+        Resultado: Los registros válidos y los errores de las filas con problemas.
+    """
+    return validar(entidad, GESTORES[entidad].cargar_datos(filepath))
+
+
+def _auditar_importados(entidad: str, destino: str, anteriores: Dict[str, Dict[str, Any]],
+                       importados: List[Dict[str, Any]]) -> None:
+    """Registra en la auditoría lo importado y ajusta los ejemplares, como las operaciones normales."""
+    if entidad == 'libro':
+        archivo_ejemplares = ejemplares.ruta_ejemplares(destino)
+        for libro in importados:
+            anterior = anteriores.get(libro['ISBN'])
+            auditoria.registrar_stock(destino, libro['ISBN'], anterior.get('stock') if anterior else None,
+                                      libro['stock'])
+            if anterior is not None and libro['stock'] != '':
+                ejemplares.sincronizar_stock(archivo_ejemplares, libro['ISBN'], int(libro['stock']))
+    elif entidad == 'prestamo':
+        for prestamo in importados:
+            anterior = anteriores.get(str(prestamo['id_prestamo']))
+            if anterior is None:
+                auditoria.registrar(destino, auditoria.PRESTAMO, prestamo['id_prestamo'], None, prestamo)
+            elif anterior.get('estado') != prestamo['estado']:
+                auditoria.registrar(destino, auditoria.ESTADO, prestamo['id_prestamo'], anterior.get('estado'),
+                                    prestamo['estado'])
+
+
+def importar(entidad: str, origen: str, destino: str) -> Resultado:
+    """
+    Importa en bloque los registros de un archivo a otro, validándolos antes.
+
+    Los registros válidos se agregan al destino (o reemplazan al que tenga la
+    misma clave) y se guardan de una sola vez con `guardar_cambios` del gestor,
+    que mantiene los índices del destino. Los libros y préstamos importados
+    quedan en la auditoría, y el stock de un libro que ya existía ajusta sus
+    ejemplares. Las claves repetidas dentro del mismo archivo de origen se
+    reportan como error.
+
+    Args:
+        entidad (str): 'usuario', 'libro' o 'prestamo'.
+        origen (str): Archivo a importar (CSV, JSON o '.dat' según la entidad).
+        destino (str): Archivo de datos de la entidad.
+
+    Returns:
+        Resultado: Los registros importados y los errores de las filas rechazadas.
+    """
+    gestor = GESTORES[entidad]
+    clave = gestor.CLAVE
+    resultado = validar(entidad, gestor.cargar_datos(origen, solo_lectura=True), clave)
+    if not resultado.validos:
+        return resultado
+
+    with cerrojo.bloquear(destino):
+        actuales = gestor.cargar_datos(destino)
+        anteriores = {str(r.get(clave)): r for r in actuales}
+        nuevos = {str(registro[clave]): registro for registro in resultado.validos}
+        combinados = [nuevos.pop(str(r.get(clave)), r) for r in actuales]
+        combinados.extend(nuevos.values())
+        gestor.guardar_cambios(destino, combinados, resultado.validos)
+        _auditar_importados(entidad, destino, anteriores, resultado.validos)
+    return resultado
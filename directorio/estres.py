@@ -0,0 +1,382 @@
+# -*- coding: utf-8 -*-
+"""
+Módulo de Pruebas de Carga.
+
+Lanza varios procesos que, sobre una misma carpeta de datos, ejecutan
+secuencias aleatorias (reproducibles con una semilla) de préstamos,
+devoluciones y altas o cambios de usuarios y libros. Al terminar revisa los
+invariantes de los datos:
+
+- ningún libro tiene stock negativo;
+- para cada libro, stock + préstamos abiertos = ejemplares (lo dado de alta);
+- los ejemplares prestados coinciden con los préstamos abiertos;
+- los IDs de préstamos (activos y archivados), usuarios y libros no se repiten;
+- los préstamos abiertos apuntan a usuarios y libros existentes.
+
+Por defecto cada proceso trabaja como la aplicación (`main.py`): con la
+escritura diferida y el vigilante de archivos activos. Con `--directo` las
+escrituras van a disco al momento y no hay caché de lectura.
+
+También mide el rendimiento (operaciones por segundo) y los percentiles de
+latencia de cada operación. El reporte se puede guardar en JSON y comparar con
+uno anterior para detectar regresiones.
+
+Por defecto la prueba corre en una carpeta temporal nueva. Con `--carpeta` se
+puede indicar otra, pero solo se borra si está vacía o si la creó una prueba
+de carga anterior (lleva el archivo '.estres'): nunca una carpeta de datos real.
+
+Uso:
+    python estres.py --procesos 4 --operaciones 200 --reporte estres.json --base estres_anterior.json
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence
+
+import ejemplares
+import escritura_diferida
+import gestor_datos
+import gestor_datos2
+import gestor_datos3
+import historico
+import integridad
+import libro
+import prestamos
+import usuario
+import vigilante
+from modelos import a_entero
+
+# Operaciones y su peso en la mezcla aleatoria.
+OPERACIONES = {
+    'prestar': 6,
+    'devolver': 4,
+    'crear_usuario': 1,
+    'actualizar_usuario': 1,
+    'crear_libro': 1,
+    'actualizar_libro': 1,
+    'listar': 1,
+}
+
+PERCENTILES = (50, 90, 99)
+
+# Archivo que deja `preparar` en la carpeta: solo una carpeta que lo tenga se puede borrar.
+MARCA = '.estres'
+
+# Aumento relativo (p. ej. 0.5 = 50 %) a partir del cual un reporte se considera una regresión.
+TOLERANCIA = 0.5
+
+
+def preparar(carpeta: str, usuarios: int = 20, libros: int = 10, stock: int = 3) -> Dict[str, str]:
+    """
+    Crea una carpeta de datos nueva con usuarios y libros iniciales.
+
+    Args:
+        carpeta (str): Carpeta de datos; si ya existe, debe estar vacía o
+            haberla creado antes esta función (entonces se borra).
+        usuarios (int): Cantidad de usuarios iniciales.
+        libros (int): Cantidad de libros iniciales.
+        stock (int): Ejemplares de cada libro inicial.
+
+    Returns:
+        Dict[str, str]: Rutas de 'usuarios', 'libros' y 'prestamos'.
+
+    Raises:
+        ValueError: Si la carpeta tiene archivos y no es de una prueba de carga.
+    """
+    if os.path.isdir(carpeta) and os.listdir(carpeta):
+        if not os.path.exists(os.path.join(carpeta, MARCA)):
+            raise ValueError(f"La carpeta {carpeta} tiene datos que no son de una prueba de carga")
+        shutil.rmtree(carpeta)
+    os.makedirs(carpeta, exist_ok=True)
+    open(os.path.join(carpeta, MARCA), mode='w', encoding='utf-8').close()
+    rutas = {
+        'usuarios': os.path.join(carpeta, 'usuario.json'),
+        'libros': os.path.join(carpeta, 'libro.json'),
+        'prestamos': os.path.join(carpeta, 'prestamo.json'),
+    }
+    gestor_datos.guardar_datos(rutas['usuarios'], [
+        {'id': str(i), 'documento': str(1000 + i), 'nombres': f'Usuario {i}', 'apellidos': 'Prueba',
+         'email': f'usuario{i}@biblioteca.co'}
+        for i in range(1, usuarios + 1)
+    ])
+    gestor_datos2.guardar_datos(rutas['libros'], [
+        {'id': str(i), 'ISBN': str(9000 + i), 'nombre': f'Libro {i}', 'autor': 'Autor', 'stock': str(stock)}
+        for i in range(1, libros + 1)
+    ])
+    gestor_datos3.guardar_datos(rutas['prestamos'], [])
+    return rutas
+
+
+def _trabajador(rutas: Dict[str, str], numero: int, operaciones: int, semilla: int,
+                como_app: bool = True) -> Dict[str, Any]:
+    """Ejecuta una secuencia aleatoria de operaciones (corre en su propio proceso)."""
+    if not como_app:
+        return _operar(rutas, numero, operaciones, semilla)
+    escritura_diferida.activar()
+    vigilante.activar(os.path.dirname(rutas['prestamos']))
+    try:
+        return _operar(rutas, numero, operaciones, semilla)
+    finally:
+        escritura_diferida.desactivar()
+        vigilante.desactivar()
+
+
+def _operar(rutas: Dict[str, str], numero: int, operaciones: int, semilla: int) -> Dict[str, Any]:
+    """Ejecuta la secuencia de operaciones de un proceso y mide cada una."""
+    azar = random.Random(semilla * 1000 + numero)
+    prestamos.console.quiet = True
+    documentos = [u['documento'] for u in gestor_datos.cargar_datos(rutas['usuarios'], solo_lectura=True)]
+    isbns = [lb['ISBN'] for lb in gestor_datos2.cargar_datos(rutas['libros'], solo_lectura=True)]
+    nombres, pesos = zip(*OPERACIONES.items())
+
+    latencias: Dict[str, List[float]] = {nombre: [] for nombre in nombres}
+    resultados: Dict[str, Counter] = {nombre: Counter() for nombre in nombres}
+    creados: Dict[str, int] = {}
+
+    # usuario.py y libro.py escriben sus mensajes con print
+    with open(os.devnull, mode='w', encoding='utf-8') as nulo, contextlib.redirect_stdout(nulo):
+        for paso in range(operaciones):
+            operacion = azar.choices(nombres, pesos)[0]
+            inicio = time.perf_counter()
+            if operacion == 'prestar':
+                hecho = prestamos.realizar_prestamo(
+                    rutas['prestamos'], rutas['usuarios'], rutas['libros'], azar.choice(documentos), azar.choice(isbns),
+                    reservar_si_agotado=azar.random() < 0.3,
+                )
+            elif operacion == 'devolver':
+                abiertos = [p for p in gestor_datos3.cargar_datos(rutas['prestamos'], solo_lectura=True)
+                            if p.get('estado') != 'devuelto']
+                # Otro proceso pudo devolverlo entre la lectura y la devolución: cuenta como rechazada
+                hecho = abiertos and prestamos.registrar_devolucion(
+                    rutas['prestamos'], rutas['libros'], azar.choice(abiertos)['id_prestamo'], rutas['usuarios'])
+            elif operacion == 'crear_usuario':
+                documento = f"{numero + 1}{paso:06d}"
+                hecho = usuario.crear_usuario(rutas['usuarios'], documento, 'Nuevo', f'Proceso {numero}',
+                                              f'nuevo{documento}@biblioteca.co')
+                if hecho:
+                    documentos.append(documento)
+            elif operacion == 'actualizar_usuario':
+                documento = azar.choice(documentos)
+                hecho = usuario.actualizar_usuario(rutas['usuarios'], documento,
+                                                   {'email': f'{documento}.{paso}@biblioteca.co'})
+            elif operacion == 'crear_libro':
+                isbn = f"{numero + 1}{paso:06d}"
+                stock = azar.randint(1, 3)
+                hecho = libro.crear_libro(rutas['libros'], isbn, f'Libro {isbn}', 'Autor', stock)
+                if hecho:
+                    isbns.append(isbn)
+                    creados[isbn] = stock
+            elif operacion == 'actualizar_libro':
+                isbn = azar.choice(isbns)
+                hecho = libro.actualizar_libro(rutas['libros'], isbn, {'nombre': f'Libro {isbn} ({paso})'})
+            else:
+                hecho = prestamos.listar_prestamos(rutas['prestamos'], rutas['usuarios'], rutas['libros']) is not None
+            latencias[operacion].append((time.perf_counter() - inicio) * 1000)
+            resultados[operacion]['ok' if hecho else 'rechazadas'] += 1
+
+    return {
+        'latencias': latencias,
+        'resultados': {nombre: dict(conteo) for nombre, conteo in resultados.items()},
+        'libros_creados': creados,
+    }
+
+
+def percentiles(valores: Sequence[float], cuales: Sequence[int] = PERCENTILES) -> Dict[str, float]:
+    """
+    Calcula percentiles por rango más cercano.
+
+    Args:
+        valores (Sequence[float]): Las mediciones.
+        cuales (Sequence[int]): Los percentiles a calcular (0-100).
+
+    Returns:
+        Dict[str, float]: 'p50', 'p90'... y 'max' (vacío si no hay mediciones).
+    """
+    if not valores:
+        return {}
+    ordenados = sorted(valores)
+    resultado = {}
+    for p in cuales:
+        rango = max(1, -(-p * len(ordenados) // 100))
+        resultado[f'p{p}'] = round(ordenados[rango - 1], 3)
+    resultado['max'] = round(ordenados[-1], 3)
+    return resultado
+
+
+def verificar(rutas: Dict[str, str], ejemplares_por_isbn: Dict[str, int]) -> List[str]:
+    """
+    Revisa los invariantes de una carpeta de datos.
+
+    Args:
+        rutas (Dict[str, str]): Rutas de 'usuarios', 'libros' y 'prestamos'.
+        ejemplares_por_isbn (Dict[str, int]): Ejemplares dados de alta por ISBN.
+
+    Returns:
+        List[str]: La descripción de cada invariante violado (vacía si todo está bien).
+    """
+    violaciones = []
+    usuarios = gestor_datos.cargar_datos(rutas['usuarios'], solo_lectura=True)
+    libros = gestor_datos2.cargar_datos(rutas['libros'], solo_lectura=True)
+    activos = gestor_datos3.cargar_datos(rutas['prestamos'], solo_lectura=True)
+    abiertos = Counter(str(p.get('id_libro')) for p in activos if p.get('estado') != 'devuelto')
+    copias = ejemplares.cargar(ejemplares.ruta_ejemplares(rutas['libros']))
+
+    for lb in libros:
+        isbn = str(lb.get('ISBN'))
+        stock = a_entero(lb.get('stock'))
+        if stock < 0:
+            violaciones.append(f"Libro {isbn}: stock negativo ({stock})")
+        esperado = ejemplares_por_isbn.get(isbn)
+        if esperado is not None and stock + abiertos[isbn] != esperado:
+            violaciones.append(f"Libro {isbn}: stock {stock} + {abiertos[isbn]} prestados != {esperado} ejemplares")
+        if isbn in copias:
+            prestados = len(copias[isbn].estados) - copias[isbn].disponibles() - copias[isbn].estados.count(ejemplares.BAJA)
+            if prestados != abiertos[isbn]:
+                violaciones.append(f"Libro {isbn}: {prestados} ejemplares prestados != {abiertos[isbn]} préstamos abiertos")
+
+    ids_prestamos = [str(p.get('id_prestamo')) for p in activos]
+    ids_prestamos += [str(p.get('id_prestamo')) for p in historico.iterar_archivados(rutas['prestamos'])]
+    for nombre, valores in (
+        ('préstamo', ids_prestamos),
+        ('usuario (id)', [str(u.get('id')) for u in usuarios]),
+        ('usuario (documento)', [str(u.get('documento')) for u in usuarios]),
+        ('libro (id)', [str(lb.get('id')) for lb in libros]),
+        ('libro (ISBN)', [str(lb.get('ISBN')) for lb in libros]),
+    ):
+        repetidos = sorted(valor for valor, veces in Counter(valores).items() if veces > 1)
+        if repetidos:
+            violaciones.append(f"IDs de {nombre} repetidos: {', '.join(repetidos)}")
+
+    for problema in integridad.verificar(rutas['prestamos'], rutas['usuarios'], rutas['libros']):
+        violaciones.append(f"Préstamo {problema['id_prestamo']}: {problema['campo']} {problema['valor']} no existe")
+    return violaciones
+
+
+def ejecutar(carpeta: str, procesos: int = 4, operaciones: int = 200, semilla: int = 0,
+             como_app: bool = True) -> Dict[str, Any]:
+    """
+    Corre la prueba de carga completa y retorna su reporte.
+
+    Args:
+        carpeta (str): Carpeta de datos de la prueba (ver `preparar`).
+        procesos (int): Procesos que operan a la vez sobre la carpeta.
+        operaciones (int): Operaciones por proceso.
+        semilla (int): Semilla de la secuencia aleatoria.
+        como_app (bool): True para trabajar con escritura diferida y vigilante, como `main.py`.
+
+    Returns:
+        Dict[str, Any]: Rendimiento, latencias, resultados por operación y violaciones.
+    """
+    rutas = preparar(carpeta)
+    ejemplares_por_isbn = {str(lb['ISBN']): a_entero(lb['stock'])
+                           for lb in gestor_datos2.cargar_datos(rutas['libros'], solo_lectura=True)}
+
+    inicio = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=procesos) as grupo:
+        futuros = [grupo.submit(_trabajador, rutas, n, operaciones, semilla, como_app) for n in range(procesos)]
+        partes = [futuro.result() for futuro in futuros]
+    segundos = time.perf_counter() - inicio
+
+    latencias: Dict[str, List[float]] = {nombre: [] for nombre in OPERACIONES}
+    resultados: Dict[str, Counter] = {nombre: Counter() for nombre in OPERACIONES}
+    for parte in partes:
+        ejemplares_por_isbn.update(parte['libros_creados'])
+        for nombre in OPERACIONES:
+            latencias[nombre] += parte['latencias'][nombre]
+            resultados[nombre].update(parte['resultados'][nombre])
+
+    total = procesos * operaciones
+    return {
+        'procesos': procesos,
+        'operaciones': total,
+        'semilla': semilla,
+        'modo': 'app' if como_app else 'directo',
+        'segundos': round(segundos, 3),
+        'rendimiento': round(total / segundos, 1) if segundos else 0.0,
+        'latencias_ms': {nombre: percentiles(valores) for nombre, valores in latencias.items() if valores},
+        'resultados': {nombre: dict(conteo) for nombre, conteo in resultados.items() if conteo},
+        'violaciones': verificar(rutas, ejemplares_por_isbn),
+    }
+
+
+def comparar(reporte: Dict[str, Any], anterior: Dict[str, Any], tolerancia: float = TOLERANCIA) -> List[str]:
+    """
+    Compara un reporte con uno anterior y lista las regresiones.
+
+    Args:
+        reporte (Dict[str, Any]): El reporte nuevo.
+        anterior (Dict[str, Any]): El reporte de referencia.
+        tolerancia (float): Empeoramiento relativo permitido.
+
+    Returns:
+        List[str]: Las regresiones encontradas (rendimiento o p90 de alguna operación).
+    """
+    regresiones = []
+    if reporte['rendimiento'] < anterior['rendimiento'] * (1 - tolerancia):
+        regresiones.append(f"Rendimiento: {reporte['rendimiento']} op/s (antes {anterior['rendimiento']})")
+    for nombre, medidas in reporte['latencias_ms'].items():
+        antes = anterior.get('latencias_ms', {}).get(nombre, {}).get('p90')
+        if antes and medidas['p90'] > antes * (1 + tolerancia):
+            regresiones.append(f"{nombre}: p90 {medidas['p90']} ms (antes {antes} ms)")
+    return regresiones
+
+
+def main(argumentos: Optional[Sequence[str]] = None) -> int:
+    """Punto de entrada de la línea de comandos; retorna 1 si hay violaciones o regresiones."""
+    from rich.console import Console
+    from rich.table import Table
+
+    parser = argparse.ArgumentParser(description="Prueba de carga de préstamos y devoluciones concurrentes.")
+    parser.add_argument('--carpeta', help="Carpeta de datos de la prueba (por defecto, una temporal nueva).")
+    parser.add_argument('--procesos', type=int, default=4)
+    parser.add_argument('--operaciones', type=int, default=200, help="Operaciones por proceso.")
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--directo', action='store_true',
+                        help="Sin escritura diferida ni vigilante (escrituras inmediatas).")
+    parser.add_argument('--reporte', help="Archivo JSON donde guardar el reporte.")
+    parser.add_argument('--base', help="Reporte JSON anterior con el que comparar.")
+    opciones = parser.parse_args(argumentos)
+
+    console = Console()
+    carpeta = opciones.carpeta or tempfile.mkdtemp(prefix='estres_')
+    reporte = ejecutar(carpeta, opciones.procesos, opciones.operaciones, opciones.semilla,
+                       como_app=not opciones.directo)
+
+    tabla = Table(title=f"⏱️ {reporte['operaciones']} operaciones en {reporte['segundos']} s "
+                        f"({reporte['rendimiento']} op/s, {reporte['procesos']} procesos)")
+    tabla.add_column("Operación", style="cyan")
+    for columna in [f"p{p}" for p in PERCENTILES] + ["max"]:
+        tabla.add_column(f"{columna} (ms)", justify="right")
+    tabla.add_column("OK / rechazadas", justify="right", style="magenta")
+    for nombre, medidas in reporte['latencias_ms'].items():
+        conteo = reporte['resultados'].get(nombre, {})
+        tabla.add_row(nombre, *(str(v) for v in medidas.values()),
+                      f"{conteo.get('ok', 0)} / {conteo.get('rechazadas', 0)}")
+    console.print(tabla)
+
+    problemas = list(reporte['violaciones'])
+    if opciones.base:
+        with open(opciones.base, mode='r', encoding='utf-8') as f:
+            problemas += comparar(reporte, json.load(f))
+    if opciones.reporte:
+        with open(opciones.reporte, mode='w', encoding='utf-8') as f:
+            json.dump(reporte, f, ensure_ascii=False, indent=2)
+
+    for problema in problemas:
+        console.print(f"[bold red]❌ {problema}[/bold red]")
+    if not problemas:
+        console.print("[bold green]✅ Invariantes correctos y sin regresiones.[/bold green]")
+    return 1 if problemas else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,356 @@
+# -*- coding: utf-8 -*-
+"""
+Módulo de Exportación de Préstamos.
+
+Exporta los préstamos (activos y archivados) unidos con el nombre del usuario
+y del libro, como los arma `listar_prestamos`, para que otros equipos los
+analicen sin leer los archivos de datos. Las filas se generan una por una y se
+escriben a medida que se producen: solo los usuarios y libros (para los
+nombres) y un bloque de filas del formato columnar quedan en memoria.
+
+Formatos, según la extensión del archivo de salida:
+
+- '.csv': una fila por préstamo, con cabecera.
+- '.jsonl': un objeto JSON por línea.
+- '.colz': columnar por bloques. Cada bloque guarda sus filas columna por
+  columna, cada columna comprimida por separado con zlib, así que quien solo
+  necesita algunas columnas no descomprime las demás.
+
+La exportación incremental usa una marca de agua guardada junto a la salida
+(`<salida>.marca.json`): el mayor ID de préstamo activo ya exportado, el
+último evento de la auditoría ya visto y, por cada partición del histórico,
+hasta qué byte se leyó. Así cada préstamo se exporta al crearse, otra vez cada
+vez que la auditoría registra un cambio suyo (estado o vencimiento) y otra al
+devolverse (ya con su fecha de devolución); quien lo consuma se queda con la
+última fila de cada 'id_prestamo'. Como la marca no recuerda filas salteadas,
+la exportación incremental no admite filtros y una completa con filtros no la
+mueve.
+"""
+
+import csv
+import json
+import os
+import struct
+import zlib
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set
+
+import auditoria
+import codec_json
+import gestor_datos
+import gestor_datos2
+import gestor_datos3
+import historico
+from modelos import a_entero
+
+COLUMNAS = [
+    'id_prestamo', 'id_usuario', 'usuario', 'id_libro', 'libro',
+    'fecha_prestamo', 'fecha_devolucion_esperada', 'fecha_devolucion', 'estado',
+]
+
+FORMATOS = {'.csv': 'csv', '.jsonl': 'jsonl', '.colz': 'columnar'}
+
+# Filas por bloque del formato columnar.
+FILAS_POR_BLOQUE = 10000
+
+MAGICO_COLUMNAR = b'COLZ1\n'
+_LARGO = struct.Struct('<I')
+
+
+def formato_de(ruta: str) -> str:
+    """Retorna el formato de exportación que corresponde a la extensión de la ruta."""
+    formato = FORMATOS.get(os.path.splitext(ruta)[1])
+    if formato is None:
+        raise ValueError(f"Formato de exportación no soportado: {ruta}")
+    return formato
+
+
+def ruta_marca(ruta: str) -> str:
+    """Retorna la ruta de la marca de agua de una exportación incremental."""
+    return ruta + '.marca.json'
+
+
+# --- Filas ---
+
+def _fila(prestamo: Dict[str, Any], usuarios: Dict[str, str], libros: Dict[str, str]) -> Dict[str, Any]:
+    id_usuario = str(prestamo.get('id_usuario', ''))
+    id_libro = str(prestamo.get('id_libro', ''))
+    return {
+        'id_prestamo': a_entero(prestamo.get('id_prestamo')),
+        'id_usuario': id_usuario,
+        'usuario': usuarios.get(id_usuario, 'Desconocido'),
+        'id_libro': id_libro,
+        'libro': libros.get(id_libro, 'Desconocido'),
+        'fecha_prestamo': prestamo.get('fecha_prestamo') or '',
+        'fecha_devolucion_esperada': prestamo.get('fecha_devolucion_esperada') or '',
+        'fecha_devolucion': prestamo.get('fecha_devolucion') or '',
+        'estado': prestamo.get('estado') or '',
+    }
+
+
+def _cumple(prestamo: Dict[str, Any], desde: Optional[str], hasta: Optional[str],
+            estados: Optional[Sequence[str]]) -> bool:
+    fecha = str(prestamo.get('fecha_prestamo') or '')
+    if (desde and fecha < desde) or (hasta and fecha > hasta):
+        return False
+    return not estados or prestamo.get('estado') in estados
+
+
+def _cambiados_desde(archivo_prestamo: str, marca: Dict[str, Any]) -> Set[str]:
+    """
+    IDs de los préstamos con eventos de la auditoría posteriores a la marca, que avanza hasta el último visto.
+
+    Se lee antes que los préstamos: cada cambio se guarda antes de auditarse,
+    así que lo ya auditado está en el archivo que se lee después.
+    """
+    visto = marca.get('auditoria') or {'n': 0, 'ts': ''}
+    ultimo = dict(visto)
+    cambiados = set()
+    for evento in auditoria.eventos(archivo_prestamo, desde=visto['ts'] or None):
+        if evento['n'] <= visto['n']:
+            continue
+        if evento['tipo'] in (auditoria.PRESTAMO, auditoria.ESTADO):
+            cambiados.add(evento['clave'])
+        if evento['n'] > ultimo['n']:
+            ultimo = {'n': evento['n'], 'ts': evento['ts']}
+    marca['auditoria'] = ultimo
+    return cambiados
+
+
+def filas_prestamos(
+        archivo_prestamo: str,
+        archivo_usuario: str,
+        archivo_libro: str,
+        desde: Optional[str] = None,
+        hasta: Optional[str] = None,
+        estados: Optional[Sequence[str]] = None,
+        marca: Optional[Dict[str, Any]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Genera las filas de préstamos unidas con los nombres de usuario y libro.
+
+    Args:
+        archivo_prestamo (str): Ruta al archivo de préstamos activo.
+        archivo_usuario (str): Ruta al archivo de usuarios.
+        archivo_libro (str): Ruta al archivo de libros.
+        desde (Optional[str]): Primera 'fecha_prestamo' ISO incluida.
+        hasta (Optional[str]): Última 'fecha_prestamo' ISO incluida.
+        estados (Optional[Sequence[str]]): Solo los préstamos con estos estados.
+        marca (Optional[Dict[str, Any]]): Marca de agua de una exportación
+            anterior; se actualiza con lo que se va generando. Con marca se
+            generan los préstamos activos nuevos o cambiados desde ella. Sin
+            marca se generan todos, leyendo solo las particiones del rango.
+
+    Yields:
+        Dict[str, Any]: Cada fila, con las columnas de COLUMNAS.
+    """
+    usuarios = {
+        str(u.get('documento')): f"{u.get('nombres', '')} {u.get('apellidos', '')}".strip()
+        for u in gestor_datos.cargar_datos(archivo_usuario, solo_lectura=True)
+    }
+    libros = {str(lb.get('ISBN')): lb.get('nombre', '')
+              for lb in gestor_datos2.cargar_datos(archivo_libro, solo_lectura=True)}
+
+    ultimo_id = int(marca.get('ultimo_id', 0)) if marca is not None else 0
+    cambiados = _cambiados_desde(archivo_prestamo, marca) if marca is not None else set()
+    nuevo_ultimo = ultimo_id
+    for prestamo in gestor_datos3.cargar_datos(archivo_prestamo, solo_lectura=True):
+        id_prestamo = a_entero(prestamo.get('id_prestamo'))
+        if marca is not None and id_prestamo <= ultimo_id and str(prestamo.get('id_prestamo')) not in cambiados:
+            continue
+        nuevo_ultimo = max(nuevo_ultimo, id_prestamo)
+        if _cumple(prestamo, desde, hasta, estados):
+            yield _fila(prestamo, usuarios, libros)
+
+    if marca is None:
+        # Sin marca se leen solo las particiones del rango de fechas pedido
+        periodo_desde = desde[:7] if desde else None
+        periodo_hasta = hasta[:7] if hasta else None
+        for prestamo in historico.iterar_archivados(archivo_prestamo, periodo_desde, periodo_hasta):
+            if _cumple(prestamo, desde, hasta, estados):
+                yield _fila(prestamo, usuarios, libros)
+        return
+
+    marca['ultimo_id'] = nuevo_ultimo
+    posiciones = marca.setdefault('posiciones', {})
+    for periodo, posicion, prestamo in historico.anexados_desde(archivo_prestamo, dict(posiciones)):
+        posiciones[periodo] = posicion
+        if _cumple(prestamo, desde, hasta, estados):
+            yield _fila(prestamo, usuarios, libros)
+
+
+# --- Escritores ---
+
+def _escribir_csv(filas: Iterable[Dict[str, Any]], ruta: str, anexar: bool) -> int:
+    nuevo = not anexar or not os.path.exists(ruta) or os.path.getsize(ruta) == 0
+    total = 0
+    with open(ruta, mode='a' if anexar else 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNAS)
+        if nuevo:
+            writer.writeheader()
+        for fila in filas:
+            writer.writerow(fila)
+            total += 1
+    return total
+
+
+def _escribir_jsonl(filas: Iterable[Dict[str, Any]], ruta: str, anexar: bool) -> int:
+    total = 0
+    with open(ruta, mode='a' if anexar else 'w', encoding='utf-8') as f:
+        for fila in filas:
+            f.write(json.dumps(fila, ensure_ascii=False) + '\n')
+            total += 1
+    return total
+
+
+def _escribir_bloque(archivo, bloque: List[Dict[str, Any]], nivel: int) -> None:
+    """Escribe un bloque: largo de la cabecera, cabecera JSON y una columna comprimida tras otra."""
+    comprimidas = [
+        zlib.compress(json.dumps([fila[columna] for fila in bloque], ensure_ascii=False).encode('utf-8'), nivel)
+        for columna in COLUMNAS
+    ]
+    cabecera = json.dumps({
+        'filas': len(bloque),
+        'columnas': [[columna, len(datos)] for columna, datos in zip(COLUMNAS, comprimidas)],
+    }).encode('utf-8')
+    archivo.write(_LARGO.pack(len(cabecera)))
+    archivo.write(cabecera)
+    for datos in comprimidas:
+        archivo.write(datos)
+
+
+def _escribir_columnar(filas: Iterable[Dict[str, Any]], ruta: str, anexar: bool, nivel: int = 6) -> int:
+    nuevo = not anexar or not os.path.exists(ruta) or os.path.getsize(ruta) == 0
+    total = 0
+    with open(ruta, mode='ab' if anexar else 'wb') as f:
+        if nuevo:
+            f.write(MAGICO_COLUMNAR)
+        bloque: List[Dict[str, Any]] = []
+        for fila in filas:
+            bloque.append(fila)
+            if len(bloque) >= FILAS_POR_BLOQUE:
+                _escribir_bloque(f, bloque, nivel)
+                total += len(bloque)
+                bloque = []
+        if bloque:
+            _escribir_bloque(f, bloque, nivel)
+            total += len(bloque)
+    return total
+
+
+_ESCRITORES = {'csv': _escribir_csv, 'jsonl': _escribir_jsonl, 'columnar': _escribir_columnar}
+
+
+def leer_columnar(ruta: str, columnas: Optional[Sequence[str]] = None) -> Iterator[Dict[str, List[Any]]]:
+    """
+    Lee un archivo columnar bloque por bloque, descomprimiendo solo las columnas pedidas.
+
+    Args:
+        ruta (str): Ruta al archivo '.colz'.
+        columnas (Optional[Sequence[str]]): Columnas a leer (todas si es None).
+
+    Yields:
+        Dict[str, List[Any]]: Por bloque, los valores de cada columna pedida.
+    """
+    with open(ruta, mode='rb') as f:
+        if f.read(len(MAGICO_COLUMNAR)) != MAGICO_COLUMNAR:
+            raise ValueError(f"No es un archivo columnar: {ruta}")
+        while True:
+            largo = f.read(_LARGO.size)
+            if len(largo) < _LARGO.size:
+                return
+            cabecera = json.loads(f.read(_LARGO.unpack(largo)[0]))
+            bloque = {}
+            for nombre, tamano in cabecera['columnas']:
+                if columnas is None or nombre in columnas:
+                    bloque[nombre] = json.loads(zlib.decompress(f.read(tamano)))
+                else:
+                    f.seek(tamano, os.SEEK_CUR)
+            yield bloque
+
+
+def filas_columnar(ruta: str) -> Iterator[Dict[str, Any]]:
+    """Recorre fila por fila un archivo columnar."""
+    for bloque in leer_columnar(ruta):
+        yield from (dict(zip(bloque, valores)) for valores in zip(*bloque.values()))
+
+
+# --- Exportación ---
+
+def _leer_marca(ruta: str) -> Dict[str, Any]:
+    try:
+        with open(ruta_marca(ruta), mode='r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {'ultimo_id': 0, 'auditoria': {'n': 0, 'ts': ''}, 'posiciones': {}}
+
+
+def _marca_actual(archivo_prestamo: str) -> Dict[str, Any]:
+    """La marca de agua que deja al día lo que hay ahora en los archivos de préstamos."""
+    posicion = auditoria.posicion_final(archivo_prestamo)
+    activos = gestor_datos3.cargar_datos(archivo_prestamo, solo_lectura=True)
+    return {
+        'ultimo_id': max((a_entero(p.get('id_prestamo')) for p in activos), default=0),
+        'auditoria': posicion,
+        'posiciones': historico.posiciones_finales(archivo_prestamo),
+    }
+
+
+def _guardar_marca(ruta: str, marca: Dict[str, Any]) -> None:
+    codec_json.escribir_atomico(ruta_marca(ruta), marca)
+
+
+def exportar_prestamos(
+        archivo_prestamo: str,
+        archivo_usuario: str,
+        archivo_libro: str,
+        ruta: str,
+        desde: Optional[str] = None,
+        hasta: Optional[str] = None,
+        estados: Optional[Sequence[str]] = None,
+        incremental: bool = False,
+) -> int:
+    """
+    Exporta los préstamos a CSV, JSONL o columnar según la extensión de la salida.
+
+    Una exportación completa reescribe la salida y, si no tiene filtros, deja
+    la marca de agua al día; una incremental agrega solo lo nuevo o cambiado
+    desde la marca anterior.
+
+    Args:
+        archivo_prestamo (str): Ruta al archivo de préstamos activo.
+        archivo_usuario (str): Ruta al archivo de usuarios.
+        archivo_libro (str): Ruta al archivo de libros.
+        ruta (str): Archivo de salida ('.csv', '.jsonl' o '.colz').
+        desde (Optional[str]): Primera 'fecha_prestamo' ISO incluida.
+        hasta (Optional[str]): Última 'fecha_prestamo' ISO incluida.
+        estados (Optional[Sequence[str]]): Solo los préstamos con estos estados.
+        incremental (bool): True para agregar solo lo nuevo desde la última exportación.
+
+    Returns:
+        int: La cantidad de filas escritas.
+
+    Raises:
+        ValueError: Si se pide una exportación incremental con filtros.
+    """
+    escribir = _ESCRITORES[formato_de(ruta)]
+    if incremental:
+        if desde or hasta or estados:
+            raise ValueError("La exportación incremental no admite filtros de fecha ni de estado")
+        marca = _leer_marca(ruta)
+        total = escribir(filas_prestamos(archivo_prestamo, archivo_usuario, archivo_libro, marca=marca), ruta, True)
+        _guardar_marca(ruta, marca)
+        return total
+
+    # La marca se toma antes de leer: lo que se agregue durante la exportación sale en la próxima
+    marca = _marca_actual(archivo_prestamo)
+    filas = filas_prestamos(archivo_prestamo, archivo_usuario, archivo_libro, desde, hasta, estados)
+    # La exportación completa se escribe aparte y reemplaza la anterior de una vez
+    temporal = ruta + '.tmp' + os.path.splitext(ruta)[1]
+    total = escribir(filas, temporal, False)
+    os.replace(temporal, ruta)
+    if desde or hasta or estados:
+        # Con filtros faltan filas: la marca anterior (si la hay) sigue siendo la válida
+        return total
+    _guardar_marca(ruta, marca)
+    return total
+
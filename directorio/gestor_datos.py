@@ -3,18 +3,31 @@
 Módulo de Persistencia de Datos.
 
 Responsable de leer y escribir datos en archivos planos (CSV y JSON).
+Los archivos CSV y JSON pueden estar comprimidos (ver `compresion`).
 No contiene lógica de negocio, solo operaciones de I/O.
 """
 
 import csv
 import json
 import os
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterable, List, Optional
+
+import bitacora
+import busqueda_usuarios
+import cerrojo
+import codec_json
+import compresion
+import escritura_diferida
+import indice_csv
+import vigilante
 
 # Se define el orden de las columnas para los archivos.
 # Se añade 'tipo_documento' como nuevo campo.
 CAMPOS = ['id', 'documento', 'nombres', 'apellidos','email']
 
+# Campo que identifica a cada registro.
+CLAVE = 'documento'
+
 def inicializar_archivo(filepath: str) -> None:
     """
     Verifica si un archivo de datos existe. Si no, lo crea con las cabeceras.
@@ -29,38 +42,83 @@ def inicializar_archivo(filepath: str) -> None:
         os.makedirs(directorio)
 
     if not os.path.exists(filepath):
-        if filepath.endswith('.csv'):
-            with open(filepath, mode='w', newline='', encoding='utf-8') as csv_file:
+        if compresion.formato(filepath) == '.csv':
+            with compresion.abrir(filepath, 'w', newline='', encoding='utf-8') as csv_file:
                 writer = csv.DictWriter(csv_file, fieldnames=CAMPOS)
                 writer.writeheader()
-        elif filepath.endswith('.json'):
-            with open(filepath, mode='w', encoding='utf-8') as json_file:
+        elif compresion.formato(filepath) == '.json':
+            with compresion.abrir(filepath, 'w', encoding='utf-8') as json_file:
                 json.dump([], json_file)
+        elif bitacora.es_bitacora(filepath):
+            bitacora.inicializar(filepath)
 
-def cargar_datos(filepath: str) -> List[Dict[str, Any]]:
+def cargar_datos(filepath: str, solo_lectura: bool = False) -> List[Dict[str, Any]]:
     """
     Carga los datos desde un archivo (CSV o JSON) y los retorna como una lista de diccionarios.
 
     Args:
         filepath (str): La ruta al archivo de datos.
+        solo_lectura (bool): Si es True y los datos están en la caché del vigilante,
+            se retornan sus vistas de solo lectura, sin copiarlas.
 
     Returns:
         List[Dict[str, Any]]: Una lista de diccionarios con los datos de los aprendices.
     """
+    pendiente = escritura_diferida.leer_pendiente(filepath)
+    if pendiente is not None:
+        return pendiente
+
+    en_cache = vigilante.leer_cache(filepath, solo_lectura)
+    if en_cache is not None:
+        return en_cache
+
+    # La firma se toma antes de leer: si el archivo cambia durante la lectura, la caché no se usa
+    firma = vigilante.firma(filepath)
+    datos = _leer(filepath)
+    escritura_diferida.recordar(filepath, datos)
+    vigilante.guardar_cache(filepath, datos, firma, CLAVE)
+    return datos
+
+def buscar_registro(filepath: str, valor: str) -> Optional[Dict[str, Any]]:
+    """
+    Busca un solo registro por su clave ('documento').
+
+    En un CSV sin cambios pendientes se usa el índice de posiciones del archivo
+    y solo se interpreta la línea encontrada.
+
+    Args:
+        filepath (str): La ruta al archivo de datos.
+        valor (str): El valor de la clave buscada.
+
+    Returns:
+        Optional[Dict[str, Any]]: El registro, o None si no existe.
+    """
+    if escritura_diferida.leer_pendiente(filepath) is None:
+        if filepath.endswith('.csv') and os.path.exists(filepath) and not compresion.comprimido(filepath):
+            return indice_csv.buscar(filepath, CLAVE, valor)
+    for registro in cargar_datos(filepath):
+        if str(registro.get(CLAVE)) == str(valor):
+            return registro
+    return None
+
+def _leer(filepath: str) -> List[Dict[str, Any]]:
+    """Lee el archivo de disco (sin pasar por la escritura diferida)."""
     inicializar_archivo(filepath)
 
     try:
-        if filepath.endswith('.csv'):
-            with open(filepath, mode='r', newline='', encoding='utf-8') as csv_file:
+        if compresion.formato(filepath) == '.csv':
+            with compresion.abrir(filepath, 'r', newline='', encoding='utf-8') as csv_file:
                 lector = csv.DictReader(csv_file)
                 return list(lector)
-        elif filepath.endswith('.json'):
-            with open(filepath, mode='r', encoding='utf-8') as json_file:
-                datos = json.load(json_file)
-                return datos if isinstance(datos, list) else []
+        elif compresion.formato(filepath) == '.json':
+            datos = codec_json.leer(filepath)
+            return datos if isinstance(datos, list) else []
+        elif bitacora.es_bitacora(filepath):
+            return bitacora.leer(filepath, CLAVE)
     except (FileNotFoundError, json.JSONDecodeError):
         return []
 
+@cerrojo.exclusivo
 def guardar_datos(filepath: str, datos: List[Dict[str, Any]]) -> None:
     """
     Guarda una lista de diccionarios en un archivo (CSV o JSON), sobrescribiendo el contenido.
@@ -69,12 +127,58 @@ def guardar_datos(filepath: str, datos: List[Dict[str, Any]]) -> None:
         filepath (str): La ruta al archivo donde se guardarán los datos.
         datos (List[Dict[str, Any]]): La lista de aprendices a guardar.
     """
-    if filepath.endswith('.csv'):
-        with open(filepath, mode='w', newline='', encoding='utf-8') as csv_file:
-            writer = csv.DictWriter(csv_file, fieldnames=CAMPOS)
+    if escritura_diferida.encolar(filepath, datos, __name__, CLAVE):
+        return
+    _escribir(filepath, datos)
+
+@cerrojo.exclusivo
+def guardar_cambios(
+        filepath: str,
+        datos: List[Dict[str, Any]],
+        cambiados: List[Dict[str, Any]],
+        eliminados: Iterable[str] = (),
+) -> None:
+    """
+    Guarda el contenido después de modificar pocos usuarios.
+
+    En el formato de bitácora ('.log') solo se anotan las operaciones del
+    cambio; en los demás formatos el archivo se guarda completo. El índice de
+    búsqueda por nombre y correo se actualiza solo con los usuarios cambiados,
+    sin reconstruirlo.
+
+    Args:
+        filepath (str): La ruta al archivo de datos.
+        datos (List[Dict[str, Any]]): El contenido completo, ya con los cambios.
+        cambiados (List[Dict[str, Any]]): Usuarios nuevos o modificados.
+        eliminados (Iterable[str]): Documentos de los usuarios eliminados.
+    """
+    busqueda = busqueda_usuarios.vigente(filepath)
+    eliminados = list(eliminados)
+    if bitacora.es_bitacora(filepath) and escritura_diferida.leer_pendiente(filepath) is None:
+        bitacora.anotar(filepath, CLAVE, cambiados, eliminados)
+        vigilante.invalidar(filepath)
+        escritura_diferida.olvidar(filepath)
+    else:
+        guardar_datos(filepath, datos)
+    if busqueda is not None:
+        busqueda.aplicar(cambiados, eliminados)
+        busqueda_usuarios.confirmar(filepath, busqueda)
+
+def columnas_csv(datos: List[Dict[str, Any]]) -> List[str]:
+    """Retorna las columnas de un CSV: las de CAMPOS y, después, las extra que traigan los registros."""
+    extra = dict.fromkeys(clave for registro in datos for clave in registro if clave not in CAMPOS)
+    return CAMPOS + list(extra)
+
+def _escribir(filepath: str, datos: List[Dict[str, Any]]) -> None:
+    """Escribe el archivo en disco (sin pasar por la escritura diferida)."""
+    vigilante.invalidar(filepath)
+    if compresion.formato(filepath) == '.csv':
+        with compresion.abrir(filepath, 'w', newline='', encoding='utf-8') as csv_file:
+            writer = csv.DictWriter(csv_file, fieldnames=columnas_csv(datos))
             writer.writeheader()
             writer.writerows(datos)
-    elif filepath.endswith('.json'):
-        with open(filepath, mode='w', encoding='utf-8') as json_file:
-            json.dump(datos, json_file, indent=4)
+    elif compresion.formato(filepath) == '.json':
+        codec_json.escribir(filepath, datos)
+    elif bitacora.es_bitacora(filepath):
+        bitacora.escribir(filepath, datos)
 
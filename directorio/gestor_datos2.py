@@ -2,19 +2,42 @@
 """
 Módulo de Persistencia de Datos.
 
-Responsable de leer y escribir datos en archivos planos (CSV y JSON).
+Responsable de leer y escribir datos en archivos planos (CSV, JSON y de ancho fijo).
+Los archivos CSV y JSON pueden estar comprimidos (ver `compresion`).
 No contiene lógica de negocio, solo operaciones de I/O.
 """
 
 import csv
 import json
 import os
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterable, List, Optional
+
+import bitacora
+import cerrojo
+import codec_json
+import compresion
+import codificacion
+import escritura_diferida
+import indice_csv
+import registros_fijos
+import vigilante
 
 # Se define el orden de las columnas para los archivos.
 # Se añade 'tipo_documento' como nuevo campo.
 CAMPOS = ['id', 'ISBN', 'nombre', 'autor','stock']
 
+# Campo que identifica a cada registro.
+CLAVE = 'ISBN'
+
+# Columnas con muchos valores repetidos: se comparten en memoria y se guardan
+# codificadas por diccionario cuando el archivo JSON supera el umbral de registros.
+COLUMNAS_DICCIONARIO = ['autor']
+UMBRAL_CODIFICACION = 1000
+
+# Ancho mínimo (bytes) de cada campo en el formato de ancho fijo ('.dat'), que
+# permite reescribir un solo registro en su lugar.
+ANCHOS = {'id': 10, 'ISBN': 20, 'nombre': 80, 'autor': 50, 'stock': 6}
+
 def inicializar_archivo(filepath: str) -> None:
     """
     Verifica si un archivo de datos existe. Si no, lo crea con las cabeceras.
@@ -29,38 +52,93 @@ def inicializar_archivo(filepath: str) -> None:
         os.makedirs(directorio)
 
     if not os.path.exists(filepath):
-        if filepath.endswith('.csv'):
-            with open(filepath, mode='w', newline='', encoding='utf-8') as csv_file:
+        if compresion.formato(filepath) == '.csv':
+            with compresion.abrir(filepath, 'w', newline='', encoding='utf-8') as csv_file:
                 writer = csv.DictWriter(csv_file, fieldnames=CAMPOS)
                 writer.writeheader()
-        elif filepath.endswith('.json'):
-            with open(filepath, mode='w', encoding='utf-8') as json_file:
+        elif compresion.formato(filepath) == '.json':
+            with compresion.abrir(filepath, 'w', encoding='utf-8') as json_file:
                 json.dump([], json_file)
+        elif registros_fijos.es_fijo(filepath):
+            registros_fijos.inicializar(filepath, ANCHOS, CLAVE)
+        elif bitacora.es_bitacora(filepath):
+            bitacora.inicializar(filepath)
 
-def cargar_datos(filepath: str) -> List[Dict[str, Any]]:
+def cargar_datos(filepath: str, solo_lectura: bool = False) -> List[Dict[str, Any]]:
     """
     Carga los datos desde un archivo (CSV o JSON) y los retorna como una lista de diccionarios.
 
     Args:
         filepath (str): La ruta al archivo de datos.
+        solo_lectura (bool): Si es True y los datos están en la caché del vigilante,
+            se retornan sus vistas de solo lectura, sin copiarlas.
 
     Returns:
         List[Dict[str, Any]]: Una lista de diccionarios con los datos de los aprendices.
     """
+    pendiente = escritura_diferida.leer_pendiente(filepath)
+    if pendiente is not None:
+        return pendiente
+
+    en_cache = vigilante.leer_cache(filepath, solo_lectura)
+    if en_cache is not None:
+        return en_cache
+
+    # La firma se toma antes de leer: si el archivo cambia durante la lectura, la caché no se usa
+    firma = vigilante.firma(filepath)
+    datos = _leer(filepath)
+    escritura_diferida.recordar(filepath, datos)
+    vigilante.guardar_cache(filepath, datos, firma, CLAVE)
+    return datos
+
+def buscar_registro(filepath: str, valor: str) -> Optional[Dict[str, Any]]:
+    """
+    Busca un solo registro por su clave ('ISBN').
+
+    En un CSV sin cambios pendientes se usa el índice de posiciones del archivo
+    y solo se interpreta la línea encontrada (en '.dat', la ranura del registro).
+
+    Args:
+        filepath (str): La ruta al archivo de datos.
+        valor (str): El valor de la clave buscada.
+
+    Returns:
+        Optional[Dict[str, Any]]: El registro, o None si no existe.
+    """
+    if escritura_diferida.leer_pendiente(filepath) is None:
+        if filepath.endswith('.csv') and os.path.exists(filepath) and not compresion.comprimido(filepath):
+            return indice_csv.buscar(filepath, CLAVE, valor)
+        if registros_fijos.es_fijo(filepath) and os.path.exists(filepath):
+            return registros_fijos.obtener(filepath, valor)
+    for registro in cargar_datos(filepath):
+        if str(registro.get(CLAVE)) == str(valor):
+            return registro
+    return None
+
+def _leer(filepath: str) -> List[Dict[str, Any]]:
+    """Lee el archivo de disco (sin pasar por la escritura diferida)."""
     inicializar_archivo(filepath)
 
     try:
-        if filepath.endswith('.csv'):
-            with open(filepath, mode='r', newline='', encoding='utf-8') as csv_file:
+        if compresion.formato(filepath) == '.csv':
+            with compresion.abrir(filepath, 'r', newline='', encoding='utf-8') as csv_file:
                 lector = csv.DictReader(csv_file)
-                return list(lector)
-        elif filepath.endswith('.json'):
-            with open(filepath, mode='r', encoding='utf-8') as json_file:
-                datos = json.load(json_file)
-                return datos if isinstance(datos, list) else []
+                return codificacion.compartir_valores(list(lector), COLUMNAS_DICCIONARIO)
+        elif compresion.formato(filepath) == '.json':
+            datos = codec_json.leer(filepath)
+            if codificacion.es_codificado(datos):
+                return codificacion.decodificar(datos)
+            if not isinstance(datos, list):
+                return []
+            return codificacion.compartir_valores(datos, COLUMNAS_DICCIONARIO)
+        elif registros_fijos.es_fijo(filepath):
+            return codificacion.compartir_valores(registros_fijos.leer(filepath), COLUMNAS_DICCIONARIO)
+        elif bitacora.es_bitacora(filepath):
+            return codificacion.compartir_valores(bitacora.leer(filepath, CLAVE), COLUMNAS_DICCIONARIO)
     except (FileNotFoundError, json.JSONDecodeError):
         return []
 
+@cerrojo.exclusivo
 def guardar_datos(filepath: str, datos: List[Dict[str, Any]]) -> None:
     """
     Guarda una lista de diccionarios en un archivo (CSV o JSON), sobrescribiendo el contenido.
@@ -69,12 +147,86 @@ def guardar_datos(filepath: str, datos: List[Dict[str, Any]]) -> None:
         filepath (str): La ruta al archivo donde se guardarán los datos.
         datos (List[Dict[str, Any]]): La lista de aprendices a guardar.
     """
-    if filepath.endswith('.csv'):
-        with open(filepath, mode='w', newline='', encoding='utf-8') as csv_file:
-            writer = csv.DictWriter(csv_file, fieldnames=CAMPOS)
+    if escritura_diferida.encolar(filepath, datos, __name__, CLAVE):
+        return
+    _escribir(filepath, datos)
+
+def columnas_csv(datos: List[Dict[str, Any]]) -> List[str]:
+    """Retorna las columnas de un CSV: las de CAMPOS y, después, las extra que traigan los registros."""
+    extra = dict.fromkeys(clave for registro in datos for clave in registro if clave not in CAMPOS)
+    return CAMPOS + list(extra)
+
+def _escribir(filepath: str, datos: List[Dict[str, Any]]) -> None:
+    """Escribe el archivo en disco (sin pasar por la escritura diferida)."""
+    vigilante.invalidar(filepath)
+    if compresion.formato(filepath) == '.csv':
+        with compresion.abrir(filepath, 'w', newline='', encoding='utf-8') as csv_file:
+            writer = csv.DictWriter(csv_file, fieldnames=columnas_csv(datos))
             writer.writeheader()
             writer.writerows(datos)
-    elif filepath.endswith('.json'):
-        with open(filepath, mode='w', encoding='utf-8') as json_file:
-            json.dump(datos, json_file, indent=4)
+    elif compresion.formato(filepath) == '.json':
+        if len(datos) >= UMBRAL_CODIFICACION:
+            codec_json.escribir(filepath, codificacion.codificar(datos, COLUMNAS_DICCIONARIO))
+        else:
+            codec_json.escribir(filepath, datos)
+    elif registros_fijos.es_fijo(filepath):
+        registros_fijos.escribir(filepath, datos, ANCHOS, CLAVE)
+    elif bitacora.es_bitacora(filepath):
+        bitacora.escribir(filepath, datos)
+
+@cerrojo.exclusivo
+def guardar_cambios(
+        filepath: str,
+        datos: List[Dict[str, Any]],
+        cambiados: List[Dict[str, Any]],
+        eliminados: Iterable[str] = (),
+) -> None:
+    """
+    Guarda el contenido después de modificar pocos registros.
+
+    En el formato de ancho fijo ('.dat') solo se escriben, en su lugar, los
+    registros cambiados y las marcas de los eliminados; en el de bitácora
+    ('.log') solo se anotan las operaciones del cambio. En los demás formatos
+    (o con la escritura diferida activa) se guarda el contenido completo.
+
+    Args:
+        filepath (str): La ruta al archivo de datos.
+        datos (List[Dict[str, Any]]): El contenido completo, ya con los cambios.
+        cambiados (List[Dict[str, Any]]): Registros nuevos o modificados.
+        eliminados (Iterable[str]): Claves de los registros eliminados.
+    """
+    if registros_fijos.es_fijo(filepath) and os.path.exists(filepath) \
+            and escritura_diferida.leer_pendiente(filepath) is None \
+            and registros_fijos.actualizar(filepath, cambiados):
+        registros_fijos.eliminar(filepath, eliminados)
+        vigilante.invalidar(filepath)
+        escritura_diferida.olvidar(filepath)
+        return
+    if bitacora.es_bitacora(filepath) and escritura_diferida.leer_pendiente(filepath) is None:
+        bitacora.anotar(filepath, CLAVE, cambiados, eliminados)
+        vigilante.invalidar(filepath)
+        escritura_diferida.olvidar(filepath)
+        return
+    guardar_datos(filepath, datos)
+
+@cerrojo.exclusivo
+def sumar_stock(filepath: str, datos: List[Dict[str, Any]], libro: Dict[str, Any], cantidad: int) -> None:
+    """
+    Guarda un cambio de stock de un libro (un préstamo o una devolución).
+
+    En el formato de bitácora ('.log') se anota solo la cantidad sumada, no el
+    registro completo; en los demás formatos equivale a `guardar_cambios`.
+
+    Args:
+        filepath (str): La ruta al archivo de datos.
+        datos (List[Dict[str, Any]]): El contenido completo, ya con el stock cambiado.
+        libro (Dict[str, Any]): El libro con el stock ya cambiado.
+        cantidad (int): Lo que se sumó al stock (negativo si se restó).
+    """
+    if bitacora.es_bitacora(filepath) and escritura_diferida.leer_pendiente(filepath) is None:
+        bitacora.anotar(filepath, CLAVE, sumas=[(str(libro.get(CLAVE)), 'stock', cantidad)])
+        vigilante.invalidar(filepath)
+        escritura_diferida.olvidar(filepath)
+        return
+    guardar_cambios(filepath, datos, [libro])
 
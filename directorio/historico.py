@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""
+Módulo de Histórico de Préstamos.
+
+Los préstamos devueltos salen del archivo activo y se guardan en particiones
+por mes de 'fecha_prestamo', dentro de una carpeta junto al archivo activo
+(e.g. 'data/prestamo_archivo/2025-11.jsonl').
+
+Cada partición es un archivo de solo anexado (una línea JSON por préstamo):
+los registros archivados nunca se reescriben. Un pequeño índice guarda el
+último ID archivado y las particiones existentes, para no tener que leerlas.
+"""
+
+import json
+import os
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import cerrojo
+import codec_json
+
+NOMBRE_INDICE = 'indice.json'
+EXTENSION = '.jsonl'
+SIN_FECHA = 'sin_fecha'
+
+
+def carpeta_archivo(archivo_prestamo: str) -> str:
+    """
+    Retorna la carpeta de particiones asociada a un archivo de préstamos.
+
+    Args:
+        archivo_prestamo (str): Ruta al archivo activo (e.g. 'data/prestamo.json').
+
+    Returns:
+        str: Ruta de la carpeta (e.g. 'data/prestamo_archivo').
+    """
+    base, _ = os.path.splitext(archivo_prestamo)
+    return f"{base}_archivo"
+
+
+def periodo_de(prestamo: Dict[str, Any]) -> str:
+    """
+    Calcula la partición (AAAA-MM) de un préstamo según su fecha de préstamo.
+
+    Args:
+        prestamo (Dict[str, Any]): El préstamo en formato de almacenamiento.
+
+    Returns:
+        str: El periodo 'AAAA-MM', o 'sin_fecha' si no tiene fecha.
+    """
+    fecha = str(prestamo.get('fecha_prestamo') or '')
+    if len(fecha) >= 7 and fecha[4] == '-':
+        return fecha[:7]
+    return SIN_FECHA
+
+
+def _leer_indice(carpeta: str) -> Dict[str, Any]:
+    ruta = os.path.join(carpeta, NOMBRE_INDICE)
+    if not os.path.exists(ruta):
+        return {'ultimo_id': 0, 'particiones': []}
+    with open(ruta, mode='r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _guardar_indice(carpeta: str, indice: Dict[str, Any]) -> None:
+    codec_json.escribir_atomico(os.path.join(carpeta, NOMBRE_INDICE), indice)
+
+
+def ultimo_id(archivo_prestamo: str) -> int:
+    """
+    Retorna el mayor 'id_prestamo' que ya fue archivado (0 si no hay histórico).
+
+    Args:
+        archivo_prestamo (str): Ruta al archivo activo.
+
+    Returns:
+        int: El último ID archivado.
+    """
+    return int(_leer_indice(carpeta_archivo(archivo_prestamo)).get('ultimo_id', 0))
+
+
+def periodos(archivo_prestamo: str) -> List[str]:
+    """
+    Lista los periodos archivados, en orden cronológico.
+
+    Args:
+        archivo_prestamo (str): Ruta al archivo activo.
+
+    Returns:
+        List[str]: Los periodos 'AAAA-MM' con préstamos archivados.
+    """
+    return sorted(_leer_indice(carpeta_archivo(archivo_prestamo)).get('particiones', []))
+
+
+def _ids_archivados(ruta: str) -> Set[str]:
+    if not os.path.exists(ruta):
+        return set()
+    with open(ruta, mode='r', encoding='utf-8') as f:
+        # Una línea sin terminar (escritura cortada) no cuenta como archivada
+        return {str(json.loads(linea).get('id_prestamo')) for linea in f if linea.endswith('\n') and linea.strip()}
+
+
+@cerrojo.exclusivo
+def archivar(archivo_prestamo: str, prestamos: Iterable[Dict[str, Any]], omitir_archivados: bool = False) -> int:
+    """
+    Anexa préstamos cerrados a sus particiones mensuales.
+
+    Args:
+        archivo_prestamo (str): Ruta al archivo activo.
+        prestamos (Iterable[Dict[str, Any]]): Préstamos devueltos a archivar.
+        omitir_archivados (bool): True para no anexar los préstamos cuyo ID ya
+            está en su partición (lee esas particiones completas).
+
+    Returns:
+        int: La cantidad de préstamos archivados.
+    """
+    por_periodo: Dict[str, List[Dict[str, Any]]] = {}
+    for prestamo in prestamos:
+        por_periodo.setdefault(periodo_de(prestamo), []).append(prestamo)
+
+    if not por_periodo:
+        return 0
+
+    carpeta = carpeta_archivo(archivo_prestamo)
+    os.makedirs(carpeta, exist_ok=True)
+    indice = _leer_indice(carpeta)
+    particiones = set(indice.get('particiones', []))
+    maximo = int(indice.get('ultimo_id', 0))
+    total = 0
+
+    for periodo, grupo in por_periodo.items():
+        ruta = os.path.join(carpeta, periodo + EXTENSION)
+        if omitir_archivados:
+            archivados = _ids_archivados(ruta)
+            grupo = [p for p in grupo if str(p.get('id_prestamo')) not in archivados]
+        with open(ruta, mode='a', encoding='utf-8') as f:
+            for prestamo in grupo:
+                f.write(json.dumps(prestamo, ensure_ascii=False) + '\n')
+                try:
+                    maximo = max(maximo, int(prestamo.get('id_prestamo', 0)))
+                except (TypeError, ValueError):
+                    pass
+        particiones.add(periodo)
+        total += len(grupo)
+
+    indice['particiones'] = sorted(particiones)
+    indice['ultimo_id'] = maximo
+    _guardar_indice(carpeta, indice)
+    return total
+
+
+def iterar_archivados(
+        archivo_prestamo: str,
+        desde: Optional[str] = None,
+        hasta: Optional[str] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Recorre perezosamente los préstamos archivados, partición por partición.
+
+    Solo se abren las particiones dentro del rango pedido.
+
+    Args:
+        archivo_prestamo (str): Ruta al archivo activo.
+        desde (Optional[str]): Primer periodo 'AAAA-MM' a incluir.
+        hasta (Optional[str]): Último periodo 'AAAA-MM' a incluir.
+
+    Yields:
+        Dict[str, Any]: Cada préstamo archivado.
+    """
+    carpeta = carpeta_archivo(archivo_prestamo)
+    for periodo in periodos(archivo_prestamo):
+        if periodo != SIN_FECHA and ((desde and periodo < desde) or (hasta and periodo > hasta)):
+            continue
+        ruta = os.path.join(carpeta, periodo + EXTENSION)
+        if not os.path.exists(ruta):
+            continue
+        with open(ruta, mode='r', encoding='utf-8') as f:
+            for linea in f:
+                if linea.strip():
+                    yield json.loads(linea)
+
+
+def anexados_desde(
+        archivo_prestamo: str,
+        posiciones: Dict[str, int],
+) -> Iterator[Tuple[str, int, Dict[str, Any]]]:
+    """
+    Recorre los préstamos anexados a cada partición después de una posición.
+
+    Como las particiones solo crecen, la posición (en bytes) donde terminó una
+    lectura anterior sirve para leer únicamente lo nuevo.
+
+    Args:
+        archivo_prestamo (str): Ruta al archivo activo.
+        posiciones (Dict[str, int]): Por periodo, el byte desde donde leer (0 si no está).
+
+    Yields:
+        Tuple[str, int, Dict[str, Any]]: (periodo, posición al final de la línea, préstamo).
+    """
+    carpeta = carpeta_archivo(archivo_prestamo)
+    for periodo in periodos(archivo_prestamo):
+        ruta = os.path.join(carpeta, periodo + EXTENSION)
+        if not os.path.exists(ruta):
+            continue
+        with open(ruta, mode='rb') as f:
+            f.seek(posiciones.get(periodo, 0))
+            for linea in iter(f.readline, b''):
+                if not linea.endswith(b'\n'):
+                    break  # línea que se está escribiendo: se lee la próxima vez
+                if linea.strip():
+                    yield periodo, f.tell(), json.loads(linea)
+
+
+def posiciones_finales(archivo_prestamo: str) -> Dict[str, int]:
+    """
+    Retorna dónde termina hoy cada partición, para `anexados_desde`.
+
+    Solo se lee el final de cada archivo, hacia atrás hasta el último salto de
+    línea: una línea que se está escribiendo no cuenta.
+
+    Args:
+        archivo_prestamo (str): Ruta al archivo activo.
+
+    Returns:
+        Dict[str, int]: Por periodo, la posición al final de su última línea completa.
+    """
+    carpeta = carpeta_archivo(archivo_prestamo)
+    posiciones = {}
+    for periodo in periodos(archivo_prestamo):
+        ruta = os.path.join(carpeta, periodo + EXTENSION)
+        if not os.path.exists(ruta):
+            continue
+        with open(ruta, mode='rb') as f:
+            fin = f.seek(0, os.SEEK_END)
+            while fin > 0:
+                inicio = max(fin - 4096, 0)
+                f.seek(inicio)
+                salto = f.read(fin - inicio).rfind(b'\n')
+                if salto >= 0:
+                    fin = inicio + salto + 1
+                    break
+                fin = inicio
+        posiciones[periodo] = fin
+    return posiciones
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+Módulo de Índice de CSV.
+
+Búsquedas puntuales por clave en archivos CSV grandes sin interpretar el
+archivo completo: el CSV se abre con `mmap` y un archivo de índice junto a él
+(e.g. 'data/libro_indice_ISBN.json') guarda la posición en bytes de la línea de
+cada clave. Una búsqueda interpreta solo la línea encontrada.
+
+El índice leído queda en memoria mientras el archivo de índice conserve su
+firma (fecha de modificación y tamaño), así que las búsquedas seguidas no lo
+vuelven a interpretar.
+
+El índice guarda la fecha de modificación y el tamaño del CSV. Si no coinciden
+y el archivo solo creció (los bytes finales que ya estaban indexados siguen
+iguales), solo se indexan las líneas agregadas; si no, se reconstruye.
+
+Como los archivos que escribe el sistema, se asume que ningún campo contiene
+saltos de línea.
+"""
+
+import csv
+import json
+import mmap
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import codec_json
+import vigilante
+
+# Bytes finales ya indexados que se comparan para saber si el archivo solo creció.
+BYTES_COLA = 64
+
+# Índices leídos por ruta, con la firma que tenía el archivo de índice
+_LEIDOS: Dict[str, Tuple[Tuple[int, int], Dict[str, Any]]] = {}
+
+
+def ruta_indice(archivo_csv: str, clave: str) -> str:
+    """
+    Retorna la ruta del archivo de índice de un CSV para una clave.
+
+    Args:
+        archivo_csv (str): Ruta al CSV (e.g. 'data/libro.csv').
+        clave (str): Columna indexada (e.g. 'ISBN').
+
+    Returns:
+        str: Ruta del índice (e.g. 'data/libro_indice_ISBN.json').
+    """
+    base, _ = os.path.splitext(archivo_csv)
+    return f"{base}_indice_{clave}.json"
+
+
+def _interpretar(linea: bytes) -> List[str]:
+    return next(csv.reader([linea.decode('utf-8-sig').rstrip('\r\n')]), [])
+
+
+def _indexar(mapa: mmap.mmap, inicio: int, columna: int, posiciones: Dict[str, int]) -> None:
+    """Agrega al índice las líneas desde una posición hasta el final del archivo."""
+    posicion = inicio
+    fin = len(mapa)
+    while posicion < fin:
+        salto = mapa.find(b'\n', posicion)
+        siguiente = fin if salto < 0 else salto + 1
+        campos = _interpretar(mapa[posicion:siguiente])
+        if len(campos) > columna:
+            posiciones.setdefault(campos[columna], posicion)
+        posicion = siguiente
+
+
+def _cargar_indice(ruta: str) -> Optional[Dict[str, Any]]:
+    firma = vigilante.firma(ruta)
+    leido = _LEIDOS.get(ruta)
+    if leido is not None and leido[0] == firma:
+        return leido[1]
+    try:
+        with open(ruta, mode='r', encoding='utf-8') as f:
+            indice = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        _LEIDOS.pop(ruta, None)
+        return None
+    _LEIDOS[ruta] = (firma, indice)
+    return indice
+
+
+def _guardar_indice(ruta: str, indice: Dict[str, Any]) -> None:
+    codec_json.escribir_atomico(ruta, indice)
+    _LEIDOS[ruta] = (vigilante.firma(ruta), indice)
+
+
+def _actualizar(archivo_csv: str, clave: str, mapa: mmap.mmap) -> Optional[Dict[str, Any]]:
+    """Retorna el índice al día con el CSV, indexando solo lo necesario."""
+    info = os.stat(archivo_csv)
+    ruta = ruta_indice(archivo_csv, clave)
+    indice = _cargar_indice(ruta)
+    if indice and indice.get('mtime_ns') == info.st_mtime_ns and indice.get('tamano') == info.st_size:
+        return indice
+
+    tamano_anterior = indice.get('tamano', 0) if indice else 0
+    if indice and 0 < tamano_anterior <= info.st_size and mapa[tamano_anterior - 1:tamano_anterior] == b'\n' \
+            and mapa[max(tamano_anterior - BYTES_COLA, 0):tamano_anterior].hex() == indice.get('cola'):
+        # Solo se agregaron líneas al final
+        inicio = tamano_anterior
+    else:
+        fin_cabecera = mapa.find(b'\n')
+        cabecera = _interpretar(mapa[:fin_cabecera + 1 if fin_cabecera >= 0 else len(mapa)])
+        if clave not in cabecera:
+            return None
+        indice = {'cabecera': cabecera, 'posiciones': {}}
+        inicio = fin_cabecera + 1 if fin_cabecera >= 0 else len(mapa)
+
+    _indexar(mapa, inicio, indice['cabecera'].index(clave), indice['posiciones'])
+    indice['mtime_ns'] = info.st_mtime_ns
+    indice['tamano'] = info.st_size
+    indice['cola'] = mapa[max(info.st_size - BYTES_COLA, 0):info.st_size].hex()
+    _guardar_indice(ruta, indice)
+    return indice
+
+
+def buscar(archivo_csv: str, clave: str, valor: str) -> Optional[Dict[str, str]]:
+    """
+    Busca la primera fila de un CSV cuyo campo `clave` sea `valor`.
+
+    Args:
+        archivo_csv (str): Ruta al CSV.
+        clave (str): Columna por la que se busca.
+        valor (str): Valor buscado.
+
+    Returns:
+        Optional[Dict[str, str]]: La fila encontrada, o None.
+    """
+    if not os.path.exists(archivo_csv) or os.path.getsize(archivo_csv) == 0:
+        return None
+    with open(archivo_csv, mode='rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+        indice = _actualizar(archivo_csv, clave, mapa)
+        if indice is None:
+            return None
+        posicion = indice['posiciones'].get(str(valor))
+        if posicion is None:
+            return None
+        salto = mapa.find(b'\n', posicion)
+        campos = _interpretar(mapa[posicion:salto + 1 if salto >= 0 else len(mapa)])
+    return dict(zip(indice['cabecera'], campos))
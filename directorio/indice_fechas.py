@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+Módulo de Índices por Fecha de los Préstamos.
+
+Índices ordenados sobre 'fecha_prestamo' y 'fecha_devolucion_esperada' para
+consultar rangos de fechas ("préstamos hechos entre dos fechas", "préstamos que
+vencen esta semana") tocando solo los préstamos que caen en el rango.
+
+Las fechas se guardan como texto ISO ('AAAA-MM-DD'), que ordenado como texto
+queda en orden cronológico. Cada índice es una lista ordenada de pares
+(fecha, id_prestamo) que se recorre con `bisect`, y se actualiza al insertar,
+modificar o borrar un préstamo sin reordenar todo.
+
+Junto a ellos se mantienen índices inversos por 'id_usuario' e 'id_libro'
+(valor → IDs de préstamo), que usa el módulo de integridad para saber en O(1)
+si un usuario o un libro tiene préstamos.
+
+Los índices de cada archivo de préstamos se guardan en memoria junto con la
+fecha de modificación y el tamaño del archivo; si el archivo cambió por otro
+camino, se reconstruyen desde `gestor_datos3.cargar_datos`.
+"""
+
+import os
+from bisect import bisect_left, bisect_right, insort
+from operator import itemgetter
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import vigilante
+from modelos import clave_natural
+
+CAMPOS = ('fecha_prestamo', 'fecha_devolucion_esperada')
+
+# Campos con índice inverso (llaves foráneas hacia usuarios y libros).
+INVERSOS = ('id_usuario', 'id_libro')
+
+_INDICES: Dict[str, "IndicesPrestamo"] = {}
+
+
+class IndiceOrdenado:
+    """Pares (fecha, id) ordenados de un campo de fecha."""
+
+    __slots__ = ('campo', 'entradas')
+
+    def __init__(self, campo: str) -> None:
+        self.campo = campo
+        self.entradas: List[Tuple[str, str]] = []
+
+    def agregar(self, fecha: str, id_prestamo: str) -> None:
+        if fecha:
+            insort(self.entradas, (fecha, id_prestamo))
+
+    def quitar(self, fecha: str, id_prestamo: str) -> None:
+        if not fecha:
+            return
+        i = bisect_left(self.entradas, (fecha, id_prestamo))
+        if i < len(self.entradas) and self.entradas[i] == (fecha, id_prestamo):
+            del self.entradas[i]
+
+    def rango(self, desde: Optional[str] = None, hasta: Optional[str] = None) -> Iterator[str]:
+        """Recorre en orden de fecha los IDs con fecha entre `desde` y `hasta` (ambas incluidas)."""
+        inicio = bisect_left(self.entradas, desde, key=itemgetter(0)) if desde else 0
+        fin = bisect_right(self.entradas, hasta, key=itemgetter(0)) if hasta else len(self.entradas)
+        for i in range(inicio, fin):
+            yield self.entradas[i][1]
+
+
+class IndicesPrestamo:
+    """Préstamos de un archivo por ID, con índices ordenados por fecha e inversos por llave foránea."""
+
+    def __init__(self, prestamos: Iterable[Dict[str, Any]] = ()) -> None:
+        self.registros: Dict[str, Dict[str, Any]] = {str(p.get('id_prestamo')): p for p in prestamos}
+        self.indices = {campo: IndiceOrdenado(campo) for campo in CAMPOS}
+        self.firma: Tuple[int, int] = (-1, -1)
+        # Al construir se ordena una sola vez en lugar de insertar uno por uno
+        for campo, indice in self.indices.items():
+            indice.entradas = sorted(
+                (str(p[campo]), id_prestamo) for id_prestamo, p in self.registros.items() if p.get(campo)
+            )
+        self.inversos: Dict[str, Dict[str, Set[str]]] = {campo: {} for campo in INVERSOS}
+        for id_prestamo, prestamo in self.registros.items():
+            self._referenciar(id_prestamo, prestamo)
+
+    def _referenciar(self, id_prestamo: str, prestamo: Dict[str, Any]) -> None:
+        for campo, inverso in self.inversos.items():
+            inverso.setdefault(str(prestamo.get(campo)), set()).add(id_prestamo)
+
+    def guardar(self, prestamo: Dict[str, Any]) -> None:
+        """Agrega un préstamo o reemplaza el que tenga el mismo ID."""
+        id_prestamo = str(prestamo.get('id_prestamo'))
+        self.borrar(id_prestamo)
+        self.registros[id_prestamo] = prestamo
+        for campo, indice in self.indices.items():
+            indice.agregar(str(prestamo.get(campo) or ''), id_prestamo)
+        self._referenciar(id_prestamo, prestamo)
+
+    def borrar(self, id_prestamo: str) -> None:
+        anterior = self.registros.pop(str(id_prestamo), None)
+        if anterior is None:
+            return
+        for campo, indice in self.indices.items():
+            indice.quitar(str(anterior.get(campo) or ''), str(id_prestamo))
+        for campo, inverso in self.inversos.items():
+            ids = inverso.get(str(anterior.get(campo)))
+            if ids is not None:
+                ids.discard(str(id_prestamo))
+                if not ids:
+                    del inverso[str(anterior.get(campo))]
+
+    def aplicar(self, cambiados: Iterable[Dict[str, Any]], eliminados: Iterable[str]) -> None:
+        """Aplica registros nuevos o modificados y claves eliminadas."""
+        for id_prestamo in eliminados:
+            self.borrar(id_prestamo)
+        for prestamo in cambiados:
+            self.guardar(dict(prestamo))
+
+    def entre(self, campo: str, desde: Optional[str] = None, hasta: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Retorna, en orden de fecha, los préstamos con `campo` entre `desde` y `hasta`."""
+        return [dict(self.registros[id_prestamo]) for id_prestamo in self.indices[campo].rango(desde, hasta)]
+
+    def que_referencian(self, campo: str, valor: str) -> List[Dict[str, Any]]:
+        """Retorna los préstamos cuyo `campo` ('id_usuario' o 'id_libro') es `valor`."""
+        ids = self.inversos[campo].get(str(valor), ())
+        return [dict(self.registros[id_prestamo]) for id_prestamo in sorted(ids, key=clave_natural)]
+
+
+# --- Índices por archivo ---
+
+def vigente(filepath: str) -> Optional[IndicesPrestamo]:
+    """Retorna los índices de un archivo si siguen al día con él, o None."""
+    indices = _INDICES.get(os.path.abspath(filepath))
+    if indices is not None and indices.firma == vigilante.firma(filepath):
+        return indices
+    return None
+
+
+def confirmar(filepath: str, indices: IndicesPrestamo) -> None:
+    """Registra que los índices corresponden al contenido actual del archivo."""
+    indices.firma = vigilante.firma(filepath)
+    _INDICES[os.path.abspath(filepath)] = indices
+
+
+def de_archivo(filepath: str) -> IndicesPrestamo:
+    """
+    Retorna los índices de un archivo de préstamos, construyéndolos si hace falta.
+
+    Args:
+        filepath (str): Ruta al archivo de préstamos.
+
+    Returns:
+        IndicesPrestamo: Los índices al día con el archivo.
+    """
+    indices = vigente(filepath)
+    if indices is None:
+        import gestor_datos3  # importación diferida: gestor_datos3 usa este módulo
+        indices = IndicesPrestamo(gestor_datos3.cargar_datos(filepath))
+        confirmar(filepath, indices)
+    return indices
+
+
+def prestamos_entre(
+        filepath: str,
+        campo: str,
+        desde: Optional[str] = None,
+        hasta: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Lista los préstamos cuyo campo de fecha cae en un rango.
+
+    Args:
+        filepath (str): Ruta al archivo de préstamos.
+        campo (str): 'fecha_prestamo' o 'fecha_devolucion_esperada'.
+        desde (Optional[str]): Primera fecha ISO incluida (sin límite si es None).
+        hasta (Optional[str]): Última fecha ISO incluida (sin límite si es None).
+
+    Returns:
+        List[Dict[str, Any]]: Los préstamos, en orden de esa fecha.
+    """
+    if campo not in CAMPOS:
+        raise ValueError(f"Campo de fecha no indexado: {campo}")
+    return de_archivo(filepath).entre(campo, desde, hasta)
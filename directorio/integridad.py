@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+Módulo de Integridad Referencial.
+
+Declara las llaves foráneas de los préstamos y las hace cumplir al eliminar
+usuarios y libros:
+
+- prestamo.id_usuario → usuario.documento
+- prestamo.id_libro   → libro.ISBN
+
+Las comprobaciones usan los índices inversos de `indice_fechas` (valor → IDs
+de préstamo), así que saber si un usuario o un libro tiene préstamos no exige
+recorrer el archivo de préstamos.
+
+Al eliminar se puede restringir (no se elimina si hay préstamos sin devolver
+que lo referencian) o eliminar en cascada (se eliminan también esos préstamos).
+En cascada, los préstamos sin devolver de un usuario se dan primero por
+devueltos: el libro recupera su stock y el ejemplar queda libre. En ambos casos
+se quitan las reservas del usuario o del libro eliminado.
+"""
+
+import os
+from typing import Any, Dict, List
+
+import auditoria
+import cerrojo
+import ejemplares
+import gestor_datos
+import gestor_datos2
+import gestor_datos3
+import indice_fechas
+import reservas
+
+RESTRINGIR = 'restringir'
+CASCADA = 'cascada'
+
+# Entidad referenciada: (campo en el préstamo, gestor de la entidad, campo referenciado)
+LLAVES_FORANEAS = {
+    'usuario': ('id_usuario', gestor_datos, 'documento'),
+    'libro': ('id_libro', gestor_datos2, 'ISBN'),
+}
+
+
+class IntegridadError(ValueError):
+    """Se intentó eliminar un registro que tiene préstamos sin devolver."""
+
+    def __init__(self, entidad: str, valor: str, prestamos: List[Dict[str, Any]]) -> None:
+        super().__init__(f"El {entidad} {valor} tiene {len(prestamos)} préstamo(s) sin devolver")
+        self.entidad = entidad
+        self.valor = valor
+        self.prestamos = prestamos
+
+
+def prestamos_que_referencian(archivo_prestamo: str, entidad: str, valor: str) -> List[Dict[str, Any]]:
+    """
+    Retorna los préstamos activos que referencian a un usuario o a un libro.
+
+    Args:
+        archivo_prestamo (str): Ruta al archivo de préstamos.
+        entidad (str): 'usuario' o 'libro'.
+        valor (str): Documento del usuario o ISBN del libro.
+
+    Returns:
+        List[Dict[str, Any]]: Los préstamos que lo referencian.
+    """
+    campo = LLAVES_FORANEAS[entidad][0]
+    return indice_fechas.de_archivo(archivo_prestamo).que_referencian(campo, valor)
+
+
+def _reponer_stock(archivo_libro: str, prestamos: List[Dict[str, Any]]) -> None:
+    """Libera el ejemplar de cada préstamo sin devolver y guarda una sola vez el stock repuesto."""
+    if not os.path.exists(archivo_libro):
+        return
+    libros = gestor_datos2.cargar_datos(archivo_libro)
+    por_isbn = {str(lb.get('ISBN')): lb for lb in libros}
+    archivo_ejemplares = ejemplares.ruta_ejemplares(archivo_libro)
+    anteriores: Dict[str, int] = {}
+    for prestamo in prestamos:
+        libro = por_isbn.get(str(prestamo.get('id_libro')))
+        if libro is None:
+            continue
+        isbn = str(libro['ISBN'])
+        anterior = int(libro.get('stock') or 0)
+        anteriores.setdefault(isbn, anterior)
+        ejemplares.devolver(archivo_ejemplares, isbn, prestamo.get('id_ejemplar') or '')
+        libro['stock'] = str(ejemplares.stock(archivo_ejemplares, isbn, anterior + 1))
+    if not anteriores:
+        return
+
+    gestor_datos2.guardar_cambios(archivo_libro, libros, [por_isbn[isbn] for isbn in anteriores])
+    for isbn, anterior in anteriores.items():
+        auditoria.registrar_stock(archivo_libro, isbn, anterior, por_isbn[isbn]['stock'])
+
+
+@cerrojo.exclusivo
+def antes_de_eliminar(archivo_prestamo: str, archivo_libro: str, entidad: str, valor: str,
+                      modo: str = RESTRINGIR) -> int:
+    """
+    Aplica la regla de integridad antes de eliminar un usuario o un libro.
+
+    Args:
+        archivo_prestamo (str): Ruta al archivo de préstamos.
+        archivo_libro (str): Ruta al archivo de libros de esos préstamos, cuyo
+            stock se repone en cascada.
+        entidad (str): 'usuario' o 'libro'.
+        valor (str): Documento del usuario o ISBN del libro.
+        modo (str): RESTRINGIR o CASCADA.
+
+    Returns:
+        int: La cantidad de préstamos eliminados en cascada.
+
+    Raises:
+        IntegridadError: Si el modo es RESTRINGIR y hay préstamos sin devolver que lo referencian.
+    """
+    if modo not in (RESTRINGIR, CASCADA):
+        raise ValueError(f"Modo de integridad desconocido: {modo}")
+    referencias = prestamos_que_referencian(archivo_prestamo, entidad, valor)
+    pendientes = [p for p in referencias if p.get('estado') != 'devuelto']
+    if pendientes and modo == RESTRINGIR:
+        raise IntegridadError(entidad, valor, pendientes)
+
+    filtro = {'id_usuario': valor} if entidad == 'usuario' else {'id_libro': valor}
+    reservas.cancelar(reservas.ruta_reservas(archivo_prestamo), **filtro)
+    if not referencias or modo == RESTRINGIR:
+        return 0
+
+    # Un libro que se elimina no necesita stock; los de un usuario eliminado sí
+    if entidad == 'usuario' and pendientes:
+        _reponer_stock(archivo_libro, pendientes)
+    ids = {str(p.get('id_prestamo')) for p in referencias}
+    prestamos = gestor_datos3.cargar_datos(archivo_prestamo)
+    restantes = [p for p in prestamos if str(p.get('id_prestamo')) not in ids]
+    gestor_datos3.guardar_cambios(archivo_prestamo, restantes, [], sorted(ids))
+    for prestamo in referencias:
+        auditoria.registrar(archivo_prestamo, auditoria.BAJA, prestamo.get('id_prestamo'), prestamo.get('estado'), None)
+    return len(ids)
+
+
+def verificar(archivo_prestamo: str, archivo_usuario: str, archivo_libro: str) -> List[Dict[str, Any]]:
+    """
+    Revisa todos los préstamos y reporta los que apuntan a usuarios o libros inexistentes.
+
+    Solo se busca una vez cada valor distinto de cada llave foránea.
+
+    Args:
+        archivo_prestamo (str): Ruta al archivo de préstamos.
+        archivo_usuario (str): Ruta al archivo de usuarios.
+        archivo_libro (str): Ruta al archivo de libros.
+
+    Returns:
+        List[Dict[str, Any]]: Un problema por préstamo y llave rota, con 'id_prestamo',
+            'campo' y 'valor'.
+    """
+    archivos = {'usuario': archivo_usuario, 'libro': archivo_libro}
+    indices = indice_fechas.de_archivo(archivo_prestamo)
+    problemas = []
+    for entidad, (campo, gestor, referenciado) in LLAVES_FORANEAS.items():
+        existentes = {str(r.get(referenciado)) for r in gestor.cargar_datos(archivos[entidad], solo_lectura=True)}
+        for valor in sorted(indices.inversos[campo]):
+            if valor not in existentes:
+                for prestamo in indices.que_referencian(campo, valor):
+                    problemas.append({'id_prestamo': prestamo.get('id_prestamo'), 'campo': campo, 'valor': valor})
+    return problemas
@@ -2,14 +2,19 @@
 
 from typing import Any, Dict, List, Optional
 
+import auditoria
+import cerrojo
+import ejemplares
 import gestor_datos2
+import integridad
+from modelos import Libro, a_dicts, desde_dicts
 
-def generar_id_prodcuto(libros: List[Dict[str, Any]]) -> int:
+def generar_id_prodcuto(libros: List[Libro]) -> int:
     """
     Genera un nuevo ID autoincremental para un usuario.
 
     Args:
-        libros (List[Dict[str, Any]]): La lista actual de los libros.
+        libros (List[Libro]): La lista actual de los libros.
 
     Returns:
         int: El nuevo ID a asignar.
@@ -17,10 +22,11 @@ def generar_id_prodcuto(libros: List[Dict[str, Any]]) -> int:
     if not libros:
         return 1
 
-    max_id = max(int(ap.get('id', 0)) for ap in libros)
+    max_id = max(ap.id for ap in libros)
     return max_id + 1
 
 
+@cerrojo.exclusivo
 def crear_libro(
         filepath: str,
         ISBN: int,
@@ -46,27 +52,27 @@ def crear_libro(
     Returns:
         Optional[Dict[str, Any]]: El diccionario del libro creado o None si ya existía.
     """
-    libros = gestor_datos2.cargar_datos(filepath)
+    libros = desde_dicts(Libro, gestor_datos2.cargar_datos(filepath))
     str_documento = str(ISBN)
 
-    if any(ap.get('documento') == str_documento for ap in libros):
+    if any(ap.ISBN == str_documento for ap in libros):
         print(f"\n❌ Error: El documento '{str_documento}' ya se encuentra registrado.")
         return None
 
     nuevo_id = generar_id_prodcuto(libros)
 
-    nuevo_libro = {
-        'id': str(nuevo_id),
-        'ISBN': str_documento,
-        'nombre': nombre,
-        'autor': autor,
-        'stock': stock,
-
-    }
+    nuevo_libro = Libro(
+        id=nuevo_id,
+        ISBN=str_documento,
+        nombre=nombre,
+        autor=autor,
+        stock=int(stock),
+    )
 
     libros.append(nuevo_libro)
-    gestor_datos2.guardar_datos(filepath, libros)
-    return nuevo_libro
+    gestor_datos2.guardar_cambios(filepath, a_dicts(libros), [nuevo_libro.a_dict()])
+    auditoria.registrar_stock(filepath, str_documento, None, nuevo_libro.stock)
+    return nuevo_libro.a_dict()
 
 
 def leer_todos_los_libros(filepath: str) -> List[Dict[str, Any]]:
@@ -93,14 +99,11 @@ def buscar_libro_por_isbn(filepath: str, documento: str) -> Optional[Dict[str, A
     Returns:
         Optional[Dict[str, Any]]: El diccionario del libro si se encuentra, de lo contrario None.
     """
-    libros = gestor_datos2.cargar_datos(filepath)
-    for libro in libros:
-        if libro.get('ISBN') == documento:
-            return libro
-    return None
+    return gestor_datos2.buscar_registro(filepath, documento)
 
 
 
+@cerrojo.exclusivo
 def actualizar_libro(
         filepath: str,
         documento: str,
@@ -133,24 +136,41 @@ def actualizar_libro(
         for key, value in datos_nuevos.items():
             datos_nuevos[key] = str(value)
 
+        stock_anterior = libro_encontrado.get('stock')
         libro_encontrado.update(datos_nuevos)
         libros[indice] = libro_encontrado
-        gestor_datos2.guardar_datos(filepath, libros)
+        gestor_datos2.guardar_cambios(filepath, libros, [libro_encontrado])
+        if 'stock' in datos_nuevos:
+            stock = Libro.desde_dict(libro_encontrado).stock
+            auditoria.registrar_stock(filepath, documento, stock_anterior, stock)
+            ejemplares.sincronizar_stock(ejemplares.ruta_ejemplares(filepath), documento, stock)
         return libro_encontrado
 
     return None
 
 
-def eliminar_libro(filepath: str, documento: str) -> bool:
+@cerrojo.exclusivo
+def eliminar_libro(
+        filepath: str,
+        documento: str,
+        archivo_prestamo: Optional[str] = None,
+        modo: str = integridad.RESTRINGIR,
+) -> bool:
     """
     (DELETE) Elimina un libro de la agenda.
 
     Args:
         filepath (str): Ruta al archivo de datos.
         documento (str): El documento del libro a eliminar.
+        archivo_prestamo (Optional[str]): Archivo de préstamos cuya integridad se
+            cuida; si es None no se revisan préstamos.
+        modo (str): integridad.RESTRINGIR o integridad.CASCADA.
 
     Returns:
         bool: True si el libro fue eliminado, False si no se encontró.
+
+    Raises:
+        integridad.IntegridadError: Si el libro tiene préstamos sin devolver y el modo es RESTRINGIR.
     """
     libros = gestor_datos2.cargar_datos(filepath)
     libro_a_eliminar = None
@@ -161,8 +181,11 @@ def eliminar_libro(filepath: str, documento: str) -> bool:
             break
 
     if libro_a_eliminar:
+        if archivo_prestamo:
+            integridad.antes_de_eliminar(archivo_prestamo, filepath, 'libro', documento, modo)
         libros.remove(libro_a_eliminar)
-        gestor_datos2.guardar_datos(filepath, libros)
+        gestor_datos2.guardar_cambios(filepath, libros, [], [documento])
+        auditoria.registrar_stock(filepath, documento, libro_a_eliminar.get('stock'), None)
         return True
 
     return False
\ No newline at end of file
@@ -6,10 +6,24 @@ Punto de entrada de la aplicación.
 Maneja la interacción con el usuario (menús, entradas, salidas) usando la librería rich.
 """
 import os
+from datetime import date
 
 import usuario  # Importamos nuestro módulo de lógica de negocio
 import libro
 import prestamos
+import auditoria
+import escritura_diferida
+import exportacion
+import bitacora
+import carga_paralela
+import esquemas
+import integridad
+import multas
+import sucursales
+import politicas
+import vigilante
+import vista_tabla
+from modelos import Libro, Usuario, clave_natural, desde_dicts
 
 # --- Importaciones de la librería Rich ---
 from rich.console import Console
@@ -24,6 +38,10 @@ from rich import box
 # --- Inicialización de la Consola de Rich ---
 console = Console()
 
+# Filas ya formateadas de los listados de préstamos (se reutilizan entre llamadas)
+VISTA_PRESTAMOS = vista_tabla.vista_prestamos(header_style="bold white on black")
+VISTA_DEVOLUCIONES = vista_tabla.vista_prestamos("Fecha devolución")
+
 
 # Ruta base (donde está este archivo main.py)
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -42,6 +60,50 @@ ARCHIVO_LIBROS_CSV = os.path.join(DIRECTORIO_DATOS, "libro.csv")
 ARCHIVO_PRESTAMOS_JSON = os.path.join(DIRECTORIO_DATOS, "prestamo.json")
 ARCHIVO_PRESTAMOS_CSV = os.path.join(DIRECTORIO_DATOS, "prestamo.csv")
 
+# Sucursal cuyos libros y préstamos se están gestionando (los usuarios son compartidos)
+SUCURSAL_ACTUAL = sucursales.PRINCIPAL
+
+
+def usar_sucursal(id_sucursal: str):
+    """Apunta los archivos de libros y préstamos a la carpeta de una sucursal."""
+    global SUCURSAL_ACTUAL, ARCHIVO_LIBROS_JSON, ARCHIVO_LIBROS_CSV, ARCHIVO_PRESTAMOS_JSON, ARCHIVO_PRESTAMOS_CSV
+    SUCURSAL_ACTUAL = id_sucursal
+    archivos_json = sucursales.archivos(DIRECTORIO_DATOS, id_sucursal)
+    archivos_csv = sucursales.archivos(DIRECTORIO_DATOS, id_sucursal, extension=".csv")
+    ARCHIVO_LIBROS_JSON, ARCHIVO_LIBROS_CSV = archivos_json["libros"], archivos_csv["libros"]
+    ARCHIVO_PRESTAMOS_JSON, ARCHIVO_PRESTAMOS_CSV = archivos_json["prestamos"], archivos_csv["prestamos"]
+
+
+def elegir_sucursal():
+    """Pregunta en qué sucursal se trabaja (o crea otra), si hay más de una."""
+    ids = sucursales.listar(DIRECTORIO_DATOS)
+    if len(ids) == 1:
+        # Sin sucursales declaradas en 'sucursales.json' se usa la carpeta de datos principal
+        return
+    id_sucursal = Prompt.ask("Sucursal", choices=ids + ["nueva"], default=SUCURSAL_ACTUAL)
+    if id_sucursal == "nueva":
+        id_sucursal = Prompt.ask("ID de la nueva sucursal")
+        try:
+            sucursales.agregar(DIRECTORIO_DATOS, id_sucursal)
+        except ValueError as error:
+            console.print(f"[bold red]❌ {error}[/bold red]")
+            return
+    usar_sucursal(id_sucursal)
+    console.print(f"🏢 Sucursal: [bold green]{id_sucursal}[/bold green]")
+
+
+def varias_sucursales() -> bool:
+    """Pregunta si un listado debe incluir todas las sucursales (solo si hay más de una)."""
+    return len(sucursales.listar(DIRECTORIO_DATOS)) > 1 and Confirm.ask(
+        "¿Incluir todas las sucursales?", default=False)
+
+
+def marcar_sucursal(filas: list) -> list:
+    """Antepone la sucursal al ID de cada préstamo (los IDs se repiten entre sucursales)."""
+    for fila in filas:
+        fila["id_prestamo"] = f"{fila['sucursal']}/{fila['id_prestamo']}"
+    return filas
+
 
 
 # --- USUARIOS ---
@@ -65,10 +127,20 @@ def menu_crear_usuario(filepath: str):
         console.print(Panel("⚠️ No se pudo registrar al usuario. Verifique los datos.",
                             border_style="red", title="Error"))
 
+def cargar_validados(entidad: str, filepath: str) -> list:
+    """Carga los registros válidos de un archivo y avisa cuántas filas se omitieron por errores."""
+    resultado = esquemas.cargar(entidad, filepath)
+    if resultado.errores:
+        filas = sorted({e["fila"] for e in resultado.errores})
+        console.print(f"[yellow]⚠️ Se omitieron {len(filas)} fila(s) con datos inválidos.[/yellow]")
+        for error in resultado.errores[:5]:
+            console.print(f"   [dim]Fila {error['fila']}: '{error['campo']}' {error['mensaje']}[/dim]")
+    return resultado.validos
+
 def menu_leer_usuario(filepath: str):
     """Maneja la lógica para mostrar todos los usuarios en una tabla."""
     console.print(Panel.fit("[bold cyan]👥 Lista de usuarios[/bold cyan]"))
-    usuarios = usuario.leer_todos_los_usuario(filepath)
+    usuarios = cargar_validados("usuario", filepath)
 
     if not usuarios:
         console.print("[yellow]No hay usuarios registrados.[/yellow]")
@@ -82,15 +154,41 @@ def menu_leer_usuario(filepath: str):
     tabla.add_column("email", justify="right")
 
     # Ordenamos por Ficha y luego por ID
-    usuarios_ordenados = sorted(usuarios, key=lambda x: (int(x['documento']), int(x['id'])))
+    usuarios_ordenados = sorted(desde_dicts(Usuario, usuarios), key=lambda x: (clave_natural(x.documento), x.id))
 
     for ap in usuarios_ordenados:
 
         tabla.add_row(
-            ap['id'],
-            ap['documento'],
-            f"{ap['nombres']} {ap['apellidos']}",
-            ap['email']
+            str(ap.id),
+            ap.documento,
+            f"{ap.nombres} {ap.apellidos}",
+            ap.email
+        )
+
+    console.print(tabla)
+
+def menu_buscar_usuario(filepath: str):
+    """Busca usuarios por nombre, apellido o email, aunque el texto tenga errores."""
+    console.print(Panel.fit("[bold cyan]🔍 Buscar Usuario[/bold cyan]"))
+    consulta = Prompt.ask("Nombre, apellido o email")
+    encontrados = usuario.buscar_usuarios(filepath, consulta)
+
+    if not encontrados:
+        console.print(f"[yellow]⚠️ No se encontraron usuarios parecidos a '{consulta}'.[/yellow]")
+        return
+
+    tabla = Table(title=f"Resultados para '{consulta}'", border_style="blue", show_header=True, header_style="bold magenta")
+    tabla.add_column("Documento", justify="right")
+    tabla.add_column("Nombre Completo")
+    tabla.add_column("email", justify="right")
+    tabla.add_column("Similitud", justify="center", style="green")
+
+    for u in encontrados:
+        tabla.add_row(
+            str(u.get("documento", "")),
+            f"{u.get('nombres', '')} {u.get('apellidos', '')}",
+            str(u.get("email", "")),
+            f"{u['similitud']:.0%}",
         )
 
     console.print(tabla)
@@ -130,6 +228,24 @@ def menu_actualizar_usuario(filepath: str):
     else:
         console.print(Panel("❌ Ocurrió un error al actualizar.", border_style="red", title="Error"))
 
+def eliminar_cuidando_prestamos(eliminar, filepath: str, documento: str) -> bool:
+    """Elimina un usuario o libro respetando sus préstamos; si los tiene, ofrece eliminarlos en cascada."""
+    try:
+        return eliminar(filepath, documento, ARCHIVO_PRESTAMOS_JSON)
+    except integridad.IntegridadError as error:
+        console.print(f"\n[bold red]❌ {error}.[/bold red]")
+        if Confirm.ask("¿Desea eliminar también esos préstamos?", default=False):
+            return eliminar(filepath, documento, ARCHIVO_PRESTAMOS_JSON, integridad.CASCADA)
+        return False
+
+def eliminar_usuario_compartido(filepath: str, documento: str, archivo_prestamo: str,
+                                modo: str = integridad.RESTRINGIR) -> bool:
+    """Elimina un usuario cuidando sus préstamos en todas las sucursales (el registro es compartido)."""
+    if not usuario.buscar_usuario_por_documento(filepath, documento):
+        return False
+    sucursales.antes_de_eliminar_usuario(DIRECTORIO_DATOS, documento, modo)
+    return usuario.eliminar_usuario(filepath, documento)
+
 def menu_eliminar_usuario(filepath: str):
     """Maneja la lógica para eliminar un usuario."""
     console.print(Panel.fit("[bold cyan]🗑️ Eliminar Usuario[/bold cyan]"))
@@ -146,7 +262,7 @@ def menu_eliminar_usuario(filepath: str):
     )
 
     if confirmacion:
-        if usuario.eliminar_usuario(filepath, str(documento)):
+        if eliminar_cuidando_prestamos(eliminar_usuario_compartido, filepath, str(documento)):
             console.print(Panel("✅ ¡Usuario eliminado con éxito!", border_style="green", title="Éxito"))
         else:
             console.print(Panel("❌ Ocurrió un error al eliminar.", border_style="red", title="Error"))
@@ -201,7 +317,7 @@ def menu_crear_libro(filepath: str):
 def menu_leer_libros(filepath: str):
     """Maneja la lógica para mostrar todos los libros ."""
     console.print(Panel.fit("[bold cyan]👥 Lista de libros[/bold cyan]"))
-    libros = libro.leer_todos_los_libros(filepath)
+    libros = cargar_validados("libro", filepath)
 
     if not libros:
         console.print("[yellow]No hay libros registrados.[/yellow]")
@@ -216,16 +332,16 @@ def menu_leer_libros(filepath: str):
     tabla.add_column("stock", justify="right")
 
     # Ordenamos por Ficha y luego por ID
-    libros_ordenados = sorted(libros, key=lambda x: (int(x['ISBN']), int(x['id'])))
+    libros_ordenados = sorted(desde_dicts(Libro, libros), key=lambda x: (clave_natural(x.ISBN), x.id))
 
     for ap in libros_ordenados:
 
         tabla.add_row(
-            str(ap['id']),
-            str(ap['ISBN']),
-            str(ap['nombre']),
-            str(ap['autor']),
-            str(ap['stock']),
+            str(ap.id),
+            ap.ISBN,
+            ap.nombre,
+            ap.autor,
+            str(ap.stock),
         )
 
     console.print(tabla)
@@ -281,7 +397,7 @@ def menu_eliminar_libro(filepath: str):
     )
 
     if confirmacion:
-        if libro.eliminar_libro(filepath, str(documento)):
+        if eliminar_cuidando_prestamos(libro.eliminar_libro, filepath, str(documento)):
             console.print(Panel("✅ ¡Libro eliminado con éxito!", border_style="green", title="Éxito"))
         else:
             console.print(Panel("❌ Ocurrió un error al eliminar.", border_style="red", title="Error"))
@@ -357,7 +473,8 @@ def menu_registrar_devolucion(archivo_prestamo: str, archivo_libros: str):
 
     id_prestamo = Prompt.ask("id_prestamo")
 
-    devolucion_creado = prestamos.registrar_devolucion(archivo_prestamo, archivo_libros, id_prestamo)
+    devolucion_creado = prestamos.registrar_devolucion(archivo_prestamo, archivo_libros, id_prestamo,
+                                                     ARCHIVO_USUARIOS_JSON)
 
     if devolucion_creado:
         console.print(
@@ -382,98 +499,216 @@ def menu_listar_prestamo(filepath: str):
 
     console.print(Panel.fit("[bold cyan]👥 Lista de Préstamos[/bold cyan]"))
 
-    archivo_prestamo = os.path.join("directorio", "data", "prestamo.json")
-    archivo_usuario = os.path.join("directorio", "data", "usuario.json")
-    archivo_libro = os.path.join("directorio", "data", "libro.json")
-    # Llamar a la función que obtiene los préstamos registrados
-    prestamos_registrados = prestamos.listar_prestamos(archivo_prestamo, archivo_usuario, archivo_libro)
+    # Llamar a la función que obtiene los préstamos registrados (de una sucursal o de todas)
+    if varias_sucursales():
+        prestamos_registrados = marcar_sucursal(sucursales.listar_prestamos(DIRECTORIO_DATOS))
+    else:
+        prestamos_registrados = prestamos.listar_prestamos(
+            ARCHIVO_PRESTAMOS_JSON, ARCHIVO_USUARIOS_JSON, ARCHIVO_LIBROS_JSON)
 
     if not prestamos_registrados:
         console.print("[yellow]⚠️ No hay préstamos registrados.[/yellow]")
         return
-    tabla = Table(
-        title="[magenta]📝  Lista de Préstamos Registrados[/magenta]",
-        show_lines=True,
-        box=box.DOUBLE_EDGE,
-        header_style="bold white on black",
-    )
-    tabla.add_column("ID Préstamo", justify="center", style="cyan", no_wrap=True)
-    tabla.add_column("Usuario", justify="left", style="magenta")
-    tabla.add_column("Libro", justify="left", style="blue")
-    tabla.add_column("Fecha préstamo", justify="center", style="green")
-    tabla.add_column("Fecha devolución esperada", justify="center", style="bright_cyan")
-    tabla.add_column("Estado", justify="center", style="bold yellow")
-
-    # Agregar filas a la tabla
-    for p in prestamos_registrados:
-        estado = p["estado"]
-
-        if estado == "devuelto":
-            color_estado = "[green]Devuelto[/green]"
-        elif estado == "atrasado":
-            color_estado = "[red bold]Atrasado[/red bold]"
-        else:
-            color_estado = "[yellow]Prestado[/yellow]"
-
-        tabla.add_row(
-            str(p["id_prestamo"]),
-            p["usuario"],
-            p["libro"],
-            p["fecha_prestamo"],
-            p.get("fecha_devolucion_esperada", "N/A"),
-            color_estado,
-        )
 
-    console.print(tabla)
+    # Solo se vuelven a formatear los préstamos que cambiaron desde la última vez
+    VISTA_PRESTAMOS.mostrar(console, prestamos_registrados, "[magenta]📝  Lista de Préstamos Registrados[/magenta]")
 
 def menu_listar_devoluciones_prestamos():
     """Muestra todos los préstamos devueltos en una tabla."""
     console.print(Panel.fit("[bold cyan]📦 Lista de Devoluciones[/bold cyan]"))
 
-    archivo_prestamo = os.path.join("directorio", "data", "prestamo.json")
-    archivo_usuario = os.path.join("directorio", "data", "usuario.json")
-    archivo_libro = os.path.join("directorio", "data", "libro.json")
-
-    devoluciones = prestamos.listar_devoluciones(archivo_prestamo, archivo_usuario, archivo_libro)
+    if varias_sucursales():
+        devoluciones = marcar_sucursal(sucursales.listar_devoluciones(DIRECTORIO_DATOS))
+    else:
+        devoluciones = prestamos.listar_devoluciones(ARCHIVO_PRESTAMOS_JSON, ARCHIVO_USUARIOS_JSON, ARCHIVO_LIBROS_JSON)
 
     if not devoluciones:
         console.print("[yellow]⚠️ No hay devoluciones registradas.[/yellow]")
         return
 
+    VISTA_DEVOLUCIONES.mostrar(console, devoluciones, "📦🔙 Lista de Devoluciones Registradas")
+
+
+def menu_prestamos_por_vencer(archivo_prestamo: str):
+    """Muestra los préstamos que vencen en los próximos días."""
+    console.print(Panel.fit("[bold cyan]⏰ Préstamos por Vencer[/bold cyan]"))
+
+    dias = IntPrompt.ask("¿Cuántos días hacia adelante?", default=7)
+    if varias_sucursales():
+        por_vencer = marcar_sucursal(sucursales.prestamos_por_vencer(DIRECTORIO_DATOS, dias))
+    else:
+        por_vencer = prestamos.prestamos_por_vencer(archivo_prestamo, dias)
+
+    if not por_vencer:
+        console.print(f"[yellow]⚠️ No hay préstamos que venzan en los próximos {dias} días.[/yellow]")
+        return
+
     tabla = Table(
-        title="📦🔙 Lista de Devoluciones Registradas",
+        title=f"⏰ Préstamos que vencen en los próximos {dias} días",
         show_lines=True,
         box=box.DOUBLE_EDGE,
     )
-
     tabla.add_column("ID Préstamo", justify="center", style="cyan")
     tabla.add_column("Usuario", justify="left", style="magenta")
     tabla.add_column("Libro", justify="left", style="blue")
-    tabla.add_column("Fecha préstamo", justify="center", style="green")
     tabla.add_column("Fecha devolución esperada", justify="center", style="bright_cyan")
-    tabla.add_column("Estado", justify="center", style="bold yellow")
 
-    for d in devoluciones:
-        estado = d.get("estado","prestado")
+    for p in por_vencer:
+        tabla.add_row(
+            str(p["id_prestamo"]),
+            str(p["id_usuario"]),
+            str(p["id_libro"]),
+            p["fecha_devolucion_esperada"],
+        )
 
-        # Asignar colores según el estado
-        if estado == "devuelto":
-            color_estado = "[green]Devuelto[/green]"
-        elif estado == "atrasado":
-            color_estado = "[red bold]Atrasado[/red bold]"
-        else:
-            color_estado = "[yellow]Prestado[/yellow]"
+    console.print(tabla)
+
+
+def menu_verificar_integridad():
+    """Revisa que todos los préstamos apunten a usuarios y libros existentes."""
+    console.print(Panel.fit("[bold cyan]🔗 Verificar Integridad[/bold cyan]"))
+
+    problemas = integridad.verificar(ARCHIVO_PRESTAMOS_JSON, ARCHIVO_USUARIOS_JSON, ARCHIVO_LIBROS_JSON)
+    if not problemas:
+        console.print("[bold green]✅ Todos los préstamos apuntan a usuarios y libros existentes.[/bold green]")
+        return
+
+    tabla = Table(title="🔗 Préstamos con referencias rotas", show_lines=True, box=box.DOUBLE_EDGE)
+    tabla.add_column("ID Préstamo", justify="center", style="cyan")
+    tabla.add_column("Campo", justify="left", style="magenta")
+    tabla.add_column("Valor inexistente", justify="left", style="red")
+    for problema in problemas:
+        tabla.add_row(str(problema["id_prestamo"]), problema["campo"], problema["valor"])
+    console.print(tabla)
 
+
+def menu_estado_a_una_fecha(archivo_prestamo: str, archivo_libros: str):
+    """Reconstruye, con la auditoría, el stock y los préstamos activos a una fecha."""
+    console.print(Panel.fit("[bold cyan]🕓 Stock y Préstamos a una Fecha[/bold cyan]"))
+
+    momento = Prompt.ask("Fecha (AAAA-MM-DD)", default=date.today().isoformat())
+    estado = auditoria.estado_en(archivo_prestamo, momento)
+    actuales = {str(lb.get("ISBN")): lb for lb in libro.leer_todos_los_libros(archivo_libros)}
+
+    tabla = Table(title=f"📚 Stock al {momento}", show_lines=True, box=box.DOUBLE_EDGE)
+    tabla.add_column("ISBN", justify="center", style="cyan")
+    tabla.add_column("Libro", justify="left", style="blue")
+    tabla.add_column("Stock entonces", justify="center", style="bright_cyan")
+    tabla.add_column("Stock hoy", justify="center", style="green")
+    for isbn in sorted(set(actuales) | set(estado["stock"]), key=clave_natural):
+        actual = actuales.get(isbn, {})
+        # Un libro sin cambios de stock auditados tenía el mismo stock que hoy
+        entonces = estado["stock"].get(isbn, actual.get("stock"))
         tabla.add_row(
-            str(d['id_prestamo']),
-            d['usuario'],
-            d['libro'],
-            d['fecha_prestamo'],
-            d.get('fecha_devolucion_esperada', "N/A"),
-            color_estado,
+            isbn,
+            actual.get("nombre", "(eliminado)"),
+            "-" if entonces is None else str(entonces),
+            str(actual.get("stock", "-")),
         )
+    console.print(tabla)
 
+    activos = [p for p in estado["prestamos"].values() if p.get("estado") != "devuelto"]
+    console.print(f"[cyan]📋 Préstamos sin devolver al {momento}:[/cyan] {len(activos)}")
+
+
+def menu_exportar_prestamos(archivo_prestamo: str):
+    """Exporta los préstamos con nombres de usuario y libro para análisis."""
+    console.print(Panel.fit("[bold cyan]📤 Exportar Préstamos[/bold cyan]"))
+
+    formato = Prompt.ask("Formato", choices=["csv", "jsonl", "colz"], default="csv")
+    ruta = Prompt.ask("Archivo de salida", default=os.path.join(DIRECTORIO_DATOS, f"exportacion_prestamos.{formato}"))
+    if not ruta.endswith("." + formato):
+        ruta = f"{os.path.splitext(ruta)[0]}.{formato}"
+    incremental = Confirm.ask("¿Agregar solo lo nuevo desde la última exportación?", default=False)
+    desde = hasta = None
+    estado = "todos"
+    if not incremental:  # la exportación incremental no admite filtros
+        desde = Prompt.ask("Desde (AAAA-MM-DD, vacío para no filtrar)", default="") or None
+        hasta = Prompt.ask("Hasta (AAAA-MM-DD, vacío para no filtrar)", default="") or None
+        estado = Prompt.ask("Estado", choices=["todos", "prestado", "atrasado", "devuelto"], default="todos")
+
+    total = exportacion.exportar_prestamos(
+        archivo_prestamo, ARCHIVO_USUARIOS_JSON, ARCHIVO_LIBROS_JSON, ruta,
+        desde, hasta, None if estado == "todos" else [estado], incremental,
+    )
+    console.print(f"[bold green]✅ {total} fila(s) exportadas a {ruta}[/bold green]")
+
+
+def menu_politica_prestamos(archivo_prestamo: str):
+    """Muestra y modifica la política de préstamo, y recalcula los vencimientos."""
+    console.print(Panel.fit("[bold cyan]📅 Política de Préstamos[/bold cyan]"))
+
+    ruta = politicas.ruta_politica(archivo_prestamo)
+    politica = politicas.cargar(ruta)
+
+    tabla = Table(title="📅 Días de préstamo", show_lines=True, box=box.DOUBLE_EDGE)
+    tabla.add_column("Regla", justify="left", style="magenta")
+    tabla.add_column("Valor", justify="left", style="cyan")
+    tabla.add_column("Días", justify="center", style="bright_cyan")
+    tabla.add_row("Base", politicas.GENERAL, str(politica["dias_base"]))
+    for tipo, dias in politica["tipos_usuario"].items():
+        tabla.add_row("Tipo de usuario", tipo, str(dias))
+    for categoria, dias in politica["categorias"].items():
+        tabla.add_row("Categoría (tope)", categoria, str(dias))
     console.print(tabla)
+    console.print(f"[blue]Días cerrados (0=lunes):[/blue] {politica['dias_cerrados']}   "
+                  f"[blue]Feriados:[/blue] {', '.join(politica['feriados']) or 'ninguno'}")
+
+    cambio = Prompt.ask(
+        "¿Qué desea cambiar?",
+        choices=["nada", "tipo", "categoria", "usuario", "libro", "feriado", "cerrados"],
+        default="nada",
+    )
+    if cambio == "tipo":
+        tipo = Prompt.ask("Tipo de usuario")
+        politica["tipos_usuario"][tipo] = IntPrompt.ask("Días de préstamo", default=politica["dias_base"])
+    elif cambio == "categoria":
+        categoria = Prompt.ask("Categoría de libro")
+        politica["categorias"][categoria] = IntPrompt.ask("Días máximos de préstamo", default=7)
+    elif cambio == "usuario":
+        documento = Prompt.ask("Documento del usuario")
+        politica["usuarios"][documento] = Prompt.ask("Tipo de usuario", default=politicas.GENERAL)
+    elif cambio == "libro":
+        isbn = Prompt.ask("ISBN del libro")
+        politica["libros"][isbn] = Prompt.ask("Categoría", default=politicas.GENERAL)
+    elif cambio == "feriado":
+        feriado = Prompt.ask("Fecha del feriado (AAAA-MM-DD)")
+        if feriado not in politica["feriados"]:
+            politica["feriados"] = sorted(politica["feriados"] + [feriado])
+    elif cambio == "cerrados":
+        texto = Prompt.ask("Días cerrados separados por coma (0=lunes ... 6=domingo)", default="6")
+        politica["dias_cerrados"] = sorted({int(d) for d in texto.split(",") if d.strip().isdigit()})
+
+    if cambio == "nada" and not Confirm.ask("¿Recalcular los vencimientos con la política actual?", default=False):
+        return
+    politicas.guardar(ruta, politica)
+    modificados = politicas.recalcular_vencimientos(archivo_prestamo, politica)
+    console.print(f"[bold green]✅ Política guardada. {modificados} préstamo(s) con vencimiento actualizado.[/bold green]")
+
+
+def menu_multas(archivo_prestamo: str):
+    """Muestra el saldo de multas de un usuario y registra pagos."""
+    console.print(Panel.fit("[bold cyan]💸 Multas[/bold cyan]"))
+
+    documento = Prompt.ask("Documento del usuario")
+    cuentas = multas.cuentas_al_dia(archivo_prestamo)
+    vencidos = [(id_prestamo, v) for id_prestamo, v in cuentas.vencidos.items() if v[multas.USUARIO] == documento]
+
+    if vencidos:
+        tabla = Table(title=f"💸 Préstamos vencidos de {documento}", show_lines=True, box=box.DOUBLE_EDGE)
+        tabla.add_column("ID Préstamo", justify="center", style="cyan")
+        tabla.add_column("Vencimiento", justify="center", style="bright_cyan")
+        tabla.add_column("Multa acumulada", justify="right", style="red")
+        for id_prestamo, vencido in vencidos:
+            tabla.add_row(id_prestamo, vencido[multas.VENCIMIENTO], str(vencido[multas.MONTO]))
+        console.print(tabla)
+
+    saldo = cuentas.saldo(documento)
+    console.print(f"[bold]Saldo total:[/bold] {saldo}")
+    if saldo > 0 and Confirm.ask("¿Registrar un pago?", default=False):
+        monto = IntPrompt.ask("Valor pagado", default=saldo)
+        restante = multas.pagar(archivo_prestamo, documento, monto)
+        console.print(f"[bold green]✅ Pago registrado. Saldo restante: {restante}[/bold green]")
 
 
 def elegir_almacenamiento3()->str:
@@ -509,7 +744,8 @@ def menu_usuarios():
         "[bold yellow]2.[/bold yellow]👁️👥  Ver todos los usuarios \n"
         "[bold yellow]3.[/bold yellow]🔄👤  Actualizar datos de un usuario \n"
         "[bold yellow]4.[/bold yellow]🗑️👤  Eliminar un usuario \n"
-        "[bold red]5.[/bold red]🚪  Volver al menú principal"
+        "[bold yellow]5.[/bold yellow]🔍👤  Buscar por nombre o email \n"
+        "[bold red]6.[/bold red]🚪  Volver al menú principal"
     )
     console.print(
         Panel(
@@ -545,7 +781,13 @@ def menu_prestamos():
         "[bold yellow]2.[/bold yellow]📦  Resgistrar devolución\n"
         "[bold yellow]3.[/bold yellow]📋  Listar los prestamos\n"
         "[bold yellow]4.[/bold yellow]🔙  Listar devoluciones\n"
-        "[bold red]5.[/bold red]🚪  Volver al menú principal\n"
+        "[bold yellow]5.[/bold yellow]⏰  Préstamos por vencer\n"
+        "[bold yellow]6.[/bold yellow]🔗  Verificar integridad de los préstamos\n"
+        "[bold yellow]7.[/bold yellow]🕓  Stock y préstamos a una fecha\n"
+        "[bold yellow]8.[/bold yellow]📤  Exportar préstamos\n"
+        "[bold yellow]9.[/bold yellow]📅  Política de préstamos y vencimientos\n"
+        "[bold yellow]10.[/bold yellow]💸  Multas de un usuario\n"
+        "[bold red]11.[/bold red]🚪  Volver al menú principal\n"
     )
     console.print(
         Panel(
@@ -591,7 +833,7 @@ def main():
             # MENÚ DE USUARIOS
             while True:
                 menu_usuarios()
-                opcion = Prompt.ask("Opción", choices=["1", "2", "3", "4", "5"], show_choices=False)
+                opcion = Prompt.ask("Opción", choices=["1", "2", "3", "4", "5", "6"], show_choices=False)
 
                 if opcion == '1':
                     menu_crear_usuario(archivo_seleccionado)
@@ -602,10 +844,13 @@ def main():
                 elif opcion == '4':
                     menu_eliminar_usuario(archivo_seleccionado)
                 elif opcion == '5':
+                    menu_buscar_usuario(archivo_seleccionado)
+                elif opcion == '6':
                     console.print("\n[bold magenta]👋 Volviendo al menú principal...[/bold magenta]")
                     break
 
         elif opcion_principal == '2':
+            elegir_sucursal()
 
             archivo_seleccionado = elegir_almacenamiento2()
             console.print(f"\n👍 Usando el archivo: [bold green]{archivo_seleccionado}[/bold green]")
@@ -628,8 +873,12 @@ def main():
                     break
 
         elif opcion_principal == '3':
+            elegir_sucursal()
             archivo_libros = ARCHIVO_LIBROS_JSON
 
+            # Los devueltos que queden en el archivo activo pasan al histórico
+            prestamos.archivar_devueltos(ARCHIVO_PRESTAMOS_JSON)
+
             archivo_seleccionado = elegir_almacenamiento3()
             console.print(f"\n👍 Usando el archivo: [bold green]{archivo_seleccionado}[/bold green]")
 
@@ -637,7 +886,7 @@ def main():
             while True:
                 menu_prestamos()
                 opcion = Prompt.ask(
-                    "Opción", choices=["1", "2", "3", "4", "5"], show_choices=False
+                    "Opción", choices=["1", "2", "3", "4", "5", "6", "7", "8", "9", "10", "11"], show_choices=False
                 )
 
                 if opcion == "1":
@@ -649,6 +898,19 @@ def main():
                 elif opcion == '4':
                    menu_listar_devoluciones_prestamos()
                 elif opcion == '5':
+                    menu_prestamos_por_vencer(archivo_seleccionado)
+                elif opcion == '6':
+                    menu_verificar_integridad()
+                elif opcion == '7':
+                    menu_estado_a_una_fecha(archivo_seleccionado, archivo_libros)
+                elif opcion == '8':
+                    menu_exportar_prestamos(archivo_seleccionado)
+                elif opcion == '9':
+                    # Como al prestar: la política recalcula sobre el archivo JSON de préstamos
+                    menu_politica_prestamos(ARCHIVO_PRESTAMOS_JSON)
+                elif opcion == '10':
+                    menu_multas(ARCHIVO_PRESTAMOS_JSON)
+                elif opcion == '11':
                     console.print("\n[bold magenta]👋 Volviendo al menú principal...[/bold magenta]")
                     break
         elif opcion_principal == '4':
@@ -664,7 +926,22 @@ def main():
 
 # --- Punto de Entrada del Script ---
 if __name__ == "__main__":
+    # Los cambios se guardan en grupo en segundo plano (el diario queda en cada carpeta de datos)
+    escritura_diferida.activar()
+    # Releer de disco solo los archivos que otro puesto haya modificado
+    vigilante.activar(DIRECTORIO_DATOS)
+    # Arranque en frío: los tres archivos se leen a la vez y quedan en la caché de lectura
+    carga_paralela.precargar({
+        'usuarios': ARCHIVO_USUARIOS_JSON,
+        'libros': ARCHIVO_LIBROS_JSON,
+        'prestamos': ARCHIVO_PRESTAMOS_JSON,
+    })
     try:
         main()
     except KeyboardInterrupt:
-        console.print("\n\n[bold red]Programa interrumpido por el usuario. Adiós.[/bold red]")
\ No newline at end of file
+        console.print("\n\n[bold red]Programa interrumpido por el usuario. Adiós.[/bold red]")
+    finally:
+        # Guardar en disco todo lo pendiente antes de salir
+        escritura_diferida.desactivar()
+        bitacora.esperar_compactaciones()
+        vigilante.desactivar()
\ No newline at end of file
@@ -0,0 +1,315 @@
+# -*- coding: utf-8 -*-
+"""
+Módulo de Modelos de Datos.
+
+Define los registros tipados (usuario, libro y préstamo) que usa la lógica de
+negocio en memoria. Los archivos siguen guardando texto plano; la conversión
+entre diccionarios de almacenamiento y registros se hace solo aquí, en el borde
+con los gestores de datos.
+
+La conversión no pierde datos: las claves que el registro no conoce se guardan
+en `extra`, y el valor original de un campo que no se pudo convertir (un ID no
+numérico, una fecha en otro formato) en `originales`. `a_dict` los devuelve tal
+como llegaron, salvo que la lógica de negocio haya cambiado ese campo.
+"""
+
+import sys
+from dataclasses import dataclass, field, fields
+from datetime import date
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Fechas distintas que se recuerdan ya convertidas.
+MAX_FECHAS = 4096
+
+
+def a_entero(valor: Any, defecto: int = 0) -> int:
+    """
+    Convierte un valor leído de archivo a entero, tolerando valores vacíos o inválidos.
+
+    Args:
+        valor (Any): El valor a convertir (normalmente un str).
+        defecto (int): Valor retornado si la conversión falla.
+
+    Returns:
+        int: El valor convertido o el valor por defecto.
+    """
+    if isinstance(valor, int):
+        return valor
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return defecto
+
+
+@lru_cache(maxsize=MAX_FECHAS)
+def _fecha_iso(texto: str) -> Optional[date]:
+    """
+    Convierte un texto ISO a `date`, o None si no es válido.
+
+    Los préstamos repiten pocas fechas distintas: con la caché, todos los
+    registros con la misma fecha comparten un único objeto `date`.
+    """
+    try:
+        return date.fromisoformat(texto)
+    except ValueError:
+        return None
+
+
+def a_fecha(valor: Any) -> Optional[date]:
+    """
+    Convierte una fecha ISO (AAAA-MM-DD) a `date`. Retorna None si no es válida.
+
+    Args:
+        valor (Any): Texto con la fecha o un objeto `date`.
+
+    Returns:
+        Optional[date]: La fecha convertida, o None.
+    """
+    if isinstance(valor, date):
+        return valor
+    if not valor:
+        return None
+    return _fecha_iso(str(valor))
+
+
+def internar(valor: Any) -> str:
+    """
+    Retorna la instancia compartida (interna) de un texto repetido.
+
+    Args:
+        valor (Any): El valor a internar; se convierte a str.
+
+    Returns:
+        str: El texto internado.
+    """
+    return sys.intern(str(valor))
+
+
+def clave_natural(texto: str) -> Tuple[int, str]:
+    """
+    Clave de ordenamiento para identificadores numéricos guardados como texto.
+
+    Ordenar por (longitud, texto) equivale al orden numérico para enteros sin
+    ceros a la izquierda, sin tener que convertir cada valor con int().
+
+    Args:
+        texto (str): El identificador (documento, ISBN...).
+
+    Returns:
+        Tuple[int, str]: La clave de ordenamiento.
+    """
+    return len(texto), texto
+
+
+def _conservados(datos: Dict[str, Any], conocidos: Iterable[str],
+                 convertidos: Dict[str, Tuple[Any, Any]]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Separa lo que un registro tipado no puede representar.
+
+    Args:
+        datos (Dict[str, Any]): El diccionario leído del archivo.
+        conocidos (Iterable[str]): Las claves que el registro interpreta.
+        convertidos (Dict[str, Tuple[Any, Any]]): Por campo, (valor original, valor convertido).
+
+    Returns:
+        Tuple[Dict[str, Any], Dict[str, Any]]: (claves desconocidas, originales
+            de los campos cuya conversión falló).
+    """
+    conocidos = set(conocidos)
+    extra = {clave: valor for clave, valor in datos.items() if clave not in conocidos}
+    originales = {
+        campo: original for campo, (original, valor) in convertidos.items()
+        if original not in (None, '') and valor in (None, 0) and str(original) != '0'
+    }
+    return extra, originales
+
+
+def _con_conservados(registro: Any, salida: Dict[str, Any], vacios: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Agrega a `salida` las claves desconocidas y los originales que no se convirtieron.
+
+    Un original solo se usa si el campo sigue con el valor que dejó la conversión
+    fallida (`vacios`); si la lógica de negocio lo cambió, gana el valor nuevo.
+    """
+    for campo, original in registro.originales.items():
+        if getattr(registro, campo) == vacios[campo]:
+            salida[campo] = original
+    for clave, valor in registro.extra.items():
+        salida.setdefault(clave, valor)
+    return salida
+
+
+@dataclass(slots=True)
+class Usuario:
+    """Registro de un usuario de la biblioteca."""
+
+    id: int
+    documento: str
+    nombres: str
+    apellidos: str
+    email: str
+    extra: Dict[str, Any] = field(default_factory=dict, compare=False)
+    originales: Dict[str, Any] = field(default_factory=dict, compare=False)
+
+    @classmethod
+    def desde_dict(cls, datos: Dict[str, Any]) -> "Usuario":
+        """Construye el registro a partir del diccionario leído del archivo."""
+        id_usuario = a_entero(datos.get('id'))
+        extra, originales = _conservados(datos, _CAMPOS_USUARIO, {'id': (datos.get('id'), id_usuario)})
+        return cls(
+            id=id_usuario,
+            documento=str(datos.get('documento', '')),
+            nombres=datos.get('nombres', '') or '',
+            apellidos=datos.get('apellidos', '') or '',
+            email=datos.get('email', '') or '',
+            extra=extra,
+            originales=originales,
+        )
+
+    def a_dict(self) -> Dict[str, Any]:
+        """Retorna el diccionario con el formato de almacenamiento (todo texto)."""
+        return _con_conservados(self, {
+            'id': str(self.id),
+            'documento': self.documento,
+            'nombres': self.nombres,
+            'apellidos': self.apellidos,
+            'email': self.email,
+        }, {'id': 0})
+
+
+@dataclass(slots=True)
+class Libro:
+    """Registro de un libro del catálogo."""
+
+    id: int
+    ISBN: str
+    nombre: str
+    autor: str
+    stock: int
+    extra: Dict[str, Any] = field(default_factory=dict, compare=False)
+    originales: Dict[str, Any] = field(default_factory=dict, compare=False)
+
+    @classmethod
+    def desde_dict(cls, datos: Dict[str, Any]) -> "Libro":
+        """Construye el registro a partir del diccionario leído del archivo."""
+        id_libro = a_entero(datos.get('id'))
+        stock = a_entero(datos.get('stock'))
+        extra, originales = _conservados(datos, _CAMPOS_LIBRO, {
+            'id': (datos.get('id'), id_libro),
+            'stock': (datos.get('stock'), stock),
+        })
+        return cls(
+            id=id_libro,
+            ISBN=str(datos.get('ISBN', '')),
+            nombre=datos.get('nombre', '') or '',
+            autor=internar(datos.get('autor', '') or ''),
+            stock=stock,
+            extra=extra,
+            originales=originales,
+        )
+
+    def a_dict(self) -> Dict[str, Any]:
+        """Retorna el diccionario con el formato de almacenamiento (todo texto)."""
+        return _con_conservados(self, {
+            'id': str(self.id),
+            'ISBN': self.ISBN,
+            'nombre': self.nombre,
+            'autor': self.autor,
+            'stock': str(self.stock),
+        }, {'id': 0, 'stock': 0})
+
+
+@dataclass(slots=True)
+class Prestamo:
+    """Registro de un préstamo de un libro a un usuario."""
+
+    id_prestamo: int
+    id_usuario: str
+    id_libro: str
+    fecha_prestamo: Optional[date]
+    fecha_devolucion_esperada: Optional[date]
+    estado: str
+    id_ejemplar: str = ''
+    extra: Dict[str, Any] = field(default_factory=dict, compare=False)
+    originales: Dict[str, Any] = field(default_factory=dict, compare=False)
+
+    @classmethod
+    def desde_dict(cls, datos: Dict[str, Any]) -> "Prestamo":
+        """
+        Construye el registro a partir del diccionario leído del archivo.
+
+        Acepta la clave antigua 'fecha' como sinónimo de 'fecha_prestamo'.
+        """
+        id_prestamo = a_entero(datos.get('id_prestamo'))
+        texto_prestamo = datos.get('fecha_prestamo', datos.get('fecha'))
+        fecha_prestamo = a_fecha(texto_prestamo)
+        fecha_devolucion = a_fecha(datos.get('fecha_devolucion_esperada'))
+        extra, originales = _conservados(datos, _CAMPOS_PRESTAMO, {
+            'id_prestamo': (datos.get('id_prestamo'), id_prestamo),
+            'fecha_prestamo': (texto_prestamo, fecha_prestamo),
+            'fecha_devolucion_esperada': (datos.get('fecha_devolucion_esperada'), fecha_devolucion),
+        })
+        return cls(
+            id_prestamo=id_prestamo,
+            id_usuario=internar(datos.get('id_usuario', '')),
+            id_libro=internar(datos.get('id_libro', '')),
+            fecha_prestamo=fecha_prestamo,
+            fecha_devolucion_esperada=fecha_devolucion,
+            estado=internar(datos.get('estado', 'prestado') or 'prestado'),
+            id_ejemplar=str(datos.get('id_ejemplar') or ''),
+            extra=extra,
+            originales=originales,
+        )
+
+    def a_dict(self) -> Dict[str, Any]:
+        """Retorna el diccionario con el formato de almacenamiento."""
+        return _con_conservados(self, {
+            'id_prestamo': self.id_prestamo,
+            'id_usuario': self.id_usuario,
+            'id_libro': self.id_libro,
+            'fecha_prestamo': self.fecha_prestamo.isoformat() if self.fecha_prestamo else '',
+            'fecha_devolucion_esperada': (
+                self.fecha_devolucion_esperada.isoformat() if self.fecha_devolucion_esperada else ''
+            ),
+            'estado': self.estado,
+            'id_ejemplar': self.id_ejemplar,
+        }, {'id_prestamo': 0, 'fecha_prestamo': None, 'fecha_devolucion_esperada': None})
+
+
+def _nombres_campos(cls) -> Tuple[str, ...]:
+    return tuple(f.name for f in fields(cls) if f.name not in ('extra', 'originales'))
+
+
+_CAMPOS_USUARIO = _nombres_campos(Usuario)
+_CAMPOS_LIBRO = _nombres_campos(Libro)
+# 'fecha' es el nombre antiguo de 'fecha_prestamo'
+_CAMPOS_PRESTAMO = _nombres_campos(Prestamo) + ('fecha',)
+
+
+def desde_dicts(cls, datos: Iterable[Dict[str, Any]]) -> List[Any]:
+    """
+    Convierte una lista de diccionarios del archivo en registros del tipo indicado.
+
+    Args:
+        cls: La clase del registro (Usuario, Libro o Prestamo).
+        datos (Iterable[Dict[str, Any]]): Los diccionarios cargados.
+
+    Returns:
+        List[Any]: La lista de registros tipados.
+    """
+    desde_dict = cls.desde_dict
+    return [desde_dict(d) for d in datos]
+
+
+def a_dicts(registros: Iterable[Any]) -> List[Dict[str, Any]]:
+    """
+    Convierte registros tipados al formato de almacenamiento.
+
+    Args:
+        registros (Iterable[Any]): Los registros a convertir.
+
+    Returns:
+        List[Dict[str, Any]]: Los diccionarios listos para guardar.
+    """
+    return [r.a_dict() for r in registros]
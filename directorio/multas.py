@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+"""
+Módulo de Multas.
+
+Cada día de atraso de un préstamo suma la multa diaria de la política de
+préstamos. Los saldos se guardan ya calculados por usuario, en un archivo JSON
+junto al de préstamos:
+
+- 'cerradas': multas de préstamos ya devueltos, menos los pagos;
+- 'acumuladas': lo que llevan acumulado los préstamos abiertos y vencidos;
+- 'vencidos': esos préstamos, con su usuario, vencimiento y monto acumulado;
+- 'hasta': el día al que corresponde lo acumulado.
+
+Las multas se ponen al día de forma perezosa, como mucho una vez por día: a los
+préstamos ya vencidos se les suman los días transcurridos y, con el índice por
+'fecha_devolucion_esperada', se agregan solo los préstamos que vencieron desde
+la última vez. Nunca se recorren todos los préstamos. Con las cuentas al día,
+saber si un usuario supera el umbral de multas es una consulta O(1).
+
+Todo lo que lee, cambia y vuelve a guardar el archivo de multas lo hace con el
+cerrojo de la carpeta de datos tomado (ver `cerrojo`).
+"""
+
+import json
+import os
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+import cerrojo
+import codec_json
+import indice_fechas
+import politicas
+import vigilante
+from modelos import a_fecha
+
+NOMBRE_ARCHIVO = 'multa.json'
+
+# Posiciones de cada préstamo vencido: [id_usuario, vencimiento, monto acumulado]
+USUARIO, VENCIMIENTO, MONTO = range(3)
+
+_CUENTAS: Dict[str, Tuple[Tuple[int, int], "CuentasMultas"]] = {}
+
+
+class CuentasMultas:
+    """Saldos de multas por usuario, al día `hasta`."""
+
+    __slots__ = ('hasta', 'cerradas', 'acumuladas', 'vencidos')
+
+    def __init__(self, datos: Optional[Dict[str, Any]] = None) -> None:
+        datos = datos or {}
+        self.hasta: Optional[date] = a_fecha(datos.get('hasta'))
+        self.cerradas: Dict[str, int] = datos.get('cerradas', {})
+        self.acumuladas: Dict[str, int] = datos.get('acumuladas', {})
+        self.vencidos: Dict[str, List[Any]] = datos.get('vencidos', {})
+
+    def a_dict(self) -> Dict[str, Any]:
+        return {
+            'hasta': self.hasta.isoformat() if self.hasta else None,
+            'cerradas': self.cerradas,
+            'acumuladas': self.acumuladas,
+            'vencidos': self.vencidos,
+        }
+
+    def sumar(self, tabla: Dict[str, int], id_usuario: str, monto: int) -> None:
+        total = tabla.get(id_usuario, 0) + monto
+        if total:
+            tabla[id_usuario] = total
+        else:
+            tabla.pop(id_usuario, None)
+
+    def saldo(self, id_usuario: str) -> int:
+        """Lo que debe un usuario: multas cerradas más lo acumulado."""
+        return self.cerradas.get(id_usuario, 0) + self.acumuladas.get(id_usuario, 0)
+
+
+def ruta_multas(archivo_prestamo: str) -> str:
+    """
+    Retorna la ruta del archivo de multas, junto al archivo de préstamos.
+
+    Args:
+        archivo_prestamo (str): Ruta al archivo de préstamos.
+
+    Returns:
+        str: Ruta del archivo de multas.
+    """
+    return os.path.join(os.path.dirname(archivo_prestamo), NOMBRE_ARCHIVO)
+
+
+def _cargar(filepath: str) -> CuentasMultas:
+    ruta = os.path.abspath(filepath)
+    firma = vigilante.firma(filepath)
+    guardadas = _CUENTAS.get(ruta)
+    if guardadas is not None and guardadas[0] == firma != (-1, -1):
+        return guardadas[1]
+
+    datos = None
+    if os.path.exists(filepath):
+        try:
+            with open(filepath, mode='r', encoding='utf-8') as f:
+                datos = json.load(f)
+        except json.JSONDecodeError:
+            datos = None
+    cuentas = CuentasMultas(datos)
+    _CUENTAS[ruta] = (firma, cuentas)
+    return cuentas
+
+
+def _guardar(filepath: str, cuentas: CuentasMultas) -> None:
+    codec_json.escribir_atomico(filepath, cuentas.a_dict())
+    _CUENTAS[os.path.abspath(filepath)] = (vigilante.firma(filepath), cuentas)
+
+
+def _poner_al_dia(cuentas: CuentasMultas, archivo_prestamo: str, tarifa: int, hoy: date) -> bool:
+    """Acumula las multas hasta `hoy`; retorna True si algo cambió."""
+    if cuentas.hasta is not None and cuentas.hasta >= hoy:
+        return False
+
+    # Los ya vencidos suman los días transcurridos desde la última vez; los que
+    # salieron del archivo sin devolverse (bajas en cascada) dejan de sumar
+    indices = indice_fechas.de_archivo(archivo_prestamo)
+    if cuentas.hasta is not None:
+        monto_dias = (hoy - cuentas.hasta).days * tarifa
+        for id_prestamo, vencido in list(cuentas.vencidos.items()):
+            if id_prestamo not in indices.registros:
+                del cuentas.vencidos[id_prestamo]
+                cuentas.sumar(cuentas.acumuladas, vencido[USUARIO], -vencido[MONTO])
+                cuentas.sumar(cuentas.cerradas, vencido[USUARIO], vencido[MONTO])
+                continue
+            vencido[MONTO] += monto_dias
+            cuentas.sumar(cuentas.acumuladas, vencido[USUARIO], monto_dias)
+
+    # Los que vencieron desde entonces salen del índice por fecha de vencimiento
+    desde = cuentas.hasta.isoformat() if cuentas.hasta else None
+    hasta = date.fromordinal(hoy.toordinal() - 1).isoformat()
+    for prestamo in indices.entre('fecha_devolucion_esperada', desde, hasta):
+        id_prestamo = str(prestamo.get('id_prestamo'))
+        vencimiento = a_fecha(prestamo.get('fecha_devolucion_esperada'))
+        if prestamo.get('estado') == 'devuelto' or id_prestamo in cuentas.vencidos or vencimiento is None:
+            continue
+        id_usuario = str(prestamo.get('id_usuario'))
+        monto = (hoy - vencimiento).days * tarifa
+        cuentas.vencidos[id_prestamo] = [id_usuario, vencimiento.isoformat(), monto]
+        cuentas.sumar(cuentas.acumuladas, id_usuario, monto)
+
+    cuentas.hasta = hoy
+    return True
+
+
+def cuentas_al_dia(archivo_prestamo: str, hoy: Optional[date] = None) -> CuentasMultas:
+    """
+    Retorna las cuentas de multas de un archivo de préstamos, puestas al día.
+
+    Si ya están al día no se toma el cerrojo; si hay que acumular, se vuelven a
+    leer y se guardan con el cerrojo tomado.
+
+    Args:
+        archivo_prestamo (str): Ruta al archivo de préstamos.
+        hoy (Optional[date]): Fecha de corte (hoy por defecto).
+
+    Returns:
+        CuentasMultas: Las cuentas, al día `hoy`.
+    """
+    hoy = hoy or date.today()
+    ruta = ruta_multas(archivo_prestamo)
+    cuentas = _cargar(ruta)
+    if cuentas.hasta is not None and cuentas.hasta >= hoy:
+        return cuentas
+
+    with cerrojo.bloquear(archivo_prestamo):
+        cuentas = _cargar(ruta)
+        tarifa = int(politicas.cargar(politicas.ruta_politica(archivo_prestamo))['multa_diaria'])
+        if _poner_al_dia(cuentas, archivo_prestamo, tarifa, hoy):
+            _guardar(ruta, cuentas)
+    return cuentas
+
+
+def saldo(archivo_prestamo: str, id_usuario: Any, hoy: Optional[date] = None) -> int:
+    """
+    Retorna lo que debe un usuario en multas (cerradas y acumuladas).
+
+    Args:
+        archivo_prestamo (str): Ruta al archivo de préstamos.
+        id_usuario (Any): Documento del usuario.
+        hoy (Optional[date]): Fecha de corte (hoy por defecto).
+
+    Returns:
+        int: El saldo del usuario.
+    """
+    return cuentas_al_dia(archivo_prestamo, hoy).saldo(str(id_usuario))
+
+
+def supera_umbral(archivo_prestamo: str, id_usuario: Any, hoy: Optional[date] = None) -> bool:
+    """
+    Indica si las multas de un usuario superan el umbral de la política.
+
+    Un umbral de 0 (o ausente) desactiva el control.
+
+    Args:
+        archivo_prestamo (str): Ruta al archivo de préstamos.
+        id_usuario (Any): Documento del usuario.
+        hoy (Optional[date]): Fecha de corte (hoy por defecto).
+
+    Returns:
+        bool: True si el saldo del usuario es mayor que el umbral.
+    """
+    umbral = politicas.cargar(politicas.ruta_politica(archivo_prestamo)).get('umbral_multas')
+    if not umbral:
+        return False
+    return saldo(archivo_prestamo, id_usuario, hoy) > int(umbral)
+
+
+@cerrojo.exclusivo
+def registrar_devolucion(archivo_prestamo: str, prestamo: Dict[str, Any], hoy: Optional[date] = None) -> int:
+    """
+    Cierra la multa de un préstamo que se devuelve.
+
+    Debe llamarse antes de quitar el préstamo del archivo activo. Lo acumulado
+    por el préstamo pasa, sin recalcular nada, a las multas cerradas del usuario.
+
+    Args:
+        archivo_prestamo (str): Ruta al archivo de préstamos.
+        prestamo (Dict[str, Any]): El préstamo devuelto.
+        hoy (Optional[date]): Fecha de la devolución (hoy por defecto).
+
+    Returns:
+        int: La multa del préstamo (0 si se devolvió a tiempo).
+    """
+    hoy = hoy or date.today()
+    cuentas = cuentas_al_dia(archivo_prestamo, hoy)
+    id_usuario = str(prestamo.get('id_usuario'))
+    vencido = cuentas.vencidos.pop(str(prestamo.get('id_prestamo')), None)
+    if vencido is not None:
+        monto = vencido[MONTO]
+        cuentas.sumar(cuentas.acumuladas, vencido[USUARIO], -monto)
+        id_usuario = vencido[USUARIO]
+    else:
+        vencimiento = a_fecha(prestamo.get('fecha_devolucion_esperada'))
+        tarifa = int(politicas.cargar(politicas.ruta_politica(archivo_prestamo))['multa_diaria'])
+        monto = max((hoy - vencimiento).days, 0) * tarifa if vencimiento else 0
+    if monto or vencido is not None:
+        cuentas.sumar(cuentas.cerradas, id_usuario, monto)
+        _guardar(ruta_multas(archivo_prestamo), cuentas)
+    return monto
+
+
+@cerrojo.exclusivo
+def pagar(archivo_prestamo: str, id_usuario: Any, monto: int) -> int:
+    """
+    Registra un pago de multas de un usuario.
+
+    Args:
+        archivo_prestamo (str): Ruta al archivo de préstamos.
+        id_usuario (Any): Documento del usuario.
+        monto (int): El valor pagado.
+
+    Returns:
+        int: El saldo que le queda al usuario.
+    """
+    cuentas = _cargar(ruta_multas(archivo_prestamo))
+    cuentas.sumar(cuentas.cerradas, str(id_usuario), -int(monto))
+    _guardar(ruta_multas(archivo_prestamo), cuentas)
+    return cuentas.saldo(str(id_usuario))
+
+
+@cerrojo.exclusivo
+def reconstruir(archivo_prestamo: str, hoy: Optional[date] = None) -> CuentasMultas:
+    """
+    Vuelve a acumular desde cero las multas de los préstamos abiertos.
+
+    Se usa cuando cambian los vencimientos (p. ej. al recalcularlos con una
+    política nueva). Las multas cerradas y los pagos se conservan.
+
+    Args:
+        archivo_prestamo (str): Ruta al archivo de préstamos.
+        hoy (Optional[date]): Fecha de corte (hoy por defecto).
+
+    Returns:
+        CuentasMultas: Las cuentas reconstruidas.
+    """
+    ruta = ruta_multas(archivo_prestamo)
+    cuentas = _cargar(ruta)
+    cuentas.hasta = None
+    cuentas.acumuladas = {}
+    cuentas.vencidos = {}
+    tarifa = int(politicas.cargar(politicas.ruta_politica(archivo_prestamo))['multa_diaria'])
+    _poner_al_dia(cuentas, archivo_prestamo, tarifa, hoy or date.today())
+    _guardar(ruta, cuentas)
+    return cuentas
@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+"""
+Módulo de Políticas de Préstamo.
+
+Calcula la fecha de devolución esperada de cada préstamo a partir de:
+
+- el tipo de usuario (p. ej. 'estudiante' o 'docente'), que fija los días de préstamo;
+- la categoría del libro (p. ej. 'referencia'), que puede acortar ese plazo:
+  se aplica siempre el plazo más corto de los dos;
+- el calendario de la biblioteca: si el vencimiento cae en un día de cierre
+  (día de la semana cerrado o feriado), se corre al siguiente día hábil.
+
+La política se guarda en un archivo JSON junto al de préstamos. Allí también se
+asigna el tipo de cada usuario (por documento) y la categoría de cada libro
+(por ISBN); quien no tenga asignación es 'general'.
+
+Al cambiar la política, `recalcular_vencimientos` actualiza los vencimientos de
+todos los préstamos abiertos en una sola pasada (vectorizada con NumPy si está
+instalado) y una sola escritura del archivo de préstamos.
+"""
+
+import json
+import os
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Sequence
+
+import auditoria
+import cerrojo
+import codec_json
+import gestor_datos3
+from modelos import a_fecha
+
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional
+    np = None
+
+NOMBRE_ARCHIVO = 'politica_prestamos.json'
+
+GENERAL = 'general'
+
+# Estados de un préstamo que aún no se devolvió.
+ABIERTOS = ('prestado', 'atrasado')
+
+POLITICA_POR_DEFECTO: Dict[str, Any] = {
+    'dias_base': 14,
+    'tipos_usuario': {'estudiante': 14, 'docente': 30},
+    'categorias': {'referencia': 3},
+    # Días de la semana sin atención (0 = lunes ... 6 = domingo)
+    'dias_cerrados': [6],
+    'feriados': [],
+    'usuarios': {},
+    'libros': {},
+    # Multa por día de atraso y saldo máximo con el que aún se presta (0 = sin límite)
+    'multa_diaria': 500,
+    'umbral_multas': 5000,
+}
+
+
+def ruta_politica(archivo_prestamo: str) -> str:
+    """
+    Retorna la ruta del archivo de política, junto al archivo de préstamos.
+
+    Args:
+        archivo_prestamo (str): Ruta al archivo de préstamos.
+
+    Returns:
+        str: Ruta del archivo de política.
+    """
+    return os.path.join(os.path.dirname(archivo_prestamo), NOMBRE_ARCHIVO)
+
+
+def cargar(filepath: str) -> Dict[str, Any]:
+    """
+    Carga la política; las claves que falten toman el valor por defecto.
+
+    Args:
+        filepath (str): Ruta al archivo de política.
+
+    Returns:
+        Dict[str, Any]: La política completa.
+    """
+    politica = json.loads(json.dumps(POLITICA_POR_DEFECTO))
+    if os.path.exists(filepath):
+        try:
+            with open(filepath, mode='r', encoding='utf-8') as f:
+                politica.update(json.load(f))
+        except json.JSONDecodeError:
+            pass
+    return politica
+
+
+@cerrojo.exclusivo
+def guardar(filepath: str, politica: Dict[str, Any]) -> None:
+    """
+    Guarda la política en disco.
+
+    Args:
+        filepath (str): Ruta al archivo de política.
+        politica (Dict[str, Any]): La política a guardar.
+    """
+    codec_json.escribir_atomico(filepath, politica, indent=2)
+
+
+def dias_prestamo(politica: Dict[str, Any], id_usuario: Any, id_libro: Any) -> int:
+    """
+    Retorna los días de préstamo para un usuario y un libro.
+
+    Args:
+        politica (Dict[str, Any]): La política vigente.
+        id_usuario (Any): Documento del usuario.
+        id_libro (Any): ISBN del libro.
+
+    Returns:
+        int: Los días del plazo más corto entre el del tipo de usuario y el de la categoría.
+    """
+    tipo = politica['usuarios'].get(str(id_usuario), GENERAL)
+    dias = int(politica['tipos_usuario'].get(tipo, politica['dias_base']))
+    categoria = politica['libros'].get(str(id_libro), GENERAL)
+    if categoria in politica['categorias']:
+        dias = min(dias, int(politica['categorias'][categoria]))
+    return dias
+
+
+def dia_habil(politica: Dict[str, Any], fecha: date) -> date:
+    """
+    Retorna la misma fecha si la biblioteca abre ese día, o el siguiente día hábil.
+
+    Args:
+        politica (Dict[str, Any]): La política vigente.
+        fecha (date): La fecha a ajustar.
+
+    Returns:
+        date: El primer día hábil desde `fecha`.
+    """
+    cerrados = set(politica['dias_cerrados'])
+    if len(cerrados) >= 7:
+        return fecha
+    feriados = set(politica['feriados'])
+    while fecha.weekday() in cerrados or fecha.isoformat() in feriados:
+        fecha += timedelta(days=1)
+    return fecha
+
+
+def calcular_vencimiento(politica: Dict[str, Any], fecha_prestamo: date, id_usuario: Any, id_libro: Any) -> date:
+    """
+    Calcula la fecha de devolución esperada de un préstamo.
+
+    Args:
+        politica (Dict[str, Any]): La política vigente.
+        fecha_prestamo (date): La fecha en que se hizo el préstamo.
+        id_usuario (Any): Documento del usuario.
+        id_libro (Any): ISBN del libro.
+
+    Returns:
+        date: La fecha de devolución esperada (siempre un día hábil).
+    """
+    vencimiento = fecha_prestamo + timedelta(days=dias_prestamo(politica, id_usuario, id_libro))
+    return dia_habil(politica, vencimiento)
+
+
+def vencimiento_prestamo(archivo_prestamo: str, id_usuario: Any, id_libro: Any,
+                         fecha_prestamo: Optional[date] = None) -> date:
+    """
+    Calcula el vencimiento de un préstamo nuevo con la política de su archivo.
+
+    Args:
+        archivo_prestamo (str): Ruta al archivo de préstamos.
+        id_usuario (Any): Documento del usuario.
+        id_libro (Any): ISBN del libro.
+        fecha_prestamo (Optional[date]): Fecha del préstamo (hoy por defecto).
+
+    Returns:
+        date: La fecha de devolución esperada.
+    """
+    politica = cargar(ruta_politica(archivo_prestamo))
+    return calcular_vencimiento(politica, fecha_prestamo or date.today(), id_usuario, id_libro)
+
+
+def _mascara_semana(politica: Dict[str, Any]) -> str:
+    """Máscara de días hábiles de NumPy ('1111110' = abre de lunes a sábado)."""
+    cerrados = set(politica['dias_cerrados'])
+    return ''.join('0' if dia in cerrados else '1' for dia in range(7))
+
+
+def calcular_vencimientos(politica: Dict[str, Any], prestamos: Sequence[Dict[str, Any]]) -> List[str]:
+    """
+    Calcula los vencimientos de muchos préstamos a la vez.
+
+    Con NumPy, las fechas se suman como un vector 'datetime64[D]' y se corren
+    al siguiente día hábil con `numpy.busday_offset`; sin NumPy, préstamo por
+    préstamo con `calcular_vencimiento`.
+
+    Args:
+        politica (Dict[str, Any]): La política vigente.
+        prestamos (Sequence[Dict[str, Any]]): Préstamos con 'fecha_prestamo' válida.
+
+    Returns:
+        List[str]: Las fechas de devolución esperadas (ISO), en el mismo orden.
+    """
+    if not prestamos:
+        return []
+    mascara = _mascara_semana(politica)
+    if np is None or '1' not in mascara:
+        return [
+            calcular_vencimiento(politica, a_fecha(p['fecha_prestamo']), p['id_usuario'], p['id_libro']).isoformat()
+            for p in prestamos
+        ]
+
+    fechas = np.array([str(p['fecha_prestamo']) for p in prestamos], dtype='datetime64[D]')
+    dias = np.array([dias_prestamo(politica, p['id_usuario'], p['id_libro']) for p in prestamos], dtype='int64')
+    feriados = np.array(politica['feriados'], dtype='datetime64[D]')
+    vencimientos = np.busday_offset(fechas + dias, 0, roll='forward', weekmask=mascara, holidays=feriados)
+    return np.datetime_as_string(vencimientos, unit='D').tolist()
+
+
+@cerrojo.exclusivo
+def recalcular_vencimientos(archivo_prestamo: str, politica: Optional[Dict[str, Any]] = None,
+                            hoy: Optional[date] = None) -> int:
+    """
+    Recalcula el vencimiento de todos los préstamos abiertos con la política.
+
+    También corrige el estado: un préstamo queda 'atrasado' si su nuevo
+    vencimiento ya pasó y 'prestado' si no. Los cambios se guardan con una
+    sola escritura del archivo de préstamos, y las multas acumuladas de los
+    préstamos abiertos se vuelven a calcular con los nuevos vencimientos; todo
+    con el cerrojo de la carpeta tomado.
+
+    Args:
+        archivo_prestamo (str): Ruta al archivo de préstamos.
+        politica (Optional[Dict[str, Any]]): La política a aplicar; por defecto,
+            la guardada junto al archivo.
+        hoy (Optional[date]): Fecha de referencia para el estado (hoy por defecto).
+
+    Returns:
+        int: La cantidad de préstamos modificados.
+    """
+    if politica is None:
+        politica = cargar(ruta_politica(archivo_prestamo))
+    hoy = hoy or date.today()
+
+    datos = gestor_datos3.cargar_datos(archivo_prestamo)
+    abiertos = [p for p in datos if p.get('estado') in ABIERTOS and a_fecha(p.get('fecha_prestamo'))]
+    vencimientos = calcular_vencimientos(politica, abiertos)
+
+    cambiados = []
+    estados = []
+    for prestamo, vencimiento in zip(abiertos, vencimientos):
+        estado = 'atrasado' if vencimiento < hoy.isoformat() else 'prestado'
+        if prestamo.get('fecha_devolucion_esperada') == vencimiento and prestamo.get('estado') == estado:
+            continue
+        # También se audita un cambio de vencimiento sin cambio de estado: la exportación incremental lo busca ahí
+        estados.append((prestamo.get('id_prestamo'), prestamo.get('estado'), estado, vencimiento))
+        prestamo['fecha_devolucion_esperada'] = vencimiento
+        prestamo['estado'] = estado
+        cambiados.append(prestamo)
+
+    if cambiados:
+        gestor_datos3.guardar_cambios(archivo_prestamo, datos, cambiados)
+        import multas  # importación diferida: multas usa este módulo
+        multas.reconstruir(archivo_prestamo, hoy)
+    for id_prestamo, anterior, nuevo, vencimiento in estados:
+        auditoria.registrar(archivo_prestamo, auditoria.ESTADO, id_prestamo, anterior, nuevo, vencimiento=vencimiento)
+    return len(cambiados)
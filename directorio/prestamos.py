@@ -4,14 +4,28 @@ Módulo de Préstamos
 -------------------
 Se encarga de registrar los préstamos de productos (libros) a clientes.
 Guarda los datos en un archivo JSON y CSV.
+Las operaciones que modifican archivos toman el cerrojo de la carpeta de datos,
+así varios procesos pueden trabajar sobre la misma carpeta.
 """
 
 from datetime import date,timedelta
+from typing import Optional
 import gestor_datos3  # préstamos
 import gestor_datos2 # libros
 import gestor_datos   # usuarios
 import csv
+import itertools
 import os
+import auditoria
+import carga_paralela
+import cerrojo
+import ejemplares
+import historico
+import indice_fechas
+import multas
+import politicas
+import reservas
+from modelos import Libro, Prestamo, a_dicts, desde_dicts
 from rich.console import Console
 
 console = Console()
@@ -51,7 +65,13 @@ def buscar_en_json_y_csv(archivo: str, clave: str, valor: str):
 
     # 2️⃣ Buscar en CSV (si existe)
     archivo_csv = archivo.replace(".json", ".csv")
-    if os.path.exists(archivo_csv):
+    if os.path.exists(archivo_csv) and clave == gestor.CLAVE:
+        # Búsqueda por la clave: solo se interpreta la línea encontrada
+        item = gestor.buscar_registro(archivo_csv, valor)
+        if item:
+            console.print(f"[green]✅ Encontrado en CSV[/green]: {item}")
+            return item
+    elif os.path.exists(archivo_csv):
         datos_csv = gestor.cargar_datos(archivo_csv)
         console.print(f"[blue]📗 Registros CSV cargados:[/blue] {len(datos_csv)}")
         for item in datos_csv:
@@ -66,21 +86,62 @@ def buscar_en_json_y_csv(archivo: str, clave: str, valor: str):
 
 
 
+def _agregar_prestamo(prestamos: list, archivo_prestamo: str, id_usuario: str, id_libro: str,
+                      id_ejemplar: str) -> Prestamo:
+    """
+    Crea un préstamo nuevo y lo agrega a la lista de préstamos activos.
+    El vencimiento sale de la política de préstamos (tipo de usuario, categoría
+    del libro y calendario de la biblioteca).
+    """
+    # Los devueltos ya archivados también cuentan para el ID
+    ultimo_id = max((p.id_prestamo for p in prestamos), default=0)
+    ultimo_id = max(ultimo_id, historico.ultimo_id(archivo_prestamo))
+    hoy = date.today()
+    nuevo_prestamo = Prestamo(
+        id_prestamo=ultimo_id + 1,
+        id_usuario=str(id_usuario),
+        id_libro=str(id_libro),
+        fecha_prestamo=hoy,
+        fecha_devolucion_esperada=politicas.vencimiento_prestamo(archivo_prestamo, id_usuario, id_libro, hoy),
+        estado="prestado",
+        id_ejemplar=id_ejemplar,
+    )
+    prestamos.append(nuevo_prestamo)
+    return nuevo_prestamo
+
+
+def _puede_recibir_prestamo(archivo_prestamo: str, archivo_usuario: Optional[str], id_usuario: str) -> bool:
+    """
+    Indica si un usuario puede recibir un préstamo: debe existir (si se indica
+    el archivo de usuarios) y sus multas no deben superar el umbral de la política.
+    """
+    if archivo_usuario is not None and not buscar_en_json_y_csv(archivo_usuario, "documento", id_usuario):
+        console.print("[bold red]❌ El usuario no existe en JSON ni CSV[/bold red]")
+        return False
+
+    # Saldo de multas ya calculado por usuario: no se recorren los préstamos
+    if multas.supera_umbral(archivo_prestamo, id_usuario):
+        console.print("[bold red]❌ El usuario tiene multas pendientes por encima del límite permitido[/bold red]")
+        return False
+    return True
+
+
+@cerrojo.exclusivo
 def realizar_prestamo(archivo_prestamo: str, archivo_usuario: str, archivo_libro: str,
-                      nuevo_id_usuario: str, nuevo_id_libro: str):
+                      nuevo_id_usuario: str, nuevo_id_libro: str, reservar_si_agotado: bool = True):
     """
     Registra un préstamo nuevo si el usuario y el libro existen.
     Guarda el préstamo tanto en JSON como en CSV usando los gestores.
+    Si no hay stock, deja al usuario en la cola de reservas del libro.
+    No presta a usuarios cuyas multas superan el umbral de la política.
     """
     prestamos=[]
     if os.path.exists(archivo_prestamo):
-        prestamos = gestor_datos3.cargar_datos(archivo_prestamo)
+        prestamos = desde_dicts(Prestamo, gestor_datos3.cargar_datos(archivo_prestamo))
         console.print(f"[blue]📘 Préstamos cargados:[/blue] {len(prestamos)}")
 
-    # Verificar si el usuario existe
-    usuario_encontrado = buscar_en_json_y_csv(archivo_usuario, "documento", nuevo_id_usuario)
-    if not usuario_encontrado:
-        console.print("[bold red]❌ El usuario no existe en JSON ni CSV[/bold red]")
+    # Verificar si el usuario existe y no debe multas por encima del límite
+    if not _puede_recibir_prestamo(archivo_prestamo, archivo_usuario, nuevo_id_usuario):
         return None
 
     # Verificar si el libro existe
@@ -89,125 +150,166 @@ def realizar_prestamo(archivo_prestamo: str, archivo_usuario: str, archivo_libro
         console.print("[bold red]❌ El libro no existe en JSON ni CSV[/bold red]")
         return None
 
-    fecha_esperada=date.today()+timedelta(days=-1)
-    try:
-        stock_actual = int(libro_encontrado.get("stock", "0"))
-    except ValueError:
-        stock_actual = 0
+    # El stock disponible lo dan los ejemplares libres; el del libro vale mientras no los haya
+    archivo_ejemplares = ejemplares.ruta_ejemplares(archivo_libro)
+    stock_libro = Libro.desde_dict(libro_encontrado).stock
+    stock_actual = ejemplares.stock(archivo_ejemplares, nuevo_id_libro, stock_libro)
 
     if stock_actual <= 0:
         console.print(
             f"[bold red]❌ No hay stock disponible para el libro con ISBN {nuevo_id_libro}[/bold red]"
         )
+        if reservar_si_agotado:
+            reserva = reservas.reservar(reservas.ruta_reservas(archivo_prestamo), nuevo_id_usuario, nuevo_id_libro)
+            if reserva:
+                console.print(f"[yellow]📌 Reserva registrada (ID {reserva['id_reserva']}). "
+                              f"El libro se asignará al devolverse un ejemplar.[/yellow]")
         return None
 
-    # Si hay stock, restar 1
-    libros = gestor_datos2.cargar_datos(archivo_libro)
+    # Si hay stock, tomar un ejemplar libre; el libro pasa a mostrar los que quedan
+    id_ejemplar = ejemplares.prestar(archivo_ejemplares, nuevo_id_libro, stock_libro)
+    libros = desde_dicts(Libro, gestor_datos2.cargar_datos(archivo_libro))
     for lb in libros:
-        if str(lb.get("ISBN")) == str(nuevo_id_libro):
-            lb["stock"] = str(stock_actual - 1)
+        if lb.ISBN == str(nuevo_id_libro):
+            anterior, lb.stock = lb.stock, stock_actual - 1
+            gestor_datos2.sumar_stock(archivo_libro, a_dicts(libros), lb.a_dict(), lb.stock - anterior)
+            auditoria.registrar_stock(archivo_libro, lb.ISBN, anterior, lb.stock)
             break
-    gestor_datos2.guardar_datos(archivo_libro, libros)
-
-    # Crear el préstamo
-    nuevo_prestamo = {
-        "id_prestamo": len(prestamos) + 1,
-        "id_usuario": nuevo_id_usuario,
-        "id_libro": nuevo_id_libro,
-        "fecha_prestamo": str(date.today()),
-        "fecha_devolucion_esperada": str(fecha_esperada),
-        "estado": "prestado",
-    }
-
-    prestamos.append(nuevo_prestamo)
 
-    for p in prestamos:
-        if "fecha" in p:
-            p["fecha_prestamo"] = p.pop("fecha")
+    nuevo_prestamo = _agregar_prestamo(prestamos, archivo_prestamo, nuevo_id_usuario, nuevo_id_libro, id_ejemplar)
+    datos_prestamos = a_dicts(prestamos)
 
-    gestor_datos3.guardar_datos(archivo_prestamo, prestamos)
+    gestor_datos3.guardar_cambios(archivo_prestamo, datos_prestamos, [nuevo_prestamo.a_dict()])
+    auditoria.registrar(archivo_prestamo, auditoria.PRESTAMO, nuevo_prestamo.id_prestamo, None, nuevo_prestamo.a_dict())
 
     # Guardar también en CSV
-    archivo_csv = archivo_prestamo.replace(".json", ".csv")
-    with open(archivo_csv, "w", newline="", encoding="utf-8") as f:
-        campos = ["id_prestamo", "id_usuario", "id_libro", "fecha_prestamo",'fecha_devolucion_esperada', "estado"]
-        writer = csv.DictWriter(f, fieldnames=campos)
-        writer.writeheader()
-        writer.writerows(prestamos)
+    if archivo_prestamo.endswith(".json"):
+        archivo_csv = archivo_prestamo.replace(".json", ".csv")
+        with open(archivo_csv, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=gestor_datos3.columnas_csv(datos_prestamos))
+            writer.writeheader()
+            writer.writerows(datos_prestamos)
 
     console.print("[bold green]✅ Préstamo registrado correctamente[/bold green]")
-    return nuevo_prestamo
+    return nuevo_prestamo.a_dict()
 
 
-def registrar_devolucion(archivo_prestamo: str, archivo_libros: str, id_prestamo: str):
+@cerrojo.exclusivo
+def registrar_devolucion(archivo_prestamo: str, archivo_libros: str, id_prestamo: str,
+                         archivo_usuario: Optional[str] = None):
     """
     Registra la devolución de un producto prestado, cambiando su estado y aumentando el stock.
+    El préstamo devuelto sale del archivo activo y se anexa al histórico de su mes,
+    con su fecha de devolución; la devolución y el cambio de stock quedan en la auditoría.
+    Si se devolvió tarde, su multa pasa al saldo del usuario.
+    Si alguien esperaba el libro, el ejemplar devuelto se le presta directamente, con
+    las mismas condiciones que `realizar_prestamo`: las reservas de usuarios que no
+    existen (si se indica `archivo_usuario`) o que deben multas se descartan.
     """
-    prestamos = gestor_datos3.cargar_datos(archivo_prestamo)
-    libros = gestor_datos2.cargar_datos(archivo_libros)
+    prestamos = desde_dicts(Prestamo, gestor_datos3.cargar_datos(archivo_prestamo))
+    libros = desde_dicts(Libro, gestor_datos2.cargar_datos(archivo_libros))
 
     # Buscar el préstamo
-    prestamo = next((p for p in prestamos if str(p.get("id_prestamo")) == str(id_prestamo)), None)
+    id_buscado = str(id_prestamo)
+    prestamo = next((p for p in prestamos if str(p.id_prestamo) == id_buscado), None)
     if not prestamo:
         console.print("[bold red]❌ No se encontró el préstamo indicado[/bold red]")
         return None
 
-    if prestamo.get("estado") == "devuelto":
+    if prestamo.estado == "devuelto":
         console.print("[yellow]⚠️ El préstamo ya fue devuelto[/yellow]")
         return None
 
     # Cambiar estado
-    prestamo["estado"] = "devuelto"
+    estado_anterior = prestamo.estado
+    prestamo.estado = "devuelto"
+    fecha_devolucion = date.today().isoformat()
 
-    # Aumentar stock del libro devuelto
-    id_libro = prestamo.get("id_libro")
-    libro_encontrado = next((lb for lb in libros if str(lb.get("ISBN")) == str(id_libro)), None)
+    # Devolver el ejemplar: a la siguiente reserva o al stock del libro
+    libro_encontrado = next((lb for lb in libros if lb.ISBN == prestamo.id_libro), None)
 
     if libro_encontrado:
-        try:
-            libro_encontrado["stock"] = str(int(libro_encontrado.get("stock", "0")) + 1)
-        except ValueError:
-            libro_encontrado["stock"] = "1"
-
-        gestor_datos2.guardar_datos(archivo_libros, libros)
-        gestor_datos3.guardar_datos(archivo_prestamo, prestamos)
+        prestamos.remove(prestamo)
+        historico.archivar(archivo_prestamo, [dict(prestamo.a_dict(), fecha_devolucion=fecha_devolucion)])
+        auditoria.registrar(archivo_prestamo, auditoria.DEVOLUCION, prestamo.id_prestamo, estado_anterior,
+                            prestamo.estado, fecha_devolucion=fecha_devolucion)
+        multa = multas.registrar_devolucion(archivo_prestamo, prestamo.a_dict())
+        if multa:
+            console.print(f"[yellow]💸 Multa por atraso: {multa}[/yellow]")
+
+        ruta_reservas = reservas.ruta_reservas(archivo_prestamo)
+        reserva = reservas.tomar_siguiente(ruta_reservas, prestamo.id_libro)
+        while reserva and not _puede_recibir_prestamo(archivo_prestamo, archivo_usuario, reserva["id_usuario"]):
+            console.print(f"[yellow]⚠️ Se descarta la reserva {reserva['id_reserva']}[/yellow]")
+            reserva = reservas.tomar_siguiente(ruta_reservas, prestamo.id_libro)
+        cambiados = []
+        if reserva:
+            # El mismo ejemplar pasa directo a la siguiente reserva: el stock no cambia
+            asignado = _agregar_prestamo(prestamos, archivo_prestamo, reserva["id_usuario"], prestamo.id_libro,
+                                         prestamo.id_ejemplar)
+            cambiados.append(asignado.a_dict())
+            auditoria.registrar(archivo_prestamo, auditoria.PRESTAMO, asignado.id_prestamo, None, asignado.a_dict(),
+                                reserva=reserva["id_reserva"])
+            console.print(f"[cyan]📌 Ejemplar asignado a la reserva {reserva['id_reserva']} "
+                          f"(préstamo {asignado.id_prestamo})[/cyan]")
+        else:
+            archivo_ejemplares = ejemplares.ruta_ejemplares(archivo_libros)
+            ejemplares.devolver(archivo_ejemplares, prestamo.id_libro, prestamo.id_ejemplar)
+            anterior = libro_encontrado.stock
+            libro_encontrado.stock = ejemplares.stock(archivo_ejemplares, prestamo.id_libro, anterior + 1)
+            gestor_datos2.sumar_stock(archivo_libros, a_dicts(libros), libro_encontrado.a_dict(),
+                                      libro_encontrado.stock - anterior)
+            auditoria.registrar_stock(archivo_libros, libro_encontrado.ISBN, anterior, libro_encontrado.stock)
+
+        gestor_datos3.guardar_cambios(archivo_prestamo, a_dicts(prestamos), cambiados, [str(prestamo.id_prestamo)])
 
         console.print("[bold green]✅ Devolución registrada correctamente[/bold green]")
-        return prestamo
+        return prestamo.a_dict()
     else:
         console.print("[bold red]❌ No se encontró el libro asociado[/bold red]")
         return None
 
 
+def _cargar_tres_archivos(archivo_prestamo: str, archivo_usuario: str, archivo_libro: str):
+    """Carga préstamos, usuarios y libros en paralelo."""
+    return carga_paralela.cargar_en_paralelo({
+        "prestamos": archivo_prestamo,
+        "usuarios": archivo_usuario,
+        "libros": archivo_libro,
+    })
+
+
+@cerrojo.exclusivo
 def listar_prestamos(archivo_prestamo: str, archivo_usuario: str, archivo_libro: str):
     """
     Retorna una lista con los préstamos registrados, mostrando
     los datos combinados de usuario y libro.
     """
 
-    # Cargar los datos
-    prestamos = gestor_datos3.cargar_datos(archivo_prestamo)
-    usuarios = gestor_datos.cargar_datos(archivo_usuario)
-    libros = gestor_datos2.cargar_datos(archivo_libro)
+    # Cargar los datos (los tres archivos a la vez)
+    datos = _cargar_tres_archivos(archivo_prestamo, archivo_usuario, archivo_libro)
+    prestamos = desde_dicts(Prestamo, datos["prestamos"])
+    usuarios = datos["usuarios"]
+    libros = datos["libros"]
 
     if not prestamos:
         return []  # No hay préstamos
 
+    hoy = date.today()
+    atrasados = []
     for prestamo in prestamos:
-        fecha_esperada=prestamo.get("fecha_devolucion_esperada")
-        if prestamo.get("estado") == "prestado" and fecha_esperada:
-            try:
-                fecha_esperada = date.fromisoformat(fecha_esperada)
-                if date.today() > fecha_esperada:
-                    prestamo["estado"] = "atrasado"
-            except Exception as e:
-                console.print(e)
-                pass
-
-    gestor_datos3.guardar_datos(archivo_prestamo,prestamos)
+        fecha_esperada = prestamo.fecha_devolucion_esperada
+        if prestamo.estado == "prestado" and fecha_esperada and hoy > fecha_esperada:
+            prestamo.estado = "atrasado"
+            atrasados.append(prestamo.a_dict())
+
+    datos_prestamos = a_dicts(prestamos)
+    gestor_datos3.guardar_cambios(archivo_prestamo, datos_prestamos, atrasados)
+    for prestamo in atrasados:
+        auditoria.registrar(archivo_prestamo, auditoria.ESTADO, prestamo["id_prestamo"], "prestado", "atrasado")
 
     lista_resultado = []
-    for prestamo in prestamos:
+    for prestamo in datos_prestamos:
         # Buscar usuario y libro asociados
         usuario = next((u for u in usuarios if str(u.get("documento")) == str(prestamo.get("id_usuario"))), None)
         libro = next((lib for lib  in libros if str(lib.get("ISBN")) == str(prestamo.get("id_libro"))),None,)
@@ -232,22 +334,51 @@ def listar_prestamos(archivo_prestamo: str, archivo_usuario: str, archivo_libro:
 
     return lista_resultado
 
-def listar_devoluciones(archivo_prestamo: str, archivo_usuario: str, archivo_libro: str):
+@cerrojo.exclusivo
+def archivar_devueltos(archivo_prestamo: str) -> int:
     """
-    Retorna una lista de todos los préstamos que ya fueron devueltos,
-    mostrando datos combinados de usuario y libro.
+    Mueve al histórico los préstamos devueltos que aún estén en el archivo activo.
+
+    Sirve para migrar archivos creados antes de existir el histórico. Si una
+    ejecución anterior se cortó después de archivar y antes de reescribir el
+    archivo activo, los préstamos que ya estaban archivados no se repiten.
+
+    Args:
+        archivo_prestamo (str): Ruta al archivo de préstamos activo.
+
+    Returns:
+        int: La cantidad de préstamos archivados.
     """
-    # Cargar todos los préstamos
     prestamos = gestor_datos3.cargar_datos(archivo_prestamo)
-    usuarios = gestor_datos.cargar_datos(archivo_usuario)
-    libros = gestor_datos2.cargar_datos(archivo_libro)
+    devueltos = [p for p in prestamos if p.get("estado") == "devuelto"]
+    if not devueltos:
+        return 0
 
-    if not prestamos:
-        return []
+    historico.archivar(archivo_prestamo, devueltos, omitir_archivados=True)
+    abiertos = [p for p in prestamos if p.get("estado") != "devuelto"]
+    gestor_datos3.guardar_cambios(archivo_prestamo, abiertos, [], [str(p.get("id_prestamo")) for p in devueltos])
+    return len(devueltos)
+
+
+def listar_devoluciones(archivo_prestamo: str, archivo_usuario: str, archivo_libro: str,
+                        desde: Optional[str] = None, hasta: Optional[str] = None):
+    """
+    Retorna una lista de todos los préstamos que ya fueron devueltos,
+    mostrando datos combinados de usuario y libro.
+
+    Las particiones del histórico solo se leen aquí, y solo las del rango
+    'desde'/'hasta' (periodos AAAA-MM) cuando se indica.
+    """
+    # Cargar los préstamos activos y, perezosamente, los archivados
+    datos = _cargar_tres_archivos(archivo_prestamo, archivo_usuario, archivo_libro)
+    prestamos = datos["prestamos"]
+    usuarios = datos["usuarios"]
+    libros = datos["libros"]
 
     devoluciones = []
 
-    for prestamo in prestamos:
+    todos = itertools.chain(prestamos, historico.iterar_archivados(archivo_prestamo, desde, hasta))
+    for prestamo in todos:
         if prestamo.get("estado") == "devuelto":
             usuario = next((u for u in usuarios if str(u.get("documento")) == str(prestamo.get("id_usuario"))),None)
             libro = next((lib for lib in libros if str(lib.get("ISBN")) == str(prestamo.get("id_libro"))),None)
@@ -263,8 +394,30 @@ def listar_devoluciones(archivo_prestamo: str, archivo_usuario: str, archivo_lib
                 "usuario": nombre_usuario,
                 "libro": nombre_libro,
                 "fecha_prestamo": prestamo.get("fecha_prestamo"),
+                "fecha_devolucion": prestamo.get("fecha_devolucion", ""),
                 "estado": prestamo.get("estado")
             }
             devoluciones.append(devolucion)
 
     return devoluciones
+
+
+def prestamos_entre(archivo_prestamo: str, desde: Optional[str] = None, hasta: Optional[str] = None):
+    """
+    Retorna los préstamos activos hechos entre dos fechas ISO (ambas incluidas),
+    en orden de fecha de préstamo. Usa el índice ordenado por 'fecha_prestamo'.
+    """
+    return indice_fechas.prestamos_entre(archivo_prestamo, "fecha_prestamo", desde, hasta)
+
+
+def prestamos_por_vencer(archivo_prestamo: str, dias: int = 7, hoy: Optional[date] = None):
+    """
+    Retorna los préstamos sin devolver cuya fecha de devolución esperada cae
+    entre hoy y los próximos 'dias' días, en orden de vencimiento.
+    Usa el índice ordenado por 'fecha_devolucion_esperada'.
+    """
+    hoy = hoy or date.today()
+    candidatos = indice_fechas.prestamos_entre(
+        archivo_prestamo, "fecha_devolucion_esperada", hoy.isoformat(), (hoy + timedelta(days=dias)).isoformat()
+    )
+    return [p for p in candidatos if p.get("estado") != "devuelto"]
@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""
+Módulo de Registros de Ancho Fijo.
+
+Formato de archivo ('.dat') en el que todos los registros ocupan lo mismo, para
+poder reescribir uno solo en su lugar sin tocar el resto del archivo:
+
+- Una línea de cabecera: 'FIJO1 ' seguido de un JSON con la clave y el ancho
+  en bytes de cada campo.
+- Después, un registro por ranura: un byte de estado ('+' vivo, '-' borrado),
+  los campos en UTF-8 rellenados con espacios hasta su ancho, y un salto de
+  línea.
+
+Borrar un registro solo marca su ranura; la ranura queda libre y la reutiliza el
+siguiente registro nuevo. En memoria se guarda, por archivo, un índice de
+clave → ranura junto con la fecha de modificación y el tamaño del archivo; si
+otro proceso lo cambia, el índice se reconstruye con una sola lectura.
+"""
+
+import json
+import os
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import vigilante
+
+MARCA = b'FIJO1 '
+VIVO = b'+'
+BORRADO = b'-'
+
+
+class Indice:
+    """Posición de cada registro de un archivo de ancho fijo y sus ranuras libres."""
+
+    __slots__ = ('campos', 'clave', 'inicio', 'largo', 'ranuras', 'posiciones', 'libres', 'firma')
+
+    def __init__(self, campos: List[Tuple[str, int]], clave: str, inicio: int) -> None:
+        self.campos = campos
+        self.clave = clave
+        self.inicio = inicio
+        self.largo = 1 + sum(ancho for _, ancho in campos) + 1
+        self.ranuras = 0
+        self.posiciones: Dict[str, int] = {}
+        self.libres: List[int] = []
+        self.firma: Tuple[int, int] = (-1, -1)
+
+    def desplazamiento(self, ranura: int) -> int:
+        return self.inicio + ranura * self.largo
+
+    def codificar(self, registro: Dict[str, Any]) -> Optional[bytes]:
+        """Codifica un registro en su ranura, o None si algún valor no cabe."""
+        partes = [VIVO]
+        for nombre, ancho in self.campos:
+            valor = registro.get(nombre)
+            texto = ('' if valor is None else str(valor)).encode('utf-8')
+            if len(texto) > ancho:
+                return None
+            partes.append(texto.ljust(ancho, b' '))
+        partes.append(b'\n')
+        return b''.join(partes)
+
+    def decodificar(self, ranura: bytes) -> Dict[str, str]:
+        registro = {}
+        posicion = 1
+        for nombre, ancho in self.campos:
+            registro[nombre] = ranura[posicion:posicion + ancho].decode('utf-8').rstrip(' ')
+            posicion += ancho
+        return registro
+
+
+_INDICES: Dict[str, Indice] = {}
+
+
+def _escribir_en(filepath: str, desplazamiento: int, contenido: bytes) -> None:
+    fd = os.open(filepath, os.O_RDWR)
+    try:
+        if hasattr(os, 'pwrite'):
+            os.pwrite(fd, contenido, desplazamiento)
+        else:
+            os.lseek(fd, desplazamiento, os.SEEK_SET)
+            os.write(fd, contenido)
+    finally:
+        os.close(fd)
+
+
+def _leer_cabecera(f) -> Indice:
+    linea = f.readline()
+    if not linea.startswith(MARCA):
+        raise ValueError("El archivo no tiene formato de ancho fijo")
+    cabecera = json.loads(linea[len(MARCA):])
+    return Indice([(nombre, ancho) for nombre, ancho in cabecera['campos']], cabecera['clave'], len(linea))
+
+
+def _recorrer(filepath: str) -> Tuple[Indice, List[Dict[str, str]]]:
+    """Lee el archivo completo, reconstruye su índice y retorna los registros vivos."""
+    with open(filepath, mode='rb') as f:
+        indice = _leer_cabecera(f)
+        contenido = f.read()
+    registros = []
+    ranura = 0
+    for posicion in range(0, len(contenido) - indice.largo + 1, indice.largo):
+        bloque = contenido[posicion:posicion + indice.largo]
+        if bloque[:1] == VIVO:
+            registro = indice.decodificar(bloque)
+            indice.posiciones[registro[indice.clave]] = ranura
+            registros.append(registro)
+        else:
+            indice.libres.append(ranura)
+        ranura += 1
+    indice.ranuras = ranura
+    indice.firma = vigilante.firma(filepath)
+    _INDICES[os.path.abspath(filepath)] = indice
+    return indice, registros
+
+
+def _indice(filepath: str) -> Indice:
+    indice = _INDICES.get(os.path.abspath(filepath))
+    if indice is None or indice.firma != vigilante.firma(filepath):
+        indice, _ = _recorrer(filepath)
+    return indice
+
+
+def es_fijo(filepath: str) -> bool:
+    """Indica si una ruta usa el formato de ancho fijo (por su extensión)."""
+    return filepath.endswith('.dat')
+
+
+def inicializar(filepath: str, campos: Dict[str, int], clave: str) -> None:
+    """
+    Crea un archivo de ancho fijo vacío si no existe.
+
+    Args:
+        filepath (str): Ruta al archivo.
+        campos (Dict[str, int]): Ancho en bytes de cada campo, en orden.
+        clave (str): Campo que identifica a cada registro.
+    """
+    if not os.path.exists(filepath):
+        escribir(filepath, [], campos, clave)
+
+
+def leer(filepath: str) -> List[Dict[str, str]]:
+    """
+    Lee los registros vivos de un archivo de ancho fijo, en orden de ranura.
+
+    Args:
+        filepath (str): Ruta al archivo.
+
+    Returns:
+        List[Dict[str, str]]: Los registros.
+    """
+    return _recorrer(filepath)[1]
+
+
+def escribir(filepath: str, datos: List[Dict[str, Any]], campos: Dict[str, int], clave: str) -> None:
+    """
+    Reescribe el archivo completo, sin ranuras libres.
+
+    Cada campo toma el ancho indicado, o más si algún valor no cabe.
+
+    Args:
+        filepath (str): Ruta al archivo.
+        datos (List[Dict[str, Any]]): Los registros.
+        campos (Dict[str, int]): Ancho mínimo en bytes de cada campo, en orden.
+        clave (str): Campo que identifica a cada registro.
+    """
+    anchos = dict(campos)
+    for registro in datos:
+        for nombre in anchos:
+            valor = registro.get(nombre)
+            largo = len(('' if valor is None else str(valor)).encode('utf-8'))
+            if largo > anchos[nombre]:
+                anchos[nombre] = largo
+
+    cabecera = MARCA + json.dumps({'clave': clave, 'campos': list(anchos.items())}).encode('utf-8') + b'\n'
+    indice = Indice(list(anchos.items()), clave, len(cabecera))
+    with open(filepath, mode='wb') as f:
+        f.write(cabecera)
+        for ranura, registro in enumerate(datos):
+            f.write(indice.codificar(registro))
+            indice.posiciones[str(registro.get(clave))] = ranura
+    indice.ranuras = len(datos)
+    indice.firma = vigilante.firma(filepath)
+    _INDICES[os.path.abspath(filepath)] = indice
+
+
+def obtener(filepath: str, clave: str) -> Optional[Dict[str, str]]:
+    """
+    Lee un solo registro por su clave.
+
+    Args:
+        filepath (str): Ruta al archivo.
+        clave (str): Valor de la clave del registro.
+
+    Returns:
+        Optional[Dict[str, str]]: El registro, o None si no existe.
+    """
+    indice = _indice(filepath)
+    ranura = indice.posiciones.get(str(clave))
+    if ranura is None:
+        return None
+    with open(filepath, mode='rb') as f:
+        f.seek(indice.desplazamiento(ranura))
+        return indice.decodificar(f.read(indice.largo))
+
+
+def actualizar(filepath: str, registros: Iterable[Dict[str, Any]]) -> bool:
+    """
+    Escribe en su lugar los registros dados: los existentes sobre su ranura y los
+    nuevos en una ranura libre o al final.
+
+    Args:
+        filepath (str): Ruta al archivo.
+        registros (Iterable[Dict[str, Any]]): Los registros nuevos o modificados.
+
+    Returns:
+        bool: False si algún valor no cabe en el ancho de su campo (no se escribe
+            nada y hay que reescribir el archivo completo).
+    """
+    indice = _indice(filepath)
+    codificados = []
+    for registro in registros:
+        bloque = indice.codificar(registro)
+        if bloque is None:
+            return False
+        codificados.append((str(registro.get(indice.clave)), bloque))
+
+    for id_registro, bloque in codificados:
+        ranura = indice.posiciones.get(id_registro)
+        if ranura is None:
+            if indice.libres:
+                ranura = indice.libres.pop()
+            else:
+                ranura = indice.ranuras
+                indice.ranuras += 1
+            indice.posiciones[id_registro] = ranura
+        _escribir_en(filepath, indice.desplazamiento(ranura), bloque)
+    indice.firma = vigilante.firma(filepath)
+    return True
+
+
+def eliminar(filepath: str, claves: Iterable[str]) -> int:
+    """
+    Marca como borrados los registros con las claves dadas y libera sus ranuras.
+
+    Args:
+        filepath (str): Ruta al archivo.
+        claves (Iterable[str]): Claves de los registros a borrar.
+
+    Returns:
+        int: La cantidad de registros borrados.
+    """
+    indice = _indice(filepath)
+    borrados = 0
+    for id_registro in claves:
+        ranura = indice.posiciones.pop(str(id_registro), None)
+        if ranura is None:
+            continue
+        _escribir_en(filepath, indice.desplazamiento(ranura), BORRADO)
+        indice.libres.append(ranura)
+        borrados += 1
+    indice.firma = vigilante.firma(filepath)
+    return borrados
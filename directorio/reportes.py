@@ -0,0 +1,333 @@
+# -*- coding: utf-8 -*-
+"""
+Módulo de Reportes.
+
+Calcula indicadores de gestión sobre los préstamos (activos e históricos):
+libros más prestados, tasa de atraso por mes, préstamos activos por usuario y
+rotación de stock.
+
+Los préstamos se cargan una sola vez en columnas de enteros (códigos de
+diccionario para usuario, libro y estado; mes y fecha como números). Las
+agregaciones se hacen sobre esas columnas con NumPy si está instalado, o con
+el módulo estándar `array` en caso contrario.
+"""
+
+import csv
+import json
+from array import array
+from collections import Counter
+from datetime import date
+from typing import Any, Dict, List, Optional, Sequence
+
+import codificacion
+import gestor_datos
+import gestor_datos2
+import gestor_datos3
+import historico
+from modelos import a_entero
+
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional
+    np = None
+
+ESTADOS = ['prestado', 'atrasado', 'devuelto']
+SIN_FECHA = -1
+
+
+def _mes(fecha: Any) -> int:
+    """Convierte 'AAAA-MM-DD' al número de mes absoluto (año * 12 + mes - 1), o SIN_FECHA."""
+    texto = str(fecha or '')
+    if len(texto) >= 7 and texto[4] == '-':
+        try:
+            anio, mes = int(texto[:4]), int(texto[5:7])
+        except ValueError:
+            return SIN_FECHA
+        if 1 <= mes <= 12:
+            return anio * 12 + mes - 1
+    return SIN_FECHA
+
+
+def _ordinal(fecha: Any) -> int:
+    """Convierte 'AAAA-MM-DD' a su número ordinal de día, o SIN_FECHA."""
+    try:
+        return date.fromisoformat(str(fecha)).toordinal()
+    except ValueError:
+        return SIN_FECHA
+
+
+def _nombre_mes(mes: int) -> str:
+    return f"{mes // 12:04d}-{mes % 12 + 1:02d}"
+
+
+class ColumnasPrestamos:
+    """Préstamos cargados como columnas de enteros del mismo largo."""
+
+    __slots__ = ('libros', 'usuarios', 'estados', 'id_libro', 'id_usuario', 'estado', 'mes', 'vence')
+
+    def __init__(self) -> None:
+        self.libros = codificacion.Diccionario()
+        self.usuarios = codificacion.Diccionario()
+        self.estados = codificacion.Diccionario(ESTADOS)
+        self.id_libro = array('l')
+        self.id_usuario = array('l')
+        self.estado = array('l')
+        self.mes = array('l')
+        self.vence = array('l')
+
+    def agregar(self, prestamo: Dict[str, Any]) -> None:
+        """Agrega un préstamo (formato de almacenamiento) al final de las columnas."""
+        self.id_libro.append(self.libros.codigo(str(prestamo.get('id_libro', ''))))
+        self.id_usuario.append(self.usuarios.codigo(str(prestamo.get('id_usuario', ''))))
+        self.estado.append(self.estados.codigo(prestamo.get('estado') or 'prestado'))
+        self.mes.append(_mes(prestamo.get('fecha_prestamo')))
+        self.vence.append(_ordinal(prestamo.get('fecha_devolucion_esperada')))
+
+    def __len__(self) -> int:
+        return len(self.estado)
+
+
+def cargar_columnas(archivo_prestamo: str, incluir_archivados: bool = True) -> ColumnasPrestamos:
+    """
+    Carga los préstamos activos (y opcionalmente los archivados) en columnas.
+
+    Args:
+        archivo_prestamo (str): Ruta al archivo de préstamos activo.
+        incluir_archivados (bool): Si se recorren también las particiones del histórico.
+
+    Returns:
+        ColumnasPrestamos: Las columnas cargadas.
+    """
+    columnas = ColumnasPrestamos()
+    for prestamo in gestor_datos3.cargar_datos(archivo_prestamo, solo_lectura=True):
+        columnas.agregar(prestamo)
+    if incluir_archivados:
+        for prestamo in historico.iterar_archivados(archivo_prestamo):
+            columnas.agregar(prestamo)
+    return columnas
+
+
+# --- Operaciones vectorizadas (NumPy o array) ---
+
+def _vector(columna):
+    """Vista NumPy (sin copia) de una columna `array`; sin NumPy, la misma columna."""
+    if np is not None and isinstance(columna, array):
+        return np.frombuffer(columna, dtype=columna.typecode)
+    return columna
+
+
+def _contar(codigos: Sequence[int], total: int) -> List[int]:
+    """Cuenta las apariciones de cada código 0..total-1."""
+    if np is not None:
+        return np.bincount(_vector(codigos), minlength=total).tolist()
+    conteos = [0] * total
+    for codigo, cantidad in Counter(codigos).items():
+        conteos[codigo] = cantidad
+    return conteos
+
+
+def _seleccionar(codigos: Sequence[int], mascara: Sequence[bool]) -> Sequence[int]:
+    """Retorna los códigos cuya posición cumple la máscara."""
+    if np is not None:
+        return _vector(codigos)[mascara]
+    return array('l', (c for c, m in zip(codigos, mascara) if m))
+
+
+def _mascara_estado(columnas: ColumnasPrestamos, estados: Sequence[str]) -> Sequence[bool]:
+    codigos = [columnas.estados.codigo(e) for e in estados]
+    if np is not None:
+        return np.isin(_vector(columnas.estado), codigos)
+    buscados = set(codigos)
+    return [c in buscados for c in columnas.estado]
+
+
+def _mascara_atrasados(columnas: ColumnasPrestamos, hoy: date) -> Sequence[bool]:
+    """Préstamos marcados como atrasados o aún prestados con fecha vencida."""
+    atrasado = columnas.estados.codigo('atrasado')
+    prestado = columnas.estados.codigo('prestado')
+    limite = hoy.toordinal()
+    if np is not None:
+        estado = _vector(columnas.estado)
+        vence = _vector(columnas.vence)
+        return (estado == atrasado) | ((estado == prestado) & (vence != SIN_FECHA) & (vence < limite))
+    return [
+        e == atrasado or (e == prestado and v != SIN_FECHA and v < limite)
+        for e, v in zip(columnas.estado, columnas.vence)
+    ]
+
+
+def _top_k(conteos: List[int], k: int) -> List[int]:
+    """Índices de los k conteos más altos (empates por orden de aparición)."""
+    if np is not None:
+        return np.argsort(-np.asarray(conteos), kind='stable')[:k].tolist()
+    return sorted(range(len(conteos)), key=lambda i: -conteos[i])[:k]
+
+
+# --- Reportes ---
+
+def top_libros_prestados(columnas: ColumnasPrestamos, archivo_libro: str, k: int = 10) -> List[Dict[str, Any]]:
+    """
+    Retorna los k libros con más préstamos.
+
+    Args:
+        columnas (ColumnasPrestamos): Los préstamos cargados.
+        archivo_libro (str): Ruta al archivo de libros (para los títulos).
+        k (int): Cantidad de libros a retornar.
+
+    Returns:
+        List[Dict[str, Any]]: Filas con 'ISBN', 'nombre' y 'prestamos'.
+    """
+    nombres = {str(lb.get('ISBN')): lb.get('nombre')
+               for lb in gestor_datos2.cargar_datos(archivo_libro, solo_lectura=True)}
+    conteos = _contar(columnas.id_libro, len(columnas.libros))
+    filas = []
+    for codigo in _top_k(conteos, k):
+        if conteos[codigo] == 0:
+            break
+        isbn = columnas.libros.valor(codigo)
+        filas.append({'ISBN': isbn, 'nombre': nombres.get(isbn, 'Desconocido'), 'prestamos': conteos[codigo]})
+    return filas
+
+
+def _meses_relativos(columnas: ColumnasPrestamos):
+    """
+    Retorna (base, total, relativos): el primer mes, la cantidad de meses del
+    rango y la columna de meses relativa a 'base'. Los préstamos sin fecha van
+    al cubo extra 'total', que los reportes descartan.
+    """
+    if np is not None:
+        mes = _vector(columnas.mes)
+        con_fecha = mes != SIN_FECHA
+        if not con_fecha.any():
+            return 0, 0, None
+        base = int(mes[con_fecha].min())
+        total = int(mes[con_fecha].max()) - base + 1
+        return base, total, np.where(con_fecha, mes - base, total)
+
+    meses = [m for m in columnas.mes if m != SIN_FECHA]
+    if not meses:
+        return 0, 0, None
+    base = min(meses)
+    total = max(meses) - base + 1
+    return base, total, array('l', (m - base if m != SIN_FECHA else total for m in columnas.mes))
+
+
+def tasa_atraso_por_mes(columnas: ColumnasPrestamos, hoy: Optional[date] = None) -> List[Dict[str, Any]]:
+    """
+    Calcula, por mes de préstamo, cuántos préstamos se atrasaron.
+
+    Args:
+        columnas (ColumnasPrestamos): Los préstamos cargados.
+        hoy (Optional[date]): Fecha de referencia (por defecto, hoy).
+
+    Returns:
+        List[Dict[str, Any]]: Filas con 'mes', 'prestamos', 'atrasados' y 'tasa'.
+    """
+    base, total, relativos = _meses_relativos(columnas)
+    if relativos is None:
+        return []
+
+    por_mes = _contar(relativos, total + 1)
+    atrasados = _contar(_seleccionar(relativos, _mascara_atrasados(columnas, hoy or date.today())), total + 1)
+
+    filas = []
+    for i in range(total):
+        if por_mes[i]:
+            filas.append({
+                'mes': _nombre_mes(base + i),
+                'prestamos': por_mes[i],
+                'atrasados': atrasados[i],
+                'tasa': round(atrasados[i] / por_mes[i], 4),
+            })
+    return filas
+
+
+def prestamos_activos_por_usuario(columnas: ColumnasPrestamos, archivo_usuario: str) -> List[Dict[str, Any]]:
+    """
+    Cuenta los préstamos abiertos (prestados o atrasados) de cada usuario.
+
+    Args:
+        columnas (ColumnasPrestamos): Los préstamos cargados.
+        archivo_usuario (str): Ruta al archivo de usuarios (para los nombres).
+
+    Returns:
+        List[Dict[str, Any]]: Filas con 'documento', 'usuario' y 'activos', de mayor a menor.
+    """
+    nombres = {
+        str(u.get('documento')): f"{u.get('nombres')} {u.get('apellidos')}"
+        for u in gestor_datos.cargar_datos(archivo_usuario, solo_lectura=True)
+    }
+    abiertos = _mascara_estado(columnas, ['prestado', 'atrasado'])
+    conteos = _contar(_seleccionar(columnas.id_usuario, abiertos), len(columnas.usuarios))
+    filas = []
+    for codigo in _top_k(conteos, len(conteos)):
+        if conteos[codigo] == 0:
+            break
+        documento = columnas.usuarios.valor(codigo)
+        filas.append({
+            'documento': documento,
+            'usuario': nombres.get(documento, 'Desconocido'),
+            'activos': conteos[codigo],
+        })
+    return filas
+
+
+def rotacion_stock(columnas: ColumnasPrestamos, archivo_libro: str) -> List[Dict[str, Any]]:
+    """
+    Calcula la rotación de cada libro: préstamos totales por ejemplar.
+
+    Los ejemplares de un libro son su stock disponible más sus préstamos abiertos.
+
+    Args:
+        columnas (ColumnasPrestamos): Los préstamos cargados.
+        archivo_libro (str): Ruta al archivo de libros.
+
+    Returns:
+        List[Dict[str, Any]]: Filas con 'ISBN', 'nombre', 'prestamos', 'ejemplares' y 'rotacion'.
+    """
+    libros = gestor_datos2.cargar_datos(archivo_libro, solo_lectura=True)
+    # Los libros sin préstamos reciben código en una copia: las columnas no se modifican
+    codigos = codificacion.Diccionario(columnas.libros.valores)
+    for lb in libros:
+        codigos.codigo(str(lb.get('ISBN')))
+
+    total = len(codigos)
+    prestamos = _contar(columnas.id_libro, total)
+    abiertos = _contar(
+        _seleccionar(columnas.id_libro, _mascara_estado(columnas, ['prestado', 'atrasado'])), total
+    )
+
+    filas = []
+    for lb in libros:
+        codigo = codigos.codigo(str(lb.get('ISBN')))
+        ejemplares = a_entero(lb.get('stock')) + abiertos[codigo]
+        filas.append({
+            'ISBN': lb.get('ISBN'),
+            'nombre': lb.get('nombre'),
+            'prestamos': prestamos[codigo],
+            'ejemplares': ejemplares,
+            'rotacion': round(prestamos[codigo] / ejemplares, 4) if ejemplares else 0.0,
+        })
+    filas.sort(key=lambda f: -f['rotacion'])
+    return filas
+
+
+def exportar(filas: List[Dict[str, Any]], ruta: str) -> None:
+    """
+    Exporta las filas de un reporte a CSV o JSON según la extensión del archivo.
+
+    Args:
+        filas (List[Dict[str, Any]]): Las filas del reporte.
+        ruta (str): Ruta de salida ('.csv' o '.json').
+    """
+    if ruta.endswith('.csv'):
+        campos = list(filas[0].keys()) if filas else []
+        with open(ruta, mode='w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=campos)
+            writer.writeheader()
+            writer.writerows(filas)
+    elif ruta.endswith('.json'):
+        with open(ruta, mode='w', encoding='utf-8') as f:
+            json.dump(filas, f, indent=4, ensure_ascii=False)
+    else:
+        raise ValueError(f"Formato de exportación no soportado: {ruta}")
@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+Módulo de Reservas.
+
+Cuando un libro no tiene stock, el usuario queda en una cola de espera para ese
+ISBN. Al devolverse un ejemplar, se asigna directamente a la siguiente reserva.
+
+Cada cola es un montículo (heap) de (prioridad, id_reserva): menor prioridad se
+atiende primero y, a igual prioridad, por orden de llegada. El archivo guarda
+las colas ya en orden de montículo, así que tomar la siguiente reserva cuesta
+O(log n) sin reordenar nada. Las colas leídas quedan en memoria mientras el
+archivo no cambie (misma fecha de modificación y tamaño).
+"""
+
+import heapq
+import json
+import os
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+import cerrojo
+import codec_json
+import vigilante
+
+NOMBRE_ARCHIVO = 'reserva.json'
+
+# Índices de cada entrada de la cola: [prioridad, id_reserva, id_usuario, fecha]
+PRIORIDAD, ID_RESERVA, ID_USUARIO, FECHA = range(4)
+
+# Reservas leídas por archivo, con la firma que tenía el archivo al leerlas
+_LEIDAS: Dict[str, Tuple[Tuple[int, int], Dict[str, Any]]] = {}
+
+
+def ruta_reservas(archivo_prestamo: str) -> str:
+    """
+    Retorna la ruta del archivo de reservas, junto al archivo de préstamos.
+
+    Args:
+        archivo_prestamo (str): Ruta al archivo de préstamos.
+
+    Returns:
+        str: Ruta del archivo de reservas.
+    """
+    return os.path.join(os.path.dirname(archivo_prestamo), NOMBRE_ARCHIVO)
+
+
+def _cargar(filepath: str) -> Dict[str, Any]:
+    ruta = os.path.abspath(filepath)
+    firma = vigilante.firma(filepath)
+    leidas = _LEIDAS.get(ruta)
+    if leidas is not None and leidas[0] == firma != (-1, -1):
+        return leidas[1]
+
+    datos = {}
+    if os.path.exists(filepath):
+        try:
+            with open(filepath, mode='r', encoding='utf-8') as f:
+                datos = json.load(f)
+        except json.JSONDecodeError:
+            datos = {}
+    datos.setdefault('ultimo_id', 0)
+    datos.setdefault('colas', {})
+    _LEIDAS[ruta] = (firma, datos)
+    return datos
+
+
+def _guardar(filepath: str, datos: Dict[str, Any]) -> None:
+    ruta = os.path.abspath(filepath)
+    try:
+        codec_json.escribir_atomico(filepath, datos)
+    except OSError:
+        # Las colas en memoria ya tienen el cambio que no se pudo escribir
+        _LEIDAS.pop(ruta, None)
+        raise
+    _LEIDAS[ruta] = (vigilante.firma(filepath), datos)
+
+
+def _a_dict(id_libro: str, entrada: List[Any]) -> Dict[str, Any]:
+    return {
+        'id_reserva': entrada[ID_RESERVA],
+        'id_usuario': entrada[ID_USUARIO],
+        'id_libro': id_libro,
+        'fecha_reserva': entrada[FECHA],
+        'prioridad': entrada[PRIORIDAD],
+    }
+
+
+@cerrojo.exclusivo
+def reservar(filepath: str, id_usuario: str, id_libro: str, prioridad: int = 0) -> Optional[Dict[str, Any]]:
+    """
+    Agrega un usuario a la cola de espera de un libro.
+
+    Args:
+        filepath (str): Ruta al archivo de reservas.
+        id_usuario (str): Documento del usuario.
+        id_libro (str): ISBN del libro.
+        prioridad (int): Prioridad de la reserva (menor se atiende antes).
+
+    Returns:
+        Optional[Dict[str, Any]]: La reserva creada, o None si el usuario ya esperaba ese libro.
+    """
+    datos = _cargar(filepath)
+    cola = datos['colas'].setdefault(str(id_libro), [])
+    if any(entrada[ID_USUARIO] == str(id_usuario) for entrada in cola):
+        return None
+
+    datos['ultimo_id'] += 1
+    entrada = [prioridad, datos['ultimo_id'], str(id_usuario), date.today().isoformat()]
+    heapq.heappush(cola, entrada)
+    _guardar(filepath, datos)
+    return _a_dict(str(id_libro), entrada)
+
+
+@cerrojo.exclusivo
+def tomar_siguiente(filepath: str, id_libro: str) -> Optional[Dict[str, Any]]:
+    """
+    Saca de la cola la siguiente reserva de un libro.
+
+    Args:
+        filepath (str): Ruta al archivo de reservas.
+        id_libro (str): ISBN del libro.
+
+    Returns:
+        Optional[Dict[str, Any]]: La reserva atendida, o None si nadie esperaba el libro.
+    """
+    datos = _cargar(filepath)
+    cola = datos['colas'].get(str(id_libro))
+    if not cola:
+        return None
+
+    entrada = heapq.heappop(cola)
+    if not cola:
+        del datos['colas'][str(id_libro)]
+    _guardar(filepath, datos)
+    return _a_dict(str(id_libro), entrada)
+
+
+def reservas_de_libro(filepath: str, id_libro: str) -> List[Dict[str, Any]]:
+    """
+    Lista las reservas pendientes de un libro, en el orden en que se atenderán.
+
+    Args:
+        filepath (str): Ruta al archivo de reservas.
+        id_libro (str): ISBN del libro.
+
+    Returns:
+        List[Dict[str, Any]]: Las reservas pendientes.
+    """
+    cola = _cargar(filepath)['colas'].get(str(id_libro), [])
+    return [_a_dict(str(id_libro), entrada) for entrada in sorted(cola)]
+
+
+def reservas_de_usuario(filepath: str, id_usuario: str) -> List[Dict[str, Any]]:
+    """
+    Lista las reservas pendientes de un usuario, con su posición en cada cola.
+
+    Args:
+        filepath (str): Ruta al archivo de reservas.
+        id_usuario (str): Documento del usuario.
+
+    Returns:
+        List[Dict[str, Any]]: Las reservas del usuario, con la clave adicional 'posicion' (1 = siguiente).
+    """
+    resultado = []
+    for id_libro, cola in _cargar(filepath)['colas'].items():
+        for entrada in cola:
+            if entrada[ID_USUARIO] == str(id_usuario):
+                reserva = _a_dict(id_libro, entrada)
+                reserva['posicion'] = 1 + sum(1 for otra in cola if otra < entrada)
+                resultado.append(reserva)
+    return resultado
+
+
+@cerrojo.exclusivo
+def cancelar(filepath: str, id_usuario: Optional[str] = None, id_libro: Optional[str] = None) -> int:
+    """
+    Quita las reservas de un usuario, de un libro, o las de ese usuario para ese libro.
+
+    Se usa al eliminar usuarios o libros, para no dejar reservas que apunten a
+    registros inexistentes.
+
+    Args:
+        filepath (str): Ruta al archivo de reservas.
+        id_usuario (Optional[str]): Documento del usuario.
+        id_libro (Optional[str]): ISBN del libro.
+
+    Returns:
+        int: La cantidad de reservas quitadas.
+    """
+    if not os.path.exists(filepath):
+        return 0
+    datos = _cargar(filepath)
+    quitadas = 0
+    for libro_cola in list(datos['colas']):
+        if id_libro is not None and libro_cola != str(id_libro):
+            continue
+        cola = datos['colas'][libro_cola]
+        quedan = [e for e in cola if id_usuario is not None and e[ID_USUARIO] != str(id_usuario)]
+        quitadas += len(cola) - len(quedan)
+        if quedan:
+            heapq.heapify(quedan)
+            datos['colas'][libro_cola] = quedan
+        else:
+            del datos['colas'][libro_cola]
+    if quitadas:
+        _guardar(filepath, datos)
+    return quitadas
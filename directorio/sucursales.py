@@ -0,0 +1,299 @@
+# -*- coding: utf-8 -*-
+"""
+Módulo de Sucursales.
+
+Reparte los libros y los préstamos entre las sucursales de la biblioteca: cada
+una tiene su propia carpeta de datos (libros, préstamos y todos sus archivos
+asociados: ejemplares, reservas, multas, histórico, auditoría...). El registro
+de usuarios es uno solo, en la carpeta de datos principal, y lo comparten todas.
+
+La carpeta de datos principal es la sucursal 'principal'; las demás viven en
+subcarpetas 'sucursal_<id>' y se declaran en 'sucursales.json'. Un libro se
+ubica por el ID de su sucursal o, si la biblioteca reparte el catálogo por
+ISBN ("reparto": "isbn"), por un hash estable del ISBN.
+
+Las consultas de varias sucursales se hacen en paralelo (un hilo por sucursal)
+y se combinan en una sola lista, marcando cada fila con su sucursal.
+"""
+
+import json
+import os
+import re
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import cerrojo
+import codec_json
+import gestor_datos2  # libros
+import integridad
+import prestamos
+
+NOMBRE_ARCHIVO = 'sucursales.json'
+PRINCIPAL = 'principal'
+PREFIJO_CARPETA = 'sucursal_'
+
+# Reparto de los libros entre sucursales.
+POR_SUCURSAL = 'sucursal'
+POR_ISBN = 'isbn'
+
+# Nombre de archivo de cada entidad dentro de la carpeta de una sucursal.
+ARCHIVOS = {
+    'usuarios': 'usuario',
+    'libros': 'libro',
+    'prestamos': 'prestamo',
+}
+
+_ID_VALIDO = re.compile(r'^[A-Za-z0-9_-]+$')
+
+
+def _cargar(directorio: str) -> Dict[str, Any]:
+    ruta = os.path.join(directorio, NOMBRE_ARCHIVO)
+    datos: Dict[str, Any] = {}
+    if os.path.exists(ruta):
+        try:
+            with open(ruta, mode='r', encoding='utf-8') as f:
+                datos = json.load(f)
+        except json.JSONDecodeError:
+            datos = {}
+    datos.setdefault('sucursales', [])
+    datos.setdefault('reparto', POR_SUCURSAL)
+    return datos
+
+
+def _guardar(directorio: str, datos: Dict[str, Any]) -> None:
+    codec_json.escribir_atomico(os.path.join(directorio, NOMBRE_ARCHIVO), datos, indent=2)
+
+
+def listar(directorio: str) -> List[str]:
+    """
+    Lista los IDs de las sucursales, empezando por la principal.
+
+    Args:
+        directorio (str): Carpeta de datos principal.
+
+    Returns:
+        List[str]: Los IDs de las sucursales.
+    """
+    return [PRINCIPAL] + [s for s in _cargar(directorio)['sucursales'] if s != PRINCIPAL]
+
+
+def reparto(directorio: str) -> str:
+    """Retorna cómo se reparten los libros: POR_SUCURSAL o POR_ISBN."""
+    return _cargar(directorio)['reparto']
+
+
+def agregar(directorio: str, id_sucursal: str, modo_reparto: Optional[str] = None) -> str:
+    """
+    Declara una sucursal nueva y crea su carpeta de datos.
+
+    Args:
+        directorio (str): Carpeta de datos principal.
+        id_sucursal (str): ID de la sucursal (letras, números, '-' o '_').
+        modo_reparto (Optional[str]): Si se indica, cambia el reparto de los libros.
+
+    Returns:
+        str: La carpeta de datos de la sucursal.
+
+    Raises:
+        ValueError: Si el ID o el reparto no son válidos.
+    """
+    if not _ID_VALIDO.match(id_sucursal or ''):
+        raise ValueError(f"ID de sucursal no válido: {id_sucursal!r}")
+    if modo_reparto not in (None, POR_SUCURSAL, POR_ISBN):
+        raise ValueError(f"Reparto no válido: {modo_reparto!r}")
+
+    with cerrojo.bloquear(os.path.join(directorio, NOMBRE_ARCHIVO)):
+        datos = _cargar(directorio)
+        if id_sucursal != PRINCIPAL and id_sucursal not in datos['sucursales']:
+            datos['sucursales'].append(id_sucursal)
+        if modo_reparto:
+            datos['reparto'] = modo_reparto
+        _guardar(directorio, datos)
+
+    carpeta = carpeta_sucursal(directorio, id_sucursal)
+    os.makedirs(carpeta, exist_ok=True)
+    return carpeta
+
+
+def carpeta_sucursal(directorio: str, id_sucursal: str) -> str:
+    """
+    Retorna la carpeta de datos de una sucursal.
+
+    Args:
+        directorio (str): Carpeta de datos principal.
+        id_sucursal (str): ID de la sucursal.
+
+    Returns:
+        str: La carpeta principal para 'principal', o 'sucursal_<id>' dentro de ella.
+    """
+    if id_sucursal == PRINCIPAL:
+        return directorio
+    return os.path.join(directorio, PREFIJO_CARPETA + id_sucursal)
+
+
+def sucursal_de_isbn(directorio: str, isbn: Any) -> str:
+    """
+    Retorna la sucursal que guarda un ISBN cuando el catálogo se reparte por ISBN.
+
+    Usa CRC-32 (y no `hash`, que cambia entre ejecuciones) para que el mismo
+    ISBN caiga siempre en la misma sucursal.
+
+    Args:
+        directorio (str): Carpeta de datos principal.
+        isbn (Any): ISBN del libro.
+
+    Returns:
+        str: El ID de la sucursal.
+    """
+    ids = listar(directorio)
+    return ids[zlib.crc32(str(isbn).encode('utf-8')) % len(ids)]
+
+
+def archivos(directorio: str, id_sucursal: Optional[str] = None, isbn: Any = None,
+             extension: str = '.json') -> Dict[str, str]:
+    """
+    Retorna las rutas de usuarios, libros y préstamos para una sucursal.
+
+    Args:
+        directorio (str): Carpeta de datos principal.
+        id_sucursal (Optional[str]): ID de la sucursal; si no se indica, se
+            ubica por el ISBN (o es la principal).
+        isbn (Any): ISBN del libro, para ubicar su sucursal.
+        extension (str): Formato de los archivos de libros y préstamos.
+
+    Returns:
+        Dict[str, str]: Ruta de cada entidad ('usuarios' siempre es la compartida).
+    """
+    if id_sucursal is None:
+        id_sucursal = sucursal_de_isbn(directorio, isbn) if isbn is not None else PRINCIPAL
+    carpeta = carpeta_sucursal(directorio, id_sucursal)
+    return {
+        'usuarios': os.path.join(directorio, ARCHIVOS['usuarios'] + '.json'),
+        'libros': os.path.join(carpeta, ARCHIVOS['libros'] + extension),
+        'prestamos': os.path.join(carpeta, ARCHIVOS['prestamos'] + extension),
+    }
+
+
+def en_paralelo(
+        directorio: str,
+        consulta: Callable[[Dict[str, str]], Any],
+        ids: Optional[Sequence[str]] = None,
+) -> Dict[str, Any]:
+    """
+    Ejecuta una consulta en varias sucursales a la vez.
+
+    Args:
+        directorio (str): Carpeta de datos principal.
+        consulta (Callable[[Dict[str, str]], Any]): Recibe las rutas de una sucursal.
+        ids (Optional[Sequence[str]]): Sucursales a consultar (todas por defecto).
+
+    Returns:
+        Dict[str, Any]: El resultado de cada sucursal, en el orden de `ids`.
+    """
+    ids = list(ids) if ids is not None else listar(directorio)
+    with ThreadPoolExecutor(max_workers=max(len(ids), 1)) as hilos:
+        futuros = {s: hilos.submit(consulta, archivos(directorio, s)) for s in ids}
+        return {s: futuro.result() for s, futuro in futuros.items()}
+
+
+def combinar(resultados: Dict[str, Optional[List[Dict[str, Any]]]]) -> List[Dict[str, Any]]:
+    """
+    Une las filas de varias sucursales y marca cada una con su sucursal.
+
+    Args:
+        resultados (Dict[str, Optional[List[Dict[str, Any]]]]): Filas por sucursal.
+
+    Returns:
+        List[Dict[str, Any]]: Todas las filas, sucursal por sucursal.
+    """
+    return [dict(fila, sucursal=id_sucursal) for id_sucursal, filas in resultados.items() for fila in filas or ()]
+
+
+def _existe(rutas: Dict[str, str]) -> bool:
+    return os.path.exists(rutas['prestamos'])
+
+
+def listar_prestamos(directorio: str) -> List[Dict[str, Any]]:
+    """Lista los préstamos activos de todas las sucursales (ver `prestamos.listar_prestamos`)."""
+    return combinar(en_paralelo(directorio, lambda r: prestamos.listar_prestamos(
+        r['prestamos'], r['usuarios'], r['libros']) if _existe(r) else []))
+
+
+def listar_devoluciones(directorio: str, desde: Optional[str] = None,
+                        hasta: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Lista las devoluciones de todas las sucursales (ver `prestamos.listar_devoluciones`)."""
+    return combinar(en_paralelo(directorio, lambda r: prestamos.listar_devoluciones(
+        r['prestamos'], r['usuarios'], r['libros'], desde, hasta) if _existe(r) else []))
+
+
+def prestamos_por_vencer(directorio: str, dias: int = 7, hoy: Optional[date] = None) -> List[Dict[str, Any]]:
+    """
+    Lista los préstamos por vencer de todas las sucursales, en orden de vencimiento.
+
+    Args:
+        directorio (str): Carpeta de datos principal.
+        dias (int): Días hacia adelante.
+        hoy (Optional[date]): Fecha de referencia (hoy por defecto).
+
+    Returns:
+        List[Dict[str, Any]]: Los préstamos, con su sucursal.
+    """
+    filas = combinar(en_paralelo(directorio, lambda r: prestamos.prestamos_por_vencer(
+        r['prestamos'], dias, hoy) if _existe(r) else []))
+    filas.sort(key=lambda p: str(p.get('fecha_devolucion_esperada')))
+    return filas
+
+
+def buscar_libro(directorio: str, isbn: Any) -> Optional[Dict[str, Any]]:
+    """
+    Busca un libro por ISBN en la sucursal que le corresponde o en todas.
+
+    Con el catálogo repartido por ISBN solo se lee una sucursal; si no, se
+    consultan todas en paralelo.
+
+    Args:
+        directorio (str): Carpeta de datos principal.
+        isbn (Any): ISBN del libro.
+
+    Returns:
+        Optional[Dict[str, Any]]: El libro con su sucursal, o None si no existe.
+    """
+    def consulta(rutas: Dict[str, str]) -> List[Dict[str, Any]]:
+        if not os.path.exists(rutas['libros']):
+            return []
+        return [lb for lb in gestor_datos2.cargar_datos(rutas['libros']) if str(lb.get('ISBN')) == str(isbn)]
+
+    ids = [sucursal_de_isbn(directorio, isbn)] if reparto(directorio) == POR_ISBN else None
+    return next(iter(combinar(en_paralelo(directorio, consulta, ids))), None)
+
+
+def antes_de_eliminar_usuario(directorio: str, documento: str, modo: str = integridad.RESTRINGIR) -> int:
+    """
+    Aplica la regla de integridad de un usuario en todas las sucursales.
+
+    Como el registro de usuarios es compartido, un usuario solo puede borrarse
+    si ninguna sucursal tiene préstamos suyos sin devolver (o, en cascada, se
+    eliminan los de todas). En modo restringido se revisan todas antes de tocar nada.
+
+    Args:
+        directorio (str): Carpeta de datos principal.
+        documento (str): Documento del usuario.
+        modo (str): integridad.RESTRINGIR o integridad.CASCADA.
+
+    Returns:
+        int: La cantidad de préstamos eliminados en cascada.
+
+    Raises:
+        integridad.IntegridadError: Si el modo es RESTRINGIR y alguna sucursal tiene préstamos pendientes.
+    """
+    if modo == integridad.RESTRINGIR:
+        pendientes = combinar(en_paralelo(directorio, lambda r: [
+            p for p in integridad.prestamos_que_referencian(r['prestamos'], 'usuario', documento)
+            if p.get('estado') != 'devuelto'] if _existe(r) else []))
+        if pendientes:
+            raise integridad.IntegridadError('usuario', documento, pendientes)
+    resultados = en_paralelo(directorio, lambda r: integridad.antes_de_eliminar(
+        r['prestamos'], r['libros'], 'usuario', documento, modo) if _existe(r) else 0)
+    return sum(resultados.values())
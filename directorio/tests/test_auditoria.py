@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+import shutil
+from directorio import prestamos, historico
+
+# 'prestamos' importa 'auditoria' sin el paquete: se usa esa misma instancia
+auditoria = prestamos.auditoria
+
+CARPETA_TEMP = os.path.join(os.getcwd(), "tests", "temp_data", "auditoria_prueba")
+
+
+def preparar():
+    shutil.rmtree(CARPETA_TEMP, ignore_errors=True)
+    os.makedirs(CARPETA_TEMP)
+    rutas = {}
+    for nombre, datos in (
+        ("usuarios", [{"documento": "1", "nombres": "Yeimy", "apellidos": "Bayona"}]),
+        ("libros", [{"ISBN": "100", "nombre": "Python Básico", "autor": "Guido", "stock": "2"}]),
+        ("prestamos", []),
+    ):
+        rutas[nombre] = os.path.join(CARPETA_TEMP, nombre + ".json")
+        with open(rutas[nombre], "w", encoding="utf-8") as f:
+            json.dump(datos, f)
+    return rutas
+
+
+def teardown_function():
+    shutil.rmtree(CARPETA_TEMP, ignore_errors=True)
+
+
+def test_prestamo_y_devolucion_quedan_auditados():
+    rutas = preparar()
+    auditoria.configurar(actor="bibliotecaria")
+    nuevo = prestamos.realizar_prestamo(rutas["prestamos"], rutas["usuarios"], rutas["libros"], "1", "100")
+    prestado = list(auditoria.eventos(rutas["prestamos"]))[-1]["ts"]
+    prestamos.registrar_devolucion(rutas["prestamos"], rutas["libros"], nuevo["id_prestamo"])
+    auditoria.configurar()
+
+    trazas = list(auditoria.eventos(rutas["prestamos"]))
+    assert [(e["tipo"], e["anterior"], e["nuevo"] if e["tipo"] != "prestamo" else None) for e in trazas] == [
+        ("stock", 2, 1), ("prestamo", None, None), ("devolucion", "prestado", "devuelto"), ("stock", 1, 2),
+    ]
+    assert {e["actor"] for e in trazas[:2]} == {"bibliotecaria"}
+    assert trazas[2]["fecha_devolucion"]
+
+    # El histórico guarda la fecha de devolución
+    assert next(historico.iterar_archivados(rutas["prestamos"]))["fecha_devolucion"] == trazas[2]["fecha_devolucion"]
+
+    # A la hora del préstamo: stock 1 y el préstamo activo; antes de todo, el stock inicial
+    assert auditoria.stock_en(rutas["libros"], "100", prestado) == 1
+    assert [p["id_prestamo"] for p in auditoria.prestamos_en(rutas["prestamos"], prestado)] == [nuevo["id_prestamo"]]
+    assert auditoria.stock_en(rutas["libros"], "100", "2000-01-01") == 2
+    assert auditoria.prestamos_en(rutas["prestamos"], trazas[-1]["ts"]) == []
+
+
+def test_consulta_parte_del_ultimo_punto_de_control(monkeypatch):
+    rutas = preparar()
+    monkeypatch.setattr(auditoria, "TAMANO_SEGMENTO", 1024)
+    momentos = []
+    for stock in range(40):
+        momentos.append(auditoria.registrar(rutas["libros"], auditoria.STOCK, "100", stock, stock + 1)["ts"])
+    auditoria.registrar_stock(rutas["libros"], "200", 7, 6)
+
+    carpeta = auditoria.carpeta_auditoria(rutas["libros"])
+    with open(os.path.join(carpeta, "indice.json"), encoding="utf-8") as f:
+        segmentos = json.load(f)["segmentos"]
+    assert len(segmentos) >= 2
+
+    # Sin los segmentos ya cubiertos por un punto de control, la consulta sigue funcionando
+    for segmento in segmentos[:-1]:
+        os.remove(os.path.join(carpeta, f"segmento_{segmento['numero']:06d}.jsonl.gz"))
+    assert auditoria.stock_en(rutas["libros"], "100", momentos[-1]) == 40
+    assert auditoria.stock_en(rutas["libros"], "100", segmentos[-1]["hasta"]) == momentos.index(segmentos[-1]["hasta"]) + 1
+    # '200' cambió después de todos esos momentos: antes tenía su stock anterior
+    assert auditoria.stock_en(rutas["libros"], "200", momentos[-1]) == 7
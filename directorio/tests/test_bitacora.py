@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+from directorio import gestor_datos2, libro
+
+# Los gestores importan 'bitacora' sin el paquete: se usa esa misma instancia
+bitacora = gestor_datos2.bitacora
+
+LIBROS = [
+    {"id": "1", "ISBN": "111", "nombre": "Cien años", "autor": "García", "stock": "3"},
+    {"id": "2", "ISBN": "222", "nombre": "Rayuela", "autor": "Cortázar", "stock": "1"},
+]
+
+
+def lineas(ruta):
+    with open(ruta, encoding="utf-8") as f:
+        return f.read().splitlines()
+
+
+def test_cada_cambio_anexa_solo_sus_operaciones(tmp_path):
+    ruta = os.path.join(tmp_path, "libros_bitacora.log")
+    gestor_datos2.guardar_datos(ruta, LIBROS)
+    assert lineas(ruta) == []
+
+    libro.crear_libro(ruta, 333, "Ficciones", "Borges", 5)
+    libro.actualizar_libro(ruta, "111", {"stock": 2})
+    libro.eliminar_libro(ruta, "222")
+    assert len(lineas(ruta)) == 3
+
+    datos = gestor_datos2.cargar_datos(ruta)
+    gestor_datos2.sumar_stock(ruta, datos, dict(datos[0], stock="1"), -1)
+    assert '"op": "sumar"' in lineas(ruta)[-1]
+
+    assert [(r["ISBN"], r["stock"]) for r in bitacora.leer(ruta, "ISBN")] == [("111", "1"), ("333", "5")]
+
+
+def test_compactar_no_repite_operaciones(tmp_path):
+    ruta = os.path.join(tmp_path, "libros_compactar.log")
+    gestor_datos2.guardar_datos(ruta, LIBROS)
+    bitacora.anotar(ruta, "ISBN", sumas=[("111", "stock", -1), ("111", "stock", -1)])
+    copia = os.path.join(tmp_path, "libros_compactar_copia.log")
+    shutil.copy(ruta, copia)
+
+    assert bitacora.compactar(ruta, "ISBN")
+    assert lineas(ruta) == []
+    assert bitacora.leer(ruta, "ISBN")[0]["stock"] == "1"
+
+    # Una compactación interrumpida deja la bitácora vieja: sus operaciones ya están en la instantánea
+    shutil.move(copia, ruta + ".compactando")
+    assert bitacora.leer(ruta, "ISBN")[0]["stock"] == "1"
+    bitacora.anotar(ruta, "ISBN", sumas=[("111", "stock", 4)])
+    assert bitacora.compactar(ruta, "ISBN")
+    assert not os.path.exists(ruta + ".compactando")
+    assert bitacora.leer(ruta, "ISBN")[0]["stock"] == "5"
+
+
+def test_compactacion_en_segundo_plano_al_pasar_el_umbral(tmp_path, monkeypatch):
+    ruta = os.path.join(tmp_path, "libros_umbral.log")
+    monkeypatch.setattr(bitacora, "UMBRAL_COMPACTACION", 512)
+    gestor_datos2.guardar_datos(ruta, LIBROS)
+    for i in range(20):
+        bitacora.anotar(ruta, "ISBN", [dict(LIBROS[1], stock=str(i))])
+    bitacora.esperar_compactaciones()
+
+    assert len(lineas(ruta)) < 20
+    assert os.path.exists(bitacora.ruta_instantanea(ruta))
+    assert bitacora.leer(ruta, "ISBN")[1]["stock"] == "19"
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+from directorio import usuario
+
+# 'usuario' importa 'busqueda_usuarios' sin el paquete: se usa esa misma instancia
+busqueda_usuarios = usuario.busqueda_usuarios
+
+
+def crear_archivo_temp(carpeta, nombre, datos):
+    ruta = os.path.join(carpeta, nombre)
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(datos, f, indent=4, ensure_ascii=False)
+    return ruta
+
+
+def preparar(carpeta):
+    return crear_archivo_temp(carpeta, "busqueda_usuarios.json", [
+        {"id": "1", "documento": "10", "nombres": "Laura", "apellidos": "Pérez", "email": "laura@correo.com"},
+        {"id": "2", "documento": "20", "nombres": "José", "apellidos": "Núñez", "email": "jnunez@correo.com"},
+        {"id": "3", "documento": "30", "nombres": "Lorena", "apellidos": "Paz", "email": "lpaz@correo.com"},
+    ])
+
+
+def documentos(resultados):
+    return [u["documento"] for u in resultados]
+
+
+def test_tolera_tildes_mayusculas_y_errores(tmp_path):
+    ruta = preparar(tmp_path)
+
+    assert documentos(usuario.buscar_usuarios(ruta, "NUNEZ"))[0] == "20"
+    assert documentos(usuario.buscar_usuarios(ruta, "Laura Peres"))[0] == "10"
+    assert documentos(usuario.buscar_usuarios(ruta, "lpaz@correo"))[0] == "30"
+    assert usuario.buscar_usuarios(ruta, "Núñez")[0]["similitud"] == 1.0
+    assert usuario.buscar_usuarios(ruta, "zzzz") == []
+    assert len(usuario.buscar_usuarios(ruta, "correo", k=2)) == 2
+
+
+def test_indice_se_actualiza_con_crear_actualizar_y_eliminar(tmp_path):
+    ruta = preparar(tmp_path)
+    usuario.buscar_usuarios(ruta, "Laura")
+    indice = busqueda_usuarios.vigente(ruta)
+    assert indice is not None
+
+    usuario.crear_usuario(ruta, 40, "Andrés", "Gómez", "agomez@correo.com")
+    assert documentos(usuario.buscar_usuarios(ruta, "andres gomez"))[0] == "40"
+
+    usuario.actualizar_usuario(ruta, "40", {"documento": "41", "apellidos": "Gámez"})
+    assert documentos(usuario.buscar_usuarios(ruta, "andres gamez"))[0] == "41"
+    assert "40" not in indice.usuarios
+
+    usuario.eliminar_usuario(ruta, "41")
+    assert "41" not in documentos(usuario.buscar_usuarios(ruta, "andres"))
+
+    # Todos los cambios se aplicaron sobre el mismo índice, sin reconstruirlo
+    assert busqueda_usuarios.vigente(ruta) is indice
+
+
+def test_cambio_externo_reconstruye_el_indice(tmp_path):
+    ruta = preparar(tmp_path)
+    indice = busqueda_usuarios.de_archivo(ruta)
+    crear_archivo_temp(tmp_path, "busqueda_usuarios.json", [
+        {"id": "1", "documento": "50", "nombres": "Marta", "apellidos": "Ríos", "email": "mrios@correo.com"},
+    ])
+    assert documentos(usuario.buscar_usuarios(ruta, "marta rios")) == ["50"]
+    assert busqueda_usuarios.vigente(ruta) is not indice
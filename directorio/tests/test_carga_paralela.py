@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+import os
+import csv
+import json
+from directorio import carga_paralela, gestor_datos
+
+# Los gestores importan 'escritura_diferida' sin el paquete: se usa esa misma instancia
+escritura_diferida = gestor_datos.escritura_diferida
+
+CARPETA_TEMP = os.path.join(os.getcwd(), "tests", "temp_data")
+os.makedirs(CARPETA_TEMP, exist_ok=True)
+
+
+def crear_json_temporal(nombre, datos):
+    ruta = os.path.join(CARPETA_TEMP, nombre)
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(datos, f, indent=4, ensure_ascii=False)
+    return ruta
+
+
+def eliminar_archivo(filepath):
+    if os.path.exists(filepath):
+        os.remove(filepath)
+
+
+def test_cargar_en_paralelo():
+    archivo_usuarios = crear_json_temporal("usuarios_paralelo.json", [{"id": "1", "documento": "10", "nombres": "Ana"}])
+    archivo_libros = crear_json_temporal("libros_paralelo.json", [{"id": "1", "ISBN": "100", "stock": "4"}])
+    archivo_prestamos = crear_json_temporal("prestamos_paralelo.json", [{"id_prestamo": 1, "id_libro": "100"}])
+
+    datos = carga_paralela.cargar_en_paralelo({
+        "usuarios": archivo_usuarios, "libros": archivo_libros, "prestamos": archivo_prestamos,
+    })
+    assert datos["usuarios"][0]["documento"] == "10"
+    assert datos["libros"][0]["stock"] == "4"
+    assert datos["prestamos"][0]["id_libro"] == "100"
+
+    for ruta in (archivo_usuarios, archivo_libros, archivo_prestamos):
+        eliminar_archivo(ruta)
+
+
+def test_cargar_csv_en_trozos_conserva_orden():
+    ruta = os.path.join(CARPETA_TEMP, "libros_trozos.csv")
+    with open(ruta, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=["id", "ISBN", "nombre", "autor", "stock"])
+        writer.writeheader()
+        for i in range(500):
+            writer.writerow({"id": i, "ISBN": 1000 + i, "nombre": f"Libro {i}", "autor": "Autor", "stock": i % 5})
+
+    filas = carga_paralela.cargar_csv_paralelo(ruta, partes=4)
+
+    assert len(filas) == 500
+    assert [f["id"] for f in filas] == [str(i) for i in range(500)]
+
+    eliminar_archivo(ruta)
+
+
+def test_archivo_grande_con_escrituras_pendientes_no_va_a_otro_proceso(monkeypatch):
+    archivo_usuarios = crear_json_temporal("usuarios_pendientes.json", [{"id": "1", "documento": "10", "nombres": "Ana"}])
+    monkeypatch.setattr(carga_paralela, "UMBRAL_PROCESO", 1)
+    # Con 'spawn' (Windows, macOS) otro proceso no ve lo pendiente: no se debe crear ninguno
+    monkeypatch.setattr(carga_paralela, "ProcessPoolExecutor", None)
+    escritura_diferida.activar(intervalo_ms=60_000, max_operaciones=1_000)
+    try:
+        gestor_datos.guardar_datos(archivo_usuarios, [{"id": "1", "documento": "20", "nombres": "Ana"}])
+        datos = carga_paralela.cargar_en_paralelo({"usuarios": archivo_usuarios})
+        assert datos["usuarios"][0]["documento"] == "20"
+    finally:
+        escritura_diferida.desactivar()
+    eliminar_archivo(archivo_usuarios)
+
+
+def test_lo_cargado_en_otro_proceso_queda_en_la_cache(monkeypatch):
+    vigilante = gestor_datos.vigilante
+    archivo_libros = crear_json_temporal("libros_precarga.json", [{"id": "1", "ISBN": "100", "stock": "4"}])
+    monkeypatch.setattr(carga_paralela, "UMBRAL_PROCESO", 1)
+    vigilante.activar(CARPETA_TEMP, intervalo=0.05)
+    try:
+        carga_paralela.precargar({"libros": archivo_libros, "prestamos": os.path.join(CARPETA_TEMP, "no_existe.json")})
+        assert vigilante.leer_cache(archivo_libros) == [{"id": "1", "ISBN": "100", "stock": "4"}]
+    finally:
+        vigilante.desactivar()
+    eliminar_archivo(archivo_libros)
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+from directorio import codec_json
+
+CARPETA_TEMP = os.path.join(os.getcwd(), "tests", "temp_data")
+os.makedirs(CARPETA_TEMP, exist_ok=True)
+
+
+def leer_texto(filepath):
+    with open(filepath, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def test_escritura_compacta_por_trozos(monkeypatch):
+    filepath = os.path.join(CARPETA_TEMP, "codec_compacto.json")
+    monkeypatch.setattr(codec_json, "TAMANO_TROZO", 2)
+    datos = [{"id": str(i), "nombre": "Año"} for i in range(5)]
+
+    codec_json.escribir(filepath, datos)
+
+    texto = leer_texto(filepath)
+    assert "\n" not in texto and ", " not in texto
+    assert json.loads(texto) == datos
+    assert codec_json.leer(filepath) == datos
+    os.remove(filepath)
+
+
+def test_escritura_bonita_y_biblioteca_estandar():
+    filepath = os.path.join(CARPETA_TEMP, "codec_bonito.json")
+    codec_json.configurar(acelerado=False)
+    try:
+        codec_json.escribir(filepath, [{"id": "1"}], bonito=True)
+        assert leer_texto(filepath).startswith("[\n    {")
+        assert codec_json.leer(filepath) == [{"id": "1"}]
+
+        codec_json.escribir(filepath, {"formato": "diccionario"})
+        assert codec_json.leer(filepath) == {"formato": "diccionario"}
+    finally:
+        codec_json.configurar(acelerado=True)
+        os.remove(filepath)
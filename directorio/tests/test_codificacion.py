@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+from directorio import codificacion, codec_json, gestor_datos3
+
+CARPETA_TEMP = os.path.join(os.getcwd(), "tests", "temp_data")
+os.makedirs(CARPETA_TEMP, exist_ok=True)
+
+
+def eliminar_archivo(filepath):
+    if os.path.exists(filepath):
+        os.remove(filepath)
+
+
+def test_codificar_y_decodificar():
+    datos = [
+        {"id_prestamo": 1, "estado": "prestado"},
+        {"id_prestamo": 2, "estado": "devuelto"},
+        {"id_prestamo": 3, "estado": "prestado"},
+    ]
+    documento = codificacion.codificar(datos, ["estado"])
+
+    assert documento["diccionarios"]["estado"] == ["prestado", "devuelto"]
+    assert [r["estado"] for r in documento["registros"]] == [0, 1, 0]
+
+    decodificados = codificacion.decodificar(json.loads(json.dumps(documento)))
+    assert decodificados == datos
+    assert decodificados[0]["estado"] is decodificados[2]["estado"]
+
+
+def test_gestor_guarda_codificado_sobre_el_umbral():
+    filepath = os.path.join(CARPETA_TEMP, "prestamos_codificados.json")
+    datos = [
+        {"id_prestamo": i, "id_usuario": "1", "id_libro": "100",
+         "fecha_prestamo": "2025-01-01", "fecha_devolucion_esperada": "2025-01-15",
+         "estado": "devuelto"}
+        for i in range(1, gestor_datos3.UMBRAL_CODIFICACION + 1)
+    ]
+    gestor_datos3.guardar_datos(filepath, datos)
+
+    with open(filepath, encoding="utf-8") as f:
+        assert codificacion.es_codificado(json.load(f))
+
+    cargados = gestor_datos3.cargar_datos(filepath)
+    assert cargados == datos
+    assert cargados[0]["estado"] is cargados[-1]["estado"]
+    assert list(codec_json.iterar(filepath)) == datos
+
+    eliminar_archivo(filepath)
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+import os
+import gzip
+import json
+import shutil
+import pytest
+from directorio import gestor_datos3
+
+# Los gestores importan 'compresion' y 'codec_json' sin el paquete: se usan esas mismas instancias
+compresion = gestor_datos3.compresion
+codec_json = gestor_datos3.codec_json
+
+CARPETA_TEMP = os.path.join(os.getcwd(), "tests", "temp_data", "compresion_prueba")
+os.makedirs(CARPETA_TEMP, exist_ok=True)
+
+PRESTAMOS = [
+    {"id_prestamo": str(i), "id_usuario": "1", "id_libro": "100", "fecha_prestamo": "2025-03-01",
+     "fecha_devolucion_esperada": "2025-03-15", "estado": "prestado", "id_ejemplar": ""}
+    for i in range(1, 6)
+]
+
+
+def teardown_module():
+    shutil.rmtree(CARPETA_TEMP, ignore_errors=True)
+
+
+@pytest.mark.parametrize("extension, codec", [(".gz", "gzip"), (".bz2", "bz2"), (".xz", "lzma")])
+def test_gestor_por_extension(extension, codec):
+    for formato in (".json", ".csv"):
+        filepath = os.path.join(CARPETA_TEMP, "prestamo" + formato + extension)
+        gestor_datos3._escribir(filepath, PRESTAMOS)
+
+        assert compresion.formato(filepath) == formato
+        assert compresion.detectar(filepath) == codec
+        assert gestor_datos3._leer(filepath) == PRESTAMOS
+        assert gestor_datos3.buscar_registro(filepath, "3")["id_prestamo"] == "3"
+        os.remove(filepath)
+
+
+def test_configuracion_por_entidad_conserva_el_nombre():
+    filepath = os.path.join(CARPETA_TEMP, "prestamo.json")
+    compresion.configurar(por_entidad={"prestamo": "gzip"})
+    try:
+        gestor_datos3._escribir(filepath, PRESTAMOS)
+        with gzip.open(filepath, "rt", encoding="utf-8") as f:
+            assert json.load(f) == PRESTAMOS
+    finally:
+        compresion.configurar(por_entidad={"prestamo": "ninguno"})
+
+    # Lo escrito comprimido se sigue leyendo aunque la configuración cambie
+    assert gestor_datos3._leer(filepath) == PRESTAMOS
+    gestor_datos3._escribir(filepath, PRESTAMOS)
+    assert not compresion.comprimido(filepath)
+    os.remove(filepath)
+
+    with pytest.raises(ValueError):
+        compresion.configurar(codec="zip")
+
+
+def test_lectura_incremental_por_trozos(monkeypatch):
+    filepath = os.path.join(CARPETA_TEMP, "numeros.json.gz")
+    monkeypatch.setattr(codec_json, "TAMANO_LECTURA", 7)
+    datos = [12345, {"nombre": "Año", "lista": [1, 2]}, "texto, con ]", 6789]
+    with gzip.open(filepath, "wt", encoding="utf-8") as f:
+        f.write(" [ " + " ,\n ".join(json.dumps(d, ensure_ascii=False) for d in datos) + " ] ")
+
+    assert list(codec_json.iterar(filepath)) == datos
+    codec_json.configurar(acelerado=False)
+    try:
+        assert codec_json.leer(filepath) == datos
+        with gzip.open(filepath, "wt", encoding="utf-8") as f:
+            f.write('[{"id": 1}, {"id": ')
+        with pytest.raises(json.JSONDecodeError):
+            codec_json.leer(filepath)
+    finally:
+        codec_json.configurar(acelerado=True)
+    os.remove(filepath)
+
+
+def test_medir_compara_cada_codec():
+    filepath = os.path.join(CARPETA_TEMP, "prestamo_medir.json")
+    codec_json.escribir(filepath, PRESTAMOS * 50)
+    resultados = compresion.medir(filepath, repeticiones=1)
+    os.remove(filepath)
+
+    assert [r["codec"] for r in resultados] == ["ninguno", "gzip", "bz2", "lzma"]
+    assert resultados[0]["proporcion"] == 1.0
+    assert all(r["proporcion"] < 1 and r["guardar_ms"] >= 0 and r["cargar_ms"] >= 0 for r in resultados[1:])
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+import shutil
+from directorio import ejemplares, prestamos, gestor_datos3
+
+gestor_datos2 = prestamos.gestor_datos2
+
+CARPETA_TEMP = os.path.join(os.getcwd(), "tests", "temp_data", "ejemplares")
+
+
+def crear_json_temporal(nombre, datos):
+    os.makedirs(CARPETA_TEMP, exist_ok=True)
+    ruta = os.path.join(CARPETA_TEMP, nombre)
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(datos, f, indent=4, ensure_ascii=False)
+    return ruta
+
+
+def test_prestar_y_devolver_ejemplares():
+    archivo = os.path.join(CARPETA_TEMP, "libro_ejemplares.json")
+    os.makedirs(CARPETA_TEMP, exist_ok=True)
+
+    primero = ejemplares.prestar(archivo, "100", stock_libro=2)
+    segundo = ejemplares.prestar(archivo, "100", stock_libro=1)
+    assert {primero, segundo} == {"100#1", "100#2"}
+
+    ejemplares.devolver(archivo, "100", primero)
+    estados = {e["id_ejemplar"]: e["estado"] for e in ejemplares.listar(archivo, "100")}
+    assert estados == {primero: "disponible", segundo: "prestado"}
+
+    ejemplares.sincronizar_stock(archivo, "100", 0)
+    assert ejemplares.cargar(archivo)["100"].disponibles() == 0
+
+    shutil.rmtree(CARPETA_TEMP, ignore_errors=True)
+
+
+def test_prestamo_referencia_ejemplar():
+    archivo_usuarios = crear_json_temporal("usuarios.json", [{"documento": "1", "nombres": "Ana", "apellidos": "Ruiz"}])
+    archivo_libros = crear_json_temporal("libros.json", [{"ISBN": "100", "nombre": "Hamlet", "stock": "1"}])
+    archivo_prestamos = crear_json_temporal("prestamos.json", [])
+
+    nuevo = prestamos.realizar_prestamo(archivo_prestamos, archivo_usuarios, archivo_libros, "1", "100")
+    assert nuevo["id_ejemplar"] == "100#1"
+    assert gestor_datos3.cargar_datos(archivo_prestamos)[0]["id_ejemplar"] == "100#1"
+
+    prestamos.registrar_devolucion(archivo_prestamos, archivo_libros, str(nuevo["id_prestamo"]))
+    assert ejemplares.listar(ejemplares.ruta_ejemplares(archivo_libros), "100")[0]["estado"] == "disponible"
+
+    shutil.rmtree(CARPETA_TEMP, ignore_errors=True)
+
+
+def test_prestar_y_devolver_sobrescriben_solo_su_isbn():
+    archivo = os.path.join(CARPETA_TEMP, "libro_ejemplares.json")
+    os.makedirs(CARPETA_TEMP, exist_ok=True)
+    # Archivo en una sola línea: la primera escritura lo pasa a un ISBN por línea
+    with open(archivo, "w", encoding="utf-8") as f:
+        json.dump({"100": "DD", "200": "PP"}, f)
+
+    primero = ejemplares.prestar(archivo, "100", stock_libro=2)
+    inodo = os.stat(archivo).st_ino
+    assert ejemplares.prestar(archivo, "100", stock_libro=1) != primero
+    ejemplares.devolver(archivo, "100", primero)
+    assert os.stat(archivo).st_ino == inodo
+    with open(archivo, encoding="utf-8") as f:
+        assert json.load(f) == {"100": "PD" if primero == "100#2" else "DP", "200": "PP"}
+
+    # Lo leído se reutiliza mientras el archivo no cambie; un cambio de otro lado se vuelve a leer
+    assert ejemplares.cargar(archivo) is ejemplares.cargar(archivo)
+    with open(archivo, "w", encoding="utf-8") as f:
+        json.dump({"100": "DDD", "200": "PP"}, f)
+    assert ejemplares.cargar(archivo)["100"].disponibles() == 3
+
+    # Sin ejemplares libres no se presta, diga lo que diga el stock del libro
+    assert ejemplares.prestar(archivo, "200", stock_libro=1) is None
+    assert ejemplares.stock(archivo, "200", 1) == 0
+    assert ejemplares.stock(archivo, "300", 4) == 4
+
+    shutil.rmtree(CARPETA_TEMP, ignore_errors=True)
+
+
+def test_stock_del_libro_sale_de_los_ejemplares():
+    archivo_usuarios = crear_json_temporal("usuarios.json", [{"documento": "1", "nombres": "Ana", "apellidos": "Ruiz"}])
+    archivo_libros = crear_json_temporal("libros.json", [{"ISBN": "100", "nombre": "Hamlet", "stock": "2"}])
+    archivo_prestamos = crear_json_temporal("prestamos.json", [])
+
+    assert prestamos.realizar_prestamo(archivo_prestamos, archivo_usuarios, archivo_libros, "1", "100")
+    assert gestor_datos2.cargar_datos(archivo_libros)[0]["stock"] == "1"
+
+    # Un stock del libro que no cuadra con los ejemplares no permite prestar de más
+    crear_json_temporal("libros.json", [{"ISBN": "100", "nombre": "Hamlet", "stock": "5"}])
+    assert prestamos.realizar_prestamo(archivo_prestamos, archivo_usuarios, archivo_libros, "1", "100")
+    assert gestor_datos2.cargar_datos(archivo_libros)[0]["stock"] == "0"
+    assert prestamos.realizar_prestamo(archivo_prestamos, archivo_usuarios, archivo_libros, "1", "100",
+                                       reservar_si_agotado=False) is None
+
+    shutil.rmtree(CARPETA_TEMP, ignore_errors=True)
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+import subprocess
+import sys
+import pytest
+from directorio import usuario, gestor_datos, prestamos
+
+# Los módulos de negocio importan 'escritura_diferida' y los gestores sin el paquete: se usan esas mismas instancias
+escritura_diferida = gestor_datos.escritura_diferida
+gestor_usuarios = usuario.gestor_datos
+gestor_libros = prestamos.gestor_datos2
+gestor_prestamos = prestamos.gestor_datos3
+
+DIRECTORIO_CODIGO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CARPETA_TEMP = os.path.join(os.getcwd(), "tests", "temp_data")
+os.makedirs(CARPETA_TEMP, exist_ok=True)
+
+
+def crear_archivo_temp(nombre, datos):
+    ruta = os.path.join(CARPETA_TEMP, nombre)
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(datos, f, indent=4, ensure_ascii=False)
+    return ruta
+
+
+def leer_json(filepath):
+    with open(filepath, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def eliminar_archivo(filepath):
+    if os.path.exists(filepath):
+        os.remove(filepath)
+
+
+def test_escritura_diferida_y_vaciado():
+    filepath = crear_archivo_temp("usuarios_diferidos.json", [])
+    diario = escritura_diferida.ruta_diario(CARPETA_TEMP)
+    escritura_diferida.activar(intervalo_ms=60_000, max_operaciones=1_000)
+    try:
+        gestor_usuarios.guardar_datos(filepath, [{"id": "1", "documento": "10"}])
+        gestor_usuarios.guardar_datos(filepath, [{"id": "1", "documento": "10"}, {"id": "2", "documento": "20"}])
+
+        # Todavía en memoria: el archivo no cambió, pero la lectura ya lo ve
+        assert leer_json(filepath) == []
+        assert [u["documento"] for u in gestor_datos.cargar_datos(filepath)] == ["10", "20"]
+
+        escritura_diferida.vaciar()
+        assert [u["documento"] for u in leer_json(filepath)] == ["10", "20"]
+        assert not os.path.exists(diario)
+
+    finally:
+        escritura_diferida.desactivar()
+
+    eliminar_archivo(filepath)
+    eliminar_archivo(os.path.join(CARPETA_TEMP, ".cerrojo"))
+
+
+def test_error_al_vaciar_conserva_lo_pendiente(monkeypatch):
+    filepath = crear_archivo_temp("usuarios_error.json", [])
+    diario = escritura_diferida.ruta_diario(CARPETA_TEMP)
+    escritor = escritura_diferida.activar(intervalo_ms=60_000, max_operaciones=1_000)
+    escribir = gestor_usuarios._escribir
+    try:
+        def fallar(ruta, datos):
+            raise OSError("disco lleno")
+
+        monkeypatch.setattr(gestor_usuarios, "_escribir", fallar)
+        gestor_usuarios.guardar_datos(filepath, [{"id": "1", "documento": "10"}])
+        with pytest.raises(OSError):
+            escritor.vaciar()
+        escritor._vaciar_con_cerrojo()  # el hilo de vaciado registra el error y sigue
+
+        # Nada se perdió: sigue pendiente y el diario se conserva
+        assert [u["documento"] for u in gestor_datos.cargar_datos(filepath)] == ["10"]
+        assert os.path.exists(diario)
+
+        monkeypatch.setattr(gestor_usuarios, "_escribir", escribir)
+        gestor_usuarios.guardar_datos(filepath, [{"id": "1", "documento": "10"}, {"id": "2", "documento": "20"}])
+        escritor.vaciar()
+        assert [u["documento"] for u in leer_json(filepath)] == ["10", "20"]
+        assert not os.path.exists(diario)
+    finally:
+        escritura_diferida.desactivar()
+
+    eliminar_archivo(filepath)
+    eliminar_archivo(os.path.join(CARPETA_TEMP, ".cerrojo"))
+
+
+def test_aplicar_diario_pendiente(tmp_path):
+    filepath = str(tmp_path / "usuarios_diario.json")
+    with open(filepath, "w", encoding="utf-8") as f:
+        json.dump([
+            {"id": "1", "documento": "10", "nombres": "Ana", "apellidos": "Ruiz", "email": "a@x.com"},
+            {"id": "2", "documento": "20", "nombres": "Luis", "apellidos": "Mora", "email": "l@x.com"},
+        ], f)
+    diario = escritura_diferida.ruta_diario(str(tmp_path))
+    with open(diario, "w", encoding="utf-8") as f:
+        f.write(json.dumps({
+            "archivo": "usuarios_diario.json", "gestor": "gestor_datos", "clave": "documento",
+            "cambiados": [{"id": "1", "documento": "10", "nombres": "Ana", "apellidos": "Ruiz", "email": "nuevo@x.com"}],
+            "eliminados": ["20"],
+        }) + "\n")
+        f.write('{"archivo": "incompleta')
+
+    assert escritura_diferida.aplicar_diario(str(tmp_path)) == 1
+
+    datos = leer_json(filepath)
+    assert [(u["documento"], u["email"]) for u in datos] == [("10", "nuevo@x.com")]
+    assert not os.path.exists(diario)
+
+
+def test_operaciones_con_cerrojo_quedan_pendientes_hasta_vaciar(tmp_path):
+    rutas = {nombre: str(tmp_path / f"{nombre}.json") for nombre in ("usuarios", "libros", "prestamos")}
+    for nombre, datos in (
+        ("usuarios", []),
+        ("libros", [{"ISBN": "100", "nombre": "Python Básico", "autor": "Guido", "stock": "0"}]),
+        ("prestamos", [{"id_prestamo": 1, "id_usuario": "30", "id_libro": "100", "fecha_prestamo": "2025-02-01",
+                        "fecha_devolucion_esperada": "2099-01-01", "estado": "prestado", "id_ejemplar": ""}]),
+    ):
+        with open(rutas[nombre], "w", encoding="utf-8") as f:
+            json.dump(datos, f)
+
+    escritura_diferida.activar(intervalo_ms=60_000, max_operaciones=1_000)
+    try:
+        usuario.crear_usuario(rutas["usuarios"], 30, "Ana", "Ruiz", "ana@example.com")
+        prestamos.registrar_devolucion(rutas["prestamos"], rutas["libros"], 1, rutas["usuarios"])
+
+        # El cerrojo ya se soltó, pero ningún otro proceso lo tomó: los archivos no cambian
+        assert leer_json(rutas["usuarios"]) == []
+        assert leer_json(rutas["libros"])[0]["stock"] == "0"
+        assert [p["id_prestamo"] for p in leer_json(rutas["prestamos"])] == [1]
+        assert [u["documento"] for u in gestor_usuarios.cargar_datos(rutas["usuarios"])] == ["30"]
+        assert gestor_prestamos.cargar_datos(rutas["prestamos"]) == []
+
+        escritura_diferida.vaciar()
+        assert [u["documento"] for u in leer_json(rutas["usuarios"])] == ["30"]
+        assert leer_json(rutas["libros"])[0]["stock"] == "1"
+        assert leer_json(rutas["prestamos"]) == []
+        assert not os.path.exists(escritura_diferida.ruta_diario(str(tmp_path)))
+    finally:
+        escritura_diferida.desactivar()
+
+
+def test_otro_proceso_aplica_lo_pendiente_al_tomar_el_cerrojo(tmp_path):
+    filepath = str(tmp_path / "usuarios.json")
+    with open(filepath, "w", encoding="utf-8") as f:
+        json.dump([], f)
+
+    escritura_diferida.activar(intervalo_ms=60_000, max_operaciones=1_000)
+    try:
+        usuario.crear_usuario(filepath, 30, "Ana", "Ruiz", "ana@example.com")
+        assert leer_json(filepath) == []
+
+        # Otro proceso toma el cerrojo de la carpeta: antes de usarla aplica el diario
+        subprocess.run(
+            [sys.executable, "-c", f"import cerrojo\nwith cerrojo.bloquear({filepath!r}):\n    pass"],
+            cwd=DIRECTORIO_CODIGO, check=True,
+        )
+        assert [u["documento"] for u in leer_json(filepath)] == ["30"]
+        assert not os.path.exists(escritura_diferida.ruta_diario(str(tmp_path)))
+
+        # Este proceso descarta lo suyo (ya escrito) y sigue difiriendo las operaciones siguientes
+        assert escritura_diferida.leer_pendiente(filepath) is None
+        usuario.crear_usuario(filepath, 40, "Luis", "Mora", "luis@example.com")
+        assert [u["documento"] for u in leer_json(filepath)] == ["30"]
+        assert [u["documento"] for u in gestor_usuarios.cargar_datos(filepath)] == ["30", "40"]
+    finally:
+        escritura_diferida.desactivar()
+    assert [u["documento"] for u in leer_json(filepath)] == ["30", "40"]
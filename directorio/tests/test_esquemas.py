@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+from directorio import esquemas, gestor_datos2
+
+CARPETA_TEMP = os.path.join(os.getcwd(), "tests", "temp_data")
+os.makedirs(CARPETA_TEMP, exist_ok=True)
+
+
+def crear_archivo_temp(nombre, datos):
+    ruta = os.path.join(CARPETA_TEMP, nombre)
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(datos, f, indent=4, ensure_ascii=False)
+    return ruta
+
+
+def test_validar_recolecta_errores_y_convierte():
+    resultado = esquemas.validar("libro", [
+        {"id": 1, "ISBN": " 111 ", "nombre": "Rayuela", "autor": "Cortázar", "stock": 3},
+        {"id": "x", "ISBN": "12a", "nombre": "", "autor": "", "stock": "-1"},
+        {"id": "3", "ISBN": "333", "nombre": "Ficciones"},
+        {"id": "4", "ISBN": "0-306-40615-x", "nombre": "ISBN-10 con X"},
+    ])
+
+    assert resultado.validos == [
+        {"id": "1", "ISBN": "111", "nombre": "Rayuela", "autor": "Cortázar", "stock": "3"},
+        {"id": "3", "ISBN": "333", "nombre": "Ficciones", "autor": "", "stock": ""},
+        {"id": "4", "ISBN": "030640615X", "nombre": "ISBN-10 con X", "autor": "", "stock": ""},
+    ]
+    # Todos los errores de la fila 2, no solo el primero
+    assert [(e["fila"], e["campo"]) for e in resultado.errores] == [
+        (2, "id"), (2, "ISBN"), (2, "stock"),
+    ]
+
+    prestamos = esquemas.validar("prestamo", [
+        {"id_prestamo": "7", "id_usuario": "10", "id_libro": "111", "fecha_prestamo": "2025-02-30",
+         "estado": "perdido"},
+    ])
+    assert [e["campo"] for e in prestamos.errores] == ["fecha_prestamo", "estado"]
+
+
+def test_importar_valida_y_guarda_como_las_operaciones_normales(tmp_path):
+    ejemplares, auditoria = esquemas.ejemplares, esquemas.auditoria
+    destino = str(tmp_path / "libro.json")
+    origen = str(tmp_path / "importar.json")
+    for ruta, datos in (
+        (destino, [{"id": "1", "ISBN": "111", "nombre": "Rayuela", "autor": "Cortázar", "stock": "1"}]),
+        (origen, [
+            {"id": "1", "ISBN": "111", "nombre": "Rayuela", "autor": "Cortázar", "stock": "4"},
+            {"id": "2", "ISBN": "222", "nombre": "Ficciones", "autor": "Borges", "stock": "2"},
+            {"id": "3", "ISBN": "222", "nombre": "Repetido", "autor": "Borges", "stock": "2"},
+            {"id": "4", "ISBN": "abc", "nombre": "Malo", "autor": "X", "stock": "1"},
+        ]),
+    ):
+        with open(ruta, "w", encoding="utf-8") as f:
+            json.dump(datos, f)
+    archivo_ejemplares = ejemplares.ruta_ejemplares(destino)
+    assert ejemplares.prestar(archivo_ejemplares, "111", 1) == "111#1"
+
+    resultado = esquemas.importar("libro", origen, destino)
+
+    assert [e["fila"] for e in resultado.errores] == [3, 4]
+    libros = gestor_datos2.cargar_datos(destino)
+    assert [(lb["ISBN"], lb["stock"]) for lb in libros] == [("111", "4"), ("222", "2")]
+    # Igual que al crear o modificar un libro: auditoría y ejemplares al día
+    assert [(e["clave"], e["anterior"], e["nuevo"]) for e in auditoria.eventos(destino)] == [
+        ("111", 1, 4), ("222", None, 2),
+    ]
+    assert ejemplares.stock(archivo_ejemplares, "111", 0) == 4
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+import os
+import pytest
+from directorio import estres
+
+
+def test_carga_concurrente_respeta_invariantes(tmp_path):
+    # Como la aplicación: escritura diferida y vigilante activos en cada proceso
+    reporte = estres.ejecutar(str(tmp_path / "datos"), procesos=2, operaciones=25, semilla=7)
+
+    assert reporte["modo"] == "app"
+    assert reporte["violaciones"] == []
+    assert reporte["operaciones"] == 50
+    assert sum(sum(conteo.values()) for conteo in reporte["resultados"].values()) == 50
+    assert set(reporte["latencias_ms"]["prestar"]) == {"p50", "p90", "p99", "max"}
+    assert not os.path.exists(tmp_path / "datos" / ".diferido.jsonl")
+
+
+def test_verificar_y_comparar_detectan_problemas(tmp_path):
+    rutas = estres.preparar(str(tmp_path / "datos"), usuarios=1, libros=1, stock=2)
+    assert estres.verificar(rutas, {"9001": 2}) == []
+    assert "!= 3 ejemplares" in estres.verificar(rutas, {"9001": 3})[0]
+
+    assert estres.percentiles([5, 1, 3, 2, 4]) == {"p50": 3, "p90": 5, "p99": 5, "max": 5}
+    anterior = {"rendimiento": 100.0, "latencias_ms": {"prestar": {"p90": 10.0}}}
+    assert estres.comparar({"rendimiento": 90.0, "latencias_ms": {"prestar": {"p90": 12.0}}}, anterior) == []
+    assert len(estres.comparar({"rendimiento": 40.0, "latencias_ms": {"prestar": {"p90": 20.0}}}, anterior)) == 2
+
+
+def test_preparar_no_borra_una_carpeta_ajena(tmp_path):
+    ajena = tmp_path / "data"
+    ajena.mkdir()
+    (ajena / "usuario.json").write_text("[]", encoding="utf-8")
+    with pytest.raises(ValueError):
+        estres.preparar(str(ajena))
+    assert (ajena / "usuario.json").exists()
+
+    # Una carpeta de una prueba anterior sí se vuelve a preparar
+    rutas = estres.preparar(str(tmp_path / "datos"), usuarios=1, libros=1)
+    estres.preparar(str(tmp_path / "datos"), usuarios=2, libros=1)
+    assert len(estres.gestor_datos.cargar_datos(rutas["usuarios"])) == 2
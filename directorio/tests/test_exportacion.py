@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+import os
+import csv
+import json
+import shutil
+import pytest
+from directorio import auditoria, exportacion, historico
+
+CARPETA_TEMP = os.path.join(os.getcwd(), "tests", "temp_data", "exportacion_prueba")
+
+
+def prestamo(id_prestamo, fecha, estado="prestado"):
+    return {"id_prestamo": id_prestamo, "id_usuario": "1", "id_libro": "100", "fecha_prestamo": fecha,
+            "fecha_devolucion_esperada": "", "estado": estado, "id_ejemplar": ""}
+
+
+def preparar():
+    shutil.rmtree(CARPETA_TEMP, ignore_errors=True)
+    os.makedirs(CARPETA_TEMP)
+    rutas = {}
+    for nombre, datos in (
+        ("usuarios", [{"documento": "1", "nombres": "Yeimy", "apellidos": "Bayona"}]),
+        ("libros", [{"ISBN": "100", "nombre": "Python Básico", "stock": "2"}]),
+        ("prestamos", [prestamo(2, "2025-02-10"), prestamo(3, "2025-03-05", "atrasado")]),
+    ):
+        rutas[nombre] = os.path.join(CARPETA_TEMP, nombre + ".json")
+        with open(rutas[nombre], "w", encoding="utf-8") as f:
+            json.dump(datos, f)
+    historico.archivar(rutas["prestamos"], [dict(prestamo(1, "2025-01-20", "devuelto"), fecha_devolucion="2025-01-25")])
+    return rutas
+
+
+def exportar(rutas, salida, **opciones):
+    return exportacion.exportar_prestamos(rutas["prestamos"], rutas["usuarios"], rutas["libros"],
+                                          os.path.join(CARPETA_TEMP, salida), **opciones)
+
+
+def teardown_function():
+    shutil.rmtree(CARPETA_TEMP, ignore_errors=True)
+
+
+def test_formatos_y_filtros(monkeypatch):
+    rutas = preparar()
+
+    assert exportar(rutas, "todo.csv") == 3
+    with open(os.path.join(CARPETA_TEMP, "todo.csv"), encoding="utf-8") as f:
+        filas = list(csv.DictReader(f))
+    assert [f["id_prestamo"] for f in filas] == ["2", "3", "1"]
+    assert filas[0]["usuario"] == "Yeimy Bayona" and filas[0]["libro"] == "Python Básico"
+    assert filas[2]["fecha_devolucion"] == "2025-01-25"
+
+    assert exportar(rutas, "febrero.jsonl", desde="2025-02-01", hasta="2025-02-28") == 1
+    assert exportar(rutas, "atrasados.jsonl", estados=["atrasado"]) == 1
+    with open(os.path.join(CARPETA_TEMP, "atrasados.jsonl"), encoding="utf-8") as f:
+        assert json.loads(f.readline())["id_prestamo"] == 3
+
+    monkeypatch.setattr(exportacion, "FILAS_POR_BLOQUE", 2)
+    assert exportar(rutas, "todo.colz") == 3
+    ruta = os.path.join(CARPETA_TEMP, "todo.colz")
+    bloques = list(exportacion.leer_columnar(ruta, ["id_prestamo", "estado"]))
+    assert [b["id_prestamo"] for b in bloques] == [[2, 3], [1]]
+    assert set(bloques[0]) == {"id_prestamo", "estado"}
+    assert [f["libro"] for f in exportacion.filas_columnar(ruta)] == ["Python Básico"] * 3
+
+
+def test_exportacion_incremental_con_marca_de_agua():
+    rutas = preparar()
+    assert exportar(rutas, "incremental.jsonl", incremental=True) == 3
+    assert exportar(rutas, "incremental.jsonl", incremental=True) == 0
+
+    # Un préstamo nuevo y la devolución del préstamo 2
+    with open(rutas["prestamos"], "w", encoding="utf-8") as f:
+        json.dump([prestamo(3, "2025-03-05", "atrasado"), prestamo(4, "2025-04-01")], f)
+    historico.archivar(rutas["prestamos"], [dict(prestamo(2, "2025-02-10", "devuelto"), fecha_devolucion="2025-04-02")])
+
+    assert exportar(rutas, "incremental.jsonl", incremental=True) == 2
+    with open(os.path.join(CARPETA_TEMP, "incremental.jsonl"), encoding="utf-8") as f:
+        filas = [json.loads(linea) for linea in f]
+    assert [(f["id_prestamo"], f["estado"]) for f in filas[3:]] == [(4, "prestado"), (2, "devuelto")]
+
+
+def test_exportacion_incremental_repite_los_prestamos_cambiados():
+    rutas = preparar()
+    assert exportar(rutas, "incremental.jsonl", incremental=True) == 3
+
+    # El préstamo 2 (ID por debajo de la marca) pasa a atrasado
+    with open(rutas["prestamos"], "w", encoding="utf-8") as f:
+        json.dump([prestamo(2, "2025-02-10", "atrasado"), prestamo(3, "2025-03-05", "atrasado")], f)
+    auditoria.registrar(rutas["prestamos"], auditoria.ESTADO, 2, "prestado", "atrasado")
+
+    assert exportar(rutas, "incremental.jsonl", incremental=True) == 1
+    with open(os.path.join(CARPETA_TEMP, "incremental.jsonl"), encoding="utf-8") as f:
+        filas = [json.loads(linea) for linea in f]
+    assert (filas[-1]["id_prestamo"], filas[-1]["estado"]) == (2, "atrasado")
+    assert exportar(rutas, "incremental.jsonl", incremental=True) == 0
+
+
+def test_exportacion_completa_poda_particiones_y_solo_sin_filtros_deja_la_marca_al_dia():
+    rutas = preparar()
+    salida = os.path.join(CARPETA_TEMP, "salida.jsonl")
+    # Una partición fuera del rango pedido ni se abre
+    particion = os.path.join(historico.carpeta_archivo(rutas["prestamos"]), "2025-01.jsonl")
+    with open(particion, encoding="utf-8") as f:
+        contenido = f.read()
+    with open(particion, "a", encoding="utf-8") as f:
+        f.write("no es JSON\n")
+    assert exportar(rutas, "salida.jsonl", desde="2025-03-01") == 1
+    # Con filtros la marca no se mueve
+    assert not os.path.exists(exportacion.ruta_marca(salida))
+
+    with open(particion, "w", encoding="utf-8") as f:
+        f.write(contenido)
+    assert exportar(rutas, "salida.jsonl") == 3
+    # Lo ya exportado sin filtros no se repite en la siguiente exportación incremental
+    assert exportar(rutas, "salida.jsonl", incremental=True) == 0
+
+
+def test_exportacion_incremental_no_admite_filtros():
+    rutas = preparar()
+    with pytest.raises(ValueError):
+        exportar(rutas, "incremental.jsonl", estados=["atrasado"], incremental=True)
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+import shutil
+from directorio import historico, prestamos, gestor_datos3, ejemplares
+
+CARPETA_TEMP = os.path.join(os.getcwd(), "tests", "temp_data")
+os.makedirs(CARPETA_TEMP, exist_ok=True)
+
+
+def crear_json_temporal(nombre, datos):
+    ruta = os.path.join(CARPETA_TEMP, nombre)
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(datos, f, indent=4, ensure_ascii=False)
+    return ruta
+
+
+def eliminar_archivo(filepath):
+    if os.path.exists(filepath):
+        os.remove(filepath)
+    shutil.rmtree(historico.carpeta_archivo(filepath), ignore_errors=True)
+
+
+def teardown_module():
+    # Archivos que las operaciones crean junto a los datos de la carpeta
+    for nombre in ("multa.json", ".cerrojo"):
+        eliminar_archivo(os.path.join(CARPETA_TEMP, nombre))
+    shutil.rmtree(os.path.join(CARPETA_TEMP, "auditoria"), ignore_errors=True)
+
+
+def test_archivar_devueltos_por_mes():
+    archivo = crear_json_temporal("prestamos_historico.json", [
+        {"id_prestamo": 1, "id_usuario": "1", "id_libro": "100", "fecha_prestamo": "2025-01-05", "estado": "devuelto"},
+        {"id_prestamo": 2, "id_usuario": "1", "id_libro": "100", "fecha_prestamo": "2025-02-07", "estado": "devuelto"},
+        {"id_prestamo": 3, "id_usuario": "1", "id_libro": "100", "fecha_prestamo": "2025-02-09", "estado": "prestado"},
+    ])
+
+    assert prestamos.archivar_devueltos(archivo) == 2
+
+    activos = gestor_datos3.cargar_datos(archivo)
+    assert [p["id_prestamo"] for p in activos] == [3]
+    assert historico.periodos(archivo) == ["2025-01", "2025-02"]
+    assert historico.ultimo_id(archivo) == 2
+
+    solo_febrero = list(historico.iterar_archivados(archivo, desde="2025-02"))
+    assert [p["id_prestamo"] for p in solo_febrero] == [2]
+
+    eliminar_archivo(archivo)
+
+
+def test_archivar_devueltos_no_repite_lo_ya_archivado():
+    devuelto = {"id_prestamo": 1, "id_usuario": "1", "id_libro": "100", "fecha_prestamo": "2025-01-05",
+                "estado": "devuelto"}
+    archivo = crear_json_temporal("prestamos_reintento.json", [devuelto])
+    # Una ejecución anterior archivó y se cortó antes de reescribir el archivo activo
+    historico.archivar(archivo, [devuelto])
+
+    assert prestamos.archivar_devueltos(archivo) == 1
+    assert gestor_datos3.cargar_datos(archivo) == []
+    assert [p["id_prestamo"] for p in historico.iterar_archivados(archivo)] == [1]
+
+    eliminar_archivo(archivo)
+
+
+def test_nuevo_id_no_repite_archivados():
+    archivo_prestamos = crear_json_temporal("prestamos_ids.json", [])
+    archivo_usuarios = crear_json_temporal("usuarios_ids.json", [{"documento": "1", "nombres": "Ana", "apellidos": "Ruiz"}])
+    archivo_libros = crear_json_temporal("libros_ids.json", [{"ISBN": "100", "nombre": "Hamlet", "stock": "3"}])
+    historico.archivar(archivo_prestamos, [
+        {"id_prestamo": 7, "id_usuario": "1", "id_libro": "100", "fecha_prestamo": "2025-01-05", "estado": "devuelto"},
+    ])
+
+    nuevo = prestamos.realizar_prestamo(archivo_prestamos, archivo_usuarios, archivo_libros, "1", "100")
+    assert nuevo["id_prestamo"] == 8
+
+    eliminar_archivo(archivo_prestamos)
+    eliminar_archivo(archivo_prestamos.replace(".json", ".csv"))
+    eliminar_archivo(archivo_usuarios)
+    eliminar_archivo(archivo_libros)
+    eliminar_archivo(ejemplares.ruta_ejemplares(archivo_libros))
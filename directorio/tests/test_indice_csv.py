@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+import os
+import csv
+from directorio import indice_csv, libro
+
+CARPETA_TEMP = os.path.join(os.getcwd(), "tests", "temp_data")
+os.makedirs(CARPETA_TEMP, exist_ok=True)
+
+CAMPOS = ["id", "ISBN", "nombre", "autor", "stock"]
+
+
+def crear_csv(nombre, filas):
+    ruta = os.path.join(CARPETA_TEMP, nombre)
+    with open(ruta, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=CAMPOS)
+        writer.writeheader()
+        writer.writerows(filas)
+    return ruta
+
+
+def eliminar_archivo(filepath):
+    if os.path.exists(filepath):
+        os.remove(filepath)
+
+
+def test_busqueda_por_indice_y_lineas_anexadas():
+    filas = [{"id": str(i), "ISBN": f"isbn-{i}", "nombre": f"Libro, {i}", "autor": "Ana", "stock": "1"}
+             for i in range(50)]
+    filepath = crear_csv("libros_indexados.csv", filas)
+    sidecar = indice_csv.ruta_indice(filepath, "ISBN")
+    eliminar_archivo(sidecar)
+
+    assert libro.buscar_libro_por_isbn(filepath, "isbn-42")["nombre"] == "Libro, 42"
+    assert libro.buscar_libro_por_isbn(filepath, "no-existe") is None
+    assert os.path.exists(sidecar)
+
+    # Una fila anexada se indexa sin reconstruir el índice
+    with open(filepath, "a", newline="", encoding="utf-8") as f:
+        csv.DictWriter(f, fieldnames=CAMPOS).writerow(
+            {"id": "50", "ISBN": "isbn-50", "nombre": "Nuevo", "autor": "Luis", "stock": "2"})
+    assert indice_csv.buscar(filepath, "ISBN", "isbn-50")["autor"] == "Luis"
+    assert indice_csv.buscar(filepath, "ISBN", "isbn-0")["id"] == "0"
+
+    # Si el archivo se reescribe, el índice se reconstruye
+    crear_csv("libros_indexados.csv", filas[:3])
+    assert indice_csv.buscar(filepath, "ISBN", "isbn-42") is None
+    assert indice_csv.buscar(filepath, "ISBN", "isbn-2")["id"] == "2"
+
+    eliminar_archivo(filepath)
+    eliminar_archivo(sidecar)
+
+
+def test_busquedas_seguidas_no_releen_el_indice(monkeypatch):
+    filas = [{"id": str(i), "ISBN": f"isbn-{i}", "nombre": f"Libro {i}", "autor": "Ana", "stock": "1"}
+             for i in range(5)]
+    filepath = crear_csv("libros_cache_indice.csv", filas)
+    sidecar = indice_csv.ruta_indice(filepath, "ISBN")
+    eliminar_archivo(sidecar)
+    assert indice_csv.buscar(filepath, "ISBN", "isbn-1")["id"] == "1"
+
+    def sin_leer(*args, **kwargs):
+        raise AssertionError("el índice se volvió a leer de disco")
+
+    monkeypatch.setattr(indice_csv.json, "load", sin_leer)
+    assert indice_csv.buscar(filepath, "ISBN", "isbn-3")["id"] == "3"
+    assert indice_csv.buscar(filepath, "ISBN", "isbn-4")["id"] == "4"
+
+    eliminar_archivo(filepath)
+    eliminar_archivo(sidecar)
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+from datetime import date
+from directorio import indice_fechas, prestamos, gestor_datos3
+
+CARPETA_TEMP = os.path.join(os.getcwd(), "tests", "temp_data")
+os.makedirs(CARPETA_TEMP, exist_ok=True)
+
+
+def crear_archivo_temp(nombre, datos):
+    ruta = os.path.join(CARPETA_TEMP, nombre)
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(datos, f, indent=4, ensure_ascii=False)
+    return ruta
+
+
+def prestamo(id_prestamo, fecha, vence, estado="prestado"):
+    return {"id_prestamo": id_prestamo, "id_usuario": "10", "id_libro": "111", "fecha_prestamo": fecha,
+            "fecha_devolucion_esperada": vence, "estado": estado, "id_ejemplar": ""}
+
+
+def test_rangos_por_fecha_y_mantenimiento_incremental():
+    filepath = crear_archivo_temp("prestamos_fechas.json", [
+        prestamo(1, "2025-01-05", "2025-01-20"),
+        prestamo(2, "2025-01-10", "2025-01-12"),
+        prestamo(3, "2025-02-01", "2025-02-15", "devuelto"),
+    ])
+
+    ids = [p["id_prestamo"] for p in prestamos.prestamos_entre(filepath, "2025-01-01", "2025-01-31")]
+    assert ids == [1, 2]
+    vencen = prestamos.prestamos_por_vencer(filepath, 7, hoy=date(2025, 1, 10))
+    assert [p["id_prestamo"] for p in vencen] == [2]
+
+    # Los cambios guardados con guardar_cambios actualizan el índice sin reconstruirlo
+    indices = indice_fechas.vigente(filepath)
+    datos = gestor_datos3.cargar_datos(filepath)
+    nuevo = prestamo(4, "2025-01-07", "2025-01-14")
+    gestor_datos3.guardar_cambios(filepath, [d for d in datos if d["id_prestamo"] != 1] + [nuevo], [nuevo], ["1"])
+    assert indice_fechas.vigente(filepath) is indices
+    ids = [p["id_prestamo"] for p in prestamos.prestamos_entre(filepath, "2025-01-01", "2025-01-31")]
+    assert ids == [4, 2]
+
+    # Si el archivo cambia por otro camino, el índice se reconstruye
+    crear_archivo_temp("prestamos_fechas.json", [prestamo(9, "2025-01-15", "2025-01-30")])
+    assert [p["id_prestamo"] for p in prestamos.prestamos_entre(filepath, "2025-01-01")] == [9]
+    os.remove(filepath)
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import json
+import pytest
+from directorio import usuario, libro, gestor_datos3
+
+# Los módulos de negocio importan 'integridad' sin el paquete: se usa esa misma instancia
+integridad = usuario.integridad
+
+CARPETA_TEMP = os.path.join(os.getcwd(), "tests", "temp_data")
+os.makedirs(CARPETA_TEMP, exist_ok=True)
+
+
+def crear_archivo_temp(nombre, datos):
+    ruta = os.path.join(CARPETA_TEMP, nombre)
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(datos, f, indent=4, ensure_ascii=False)
+    return ruta
+
+
+def preparar():
+    usuarios = crear_archivo_temp("integridad_usuarios.json", [
+        {"id": "1", "documento": "10", "nombres": "Ana", "apellidos": "Ruiz", "email": "a@x.com"},
+        {"id": "2", "documento": "20", "nombres": "Luis", "apellidos": "Mora", "email": "l@x.com"},
+    ])
+    libros = crear_archivo_temp("integridad_libros.json", [
+        {"id": "1", "ISBN": "111", "nombre": "Rayuela", "autor": "Cortázar", "stock": "1"},
+    ])
+    prestamos = crear_archivo_temp("integridad_prestamos.json", [
+        {"id_prestamo": 1, "id_usuario": "10", "id_libro": "111", "fecha_prestamo": "2025-01-01",
+         "fecha_devolucion_esperada": "2025-01-15", "estado": "prestado", "id_ejemplar": ""},
+        {"id_prestamo": 2, "id_usuario": "99", "id_libro": "111", "fecha_prestamo": "2025-01-02",
+         "fecha_devolucion_esperada": "2025-01-16", "estado": "prestado", "id_ejemplar": ""},
+    ])
+    return usuarios, libros, prestamos
+
+
+def teardown_module():
+    # Archivos que las operaciones crean junto a los datos de la carpeta
+    ruta = os.path.join(CARPETA_TEMP, ".cerrojo")
+    if os.path.exists(ruta):
+        os.remove(ruta)
+    shutil.rmtree(os.path.join(CARPETA_TEMP, "auditoria"), ignore_errors=True)
+
+
+def test_restringir_y_cascada_al_eliminar():
+    usuarios, libros, prestamos = preparar()
+
+    with pytest.raises(integridad.IntegridadError):
+        usuario.eliminar_usuario(usuarios, "10", prestamos, archivo_libro=libros)
+    assert usuario.buscar_usuario_por_documento(usuarios, "10") is not None
+
+    # Un usuario sin préstamos se elimina sin problema
+    assert usuario.eliminar_usuario(usuarios, "20", prestamos, archivo_libro=libros)
+
+    assert libro.eliminar_libro(libros, "111", prestamos, integridad.CASCADA)
+    assert gestor_datos3.cargar_datos(prestamos) == []
+    assert usuario.eliminar_usuario(usuarios, "10", prestamos, archivo_libro=libros)
+
+    for ruta in (usuarios, libros, prestamos):
+        os.remove(ruta)
+
+
+def test_verificar_reporta_llaves_rotas():
+    usuarios, libros, prestamos = preparar()
+
+    problemas = integridad.verificar(prestamos, usuarios, libros)
+    assert problemas == [{"id_prestamo": 2, "campo": "id_usuario", "valor": "99"}]
+
+    for ruta in (usuarios, libros, prestamos):
+        os.remove(ruta)
+
+
+def test_cascada_de_usuario_repone_stock_y_quita_reservas(tmp_path, monkeypatch):
+    from directorio import prestamos as modulo_prestamos
+    ejemplares, reservas = integridad.ejemplares, integridad.reservas
+    usuarios, libros, archivo = (str(tmp_path / n) for n in ("usuario.json", "libro.json", "prestamo.json"))
+    for ruta, datos in ((usuarios, [{"id": "1", "documento": "10", "nombres": "Ana", "apellidos": "Ruiz", "email": ""}]),
+                        (libros, [{"id": "1", "ISBN": "111", "nombre": "Rayuela", "autor": "Cortázar", "stock": "2"},
+                                  {"id": "2", "ISBN": "222", "nombre": "Ficciones", "autor": "Borges", "stock": "0"}]),
+                        (archivo, [])):
+        with open(ruta, "w", encoding="utf-8") as f:
+            json.dump(datos, f)
+
+    modulo_prestamos.console.quiet = True
+    assert modulo_prestamos.realizar_prestamo(archivo, usuarios, libros, "10", "111")
+    assert modulo_prestamos.realizar_prestamo(archivo, usuarios, libros, "10", "111")
+    assert reservas.reservar(reservas.ruta_reservas(archivo), "10", "222")
+
+    # El stock repuesto de todos los préstamos se guarda de una sola vez
+    guardados = []
+    guardar_cambios = integridad.gestor_datos2.guardar_cambios
+    monkeypatch.setattr(integridad.gestor_datos2, "guardar_cambios",
+                        lambda *args: guardados.append(args[0]) or guardar_cambios(*args))
+    assert usuario.eliminar_usuario(usuarios, "10", archivo, integridad.CASCADA, libros)
+    assert guardados == [libros]
+
+    assert gestor_datos3.cargar_datos(archivo) == []
+    stock = {lb["ISBN"]: lb["stock"] for lb in integridad.gestor_datos2.cargar_datos(libros)}
+    assert stock["111"] == "2"
+    copias = ejemplares.cargar(ejemplares.ruta_ejemplares(libros))
+    assert copias["111"].disponibles() == 2
+    assert reservas.reservas_de_usuario(reservas.ruta_reservas(archivo), "10") == []
@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 import os
+import shutil
 import json
 from directorio import libro, gestor_datos2
 
@@ -19,6 +20,12 @@ def eliminar_archivo(filepath):
         os.remove(filepath)
 
 
+def teardown_module():
+    # Archivos que las operaciones crean junto a los datos de la carpeta
+    eliminar_archivo(os.path.join(CARPETA_TEMP, ".cerrojo"))
+    shutil.rmtree(os.path.join(CARPETA_TEMP, "auditoria"), ignore_errors=True)
+
+
 def test_crear_libro_correcto():
     filepath = crear_archivo_temp("libro_crear.json")
 
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+from datetime import date
+from directorio import modelos
+
+
+def test_libro_convierte_stock_a_entero():
+    lb = modelos.Libro.desde_dict({"id": "3", "ISBN": "100", "nombre": "Hamlet", "autor": "Shakespeare", "stock": "7"})
+
+    assert lb.id == 3
+    assert lb.stock == 7
+    assert lb.a_dict()["stock"] == "7"
+
+
+def test_libro_stock_invalido_es_cero():
+    lb = modelos.Libro.desde_dict({"ISBN": "100", "stock": "abc"})
+    assert lb.stock == 0
+
+
+def test_prestamo_fechas_tipadas_y_clave_antigua():
+    p = modelos.Prestamo.desde_dict({
+        "id_prestamo": "5",
+        "id_usuario": "1",
+        "id_libro": "100",
+        "fecha": "2025-01-10",
+        "fecha_devolucion_esperada": "2025-01-20",
+        "estado": "prestado",
+    })
+
+    assert p.id_prestamo == 5
+    assert p.fecha_prestamo == date(2025, 1, 10)
+    assert p.a_dict()["fecha_prestamo"] == "2025-01-10"
+
+
+def test_registros_sin_diccionario_por_instancia():
+    u = modelos.Usuario.desde_dict({"id": "1", "documento": "123"})
+    assert not hasattr(u, "__dict__")
+
+
+def test_clave_natural_ordena_como_numero():
+    documentos = ["100", "9", "25"]
+    assert sorted(documentos, key=modelos.clave_natural) == ["9", "25", "100"]
+
+
+def test_prestamos_comparten_fechas_y_estado():
+    datos = {"id_prestamo": "1", "id_usuario": "1", "id_libro": "100",
+             "fecha_prestamo": "2025-03-01", "estado": "prestado"}
+    a = modelos.Prestamo.desde_dict(dict(datos))
+    b = modelos.Prestamo.desde_dict(dict(datos, id_prestamo="2"))
+
+    assert a.fecha_prestamo is b.fecha_prestamo
+    assert a.estado is b.estado
+
+
+def test_ida_y_vuelta_conserva_claves_desconocidas_y_valores_invalidos():
+    libro = {"id": "B7", "ISBN": "100", "nombre": "Hamlet", "autor": "Shakespeare", "stock": "2", "categoria": "teatro"}
+    prestamo = {"id_prestamo": "4", "id_usuario": "1", "id_libro": "100", "fecha_prestamo": "05/01/2025",
+                "fecha_devolucion_esperada": "2025-01-20", "estado": "prestado", "id_ejemplar": "", "nota": "frágil"}
+
+    assert modelos.Libro.desde_dict(libro).a_dict() == libro
+    p = modelos.Prestamo.desde_dict(prestamo)
+    assert p.fecha_prestamo is None
+    assert p.a_dict() == dict(prestamo, id_prestamo=4)
+
+
+def test_campo_invalido_modificado_guarda_el_valor_nuevo():
+    lb = modelos.Libro.desde_dict({"id": "1", "ISBN": "100", "stock": "abc"})
+    assert lb.a_dict()["stock"] == "abc"
+
+    lb.stock = 3
+    assert lb.a_dict()["stock"] == "3"
+
+
+def test_cache_de_fechas_acotada():
+    assert modelos._fecha_iso.cache_info().maxsize == modelos.MAX_FECHAS
+    assert modelos.a_fecha("2025-13-01") is None
+
+
+def test_gestor_csv_conserva_columnas_extra(tmp_path):
+    from directorio import gestor_datos2
+    ruta = str(tmp_path / "libro.csv")
+    datos = [{"id": "B7", "ISBN": "100", "nombre": "Hamlet", "autor": "Shakespeare", "stock": "2", "categoria": "teatro"}]
+
+    gestor_datos2._escribir(ruta, datos)
+
+    assert gestor_datos2._leer(ruta) == datos
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+import shutil
+from datetime import date, timedelta
+from directorio import prestamos
+
+# 'prestamos' importa 'multas' sin el paquete: se usa esa misma instancia
+multas = prestamos.multas
+
+CARPETA_TEMP = os.path.join(os.getcwd(), "tests", "temp_data", "multas_prueba")
+
+
+def prestamo(id_prestamo, usuario, vence, estado="prestado"):
+    return {"id_prestamo": id_prestamo, "id_usuario": usuario, "id_libro": "100", "fecha_prestamo": "2025-02-01",
+            "fecha_devolucion_esperada": vence, "estado": estado, "id_ejemplar": ""}
+
+
+def preparar(prestamos_data):
+    shutil.rmtree(CARPETA_TEMP, ignore_errors=True)
+    os.makedirs(CARPETA_TEMP)
+    rutas = {}
+    for nombre, datos in (
+        ("usuarios", [{"documento": "1", "nombres": "Yeimy", "apellidos": "Bayona"},
+                      {"documento": "2", "nombres": "Tatiana", "apellidos": "Solano"}]),
+        ("libros", [{"ISBN": "100", "nombre": "Python Básico", "autor": "Guido", "stock": "2"}]),
+        ("prestamos", prestamos_data),
+    ):
+        rutas[nombre] = os.path.join(CARPETA_TEMP, nombre + ".json")
+        with open(rutas[nombre], "w", encoding="utf-8") as f:
+            json.dump(datos, f)
+    return rutas
+
+
+def teardown_function():
+    shutil.rmtree(CARPETA_TEMP, ignore_errors=True)
+
+
+def test_multas_se_acumulan_por_dia_y_se_cierran_al_devolver():
+    rutas = preparar([prestamo(1, "1", "2025-03-01"), prestamo(2, "1", "2025-03-08"), prestamo(3, "2", "2025-03-20")])
+    archivo = rutas["prestamos"]
+
+    assert multas.saldo(archivo, "1", date(2025, 3, 5)) == 4 * 500
+    cuentas = multas.cuentas_al_dia(archivo, date(2025, 3, 10))
+    assert set(cuentas.vencidos) == {"1", "2"}
+    assert cuentas.saldo("1") == 9 * 500 + 2 * 500 and cuentas.saldo("2") == 0
+    assert multas.supera_umbral(archivo, "1", date(2025, 3, 10))
+
+    # Al devolver, lo acumulado pasa a multas cerradas y deja de crecer
+    assert multas.registrar_devolucion(archivo, prestamo(1, "1", "2025-03-01"), date(2025, 3, 10)) == 9 * 500
+    with open(archivo, "w", encoding="utf-8") as f:
+        json.dump([prestamo(2, "1", "2025-03-08"), prestamo(3, "2", "2025-03-20")], f)
+    assert multas.saldo(archivo, "1", date(2025, 3, 12)) == 9 * 500 + 4 * 500
+    assert multas.pagar(archivo, "1", 9 * 500) == 4 * 500
+
+    # Las cuentas quedan en disco: otra carga da el mismo saldo
+    multas._CUENTAS.clear()
+    assert multas.saldo(archivo, "1", date(2025, 3, 12)) == 4 * 500
+
+
+def test_realizar_prestamo_rechaza_usuario_con_multas():
+    vencido = (date.today() - timedelta(days=20)).isoformat()
+    rutas = preparar([prestamo(1, "1", vencido)])
+
+    assert prestamos.realizar_prestamo(rutas["prestamos"], rutas["usuarios"], rutas["libros"], "1", "100") is None
+    assert prestamos.realizar_prestamo(rutas["prestamos"], rutas["usuarios"], rutas["libros"], "2", "100")
+
+    # La devolución cierra la multa del préstamo vencido
+    prestamos.registrar_devolucion(rutas["prestamos"], rutas["libros"], 1)
+    assert multas.cuentas_al_dia(rutas["prestamos"]).cerradas == {"1": 20 * 500}
+    assert multas.cuentas_al_dia(rutas["prestamos"]).vencidos == {}
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+import shutil
+from datetime import date
+from directorio import prestamos, gestor_datos3
+
+# 'prestamos' importa 'politicas' sin el paquete: se usa esa misma instancia
+politicas = prestamos.politicas
+
+CARPETA_TEMP = os.path.join(os.getcwd(), "tests", "temp_data", "politicas_prueba")
+
+
+def preparar(prestamos_data):
+    shutil.rmtree(CARPETA_TEMP, ignore_errors=True)
+    os.makedirs(CARPETA_TEMP)
+    rutas = {}
+    for nombre, datos in (
+        ("usuarios", [{"documento": "1", "nombres": "Yeimy", "apellidos": "Bayona"},
+                      {"documento": "2", "nombres": "Tatiana", "apellidos": "Solano"}]),
+        ("libros", [{"ISBN": "100", "nombre": "Python Básico", "autor": "Guido", "stock": "2"},
+                    {"ISBN": "200", "nombre": "Diccionario", "autor": "RAE", "stock": "1"}]),
+        ("prestamos", prestamos_data),
+    ):
+        rutas[nombre] = os.path.join(CARPETA_TEMP, nombre + ".json")
+        with open(rutas[nombre], "w", encoding="utf-8") as f:
+            json.dump(datos, f)
+    politica = politicas.cargar(politicas.ruta_politica(rutas["prestamos"]))
+    politica.update(usuarios={"2": "docente"}, libros={"200": "referencia"}, feriados=["2025-03-24"])
+    politicas.guardar(politicas.ruta_politica(rutas["prestamos"]), politica)
+    return rutas, politica
+
+
+def prestamo(id_prestamo, usuario, libro, fecha, vence="", estado="prestado"):
+    return {"id_prestamo": id_prestamo, "id_usuario": usuario, "id_libro": libro, "fecha_prestamo": fecha,
+            "fecha_devolucion_esperada": vence, "estado": estado, "id_ejemplar": ""}
+
+
+def teardown_function():
+    shutil.rmtree(CARPETA_TEMP, ignore_errors=True)
+
+
+def test_vencimiento_por_tipo_categoria_y_calendario():
+    _, politica = preparar([])
+    lunes = date(2025, 3, 3)
+    assert politicas.calcular_vencimiento(politica, lunes, "1", "100") == date(2025, 3, 17)
+    assert politicas.calcular_vencimiento(politica, lunes, "2", "100") == date(2025, 4, 2)
+    # La categoría 'referencia' acorta el plazo del docente
+    assert politicas.calcular_vencimiento(politica, lunes, "2", "200") == date(2025, 3, 6)
+    # Cae en domingo: pasa al lunes, que es feriado, y luego al martes
+    assert politicas.calcular_vencimiento(politica, date(2025, 3, 9), "1", "100") == date(2025, 3, 25)
+
+
+def test_prestamo_nuevo_no_nace_atrasado():
+    rutas, politica = preparar([])
+    nuevo = prestamos.realizar_prestamo(rutas["prestamos"], rutas["usuarios"], rutas["libros"], "1", "100")
+    assert nuevo["fecha_devolucion_esperada"] == politicas.calcular_vencimiento(
+        politica, date.today(), "1", "100").isoformat()
+    assert nuevo["fecha_devolucion_esperada"] > date.today().isoformat()
+    assert prestamos.listar_prestamos(rutas["prestamos"], rutas["usuarios"], rutas["libros"])[0]["estado"] == "prestado"
+
+
+def test_recalcular_vencimientos_en_una_escritura(monkeypatch):
+    rutas, politica = preparar([
+        prestamo(1, "1", "100", "2025-03-03", "2025-03-02", "atrasado"),
+        prestamo(2, "2", "200", "2025-03-03", "2025-03-02", "atrasado"),
+        prestamo(3, "2", "100", "2025-03-03", "2025-04-02"),
+    ])
+    escrituras = []
+    original = politicas.gestor_datos3.guardar_cambios
+    monkeypatch.setattr(politicas.gestor_datos3, "guardar_cambios",
+                        lambda *args: escrituras.append(args) or original(*args))
+
+    cambiados = politicas.recalcular_vencimientos(rutas["prestamos"], hoy=date(2025, 3, 10))
+    assert cambiados == 2 and len(escrituras) == 1
+    datos = {p["id_prestamo"]: p for p in gestor_datos3.cargar_datos(rutas["prestamos"])}
+    assert (datos[1]["fecha_devolucion_esperada"], datos[1]["estado"]) == ("2025-03-17", "prestado")
+    assert (datos[2]["fecha_devolucion_esperada"], datos[2]["estado"]) == ("2025-03-06", "atrasado")
+
+    # Sin NumPy se obtienen las mismas fechas
+    monkeypatch.setattr(politicas, "np", None)
+    politica["dias_base"] = 21
+    assert politicas.calcular_vencimientos(politica, list(datos.values())) == [
+        "2025-03-25", "2025-03-06", "2025-04-02"]
+    assert politicas.recalcular_vencimientos(rutas["prestamos"], politica, hoy=date(2025, 3, 10)) == 1
+    assert len(escrituras) == 2
@@ -1,8 +1,9 @@
 # -*- coding: utf-8 -*-
 import os
 import json
+import shutil
 from datetime import date, timedelta
-from directorio import prestamos, gestor_datos2
+from directorio import prestamos, gestor_datos2, ejemplares
 
 CARPETA_TEMP = os.path.join(os.getcwd(), "tests", "temp_data")
 os.makedirs(CARPETA_TEMP, exist_ok=True)
@@ -21,6 +22,13 @@ def eliminar_archivo(filepath):
         os.remove(filepath)
 
 
+def teardown_module():
+    # Archivos que las operaciones crean junto a los datos de la carpeta
+    for nombre in ("prestamos.csv", "multa.json", ".cerrojo"):
+        eliminar_archivo(os.path.join(CARPETA_TEMP, nombre))
+    shutil.rmtree(os.path.join(CARPETA_TEMP, "auditoria"), ignore_errors=True)
+
+
 def test_buscar_en_json_y_csv():
     datos = [{"documento": "123", "nombre": "Tatiana"}]
     archivo = crear_json_temporal("usuarios_busqueda.json", datos)
@@ -48,6 +56,7 @@ def test_realizar_prestamo_correcto():
     eliminar_archivo(archivo_usuarios)
     eliminar_archivo(archivo_libros)
     eliminar_archivo(archivo_prestamos)
+    eliminar_archivo(ejemplares.ruta_ejemplares(archivo_libros))
 
 
 def test_registrar_devolucion():
@@ -65,6 +74,7 @@ def test_registrar_devolucion():
 
     eliminar_archivo(archivo_prestamos)
     eliminar_archivo(archivo_libros)
+    shutil.rmtree(os.path.join(CARPETA_TEMP, "prestamos_dev_archivo"), ignore_errors=True)
 
 
 def test_listar_prestamos():
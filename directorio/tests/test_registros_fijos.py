@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+from directorio import registros_fijos, gestor_datos2, libro
+
+CARPETA_TEMP = os.path.join(os.getcwd(), "tests", "temp_data")
+os.makedirs(CARPETA_TEMP, exist_ok=True)
+
+LIBROS = [
+    {"id": "1", "ISBN": "111", "nombre": "Cien años", "autor": "García", "stock": "3"},
+    {"id": "2", "ISBN": "222", "nombre": "Rayuela", "autor": "Cortázar", "stock": "1"},
+]
+
+
+def ruta_temp(nombre):
+    ruta = os.path.join(CARPETA_TEMP, nombre)
+    if os.path.exists(ruta):
+        os.remove(ruta)
+    return ruta
+
+
+def teardown_module():
+    # Archivos que las operaciones crean junto a los datos de la carpeta
+    ruta = os.path.join(CARPETA_TEMP, ".cerrojo")
+    if os.path.exists(ruta):
+        os.remove(ruta)
+    shutil.rmtree(os.path.join(CARPETA_TEMP, "auditoria"), ignore_errors=True)
+
+
+def test_actualizacion_en_su_lugar_y_reutilizacion_de_ranuras():
+    filepath = ruta_temp("libros_fijos.dat")
+    registros_fijos.escribir(filepath, LIBROS, gestor_datos2.ANCHOS, "ISBN")
+    tamano = os.path.getsize(filepath)
+
+    assert registros_fijos.actualizar(filepath, [dict(LIBROS[0], stock="2")])
+    assert os.path.getsize(filepath) == tamano
+    assert registros_fijos.obtener(filepath, "111")["stock"] == "2"
+
+    # El registro borrado deja su ranura libre para el siguiente nuevo
+    assert registros_fijos.eliminar(filepath, ["111"]) == 1
+    assert [r["ISBN"] for r in registros_fijos.leer(filepath)] == ["222"]
+    nuevo = {"id": "3", "ISBN": "333", "nombre": "Ficciones", "autor": "Borges", "stock": "5"}
+    assert registros_fijos.actualizar(filepath, [nuevo])
+    assert os.path.getsize(filepath) == tamano
+    assert [r["ISBN"] for r in registros_fijos.leer(filepath)] == ["333", "222"]
+
+    # Un valor que no cabe obliga a reescribir el archivo completo
+    assert not registros_fijos.actualizar(filepath, [dict(nuevo, nombre="x" * 200)])
+    os.remove(filepath)
+
+
+def test_libro_actualizado_en_archivo_de_ancho_fijo():
+    filepath = ruta_temp("libros_gestor.dat")
+    gestor_datos2.guardar_datos(filepath, LIBROS)
+
+    libro.actualizar_libro(filepath, "222", {"stock": 4})
+    libro.actualizar_libro(filepath, "111", {"nombre": "Un título mucho más largo " * 5})
+
+    libros = gestor_datos2.cargar_datos(filepath)
+    assert libros[1]["stock"] == "4"
+    assert libros[0]["nombre"].startswith("Un título mucho más largo")
+    assert libro.eliminar_libro(filepath, "111")
+    assert [lb["ISBN"] for lb in gestor_datos2.cargar_datos(filepath)] == ["222"]
+    os.remove(filepath)
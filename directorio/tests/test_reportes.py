@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+from datetime import date
+from directorio import reportes
+
+CARPETA_TEMP = os.path.join(os.getcwd(), "tests", "temp_data")
+os.makedirs(CARPETA_TEMP, exist_ok=True)
+
+
+def crear_json_temporal(nombre, datos):
+    ruta = os.path.join(CARPETA_TEMP, nombre)
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(datos, f, indent=4, ensure_ascii=False)
+    return ruta
+
+
+def eliminar_archivo(filepath):
+    if os.path.exists(filepath):
+        os.remove(filepath)
+
+
+def preparar_archivos():
+    prestamos_data = [
+        {"id_prestamo": 1, "id_usuario": "1", "id_libro": "100", "fecha_prestamo": "2025-01-05",
+         "fecha_devolucion_esperada": "2025-01-20", "estado": "devuelto"},
+        {"id_prestamo": 2, "id_usuario": "2", "id_libro": "100", "fecha_prestamo": "2025-01-10",
+         "fecha_devolucion_esperada": "2025-01-25", "estado": "atrasado"},
+        {"id_prestamo": 3, "id_usuario": "2", "id_libro": "200", "fecha_prestamo": "2025-03-01",
+         "fecha_devolucion_esperada": "2025-03-15", "estado": "prestado"},
+    ]
+    libros_data = [{"ISBN": "100", "nombre": "Hamlet", "stock": "1"}, {"ISBN": "200", "nombre": "Ulises", "stock": "0"}]
+    usuarios_data = [{"documento": "1", "nombres": "Ana", "apellidos": "Ruiz"},
+                     {"documento": "2", "nombres": "Luis", "apellidos": "Mora"}]
+    return (
+        crear_json_temporal("prestamos_reportes.json", prestamos_data),
+        crear_json_temporal("libros_reportes.json", libros_data),
+        crear_json_temporal("usuarios_reportes.json", usuarios_data),
+    )
+
+
+def ejecutar_reportes():
+    archivo_prestamos, archivo_libros, archivo_usuarios = preparar_archivos()
+    columnas = reportes.cargar_columnas(archivo_prestamos)
+
+    top = reportes.top_libros_prestados(columnas, archivo_libros, k=1)
+    assert top == [{"ISBN": "100", "nombre": "Hamlet", "prestamos": 2}]
+
+    atrasos = reportes.tasa_atraso_por_mes(columnas, hoy=date(2025, 3, 10))
+    assert [(f["mes"], f["prestamos"], f["atrasados"]) for f in atrasos] == [("2025-01", 2, 1), ("2025-03", 1, 0)]
+
+    activos = reportes.prestamos_activos_por_usuario(columnas, archivo_usuarios)
+    assert activos == [{"documento": "2", "usuario": "Luis Mora", "activos": 2}]
+
+    rotacion = reportes.rotacion_stock(columnas, archivo_libros)
+    assert rotacion[0]["ISBN"] == "100" and rotacion[0]["ejemplares"] == 2
+
+    salida = os.path.join(CARPETA_TEMP, "reporte_top.csv")
+    reportes.exportar(top, salida)
+    with open(salida, encoding="utf-8") as f:
+        assert f.readline().strip() == "ISBN,nombre,prestamos"
+
+    for ruta in (archivo_prestamos, archivo_libros, archivo_usuarios, salida):
+        eliminar_archivo(ruta)
+
+
+def test_reportes():
+    ejecutar_reportes()
+
+
+def test_reportes_sin_numpy(monkeypatch):
+    monkeypatch.setattr(reportes, "np", None)
+    ejecutar_reportes()
+
+
+def test_fechas_mal_formadas_y_rotacion_sin_modificar_columnas():
+    archivo_prestamos = crear_json_temporal("prestamos_fechas.json", [
+        {"id_prestamo": 1, "id_usuario": "1", "id_libro": "100", "fecha_prestamo": "abcd-ef-gh", "estado": "prestado"},
+        {"id_prestamo": 2, "id_usuario": "1", "id_libro": "100", "fecha_prestamo": "2025-13-01", "estado": "prestado"},
+    ])
+    archivo_libros = crear_json_temporal("libros_fechas.json", [
+        {"ISBN": "100", "nombre": "Hamlet", "stock": "0"}, {"ISBN": "300", "nombre": "Odisea", "stock": "2"},
+    ])
+    columnas = reportes.cargar_columnas(archivo_prestamos, incluir_archivados=False)
+    assert list(columnas.mes) == [reportes.SIN_FECHA, reportes.SIN_FECHA]
+
+    rotacion = reportes.rotacion_stock(columnas, archivo_libros)
+    assert [(f["ISBN"], f["prestamos"]) for f in rotacion] == [("100", 2), ("300", 0)]
+    assert columnas.libros.valores == ["100"]
+
+    eliminar_archivo(archivo_prestamos)
+    eliminar_archivo(archivo_libros)
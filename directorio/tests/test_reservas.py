@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+import shutil
+from directorio import reservas, prestamos, gestor_datos2, gestor_datos3
+
+CARPETA_TEMP = os.path.join(os.getcwd(), "tests", "temp_data", "reservas")
+
+
+def crear_json_temporal(nombre, datos):
+    os.makedirs(CARPETA_TEMP, exist_ok=True)
+    ruta = os.path.join(CARPETA_TEMP, nombre)
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(datos, f, indent=4, ensure_ascii=False)
+    return ruta
+
+
+def test_cola_por_prioridad_y_llegada():
+    archivo = os.path.join(CARPETA_TEMP, "reserva.json")
+    reservas.reservar(archivo, "1", "100")
+    reservas.reservar(archivo, "2", "100")
+    reservas.reservar(archivo, "3", "100", prioridad=-1)
+
+    assert reservas.reservar(archivo, "1", "100") is None
+    assert [r["id_usuario"] for r in reservas.reservas_de_libro(archivo, "100")] == ["3", "1", "2"]
+    assert reservas.reservas_de_usuario(archivo, "2")[0]["posicion"] == 3
+    assert reservas.tomar_siguiente(archivo, "100")["id_usuario"] == "3"
+
+    shutil.rmtree(CARPETA_TEMP, ignore_errors=True)
+
+
+def test_colas_en_memoria_mientras_el_archivo_no_cambia(monkeypatch):
+    archivo = os.path.join(CARPETA_TEMP, "reserva.json")
+    reservas.reservar(archivo, "1", "100")
+    assert not [n for n in os.listdir(CARPETA_TEMP) if n.endswith(".tmp")]
+
+    def sin_leer(*args, **kwargs):
+        raise AssertionError("las colas se volvieron a leer de disco")
+
+    with monkeypatch.context() as m:
+        m.setattr(reservas.json, "load", sin_leer)
+        reservas.reservar(archivo, "2", "100")
+        assert [r["id_usuario"] for r in reservas.reservas_de_libro(archivo, "100")] == ["1", "2"]
+
+    # Un cambio hecho por otro proceso se vuelve a leer
+    with open(archivo, "w", encoding="utf-8") as f:
+        json.dump({"ultimo_id": 7, "colas": {"200": [[0, 7, "9", "2025-01-01"]]}}, f)
+    assert reservas.reservas_de_libro(archivo, "100") == []
+    assert reservas.reservas_de_usuario(archivo, "9")[0]["id_reserva"] == 7
+
+    shutil.rmtree(CARPETA_TEMP, ignore_errors=True)
+
+
+def test_devolucion_asigna_a_la_reserva():
+    archivo_usuarios = crear_json_temporal("usuarios.json", [
+        {"documento": "1", "nombres": "Ana", "apellidos": "Ruiz"},
+        {"documento": "2", "nombres": "Luis", "apellidos": "Mora"},
+    ])
+    archivo_libros = crear_json_temporal("libros.json", [{"ISBN": "100", "nombre": "Hamlet", "stock": "1"}])
+    archivo_prestamos = crear_json_temporal("prestamos.json", [])
+
+    primero = prestamos.realizar_prestamo(archivo_prestamos, archivo_usuarios, archivo_libros, "1", "100")
+    assert prestamos.realizar_prestamo(archivo_prestamos, archivo_usuarios, archivo_libros, "2", "100") is None
+    assert len(reservas.reservas_de_libro(reservas.ruta_reservas(archivo_prestamos), "100")) == 1
+
+    prestamos.registrar_devolucion(archivo_prestamos, archivo_libros, str(primero["id_prestamo"]))
+
+    activos = gestor_datos3.cargar_datos(archivo_prestamos)
+    assert [(p["id_prestamo"], p["id_usuario"]) for p in activos] == [(2, "2")]
+    assert gestor_datos2.cargar_datos(archivo_libros)[0]["stock"] == "0"
+    assert reservas.reservas_de_libro(reservas.ruta_reservas(archivo_prestamos), "100") == []
+
+    shutil.rmtree(CARPETA_TEMP, ignore_errors=True)
+
+
+def test_devolucion_salta_reservas_de_usuarios_que_no_pueden_recibir_prestamos():
+    archivo_usuarios = crear_json_temporal("usuarios.json", [
+        {"documento": "1", "nombres": "Ana", "apellidos": "Ruiz"},
+        {"documento": "3", "nombres": "Eva", "apellidos": "Sol"},
+    ])
+    archivo_libros = crear_json_temporal("libros.json", [{"ISBN": "100", "nombre": "Hamlet", "stock": "1"}])
+    archivo_prestamos = crear_json_temporal("prestamos.json", [])
+    archivo_reservas = reservas.ruta_reservas(archivo_prestamos)
+
+    primero = prestamos.realizar_prestamo(archivo_prestamos, archivo_usuarios, archivo_libros, "1", "100")
+    # El usuario 2 reservó y luego salió del registro
+    reservas.reservar(archivo_reservas, "2", "100")
+    reservas.reservar(archivo_reservas, "3", "100")
+
+    prestamos.registrar_devolucion(archivo_prestamos, archivo_libros, str(primero["id_prestamo"]), archivo_usuarios)
+
+    activos = gestor_datos3.cargar_datos(archivo_prestamos)
+    assert [p["id_usuario"] for p in activos] == ["3"]
+    assert reservas.reservas_de_libro(archivo_reservas, "100") == []
+
+    shutil.rmtree(CARPETA_TEMP, ignore_errors=True)
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+import shutil
+import pytest
+from datetime import date
+from directorio import sucursales
+
+# 'sucursales' importa 'integridad' sin el paquete: se usa esa misma instancia
+integridad = sucursales.integridad
+
+CARPETA_TEMP = os.path.join(os.getcwd(), "tests", "temp_data", "sucursales_prueba")
+
+
+def escribir(ruta, datos):
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(datos, f)
+
+
+def prestamo(id_prestamo, usuario, libro, vence):
+    return {"id_prestamo": id_prestamo, "id_usuario": usuario, "id_libro": libro, "fecha_prestamo": "2025-03-01",
+            "fecha_devolucion_esperada": vence, "estado": "prestado", "id_ejemplar": ""}
+
+
+def preparar():
+    shutil.rmtree(CARPETA_TEMP, ignore_errors=True)
+    sucursales.agregar(CARPETA_TEMP, "norte")
+    escribir(os.path.join(CARPETA_TEMP, "usuario.json"), [{"documento": "1", "nombres": "Yeimy", "apellidos": "Bayona"}])
+    for id_sucursal, isbn, nombre, vence in (("principal", "100", "Python Básico", "2025-03-20"),
+                                             ("norte", "200", "Java Básico", "2025-03-15")):
+        rutas = sucursales.archivos(CARPETA_TEMP, id_sucursal)
+        escribir(rutas["libros"], [{"ISBN": isbn, "nombre": nombre, "autor": "Autor", "stock": "1"}])
+        escribir(rutas["prestamos"], [prestamo(1, "1", isbn, vence)])
+
+
+def teardown_function():
+    shutil.rmtree(CARPETA_TEMP, ignore_errors=True)
+
+
+def test_rutas_por_sucursal_y_por_isbn():
+    preparar()
+    assert sucursales.listar(CARPETA_TEMP) == ["principal", "norte"]
+    norte = sucursales.archivos(CARPETA_TEMP, "norte")
+    assert norte["usuarios"] == os.path.join(CARPETA_TEMP, "usuario.json")
+    assert norte["prestamos"] == os.path.join(CARPETA_TEMP, "sucursal_norte", "prestamo.json")
+
+    # El mismo ISBN cae siempre en la misma sucursal
+    destinos = {sucursales.sucursal_de_isbn(CARPETA_TEMP, str(isbn)) for isbn in range(50)}
+    assert destinos == {"principal", "norte"}
+    assert sucursales.archivos(CARPETA_TEMP, isbn="123") == sucursales.archivos(
+        CARPETA_TEMP, sucursales.sucursal_de_isbn(CARPETA_TEMP, "123"))
+
+    with pytest.raises(ValueError):
+        sucursales.agregar(CARPETA_TEMP, "../otra")
+
+
+def test_consultas_entre_sucursales():
+    preparar()
+    filas = sucursales.listar_prestamos(CARPETA_TEMP)
+    assert [(f["sucursal"], f["libro"]) for f in filas] == [("principal", "Python Básico"), ("norte", "Java Básico")]
+
+    por_vencer = sucursales.prestamos_por_vencer(CARPETA_TEMP, 30, date(2025, 3, 1))
+    assert [p["sucursal"] for p in por_vencer] == ["norte", "principal"]
+
+    assert sucursales.buscar_libro(CARPETA_TEMP, "200")["sucursal"] == "norte"
+    assert sucursales.buscar_libro(CARPETA_TEMP, "999") is None
+
+    # El usuario tiene préstamos en las dos sucursales: en cascada se eliminan todos
+    with pytest.raises(integridad.IntegridadError):
+        sucursales.antes_de_eliminar_usuario(CARPETA_TEMP, "1")
+    assert sucursales.antes_de_eliminar_usuario(CARPETA_TEMP, "1", integridad.CASCADA) == 2
+    assert sucursales.listar_prestamos(CARPETA_TEMP) == []
@@ -27,6 +27,11 @@ def eliminar_archivo(filepath):
         os.remove(filepath)
 
 
+def teardown_module():
+    # Archivos que las operaciones crean junto a los datos de la carpeta
+    eliminar_archivo(os.path.join(CARPETA_TEMP, ".cerrojo"))
+
+
 # --- TESTS ---
 
 def test_crear_usuario_correcto():
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+import time
+import shutil
+import pytest
+from directorio import gestor_datos, gestor_datos2
+
+# Los gestores importan 'vigilante' sin el paquete: se usa esa misma instancia
+vigilante = gestor_datos.vigilante
+bitacora = gestor_datos2.bitacora
+
+CARPETA_TEMP = os.path.join(os.getcwd(), "tests", "temp_data", "vigilada")
+
+
+def preparar_carpeta():
+    shutil.rmtree(CARPETA_TEMP, ignore_errors=True)
+    os.makedirs(CARPETA_TEMP)
+
+
+def escribir_json(nombre, datos):
+    ruta = os.path.join(CARPETA_TEMP, nombre)
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(datos, f)
+    return ruta
+
+
+def esperar(condicion, limite=5.0):
+    fin = time.monotonic() + limite
+    while time.monotonic() < fin:
+        if condicion():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_vigilante_avisa_cambios_y_lineas_anexadas():
+    preparar_carpeta()
+    ruta_json = escribir_json("libro.json", [])
+    ruta_jsonl = os.path.join(CARPETA_TEMP, "2025-01.jsonl")
+    with open(ruta_jsonl, "w", encoding="utf-8") as f:
+        f.write('{"id_prestamo": 1}\n')
+
+    cambiados, anexados = [], []
+    observador = vigilante.Vigilante(
+        CARPETA_TEMP, cambiados.append, lambda ruta, lineas, anterior, actual: anexados.extend(lineas),
+        intervalo=0.05, usar_inotify=False,
+    ).iniciar()
+    try:
+        escribir_json("libro.json", [{"ISBN": "1"}])
+        with open(ruta_jsonl, "a", encoding="utf-8") as f:
+            f.write('{"id_prestamo": 2}\n')
+
+        assert esperar(lambda: os.path.abspath(ruta_json) in cambiados)
+        # Del archivo de solo anexado solo llegan las líneas nuevas
+        assert esperar(lambda: anexados == ['{"id_prestamo": 2}'])
+    finally:
+        observador.detener()
+    shutil.rmtree(CARPETA_TEMP, ignore_errors=True)
+
+
+def test_cache_de_lectura_se_invalida_al_cambiar_el_archivo():
+    preparar_carpeta()
+    ruta = escribir_json("usuario.json", [{"id": "1", "documento": "10"}])
+    vigilante.activar(CARPETA_TEMP, intervalo=0.05)
+    try:
+        assert gestor_datos.cargar_datos(ruta)[0]["documento"] == "10"
+        assert vigilante.leer_cache(ruta) is not None
+
+        # Otro puesto modifica el archivo
+        escribir_json("usuario.json", [{"id": "1", "documento": "99"}])
+        assert esperar(lambda: vigilante.leer_cache(ruta) is None)
+        assert gestor_datos.cargar_datos(ruta)[0]["documento"] == "99"
+    finally:
+        vigilante.desactivar()
+    shutil.rmtree(CARPETA_TEMP, ignore_errors=True)
+
+
+def test_cache_no_guarda_datos_viejos_si_el_archivo_cambio_al_leerlo():
+    preparar_carpeta()
+    ruta = escribir_json("usuario.json", [{"id": "1", "documento": "10"}])
+    vigilante.activar(CARPETA_TEMP, intervalo=0.05)
+    try:
+        # Otro proceso escribe entre la lectura y el guardado en caché
+        firma = vigilante.firma(ruta)
+        leidos = [{"id": "1", "documento": "10"}]
+        escribir_json("usuario.json", [{"id": "1", "documento": "10"}, {"id": "2", "documento": "20"}])
+        vigilante.guardar_cache(ruta, leidos, firma)
+
+        assert vigilante.leer_cache(ruta) is None
+        assert len(gestor_datos.cargar_datos(ruta)) == 2
+        assert vigilante.leer_cache(ruta) is not None
+    finally:
+        vigilante.desactivar()
+    shutil.rmtree(CARPETA_TEMP, ignore_errors=True)
+
+
+def test_cache_entrega_vistas_de_solo_lectura_o_copias():
+    preparar_carpeta()
+    ruta = escribir_json("usuario.json", [{"id": "1", "documento": "10"}])
+    vigilante.activar(CARPETA_TEMP, intervalo=0.05)
+    try:
+        gestor_datos.cargar_datos(ruta)
+        vistas = gestor_datos.cargar_datos(ruta, solo_lectura=True)
+        assert vistas is gestor_datos.cargar_datos(ruta, solo_lectura=True)
+        with pytest.raises(TypeError):
+            vistas[0]["documento"] = "99"
+
+        # Quien va a modificar recibe copias: la caché no cambia
+        copia = gestor_datos.cargar_datos(ruta)
+        copia[0]["documento"] = "99"
+        assert gestor_datos.cargar_datos(ruta, solo_lectura=True)[0]["documento"] == "10"
+    finally:
+        vigilante.desactivar()
+    shutil.rmtree(CARPETA_TEMP, ignore_errors=True)
+
+
+def test_lineas_anexadas_se_agregan_a_la_cache():
+    preparar_carpeta()
+    ruta_log = os.path.join(CARPETA_TEMP, "libro.log")
+    gestor_datos2.guardar_datos(ruta_log, [{"ISBN": "1", "stock": "3"}, {"ISBN": "2", "stock": "1"}])
+    ruta_jsonl = os.path.join(CARPETA_TEMP, "2025-01.jsonl")
+    with open(ruta_jsonl, "w", encoding="utf-8") as f:
+        f.write('{"id_prestamo": 1}\n')
+    vigilante.activar(CARPETA_TEMP, intervalo=0.05)
+    try:
+        assert len(gestor_datos2.cargar_datos(ruta_log)) == 2
+        vigilante.guardar_cache(ruta_jsonl, [{"id_prestamo": 1}], vigilante.firma(ruta_jsonl))
+
+        # Otro proceso anexa operaciones a la bitácora y registros al archivo '.jsonl'
+        bitacora.anotar(ruta_log, "ISBN", cambiados=[{"ISBN": "3", "stock": "5"}], sumas=[("1", "stock", -1)])
+        with open(ruta_jsonl, "a", encoding="utf-8") as f:
+            f.write('{"id_prestamo": 2}\n')
+
+        def en_cache(ruta):
+            return vigilante.leer_cache(ruta, solo_lectura=True) or []
+
+        assert esperar(lambda: [(r["ISBN"], r["stock"]) for r in en_cache(ruta_log)]
+                       == [("1", "2"), ("2", "1"), ("3", "5")])
+        assert esperar(lambda: [r["id_prestamo"] for r in en_cache(ruta_jsonl)] == [1, 2])
+    finally:
+        vigilante.desactivar()
+    shutil.rmtree(CARPETA_TEMP, ignore_errors=True)
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+import io
+from rich.console import Console
+from directorio import vista_tabla
+
+
+def filas(n, atrasado=None):
+    return [
+        {"id_prestamo": i, "usuario": f"Usuario {i}", "libro": "Rayuela", "fecha_prestamo": "2025-01-01",
+         "fecha_devolucion_esperada": "2025-01-15", "estado": "atrasado" if i == atrasado else "prestado"}
+        for i in range(1, n + 1)
+    ]
+
+
+def test_solo_se_reformatean_los_registros_que_cambian():
+    vista = vista_tabla.vista_prestamos()
+    vista.actualizar(filas(50))
+    assert vista.reformateadas == 50
+
+    resultado = vista.actualizar(filas(51, atrasado=7))
+    assert vista.reformateadas == 52  # el préstamo 7 cambió y el 51 es nuevo
+    assert resultado[6].plano[-1] == "Atrasado"
+    assert resultado[6].enriquecido[-1] == "[red bold]Atrasado[/red bold]"
+
+    vista.actualizar(filas(3))
+    assert set(vista.filas) == {1, 2, 3}
+
+
+def test_salida_plana_y_por_trozos():
+    vista = vista_tabla.vista_prestamos()
+    salida = io.StringIO()
+    assert vista.mostrar(Console(file=salida), filas(3)) == 3  # no es una terminal: texto plano
+    lineas = salida.getvalue().splitlines()
+    assert lineas[0].split("\t")[0] == "ID Préstamo"
+    assert lineas[1].split("\t") == ["1", "Usuario 1", "Rayuela", "2025-01-01", "2025-01-15", "Prestado"]
+
+    salida = io.StringIO()
+    vista.mostrar(Console(file=salida, force_terminal=True, width=120), filas(5), "Préstamos", tamano_trozo=2)
+    texto = salida.getvalue()
+    assert texto.count("Préstamos") == 1 and texto.count("ID Préstamo") == 1
+    assert all(f"Usuario {i}" in texto for i in range(1, 6))
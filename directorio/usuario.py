@@ -6,14 +6,18 @@ Este módulo utiliza 'gestor_datos' para la persistencia.
 """
 
 from typing import Any, Dict, List, Optional
+import busqueda_usuarios
+import cerrojo
 import gestor_datos
+import integridad
+from modelos import Usuario, a_dicts, desde_dicts
 
-def generar_id(usuarios: List[Dict[str, Any]]) -> int:
+def generar_id(usuarios: List[Usuario]) -> int:
     """
     Genera un nuevo ID autoincremental para un usuario.
 
     Args:
-        usuarios (List[Dict[str, Any]]): La lista actual de usuarios.
+        usuarios (List[Usuario]): La lista actual de usuarios.
 
     Returns:
         int: El nuevo ID a asignar.
@@ -21,10 +25,11 @@ def generar_id(usuarios: List[Dict[str, Any]]) -> int:
     if not usuarios:
         return 1
 
-    max_id = max(int(ap.get('id', 0)) for ap in usuarios)
+    max_id = max(ap.id for ap in usuarios)
     return max_id + 1
 
 
+@cerrojo.exclusivo
 def crear_usuario(
         filepath: str,
         documento: int,
@@ -48,27 +53,26 @@ def crear_usuario(
     Returns:
         Optional[Dict[str, Any]]: El diccionario del usuario creado o None si ya existía.
     """
-    usuarios = gestor_datos.cargar_datos(filepath)
+    usuarios = desde_dicts(Usuario, gestor_datos.cargar_datos(filepath))
     str_documento = str(documento)
 
-    if any(ap.get('documento') == str_documento for ap in usuarios):
+    if any(ap.documento == str_documento for ap in usuarios):
         print(f"\n❌ Error: El documento '{str_documento}' ya se encuentra registrado.")
         return None
 
     nuevo_id = generar_id(usuarios)
 
-    nuevo_usuario = {
-        'id': str(nuevo_id),
-        'documento': str_documento,
-        'nombres': nombres,
-        'apellidos': apellidos,
-        'email': email,
-
-    }
+    nuevo_usuario = Usuario(
+        id=nuevo_id,
+        documento=str_documento,
+        nombres=nombres,
+        apellidos=apellidos,
+        email=email,
+    )
 
     usuarios.append(nuevo_usuario)
-    gestor_datos.guardar_datos(filepath, usuarios)
-    return nuevo_usuario
+    gestor_datos.guardar_cambios(filepath, a_dicts(usuarios), [nuevo_usuario.a_dict()])
+    return nuevo_usuario.a_dict()
 
 
 def leer_todos_los_usuario(filepath: str) -> List[Dict[str, Any]]:
@@ -95,13 +99,10 @@ def buscar_usuario_por_documento(filepath: str, documento: str) -> Optional[Dict
     Returns:
         Optional[Dict[str, Any]]: El diccionario del usaurio si se encuentra, de lo contrario None.
     """
-    usuarios = gestor_datos.cargar_datos(filepath)
-    for usaurio in usuarios:
-        if usaurio.get('documento') == documento:
-            return usaurio
-    return None
+    return gestor_datos.buscar_registro(filepath, documento)
 
 
+@cerrojo.exclusivo
 def actualizar_usuario(
         filepath: str,
         documento: str,
@@ -135,23 +136,43 @@ def actualizar_usuario(
 
         usuario_encontrado.update(datos_nuevos)
         usuarios[indice] = usuario_encontrado
-        gestor_datos.guardar_datos(filepath, usuarios)
+        # Si cambió el documento, el registro anterior sale del índice de búsqueda
+        anterior = [documento] if usuario_encontrado.get('documento') != documento else []
+        gestor_datos.guardar_cambios(filepath, usuarios, [usuario_encontrado], anterior)
         return usuario_encontrado
 
     return None
 
 
-def eliminar_usuario(filepath: str, documento: str) -> bool:
+@cerrojo.exclusivo
+def eliminar_usuario(
+        filepath: str,
+        documento: str,
+        archivo_prestamo: Optional[str] = None,
+        modo: str = integridad.RESTRINGIR,
+        archivo_libro: Optional[str] = None,
+) -> bool:
     """
     (DELETE) Elimina un usuario de la agenda.
 
     Args:
         filepath (str): Ruta al archivo de datos.
         documento (str): El documento del usuario a eliminar.
+        archivo_prestamo (Optional[str]): Archivo de préstamos cuya integridad se
+            cuida; si es None no se revisan préstamos.
+        modo (str): integridad.RESTRINGIR o integridad.CASCADA.
+        archivo_libro (Optional[str]): Archivo de libros de esos préstamos, cuyo
+            stock se repone en cascada; obligatorio si se indica `archivo_prestamo`.
 
     Returns:
         bool: True si el usuario fue eliminado, False si no se encontró.
+
+    Raises:
+        ValueError: Si se indica `archivo_prestamo` sin `archivo_libro`.
+        integridad.IntegridadError: Si el usuario tiene préstamos sin devolver y el modo es RESTRINGIR.
     """
+    if archivo_prestamo and not archivo_libro:
+        raise ValueError("Para cuidar los préstamos hay que indicar también el archivo de libros")
     usuarios = gestor_datos.cargar_datos(filepath)
     usuario_a_eliminar = None
 
@@ -161,9 +182,26 @@ def eliminar_usuario(filepath: str, documento: str) -> bool:
             break
 
     if usuario_a_eliminar:
+        if archivo_prestamo:
+            integridad.antes_de_eliminar(archivo_prestamo, archivo_libro, 'usuario', documento, modo)
         usuarios.remove(usuario_a_eliminar)
-        gestor_datos.guardar_datos(filepath, usuarios)
+        gestor_datos.guardar_cambios(filepath, usuarios, [], [documento])
         return True
 
     return False
 
+
+def buscar_usuarios(filepath: str, consulta: str, k: int = 10) -> List[Dict[str, Any]]:
+    """
+    Busca usuarios por nombre, apellido o correo, tolerando tildes, mayúsculas y errores de escritura.
+
+    Args:
+        filepath (str): Ruta al archivo de datos.
+        consulta (str): El texto a buscar.
+        k (int): Cantidad máxima de resultados.
+
+    Returns:
+        List[Dict[str, Any]]: Los usuarios más parecidos, del más al menos parecido,
+            con la clave adicional 'similitud' (0 a 1).
+    """
+    return [dict(u, similitud=similitud) for similitud, u in busqueda_usuarios.buscar(filepath, consulta, k)]
@@ -0,0 +1,357 @@
+# -*- coding: utf-8 -*-
+"""
+Módulo Vigilante de Archivos.
+
+Observa la carpeta de datos (y sus subcarpetas inmediatas, como las del
+histórico) para detectar archivos modificados por otro puesto o por un proceso
+de importación. Usa inotify de Linux a través de `ctypes` cuando está
+disponible y, si no, compara periódicamente la fecha de modificación y el
+tamaño de cada archivo.
+
+Por cada archivo que cambia se avisa solo por ese archivo. Para los archivos de
+solo anexado ('.jsonl' y las bitácoras '.log') que crecieron, se leen
+únicamente los bytes nuevos.
+
+Mientras hay un vigilante activo (`activar`), los gestores de datos guardan en
+caché lo que leen y solo vuelven a leer de disco el archivo que cambió. Cada
+entrada de la caché recuerda la firma (fecha de modificación y tamaño) que
+tenía el archivo antes de leerlo, y solo se usa si el archivo la conserva: un
+cambio que el vigilante aún no avisó nunca deja datos viejos en la caché. Las
+líneas anexadas a un archivo en caché se agregan a su entrada (o, en una
+bitácora, se aplican sus operaciones) sin volver a leerlo.
+
+La caché guarda los registros como vistas de solo lectura: quien solo consulta
+las recibe sin copiar (`solo_lectura`) y quien va a modificar recibe copias.
+"""
+
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import struct
+import threading
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import escritura_diferida
+
+# Constantes de inotify (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+MASCARA = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+_EVENTO = struct.Struct('iIII')
+
+EXTENSIONES_ANEXADO = ('.jsonl', '.log')
+
+AlCambiar = Callable[[str], None]
+# Recibe la ruta, las líneas nuevas y las firmas del archivo antes y después de ellas
+AlAnexar = Callable[[str, List[str], Tuple[int, int], Tuple[int, int]], None]
+
+
+def firma(ruta: str) -> Tuple[int, int]:
+    """Retorna (fecha de modificación en ns, tamaño) de un archivo, o (-1, -1) si no existe."""
+    try:
+        info = os.stat(ruta)
+    except OSError:
+        return (-1, -1)
+    return (info.st_mtime_ns, info.st_size)
+
+
+def _cargar_inotify():
+    """Retorna la libc con inotify, o None si el sistema no la tiene."""
+    nombre = ctypes.util.find_library('c')
+    if not nombre:
+        return None
+    try:
+        libc = ctypes.CDLL(nombre, use_errno=True)
+    except OSError:
+        return None
+    if not hasattr(libc, 'inotify_init1'):
+        return None
+    return libc
+
+
+class Vigilante:
+    """Hilo que observa una carpeta y avisa qué archivos cambiaron o crecieron."""
+
+    def __init__(
+            self,
+            directorio: str,
+            al_cambiar: AlCambiar,
+            al_anexar: Optional[AlAnexar] = None,
+            intervalo: float = 1.0,
+            usar_inotify: bool = True,
+    ) -> None:
+        self.directorio = os.path.abspath(directorio)
+        self.al_cambiar = al_cambiar
+        self.al_anexar = al_anexar
+        self.intervalo = intervalo
+        self._estado: Dict[str, Tuple[int, int]] = {}
+        self._detener = threading.Event()
+        self._libc = _cargar_inotify() if usar_inotify else None
+        self._fd = -1
+        self._carpetas: Dict[int, str] = {}
+        self._hilo: Optional[threading.Thread] = None
+
+    @property
+    def usa_inotify(self) -> bool:
+        return self._fd >= 0
+
+    # --- Ciclo de vida ---
+
+    def iniciar(self) -> "Vigilante":
+        """Registra el estado actual de los archivos y empieza a vigilar."""
+        for ruta in self._archivos():
+            self._estado[ruta] = self._firma(ruta)
+        if self._libc is not None:
+            self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if self._fd >= 0:
+                for carpeta in self._subcarpetas():
+                    self._agregar_carpeta(carpeta)
+        self._hilo = threading.Thread(target=self._bucle, name='vigilante', daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self) -> None:
+        """Detiene el hilo y libera los recursos de inotify."""
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join()
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    # --- Recorrido de la carpeta ---
+
+    def _subcarpetas(self) -> List[str]:
+        carpetas = [self.directorio]
+        if os.path.isdir(self.directorio):
+            carpetas += [e.path for e in os.scandir(self.directorio) if e.is_dir()]
+        return carpetas
+
+    def _archivos(self) -> List[str]:
+        archivos = []
+        for carpeta in self._subcarpetas():
+            if os.path.isdir(carpeta):
+                archivos += [e.path for e in os.scandir(carpeta) if e.is_file()]
+        return archivos
+
+    @staticmethod
+    def _firma(ruta: str) -> Tuple[int, int]:
+        return firma(ruta)
+
+    def _agregar_carpeta(self, carpeta: str) -> None:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(carpeta), MASCARA)
+        if wd >= 0:
+            self._carpetas[wd] = carpeta
+
+    # --- Detección de cambios ---
+
+    def _bucle(self) -> None:
+        while not self._detener.is_set():
+            if self.usa_inotify:
+                candidatos = self._esperar_eventos()
+            else:
+                self._detener.wait(self.intervalo)
+                candidatos = set(self._archivos()) | set(self._estado)
+            for ruta in sorted(candidatos):
+                self._revisar(ruta)
+
+    def _esperar_eventos(self) -> set:
+        listos, _, _ = select.select([self._fd], [], [], self.intervalo)
+        if not listos:
+            return set()
+        try:
+            datos = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        candidatos = set()
+        posicion = 0
+        while posicion + _EVENTO.size <= len(datos):
+            wd, mascara, _, largo = _EVENTO.unpack_from(datos, posicion)
+            posicion += _EVENTO.size
+            nombre = datos[posicion:posicion + largo].rstrip(b'\0')
+            posicion += largo
+            carpeta = self._carpetas.get(wd)
+            if carpeta is None or not nombre:
+                continue
+            ruta = os.path.join(carpeta, os.fsdecode(nombre))
+            if mascara & IN_ISDIR:
+                if mascara & (IN_CREATE | IN_MOVED_TO) and carpeta == self.directorio:
+                    self._agregar_carpeta(ruta)
+            else:
+                candidatos.add(ruta)
+        return candidatos
+
+    def _revisar(self, ruta: str) -> None:
+        """Compara el archivo con su último estado conocido y avisa si cambió."""
+        anterior = self._estado.get(ruta)
+        actual = self._firma(ruta)
+        if actual == anterior:
+            return
+        self._estado[ruta] = actual
+
+        tamano_anterior = anterior[1] if anterior else 0
+        if (self.al_anexar is not None and ruta.endswith(EXTENSIONES_ANEXADO)
+                and actual[1] > tamano_anterior >= 0):
+            lineas = self._leer_nuevas_lineas(ruta, tamano_anterior, actual[1])
+            if lineas is not None:
+                self.al_anexar(ruta, lineas, anterior, self._estado[ruta])
+                return
+        self.al_cambiar(ruta)
+
+    def _leer_nuevas_lineas(self, ruta: str, desde: int, hasta: int) -> Optional[List[str]]:
+        """Lee solo los bytes agregados al final de un archivo de solo anexado."""
+        try:
+            with open(ruta, mode='rb') as f:
+                f.seek(desde)
+                nuevos = f.read(hasta - desde)
+        except OSError:
+            return None
+        if not nuevos.endswith(b'\n'):
+            # Línea a medio escribir: se leerá completa en el siguiente aviso
+            corte = nuevos.rfind(b'\n') + 1
+            self._estado[ruta] = (self._estado[ruta][0], desde + corte)
+            nuevos = nuevos[:corte]
+        return [linea for linea in nuevos.decode('utf-8').splitlines() if linea.strip()]
+
+
+# --- Caché de lectura de los gestores ---
+
+Registros = Tuple[Mapping[str, Any], ...]
+
+# Por ruta: la firma del archivo al leerlo, sus registros y el campo clave (para aplicar bitácoras)
+_CACHE: Dict[str, Tuple[Tuple[int, int], Registros, Optional[str]]] = {}
+_CANDADO = threading.Lock()
+_VIGILANTE: Optional[Vigilante] = None
+
+
+def _congelar(datos: Sequence[Mapping[str, Any]]) -> Registros:
+    return tuple(r if isinstance(r, MappingProxyType) else MappingProxyType(dict(r)) for r in datos)
+
+
+def _invalidar_por_cambio(ruta: str) -> None:
+    invalidar(ruta)
+    # Lo leído antes ya no sirve como base de diferencias del diario
+    escritura_diferida.olvidar(ruta)
+
+
+def _con_lineas(ruta: str, registros: Registros, clave: Optional[str], lineas: List[str]) -> Optional[Registros]:
+    """Retorna los registros de la caché con las líneas anexadas, o None si no se pueden aplicar."""
+    try:
+        if ruta.endswith('.log'):
+            if clave is None:
+                return None
+            import bitacora  # importación diferida: bitacora usa este módulo (a través de cerrojo)
+            return _congelar(bitacora.aplicar_lineas(registros, clave, lineas))
+        return registros + _congelar([json.loads(linea) for linea in lineas])
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return None
+
+
+def _anexar_en_cache(ruta: str, lineas: List[str], anterior: Tuple[int, int], actual: Tuple[int, int]) -> None:
+    if os.path.basename(ruta) == escritura_diferida.NOMBRE_DIARIO:
+        return  # el diario se aplica con el cerrojo tomado, no pasa por la caché
+    escritura_diferida.olvidar(ruta)
+    with _CANDADO:
+        entrada = _CACHE.pop(ruta, None)
+        # Solo si lo guardado es justo lo que había antes de las líneas nuevas
+        if entrada is None or entrada[0] != anterior:
+            return
+        registros = _con_lineas(ruta, entrada[1], entrada[2], lineas)
+        if registros is not None:
+            _CACHE[ruta] = (actual, registros, entrada[2])
+
+
+def activar(directorio: str, intervalo: float = 1.0) -> Vigilante:
+    """
+    Empieza a vigilar la carpeta de datos y habilita la caché de lectura de los gestores.
+
+    Args:
+        directorio (str): Carpeta de datos.
+        intervalo (float): Segundos entre revisiones (o de espera máxima con inotify).
+
+    Returns:
+        Vigilante: El vigilante activo.
+    """
+    global _VIGILANTE
+    if _VIGILANTE is None:
+        _VIGILANTE = Vigilante(directorio, _invalidar_por_cambio, _anexar_en_cache, intervalo=intervalo).iniciar()
+    return _VIGILANTE
+
+
+def desactivar() -> None:
+    """Detiene el vigilante y vacía la caché de lectura."""
+    global _VIGILANTE
+    if _VIGILANTE is not None:
+        vigilante, _VIGILANTE = _VIGILANTE, None
+        vigilante.detener()
+    with _CANDADO:
+        _CACHE.clear()
+
+
+def leer_cache(filepath: str, solo_lectura: bool = False) -> Optional[Sequence[Mapping[str, Any]]]:
+    """
+    Retorna lo leído antes de un archivo que no ha cambiado, o None.
+
+    Args:
+        filepath (str): Ruta del archivo.
+        solo_lectura (bool): Si es True, retorna las vistas de solo lectura de
+            la caché sin copiarlas; si no, una lista de copias que se pueden modificar.
+
+    Returns:
+        Optional[Sequence[Mapping[str, Any]]]: Los registros, o None si no están en caché.
+    """
+    if _VIGILANTE is None:
+        return None
+    ruta = os.path.abspath(filepath)
+    actual = firma(ruta)
+    with _CANDADO:
+        entrada = _CACHE.get(ruta)
+        # Una entrada vieja se conserva: si el archivo solo creció, el vigilante la pone al día
+        if entrada is None or entrada[0] != actual:
+            return None
+        registros = entrada[1]
+    return registros if solo_lectura else [dict(r) for r in registros]
+
+
+def guardar_cache(filepath: str, datos: List[dict], firma_leida: Tuple[int, int],
+                  clave: Optional[str] = None) -> None:
+    """
+    Guarda en caché lo leído de un archivo, si hay un vigilante activo.
+
+    Args:
+        filepath (str): Ruta del archivo.
+        datos (List[dict]): Los registros leídos.
+        firma_leida (Tuple[int, int]): La firma del archivo tomada antes de leerlo.
+        clave (Optional[str]): Campo que identifica a cada registro, para aplicar
+            en la caché las operaciones que se anexen a una bitácora.
+    """
+    if _VIGILANTE is not None and firma_leida != (-1, -1):
+        registros = _congelar(datos)
+        with _CANDADO:
+            _CACHE[os.path.abspath(filepath)] = (firma_leida, registros, clave)
+
+
+def invalidar(filepath: str) -> None:
+    """Descarta la caché de un archivo para que la siguiente lectura vaya a disco."""
+    ruta = os.path.abspath(filepath)
+    with _CANDADO:
+        _CACHE.pop(ruta, None)
+
+
+def invalidar_carpeta(carpeta: str) -> None:
+    """Descarta la caché de todos los archivos de una carpeta (ruta absoluta)."""
+    with _CANDADO:
+        for ruta in [ruta for ruta in _CACHE if os.path.dirname(ruta) == carpeta]:
+            del _CACHE[ruta]
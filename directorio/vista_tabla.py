@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+Módulo de Vistas de Tabla.
+
+Mantiene, para cada listado, las filas ya formateadas (textos y colores) junto
+con la versión del registro del que salieron. Al volver a mostrar el listado
+solo se formatean los registros nuevos o que cambiaron; los demás se reutilizan.
+
+La tabla se imprime por trozos de `TAMANO_TROZO` filas, así que la primera
+pantalla aparece sin esperar a que se arme la tabla completa. Si la salida no
+es una terminal interactiva (o se pide expresamente), se escribe texto plano
+separado por tabuladores, sin bordes ni colores, que es mucho más rápido.
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from rich import box
+from rich.console import Console
+from rich.table import Table
+
+# Filas por cada tabla impresa.
+TAMANO_TROZO = 200
+
+# Texto y estilo con que se muestra cada estado de un préstamo.
+ESTADOS = {
+    'devuelto': ('Devuelto', 'green'),
+    'atrasado': ('Atrasado', 'red bold'),
+    'prestado': ('Prestado', 'yellow'),
+}
+
+
+class FilaVista:
+    """Celdas de una fila en texto plano y con marcas de estilo de rich."""
+
+    __slots__ = ('version', 'plano', 'enriquecido')
+
+    def __init__(self, version: Tuple[Any, ...], plano: Tuple[str, ...], enriquecido: Tuple[str, ...]) -> None:
+        self.version = version
+        self.plano = plano
+        self.enriquecido = enriquecido
+
+
+class VistaTabla:
+    """Columnas de un listado y caché de sus filas formateadas, por clave de registro."""
+
+    def __init__(
+            self,
+            columnas: Sequence[Tuple[str, Dict[str, Any]]],
+            formatear: Callable[[Dict[str, Any]], Tuple[Tuple[str, ...], Tuple[str, ...]]],
+            clave: str,
+            **opciones_tabla: Any,
+    ) -> None:
+        self.columnas = list(columnas)
+        self.formatear = formatear
+        self.clave = clave
+        self.opciones_tabla = opciones_tabla
+        self.filas: Dict[Any, FilaVista] = {}
+        self.reformateadas = 0
+
+    def actualizar(self, registros: Sequence[Dict[str, Any]]) -> List[FilaVista]:
+        """
+        Retorna las filas formateadas de los registros, en el mismo orden.
+
+        Solo se formatean los registros cuya versión (sus valores) cambió desde
+        la última vez; las claves que ya no aparecen salen de la caché.
+
+        Args:
+            registros (Sequence[Dict[str, Any]]): Los registros a mostrar.
+
+        Returns:
+            List[FilaVista]: Una fila por registro.
+        """
+        anteriores, self.filas = self.filas, {}
+        resultado = []
+        for registro in registros:
+            clave = registro.get(self.clave)
+            version = tuple(registro.values())
+            fila = anteriores.get(clave)
+            if fila is None or fila.version != version:
+                fila = FilaVista(version, *self.formatear(registro))
+                self.reformateadas += 1
+            self.filas[clave] = fila
+            resultado.append(fila)
+        return resultado
+
+    def tabla(self, titulo: Optional[str] = None, encabezado: bool = True) -> Table:
+        """Arma una tabla vacía con las columnas y opciones de la vista."""
+        tabla = Table(title=titulo, show_header=encabezado, **self.opciones_tabla)
+        for nombre, opciones in self.columnas:
+            tabla.add_column(nombre, **opciones)
+        return tabla
+
+    def mostrar(
+            self,
+            console: Console,
+            registros: Sequence[Dict[str, Any]],
+            titulo: Optional[str] = None,
+            plano: Optional[bool] = None,
+            tamano_trozo: Optional[int] = None,
+    ) -> int:
+        """
+        Imprime los registros como tabla (por trozos) o como texto plano.
+
+        Args:
+            console (Console): La consola de rich donde imprimir.
+            registros (Sequence[Dict[str, Any]]): Los registros a mostrar.
+            titulo (Optional[str]): Título de la tabla.
+            plano (Optional[bool]): True para texto plano; por defecto, plano si
+                la consola no es una terminal interactiva.
+            tamano_trozo (Optional[int]): Filas por tabla impresa (TAMANO_TROZO por defecto).
+
+        Returns:
+            int: La cantidad de filas mostradas.
+        """
+        filas = self.actualizar(registros)
+        if plano is None:
+            plano = not console.is_terminal
+
+        if plano:
+            salida = console.file
+            salida.write('\t'.join(nombre for nombre, _ in self.columnas) + '\n')
+            salida.writelines('\t'.join(fila.plano) + '\n' for fila in filas)
+            salida.flush()
+            return len(filas)
+
+        trozo = tamano_trozo or TAMANO_TROZO
+        for inicio in range(0, len(filas), trozo):
+            # Solo el primer trozo lleva título y encabezado; cada trozo se imprime apenas está listo
+            tabla = self.tabla(titulo if inicio == 0 else None, encabezado=inicio == 0)
+            for fila in filas[inicio:inicio + trozo]:
+                tabla.add_row(*fila.enriquecido)
+            console.print(tabla)
+        return len(filas)
+
+
+def formatear_prestamo(registro: Dict[str, Any]) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """
+    Formatea una fila de préstamo de `listar_prestamos` o `listar_devoluciones`.
+
+    Args:
+        registro (Dict[str, Any]): La fila con usuario, libro, fechas y estado.
+
+    Returns:
+        Tuple[Tuple[str, ...], Tuple[str, ...]]: (celdas en texto plano, celdas con estilos).
+    """
+    texto, estilo = ESTADOS.get(registro.get('estado'), ESTADOS['prestado'])
+    fecha_final = registro.get('fecha_devolucion') or registro.get('fecha_devolucion_esperada') or 'N/A'
+    plano = (
+        str(registro.get('id_prestamo', '')),
+        str(registro.get('usuario', '')),
+        str(registro.get('libro', '')),
+        str(registro.get('fecha_prestamo') or ''),
+        str(fecha_final),
+        texto,
+    )
+    return plano, plano[:-1] + (f"[{estilo}]{texto}[/{estilo}]",)
+
+
+def vista_prestamos(titulo_fecha: str = "Fecha devolución esperada", **opciones_tabla: Any) -> VistaTabla:
+    """
+    Crea la vista de un listado de préstamos con las columnas del menú.
+
+    Args:
+        titulo_fecha (str): Encabezado de la columna de fecha final.
+        **opciones_tabla (Any): Opciones adicionales de `rich.table.Table`.
+
+    Returns:
+        VistaTabla: La vista, con su caché vacía.
+    """
+    columnas = [
+        ("ID Préstamo", {'justify': 'center', 'style': 'cyan', 'no_wrap': True}),
+        ("Usuario", {'justify': 'left', 'style': 'magenta'}),
+        ("Libro", {'justify': 'left', 'style': 'blue'}),
+        ("Fecha préstamo", {'justify': 'center', 'style': 'green'}),
+        (titulo_fecha, {'justify': 'center', 'style': 'bright_cyan'}),
+        ("Estado", {'justify': 'center', 'style': 'bold yellow'}),
+    ]
+    return VistaTabla(columnas, formatear_prestamo, 'id_prestamo', show_lines=True, box=box.DOUBLE_EDGE,
+                      **opciones_tabla)